@@ -0,0 +1,124 @@
+"""
+Adaptive Capture Benchmark
+Runs the ingest service against a fake ESP32-CAM showing a mostly idle
+library scene, once at a fixed VGA stream and once with --adaptive capture
+control, and compares bandwidth, CPU and scan latency
+
+Usage:
+    python benchmark_capture_control.py [--seconds 60] [--every 30] [--hold 2]
+
+A book's QR label is held in front of the camera for --hold seconds every
+--every seconds; the rest of the time the camera sees the empty reading
+corner. Scan latency is the time from the first frame showing the label
+to the first decode.
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from capture_control import BURST_PROFILE, IDLE_PROFILE, jpeg_quality_for
+from esp32cam_ingest import CameraEndpoint, IngestService
+from fake_mjpeg_server import FakeMJPEGServer
+from qr_render import qr_matrix
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+FPS = 20  # Typical ESP32-CAM VGA stream rate
+SIZE = (640, 480)
+MODULE_PX = 4  # QR module size at VGA (label about 12 cm from the lens)
+
+
+def library_scene(seconds, every, hold, payload="QR001"):
+    """
+    JPEG frames of the scene and the frame indexes where the label appears
+
+    Returns:
+        tuple: (list of jpg bytes, list of first frame indexes per presentation)
+    """
+    width, height = SIZE
+    rng = np.random.default_rng(0)
+    background = np.full((height, width, 3), 150, dtype=np.uint8)
+    for _ in range(40):  # Shelves and book spines
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = (int(v) for v in rng.integers(8, 80, 2))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(background, (x, y), (x + w, y + h), color, -1)
+    matrix = np.array(qr_matrix(payload), dtype=np.uint8)
+    label = np.kron(1 - matrix, np.ones((MODULE_PX, MODULE_PX), dtype=np.uint8)) * 255
+    side = label.shape[0]
+    quality = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality_for(BURST_PROFILE.quality)]
+
+    frames, presentations = [], []
+    total = int(seconds * FPS)
+    for index in range(total):
+        t = index / FPS
+        image = background.copy()
+        shown = t % every >= every - hold
+        if shown:
+            if not presentations or presentations[-1] < index - hold * FPS:
+                presentations.append(index)
+            # Held by hand: drifts a few pixels per frame
+            x = 250 + int(6 * np.sin(index / 3))
+            y = 160 + int(4 * np.cos(index / 4))
+            image[y:y + side, x:x + side] = cv2.cvtColor(label, cv2.COLOR_GRAY2BGR)
+        noise = rng.integers(0, 6, image.shape, dtype=np.uint8)
+        frames.append(cv2.imencode('.jpg', cv2.add(image, noise), quality)[1].tobytes())
+    return frames, presentations
+
+
+def run(frames, presentations, seconds, adaptive):
+    server = FakeMJPEGServer(frames, fps=FPS, settings={'framesize': BURST_PROFILE.framesize,
+                                                      'quality': BURST_PROFILE.quality})
+    if adaptive:
+        server.prepare(IDLE_PROFILE.framesize, IDLE_PROFILE.quality)
+
+    hits = []
+
+    def on_scan(name, codes):
+        hits.append(time.monotonic())
+
+    with server:
+        endpoint = CameraEndpoint('bench', server.stream_url, f"{server.url}/control")
+        service = IngestService([endpoint], workers=1, on_scan=on_scan, adaptive=adaptive)
+        cpu_start = time.process_time()
+        service.start()
+        time.sleep(seconds)
+        stats = service.stats()['bench']
+        cpu = time.process_time() - cpu_start
+        service.stop()
+
+    latencies = []
+    for index in presentations:
+        shown_at = server.stream_started + index / FPS
+        later = [hit for hit in hits if hit >= shown_at]
+        if later and later[0] - shown_at < len(frames) / FPS:
+            latencies.append(later[0] - shown_at)
+    return stats, cpu, latencies
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed vs adaptive capture benchmark")
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--every', type=float, default=30, help='Seconds between presentations')
+    parser.add_argument('--hold', type=float, default=2, help='Seconds the label stays in view')
+    args = parser.parse_args()
+
+    frames, presentations = library_scene(args.seconds, args.every, args.hold)
+    print(f"📚 {args.seconds:.0f} s scene at {FPS} fps, label shown {len(presentations)}x "
+          f"for {args.hold:.0f} s\n")
+    for name, adaptive in (('fixed VGA', False), ('adaptive', True)):
+        stats, cpu, latencies = run(frames, presentations, args.seconds, adaptive)
+        latency = (f"{np.median(latencies) * 1000:.0f} ms median, {max(latencies) * 1000:.0f} ms max"
+                   if latencies else "n/a")
+        capture = stats.get('capture', {})
+        print(f"{name:10s} {stats['bytes_received'] / args.seconds / 1024:7.1f} KiB/s | "
+              f"CPU {cpu / args.seconds * 100:5.1f}% | scanned {stats['scanned']:4d} | "
+              f"found {len(latencies)}/{len(presentations)} | latency {latency}"
+              + (f" | bursts {capture['bursts']}, {capture['seconds_burst']:.0f} s burst" if capture else ""))
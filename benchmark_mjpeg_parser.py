@@ -0,0 +1,127 @@
+"""
+MJPEG Parser Benchmark
+Compares the MJPEGDemuxer against the original bytes += / find() loop
+on recorded ESP32-CAM stream captures
+
+Usage:
+    python benchmark_mjpeg_parser.py [capture.mjpeg ...] [--chunk-size 1024]
+
+A capture is the raw HTTP body of http://<esp32-ip>:81/stream saved to disk.
+Without captures, a synthetic VGA stream in the ESP32 format is generated.
+"""
+
+import argparse
+import time
+
+from mjpeg_parser import MJPEGDemuxer
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+PART_BOUNDARY = b"123456789000000000000987654321"  # Same as app_httpd.cpp
+SYNTHETIC_FRAMES = 300
+SYNTHETIC_SIZE = (640, 480)
+
+
+# =======================================================
+# FUNCTION: Build a synthetic capture
+# =======================================================
+def build_synthetic_capture(frames=SYNTHETIC_FRAMES, with_length=True):
+    """
+    Build a stream body matching the ESP32 stream handler output
+
+    Args:
+        frames (int): Number of parts to emit
+        with_length (bool): Include the Content-Length header
+    """
+    import cv2
+    import numpy as np
+
+    width, height = SYNTHETIC_SIZE
+    rng = np.random.default_rng(0)
+    # Smooth gradient plus noise gives a realistic ~30-60 KB VGA JPEG
+    base = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    parts = []
+    for index in range(frames):
+        noise = rng.integers(0, 32, (height, width), dtype=np.uint8)
+        image = cv2.merge([base, noise + base // 2, np.roll(base, index, axis=1)])
+        jpg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+        header = b"Content-Type: image/jpeg\r\n"
+        if with_length:
+            header += b"Content-Length: %d\r\n" % len(jpg)
+        header += b"X-Timestamp: %d.%06d\r\n\r\n" % (index // 30, (index % 30) * 33333)
+        parts.append(b"\r\n--" + PART_BOUNDARY + b"\r\n" + header + jpg)
+    return b"".join(parts)
+
+
+# =======================================================
+# PARSERS UNDER TEST
+# =======================================================
+def parse_legacy(data, chunk_size):
+    """Original ESP32CamReader._read_stream loop (without decoding)"""
+    count = 0
+    bytes_data = bytes()
+    for offset in range(0, len(data), chunk_size):
+        bytes_data += data[offset:offset + chunk_size]
+        a = bytes_data.find(b'\xff\xd8')
+        b = bytes_data.find(b'\xff\xd9')
+        if a != -1 and b != -1:
+            jpg = bytes_data[a:b + 2]
+            bytes_data = bytes_data[b + 2:]
+            count += 1
+    return count
+
+
+def parse_demuxer(data, chunk_size):
+    """MJPEGDemuxer fed with the same chunk sizes"""
+    demuxer = MJPEGDemuxer(PART_BOUNDARY)
+    view = memoryview(data)
+    count = 0
+    for offset in range(0, len(data), chunk_size):
+        count += len(demuxer.feed(view[offset:offset + chunk_size]))
+    return count
+
+
+def run(name, parser, data, chunk_size, repeat):
+    best = None
+    frames = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = parser(data, chunk_size)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    mb_per_sec = len(data) / best / 1e6
+    print(f"   {name:<10} {frames:>6} frames  {best * 1000:>9.1f} ms  "
+          f"{mb_per_sec:>8.1f} MB/s  {frames / best:>9.0f} fps")
+    return best
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('captures', nargs='*', help='Recorded stream bodies')
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.captures:
+        samples = []
+        for path in args.captures:
+            with open(path, 'rb') as f:
+                samples.append((path, f.read()))
+    else:
+        samples = [
+            ("synthetic (Content-Length)", build_synthetic_capture(with_length=True)),
+            ("synthetic (markers only)", build_synthetic_capture(with_length=False)),
+        ]
+
+    print("📊 MJPEG Parser Benchmark")
+    print("=" * 70)
+    for label, data in samples:
+        print(f"\n📁 {label}: {len(data) / 1e6:.1f} MB, chunk size {args.chunk_size}")
+        legacy = run("legacy", parse_legacy, data, args.chunk_size, args.repeat)
+        demux = run("demuxer", parse_demuxer, data, args.chunk_size, args.repeat)
+        print(f"   Speedup: {legacy / demux:.1f}x")
+    print("\n" + "=" * 70)
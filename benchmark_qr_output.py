@@ -0,0 +1,106 @@
+"""
+QR Output Backend Benchmark
+Compares file size and render speed of the QR output backends
+
+Usage:
+    python benchmark_qr_output.py [--count 200] [--books books.tsv]
+
+Backends:
+    pil-png     qrcode's make_image().save() (the original output)
+    png         qr_render 1-bit PNG, optimize + compress_level 9
+    svg         qr_render SVG path (gzip size shown for servers that compress)
+"""
+
+import argparse
+import gzip
+import io
+import time
+
+import qrcode
+
+from qr_render import render_bytes
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+QR_SIZE = 10  # Same settings as qr_code_generator.py
+QR_BORDER = 4
+
+
+# =======================================================
+# BACKENDS UNDER TEST
+# =======================================================
+def render_pil_png(data):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=QR_SIZE,
+        border=QR_BORDER,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    out = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(out, format="PNG")
+    return out.getvalue()
+
+
+def render_png(data):
+    return render_bytes(data, "png", "H", QR_SIZE, QR_BORDER)
+
+
+def render_svg(data):
+    return render_bytes(data, "svg", "H", QR_SIZE, QR_BORDER)
+
+
+BACKENDS = [("pil-png", render_pil_png), ("png", render_png), ("svg", render_svg)]
+
+
+# =======================================================
+# FUNCTION: Run one backend
+# =======================================================
+def run(name, render, payloads):
+    """
+    Render every payload and report size and speed
+
+    Returns:
+        dict: Totals for the summary table
+    """
+    total_bytes = 0
+    total_gzip = 0
+    start = time.perf_counter()
+    for payload in payloads:
+        data = render(payload)
+        total_bytes += len(data)
+        if name == "svg":
+            total_gzip += len(gzip.compress(data))
+    elapsed = time.perf_counter() - start
+    count = len(payloads)
+    line = (f"{name:8s} {total_bytes / count:8.0f} B/code  "
+            f"{elapsed / count * 1000:6.2f} ms/code  {count / elapsed:7.0f} codes/s")
+    if total_gzip:
+        line += f"  (gzip {total_gzip / count:.0f} B/code)"
+    print(line)
+    return {"bytes": total_bytes, "seconds": elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="Synthetic payloads to render")
+    parser.add_argument("--books", help="CSV or TSV export of the books table to use as payloads")
+    args = parser.parse_args()
+
+    if args.books:
+        from qr_code_generator import load_books_file
+        payloads = [book["qr_code"] for book in load_books_file(args.books)]
+    else:
+        payloads = [f"QR{index:05d}" for index in range(args.count)]
+
+    print(f"📊 Rendering {len(payloads)} QR codes per backend\n")
+    results = {name: run(name, render, payloads) for name, render in BACKENDS}
+
+    baseline = results["pil-png"]
+    print()
+    for name, result in results.items():
+        if name != "pil-png":
+            print(f"{name:8s} size {result['bytes'] / baseline['bytes']:.2f}x, "
+                  f"speed {baseline['seconds'] / result['seconds']:.2f}x vs pil-png")
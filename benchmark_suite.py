@@ -0,0 +1,277 @@
+"""
+Camera and Scanner Benchmark Suite
+Times the stream parser, JPEG decode, QR scan and the end-to-end
+pipeline on a recording, and compares them against tracked baselines
+
+Usage:
+    python benchmark_suite.py [--recording capture.mjpeg] [--rounds 5]
+                              [--only parse,decode] [--save] [--tolerance 0.25]
+
+Without --recording, a synthetic VGA capture in the ESP32 stream format is
+generated, with a QR code in two thirds of the frames. Recordings come
+from camera_replay.py.
+
+Each case runs one warm-up round and --rounds timed rounds; the median
+round is compared with benchmark_baseline.json. A case more than
+--tolerance slower than its baseline is a regression, and the exit code
+is 1. Baselines depend on the machine: --save rewrites them, so only save
+from the reference machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera_replay import load_recording, stream_part
+from esp32_stream_client import CHUNK_SIZE
+from fake_mjpeg_server import PART_BOUNDARY
+from frame_pipeline import FrameExchange, OutputStage
+from mjpeg_parser import MJPEGDemuxer
+from qr_render import qr_matrix
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+SYNTHETIC_FRAMES = 120
+SYNTHETIC_SIZE = (640, 480)
+OUTPUT_SIZE = (640, 480)  # Same as the virtual camera
+ROUNDS = 5
+TOLERANCE = 0.25  # Allowed slowdown against the baseline median
+
+
+# =======================================================
+# TEST DATA
+# =======================================================
+def synthetic_recording(frames=SYNTHETIC_FRAMES, payload="QR001"):
+    """
+    Build (jpg, timestamp) pairs: a QR code slides across a noisy scene
+    for the first two thirds of the clip, then leaves
+    """
+    width, height = SYNTHETIC_SIZE
+    matrix = np.array(qr_matrix(payload), dtype=np.uint8)
+    code = np.kron(1 - matrix, np.ones((6, 6), dtype=np.uint8)) * 255
+    side = code.shape[0]
+    rng = np.random.default_rng(0)
+    base = np.tile(np.linspace(60, 160, width, dtype=np.uint8), (height, 1))
+    recording = []
+    for index in range(frames):
+        gray = base.copy()
+        if index < frames * 2 // 3:
+            x = 20 + index * 2
+            gray[100:100 + side, x:x + side] = code
+        noise = rng.integers(0, 12, (height, width), dtype=np.uint8)
+        image = cv2.cvtColor(cv2.add(gray, noise), cv2.COLOR_GRAY2BGR)
+        jpg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+        recording.append((jpg, index / 30))
+    return recording
+
+
+def capture_body(recording):
+    """The stream body the camera would have sent for `recording`"""
+    return b"".join(stream_part(jpg, timestamp or 0.0) for jpg, timestamp in recording)
+
+
+class NullCamera:
+    """Stands in for pyvirtualcam.Camera"""
+
+    def send(self, frame):
+        pass
+
+
+# =======================================================
+# BENCHMARK CASES
+# =======================================================
+# Each case takes the recording and returns a function that runs one round
+# and returns the number of frames it processed.
+def case_parse(recording):
+    body = capture_body(recording)
+    boundary = PART_BOUNDARY.encode()
+
+    def run():
+        demuxer = MJPEGDemuxer(boundary)
+        view = memoryview(body)
+        count = 0
+        for offset in range(0, len(body), CHUNK_SIZE):
+            for _ in demuxer.feed(view[offset:offset + CHUNK_SIZE]):
+                count += 1
+        return count
+    return run
+
+
+def case_decode(recording):
+    exchange = FrameExchange(*OUTPUT_SIZE)
+    out = np.empty((OUTPUT_SIZE[1], OUTPUT_SIZE[0], 3), dtype=np.uint8)
+
+    def run():
+        for jpg, _ in recording:
+            exchange.decode(jpg, out=out)
+        return len(recording)
+    return run
+
+
+def case_scan(recording):
+    grays = [cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_GRAYSCALE) for jpg, _ in recording]
+    detector = cv2.QRCodeDetector()
+
+    def run():
+        for gray in grays:
+            detector.detectAndDecode(gray)
+        return len(grays)
+    return run
+
+
+def case_end_to_end(recording):
+    """Stream body -> demuxer -> FrameExchange -> OutputStage -> QR scan"""
+    body = capture_body(recording)
+    boundary = PART_BOUNDARY.encode()
+    detector = cv2.QRCodeDetector()
+
+    def run():
+        demuxer = MJPEGDemuxer(boundary)
+        exchange = FrameExchange(*OUTPUT_SIZE)
+        output = OutputStage(NullCamera(), *OUTPUT_SIZE)
+        view = memoryview(body)
+        count = 0
+        for offset in range(0, len(body), CHUNK_SIZE):
+            for jpg in demuxer.feed(view[offset:offset + CHUNK_SIZE]):
+                exchange.put(bytes(jpg.data), jpg.timestamp)
+                frame = exchange.read()
+                output.send(frame.image)
+                detector.detectAndDecode(cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY))
+                count += 1
+        return count
+    return run
+
+
+CASES = {
+    'parse': case_parse,
+    'decode': case_decode,
+    'scan': case_scan,
+    'end_to_end': case_end_to_end,
+}
+
+
+# =======================================================
+# RUNNER
+# =======================================================
+def run_case(run, rounds=ROUNDS):
+    """Time `rounds` rounds after one warm-up round"""
+    run()
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        frames = run()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        'rounds': rounds,
+        'frames': frames,
+        'min_ms': round(min(times) * 1000, 3),
+        'median_ms': round(median * 1000, 3),
+        'mean_ms': round(statistics.mean(times) * 1000, 3),
+        'stddev_ms': round(statistics.stdev(times) * 1000, 3) if rounds > 1 else 0.0,
+        'frames_per_sec': round(frames / median, 1),
+    }
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, recording_name, tolerance):
+    """
+    Return {case: ratio of median to baseline median} and the regressed cases
+    """
+    if not baseline or baseline.get('recording') != recording_name:
+        return {}, []
+    ratios, regressions = {}, []
+    for name, result in results.items():
+        reference = baseline['results'].get(name)
+        if reference and reference['frames'] == result['frames']:
+            ratios[name] = result['median_ms'] / reference['median_ms']
+            if ratios[name] > 1 + tolerance:
+                regressions.append(name)
+    return ratios, regressions
+
+
+def print_table(results, ratios):
+    print(f"{'Case':12s} {'Min (ms)':>10s} {'Median (ms)':>12s} {'Mean (ms)':>10s} "
+          f"{'StdDev':>8s} {'Frames/s':>10s} {'vs baseline':>12s}")
+    for name, r in results.items():
+        ratio = f"{(ratios[name] - 1) * 100:+.1f}%" if name in ratios else "-"
+        print(f"{name:12s} {r['min_ms']:10.2f} {r['median_ms']:12.2f} {r['mean_ms']:10.2f} "
+              f"{r['stddev_ms']:8.2f} {r['frames_per_sec']:10.1f} {ratio:>12s}")
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+def main():
+    parser = argparse.ArgumentParser(description="Camera and scanner benchmark suite")
+    parser.add_argument('--recording', help='.mjpeg capture or frame directory (default: synthetic)')
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--only', help='Comma-separated cases: ' + ','.join(CASES))
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    recording_name = os.path.basename(args.recording.rstrip('/')) if args.recording else 'synthetic'
+    recording = load_recording(args.recording) if args.recording else synthetic_recording()
+    if not recording:
+        raise SystemExit(f"❌ No frames in {args.recording}")
+    print(f"📼 Recording: {recording_name} ({len(recording)} frames), {args.rounds} rounds per case\n")
+
+    results = {name: run_case(CASES[name](recording), args.rounds) for name in names}
+    baseline = load_baseline(args.baseline)
+    ratios, regressions = compare(results, baseline, recording_name, args.tolerance)
+    print_table(results, ratios)
+
+    if args.save:
+        saved = baseline if baseline and baseline.get('recording') == recording_name else {}
+        saved_results = dict(saved.get('results', {}), **results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'recording': recording_name, 'machine': machine_info(), 'results': saved_results},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    elif baseline is None:
+        print(f"\nℹ️  No baseline at {args.baseline}; run with --save to create one")
+    elif not ratios:
+        print(f"\nℹ️  Baseline is for recording '{baseline.get('recording')}'; nothing compared")
+
+    if regressions and not args.save:
+        print(f"\n❌ Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
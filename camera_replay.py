@@ -0,0 +1,358 @@
+"""
+ESP32-CAM Record and Replay
+Records camera streams to disk and plays them back in place of the live
+device, so the virtual camera, the scanner and the benchmarks run without
+an ESP32-CAM or a webcam
+
+Usage:
+    python camera_replay.py record --url http://192.168.1.100 --out capture.mjpeg [--seconds 10]
+    python camera_replay.py record --url http://192.168.1.100 --out frames/ [--frames 300]
+    python camera_replay.py record --camera 0 --out frames/ [--seconds 10]
+    python camera_replay.py info capture.mjpeg
+
+Recordings:
+    *.mjpeg / *.mjpg  Raw HTTP body of the :81/stream endpoint, as sent by
+                      arduino/CameraWebServer (X-Timestamp part headers
+                      carry the capture time of every frame)
+    directory         frame_000000.jpg, frame_000001.jpg, ... plus
+                      timestamps.txt ("<file> <seconds>" per line)
+"""
+
+import argparse
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from fake_mjpeg_server import STREAM_BOUNDARY, STREAM_PART
+from mjpeg_parser import MJPEGDemuxer, MJPEGFrame, boundary_from_content_type
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+MJPEG_EXTENSIONS = ('.mjpeg', '.mjpg')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+TIMESTAMPS_FILE = 'timestamps.txt'
+FRAME_NAME = 'frame_{:06d}.jpg'
+DEFAULT_FPS = 30  # Pacing for recordings without timestamps
+JPEG_QUALITY = 90  # For frames recorded from a webcam
+CHUNK_SIZE = 4096
+
+
+def is_mjpeg_path(path):
+    return os.fspath(path).lower().endswith(MJPEG_EXTENSIONS)
+
+
+def stream_url_for(url):
+    """Accept either the camera root URL or the :81/stream URL"""
+    parts = urlsplit(url)
+    if parts.path.rstrip('/').endswith('/stream'):
+        return url
+    port = parts.port or 81  # The firmware serves the stream on port 81
+    return f"{parts.scheme}://{parts.hostname}:{port}/stream"
+
+
+# =======================================================
+# RECORDING
+# =======================================================
+class FrameSequenceWriter:
+    """Writes JPEG frames and their timestamps into a directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._timestamps = open(os.path.join(directory, TIMESTAMPS_FILE), 'w')
+        self.frames = 0
+
+    def write(self, jpg, timestamp):
+        name = FRAME_NAME.format(self.frames)
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(jpg)
+        self._timestamps.write(f"{name} {timestamp:.6f}\n")
+        self.frames += 1
+
+    def close(self):
+        self._timestamps.close()
+
+
+def stream_part(jpg, timestamp):
+    """One part of the ESP32 multipart stream body, boundary included"""
+    seconds, micros = divmod(round(timestamp * 1e6), 1000000)
+    header = STREAM_PART.format(len(jpg), seconds, micros)
+    return STREAM_BOUNDARY + header.encode() + jpg
+
+
+class MJPEGFileWriter:
+    """Writes JPEG frames as a stream body in the ESP32 multipart format"""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self.frames = 0
+
+    def write(self, jpg, timestamp):
+        self._file.write(stream_part(jpg, timestamp))
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+
+def open_writer(path):
+    return MJPEGFileWriter(path) if is_mjpeg_path(path) else FrameSequenceWriter(path)
+
+
+def _should_stop(frames, started, max_frames, seconds):
+    return ((max_frames and frames >= max_frames)
+            or (seconds and time.monotonic() - started >= seconds))
+
+
+def record_stream(url, path, max_frames=None, seconds=None, session=None):
+    """
+    Record an ESP32-CAM stream until `max_frames` or `seconds` is reached
+
+    An .mjpeg path receives the raw HTTP body byte for byte; any other path
+    is a directory that receives one JPEG file per frame.
+
+    Returns:
+        int: Frames recorded
+    """
+    if session is None:
+        from esp32_stream_client import get_session
+        session = get_session()
+    response = session.get(stream_url_for(url), stream=True, timeout=(3.05, 5))
+    response.raise_for_status()
+    demuxer = MJPEGDemuxer(boundary_from_content_type(response.headers.get('Content-Type')))
+    raw = open(path, 'wb') if is_mjpeg_path(path) else None
+    writer = None if raw else FrameSequenceWriter(path)
+    frames = 0
+    started = time.monotonic()
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            for frame in demuxer.feed(chunk):
+                if writer:
+                    timestamp = frame.timestamp
+                    writer.write(bytes(frame.data), time.time() if timestamp is None else timestamp)
+                frames += 1
+            if raw:
+                raw.write(chunk)
+            if _should_stop(frames, started, max_frames, seconds):
+                break
+    finally:
+        response.close()
+        (raw or writer).close()
+    return frames
+
+
+def record_camera(source, path, max_frames=None, seconds=None, quality=JPEG_QUALITY):
+    """
+    Record a cv2.VideoCapture source (camera index or video file)
+
+    Returns:
+        int: Frames recorded
+    """
+    cap = source if isinstance(source, cv2.VideoCapture) else cv2.VideoCapture(source)
+    writer = open_writer(path)
+    started = time.monotonic()
+    try:
+        while not _should_stop(writer.frames, started, max_frames, seconds):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            ok, jpg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok:
+                writer.write(jpg.tobytes(), time.time())
+    finally:
+        cap.release()
+        writer.close()
+    return writer.frames
+
+
+# =======================================================
+# REPLAY
+# =======================================================
+def load_recording(path):
+    """
+    Load a recording into memory
+
+    Returns:
+        list: (jpg bytes, timestamp or None) per frame
+    """
+    path = os.fspath(path)
+    if os.path.isdir(path):
+        stamps = {}
+        stamps_path = os.path.join(path, TIMESTAMPS_FILE)
+        if os.path.isfile(stamps_path):
+            with open(stamps_path) as f:
+                for line in f:
+                    name, _, value = line.strip().partition(' ')
+                    if value:
+                        stamps[name] = float(value)
+        frames = []
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(path, name), 'rb') as f:
+                    frames.append((f.read(), stamps.get(name)))
+        return frames
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [(bytes(frame.data), frame.timestamp) for frame in MJPEGDemuxer().feed(data)]
+
+
+class ReplaySource:
+    """
+    Plays a recording back in place of the live camera
+
+    Drop-in for ESP32StreamClient (probe/iter_frames/stop/stats), so it can
+    be handed to ESP32CamReader(client=...). Iterating the source yields
+    decoded BGR frames, so it also plugs into the scanner
+    (src.qr.scanner.scan / iter_scan accept any iterable of frames).
+
+    Args:
+        path (str): .mjpeg capture or frame directory
+        realtime (bool): Keep the recorded pacing; False replays as fast as possible
+        loop (bool): Start over at the end of the recording
+        speed (float): Pacing multiplier when realtime (2.0 = twice as fast)
+        fps (float): Pacing for recordings without timestamps
+    """
+
+    def __init__(self, path, realtime=True, loop=False, speed=1.0, fps=DEFAULT_FPS):
+        self.path = os.fspath(path)
+        self.stream_url = self.path
+        self.realtime = realtime
+        self.loop = loop
+        self.speed = speed
+        self.frames_data = load_recording(self.path)
+        self.offsets = self._offsets(fps)
+        self.duration = self.offsets[-1] + 1.0 / fps if self.offsets else 0.0
+
+        self._stop = threading.Event()
+        self.frames = 0
+        self.loops = 0
+        self.bytes_received = 0
+        self.last_error = None if self.frames_data else f"no frames in {self.path}"
+        self._started = None
+
+    def _offsets(self, fps):
+        """Seconds from the first frame to each frame, never going backwards"""
+        stamps = [timestamp for _, timestamp in self.frames_data]
+        if not stamps:
+            return []
+        if any(timestamp is None for timestamp in stamps):
+            return [index / fps for index in range(len(stamps))]
+        offsets, last = [], 0.0
+        for timestamp in stamps:
+            last = max(last, timestamp - stamps[0])
+            offsets.append(last)
+        return offsets
+
+    # ---------------------------------------------------
+    # ESP32StreamClient interface
+    # ---------------------------------------------------
+    def probe(self, url=None):
+        """True if the recording has frames (`url` is ignored)"""
+        return bool(self.frames_data)
+
+    def iter_frames(self):
+        """Yield MJPEGFrame objects until the recording ends or stop()"""
+        self._stop.clear()
+        self._started = time.monotonic()
+        base = 0.0  # Recording time at the start of the current loop
+        while self.frames_data and not self._stop.is_set():
+            for (jpg, timestamp), offset in zip(self.frames_data, self.offsets):
+                if self.realtime:
+                    delay = self._started + (base + offset) / self.speed - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        return
+                elif self._stop.is_set():
+                    return
+                self.frames += 1
+                self.bytes_received += len(jpg)
+                yield MJPEGFrame(jpg, (timestamp if timestamp is not None else offset) + base)
+            if not self.loop:
+                return
+            self.loops += 1
+            base += self.duration
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        """Same keys as ESP32StreamClient.stats()"""
+        elapsed = time.monotonic() - self._started if self._started else 0
+        return {
+            'url': self.stream_url,
+            'connects': 1 if self._started else 0,
+            'reconnects': 0,
+            'failures': 0,
+            'frames': self.frames,
+            'bytes_received': self.bytes_received,
+            'bytes_per_sec': round(self.bytes_received / elapsed, 1) if elapsed else 0.0,
+            'time_to_first_frame': 0.0 if self.frames else None,
+            'last_error': self.last_error,
+            'loops': self.loops,
+        }
+
+    # ---------------------------------------------------
+    # Scanner interface
+    # ---------------------------------------------------
+    def __iter__(self):
+        """Yield decoded BGR frames (paced like iter_frames)"""
+        for frame in self.iter_frames():
+            image = cv2.imdecode(np.frombuffer(frame.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                yield image
+
+    def __len__(self):
+        return len(self.frames_data)
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+def main():
+    parser = argparse.ArgumentParser(description="Record and inspect ESP32-CAM recordings")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='Record a stream or camera')
+    source = record.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help='ESP32-CAM URL (root or :81/stream)')
+    source.add_argument('--camera', help='cv2.VideoCapture index or video file')
+    record.add_argument('--out', required=True, help='.mjpeg file or frame directory')
+    record.add_argument('--frames', type=int, help='Stop after N frames')
+    record.add_argument('--seconds', type=float, help='Stop after N seconds')
+
+    info = commands.add_parser('info', help='Describe a recording')
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        if not args.frames and not args.seconds:
+            parser.error('record needs --frames or --seconds')
+        print(f"⏺️  Recording to {args.out} (Ctrl+C to stop early)...")
+        if args.url:
+            count = record_stream(args.url, args.out, args.frames, args.seconds)
+        else:
+            camera = int(args.camera) if args.camera.isdigit() else args.camera
+            count = record_camera(camera, args.out, args.frames, args.seconds)
+        print(f"✅ Recorded {count} frames")
+    else:
+        replay = ReplaySource(args.path, realtime=False)
+        if not replay.frames_data:
+            raise SystemExit(f"❌ {replay.last_error}")
+        total = sum(len(jpg) for jpg, _ in replay.frames_data)
+        first = cv2.imdecode(np.frombuffer(replay.frames_data[0][0], dtype=np.uint8), cv2.IMREAD_COLOR)
+        print(f"📼 {args.path}")
+        print(f"   Frames: {len(replay)} | Size: {first.shape[1]}x{first.shape[0]} | "
+              f"Duration: {replay.duration:.1f} s | FPS: {len(replay) / replay.duration:.1f} | "
+              f"Avg JPEG: {total / len(replay) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
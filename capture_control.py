@@ -0,0 +1,432 @@
+"""
+Adaptive Capture Control
+Keeps an ESP32-CAM on a small, heavily compressed stream while nothing is
+in front of it, and switches to full resolution for a burst when a QR code
+candidate shows up
+
+The firmware (arduino/CameraWebServer/app_httpd.cpp) changes framesize and
+JPEG quality through GET /control?var=<name>&val=<n>. It has no frame-rate
+setting, so idle scanning is thinned out on our side instead: an idle
+frame is only scanned when the scene changed since the last scan, or at
+least `scan_fps` times per second for a code held perfectly still.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+# framesize_t values from esp32-camera sensor.h
+FRAME_SIZES = {
+    0: (96, 96), 1: (160, 120), 2: (176, 144), 3: (240, 176), 4: (240, 240),
+    5: (320, 240), 6: (400, 296), 7: (480, 320), 8: (640, 480), 9: (800, 600),
+    10: (1024, 768), 11: (1280, 720), 12: (1280, 1024), 13: (1600, 1200),
+}
+FRAMESIZE_QVGA = 5
+FRAMESIZE_VGA = 8
+
+# quality is the ESP32 JPEG quality: 0-63, lower is better
+Profile = namedtuple('Profile', ['framesize', 'quality', 'scan_fps'])
+IDLE_PROFILE = Profile(FRAMESIZE_QVGA, 30, 1)  # ~2-3 KB frames; QR finders still detectable
+BURST_PROFILE = Profile(FRAMESIZE_VGA, 12, None)  # None = scan every frame
+
+BURST_SECONDS = 2.0  # Burst length after the last candidate or hit
+BURST_HOLD_SCALE = (0.5, 2.0)  # BURST_SECONDS multiplier at a recent hit rate of 0 and 1
+MAX_BURST_SECONDS = 20.0  # A code left in view cannot pin the camera at full resolution
+BURST_COOLDOWN = 10.0  # Seconds candidates are ignored after a burst hit MAX_BURST_SECONDS
+MIN_CANDIDATES = 2  # Consecutive idle scans with a candidate before bursting (a decode bursts at once)
+SCAN_BUDGET = 1.0 / 15  # Average scan seconds above which the burst framesize steps down
+# Bytes/s per camera; above it the JPEG quality number is raised. A VGA burst
+# (~30 KB frames at ~15 fps) fits; busier scenes are compressed harder so a
+# few cameras can share one 2.4 GHz access point. None turns the rule off.
+MAX_BANDWIDTH = 512 * 1024
+QUALITY_STEP = 4
+ROI_UPSCALE = 3  # Candidates that do not decode are retried on an upscaled crop
+CONTROL_TIMEOUT = (1.0, 2.0)
+EWMA_ALPHA = 0.2
+MOTION_DELTA = 24  # Gray levels a thumbnail pixel must change by to count as motion
+MOTION_FRACTION = 0.005  # Fraction of changed thumbnail pixels that wakes idle scanning
+
+
+def control_url_for(stream_url):
+    """
+    /control URL for a stream URL
+
+    The firmware serves the stream on port 81 and /control on port 80;
+    other ports (e.g. fake_mjpeg_server) serve both.
+    """
+    parts = urlsplit(stream_url)
+    port = '' if parts.port in (None, 80, 81) else f":{parts.port}"
+    return f"{parts.scheme}://{parts.hostname}{port}/control"
+
+
+def jpeg_quality_for(esp32_quality):
+    """Rough cv2.IMWRITE_JPEG_QUALITY equivalent of an ESP32 quality value"""
+    return int(min(100, max(5, 100 - 1.5 * esp32_quality)))
+
+
+def reencode(jpg, framesize, quality):
+    """Re-encode a JPEG the way the camera would send it at framesize/quality"""
+    image = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    size = FRAME_SIZES[framesize]
+    if (image.shape[1], image.shape[0]) != size:
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality_for(quality)])[1].tobytes()
+
+
+# =======================================================
+# SCAN FUNCTION
+# =======================================================
+_detectors = threading.local()
+
+
+def scan_candidates(jpg):
+    """
+    Decode a JPEG to grayscale and scan it for QR codes (see scan_gray)
+
+    Returns:
+        tuple: (list of QR payloads, candidate)
+    """
+    gray = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return [], False
+    return scan_gray(gray)
+
+
+def scan_gray(gray):
+    """
+    Scan a grayscale frame for QR codes
+
+    A located code that does not decode (modules of ~2 px in an idle
+    frame) is retried once on an upscaled crop around it, so most codes
+    are read before the camera has even switched to full resolution.
+
+    Returns:
+        tuple: (list of QR payloads, candidate) where candidate is True when
+            finder patterns were located, even if the code was too small or
+            blurred to decode at the current resolution
+    """
+    detector = getattr(_detectors, 'detector', None)
+    if detector is None:
+        detector = _detectors.detector = cv2.QRCodeDetector()
+    data, points, _ = detector.detectAndDecode(gray)
+    if points is None:
+        return [], False
+    if not data:
+        x, y, w, h = cv2.boundingRect(points.reshape(-1, 2).astype(np.float32))
+        margin = max(w, h) // 2
+        crop = gray[max(0, y - margin):y + h + margin, max(0, x - margin):x + w + margin]
+        if crop.size:
+            crop = cv2.resize(crop, None, fx=ROI_UPSCALE, fy=ROI_UPSCALE, interpolation=cv2.INTER_CUBIC)
+            data, _, _ = detector.detectAndDecode(crop)
+    return ([data] if data else []), True
+
+
+def _thumbnail(jpg):
+    """Quarter-size grayscale decode for the motion check, or None"""
+    return cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+
+
+# =======================================================
+# CAPTURE CONTROLLER CLASS
+# =======================================================
+class CaptureController:
+    """
+    Switches one camera between an idle and a burst capture profile
+
+    The scanner calls scan() for each frame (or should_scan() and its own
+    scan) and reports every scan with observe(). Idle: small frames, high
+    compression, and a frame is scanned only if it differs from the last
+    scanned one, or idle.scan_fps times per second. A decoded code, or a candidate in
+    `min_candidates` consecutive scans, starts a burst: full resolution,
+    every frame scanned, until a hold of `burst_seconds` passes without
+    candidates. The hold is scaled by the hit rate of recent scans between
+    the two `hold_scale` factors: a queue of codes being read keeps the
+    camera at full resolution, candidates that never decode let it go early.
+
+    While bursting, an average scan time over `scan_budget` steps the burst
+    framesize down; every new burst starts again at burst.framesize.
+    Throughput over `max_bandwidth` raises the quality number of both
+    profiles. Camera settings are sent from a background thread, so
+    observe() never blocks on HTTP.
+
+    should_scan() runs on the scan workers, possibly several at once, and
+    observe() on the event loop, so the scan state is guarded by a lock.
+
+    Args:
+        control_url (str): The camera's /control URL (see control_url_for)
+        session: requests.Session; defaults to the shared stream client session
+        clock (callable): Monotonic time source
+    """
+
+    def __init__(self, control_url, idle=IDLE_PROFILE, burst=BURST_PROFILE,
+                 burst_seconds=BURST_SECONDS, hold_scale=BURST_HOLD_SCALE,
+                 max_burst_seconds=MAX_BURST_SECONDS, cooldown=BURST_COOLDOWN, min_candidates=MIN_CANDIDATES,
+                 scan_budget=SCAN_BUDGET, max_bandwidth=MAX_BANDWIDTH,
+                 session=None, clock=time.monotonic):
+        self.control_url = control_url
+        self.idle = idle
+        self.burst = burst
+        self.burst_seconds = burst_seconds
+        self.hold_scale = hold_scale
+        self.max_burst_seconds = max_burst_seconds
+        self.cooldown = cooldown
+        self.min_candidates = min_candidates
+        self.scan_budget = scan_budget
+        self.max_bandwidth = max_bandwidth
+        self.session = session
+        self.clock = clock
+
+        self.mode = None
+        self.burst_framesize = burst.framesize
+        self.quality_offset = 0
+        self.settings = {}  # Last values the camera accepted
+        self._wanted = {}
+        self._lock = threading.Lock()  # Guards _wanted (shared with the settings thread)
+        self._state_lock = threading.Lock()  # Guards mode, timers, reference and counters
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._mode_since = None
+        self._burst_until = 0.0
+        self._cooldown_until = 0.0
+        self._next_scan = 0.0
+        self._reference = None  # Thumbnail of the last scanned idle frame
+        self._candidate_streak = 0
+        self._scan_ewma = None
+        self._hits = deque(maxlen=100)  # 1/0 per scan, for the hit rate
+
+        # Counters
+        self.scans = 0
+        self.skipped = 0
+        self.candidates = 0
+        self.hits = 0
+        self.bursts = 0
+        self.control_requests = 0
+        self.control_failures = 0
+        self.last_error = None
+        self.seconds_in = {'idle': 0.0, 'burst': 0.0}
+
+    # ---------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------
+    def start(self):
+        """Start the settings thread and put the camera in the idle profile"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        with self._state_lock:
+            self._enter('idle', self.clock())
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    # ---------------------------------------------------
+    # Scanner hooks
+    # ---------------------------------------------------
+    def scan(self, jpg):
+        """
+        scan_candidates(jpg), or None for an idle frame not worth scanning
+
+        Meant to run in the scan worker: the motion check decodes a
+        thumbnail of the frame.
+        """
+        if not self.should_scan(jpg):
+            return None
+        return scan_candidates(jpg)
+
+    def should_scan(self, jpg=None, now=None):
+        """
+        False for idle frames to skip
+
+        Bursts scan every frame. Idle frames are scanned when they differ
+        from the last scanned frame (see _moved), and otherwise every
+        1/idle.scan_fps seconds; without `jpg` only the timer applies.
+        """
+        now = self.clock() if now is None else now
+        if self.mode == 'burst' or not self.idle.scan_fps:
+            return True
+        # Decoded outside the lock so workers do not wait on each other
+        thumb = _thumbnail(jpg) if jpg is not None else None
+        with self._state_lock:
+            if self.mode == 'burst':
+                return True
+            moved = thumb is not None and self._moved(thumb)
+            if not moved and now < self._next_scan:
+                self.skipped += 1
+                return False
+            self._next_scan = now + 1.0 / self.idle.scan_fps
+            return True
+
+    def observe(self, scan_seconds, candidate, hit, bytes_per_sec=None, now=None):
+        """
+        Report one scan
+
+        Args:
+            scan_seconds (float): Decode + scan time of the frame
+            candidate (bool): Finder patterns were located
+            hit (bool): A code was decoded
+            bytes_per_sec (float): Current stream throughput, if known
+        """
+        now = self.clock() if now is None else now
+        with self._state_lock:
+            self._observe(scan_seconds, candidate, hit, bytes_per_sec, now)
+
+    def _observe(self, scan_seconds, candidate, hit, bytes_per_sec, now):
+        self.scans += 1
+        self.candidates += candidate
+        self.hits += hit
+        self._hits.append(1 if hit else 0)
+        self._scan_ewma = scan_seconds if self._scan_ewma is None else (
+            EWMA_ALPHA * scan_seconds + (1 - EWMA_ALPHA) * self._scan_ewma)
+        self._candidate_streak = self._candidate_streak + 1 if candidate or hit else 0
+
+        if self.mode == 'idle':
+            if now >= self._cooldown_until and (hit or self._candidate_streak >= self.min_candidates):
+                self._enter('burst', now)
+        else:
+            if candidate or hit:
+                self._burst_until = now + self.hold()
+            if now - self._mode_since >= self.max_burst_seconds:
+                self._cooldown_until = now + self.cooldown
+                self._enter('idle', now)
+            elif now >= self._burst_until:
+                self._enter('idle', now)
+            elif (self._scan_ewma > self.scan_budget and self.burst_framesize > self.idle.framesize):
+                # Scanning cannot keep up at this resolution
+                self.burst_framesize -= 1
+                self._scan_ewma = None
+                self._apply()
+
+        if self.max_bandwidth and bytes_per_sec is not None:
+            offset = self.quality_offset
+            if bytes_per_sec > self.max_bandwidth:
+                offset = min(offset + QUALITY_STEP, 63 - self.burst.quality)
+            elif bytes_per_sec < self.max_bandwidth / 2 and offset:
+                offset = max(offset - QUALITY_STEP, 0)
+            if offset != self.quality_offset:
+                self.quality_offset = offset
+                self._apply()
+
+    def profile(self):
+        """The profile currently requested from the camera"""
+        if self.mode == 'burst':
+            return self.burst._replace(framesize=self.burst_framesize,
+                                       quality=min(63, self.burst.quality + self.quality_offset))
+        return self.idle._replace(quality=min(63, self.idle.quality + self.quality_offset))
+
+    def hit_rate(self):
+        """Fraction of recent scans that decoded a code"""
+        return sum(self._hits) / len(self._hits) if self._hits else 0.0
+
+    def hold(self):
+        """Seconds a burst lasts after the last candidate, from the recent hit rate"""
+        low, high = self.hold_scale
+        return self.burst_seconds * (low + (high - low) * self.hit_rate())
+
+    def stats(self):
+        with self._state_lock:
+            return self._stats(self.clock())
+
+    def _stats(self, now):
+        seconds_in = dict(self.seconds_in)
+        if self.mode is not None:
+            seconds_in[self.mode] += now - self._mode_since
+        profile = self.profile()
+        return {
+            'mode': self.mode,
+            'framesize': profile.framesize,
+            'quality': profile.quality,
+            'camera_settings': dict(self.settings),
+            'scans': self.scans,
+            'skipped': self.skipped,
+            'candidates': self.candidates,
+            'hits': self.hits,
+            'hit_rate': round(self.hit_rate(), 3),
+            'burst_hold': round(self.hold(), 2),
+            'avg_scan_ms': round(self._scan_ewma * 1000, 2) if self._scan_ewma is not None else None,
+            'bursts': self.bursts,
+            'seconds_idle': round(seconds_in['idle'], 1),
+            'seconds_burst': round(seconds_in['burst'], 1),
+            'control_requests': self.control_requests,
+            'control_failures': self.control_failures,
+            'last_error': self.last_error,
+        }
+
+    # ---------------------------------------------------
+    # Internals
+    # ---------------------------------------------------
+    def _moved(self, thumb):
+        """Whether a thumbnail differs from the reference; a change becomes the new reference"""
+        reference = self._reference
+        if reference is not None and reference.shape == thumb.shape:
+            changed = np.count_nonzero(cv2.absdiff(thumb, reference) > MOTION_DELTA)
+            if changed < MOTION_FRACTION * thumb.size:
+                return False
+        self._reference = thumb
+        return True
+
+    def _enter(self, mode, now):
+        if self.mode is not None:
+            self.seconds_in[self.mode] += now - self._mode_since
+        if mode == 'burst':
+            self.bursts += 1
+            self._burst_until = now + self.hold()
+            # A step down only holds for the burst that needed it
+            self.burst_framesize = self.burst.framesize
+            self._scan_ewma = None
+        self.mode = mode
+        self._mode_since = now
+        self._candidate_streak = 0
+        self._next_scan = now
+        self._apply()
+
+    def _apply(self):
+        profile = self.profile()
+        with self._lock:
+            self._wanted = {'framesize': profile.framesize, 'quality': profile.quality}
+        self._wake.set()
+
+    def _run(self):
+        if self.session is None:
+            from esp32_stream_client import get_session
+            self.session = get_session()
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                wanted = dict(self._wanted)
+            for var, val in wanted.items():
+                if self._stop.is_set():
+                    return
+                if self.settings.get(var) == val:
+                    continue
+                self.control_requests += 1
+                try:
+                    response = self.session.get(self.control_url, params={'var': var, 'val': val},
+                                                timeout=CONTROL_TIMEOUT)
+                    response.close()
+                    if response.ok:
+                        self.settings[var] = val
+                    else:
+                        self.control_failures += 1
+                        self.last_error = f"{var}={val}: HTTP {response.status_code}"
+                except Exception as e:
+                    self.control_failures += 1
+                    self.last_error = f"{var}={val}: {e}"
+            if any(self.settings.get(var) != val for var, val in wanted.items()):
+                # Retry failed settings after a short pause
+                if not self._stop.wait(1.0):
+                    self._wake.set()
@@ -0,0 +1,228 @@
+"""
+ESP32-CAM Stream Client
+Keep-alive HTTP session, jittered reconnect backoff and connection stats
+for the MJPEG stream served by arduino/CameraWebServer
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mjpeg_parser import MJPEGDemuxer, boundary_from_content_type
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+CONNECT_TIMEOUT = 3.05  # Seconds to establish the TCP connection
+READ_TIMEOUT = 5  # Seconds without any stream data before reconnecting
+BACKOFF_BASE = 0.5  # First reconnect waits up to this many seconds
+BACKOFF_MAX = 30  # Upper bound for a single reconnect wait
+POOL_SIZE = 16  # Connections kept per camera host
+CHUNK_SIZE = 4096  # Bytes per network read
+RATE_WINDOW = 1.0  # Seconds per bytes/sec sample
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide requests.Session shared by all stream clients
+
+    One session means one urllib3 pool manager, so control requests and
+    probes reuse keep-alive connections instead of opening new ones.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """
+    Exponential backoff with full jitter
+
+    Spreading reconnects over [0, base * 2^attempt] keeps a dozen cameras
+    that lost Wi-Fi together from reconnecting in lockstep.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# =======================================================
+# STREAM CLIENT CLASS
+# =======================================================
+class ESP32StreamClient:
+    """
+    Reconnecting MJPEG stream client
+
+    iter_frames() yields MJPEGFrame objects until stop() is called,
+    reconnecting with jittered exponential backoff whenever the stream
+    fails. Backoff waits on an Event, so stop() interrupts them at once.
+
+    With a frame_metrics.StageMetrics, every frame is observed as
+    "network": the socket reads and demuxing from the first chunk read
+    after the previous frame until the frame is complete. The wait for
+    the camera to start sending is not included.
+    """
+
+    def __init__(self, stream_url, session=None, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, metrics=None):
+        self.stream_url = stream_url
+        self.metrics = metrics
+        self.session = session or get_session()
+        self.timeout = (connect_timeout, read_timeout)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._stop = threading.Event()
+        self._response = None
+        self._lock = threading.Lock()
+
+        # Connection stats
+        self.connects = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.frames = 0
+        self.bytes_received = 0
+        self.bytes_per_sec = 0.0
+        self.time_to_first_frame = None  # Seconds, for the current connection
+        self.last_error = None
+        self._window_start = None
+        self._window_bytes = 0
+
+    # ---------------------------------------------------
+    # Public API
+    # ---------------------------------------------------
+    def probe(self, url=None):
+        """
+        Check that the camera answers HTTP
+
+        Args:
+            url (str): URL to probe; defaults to the stream host root
+
+        Returns:
+            bool: True if the camera responded
+        """
+        if url is None:
+            parts = urlsplit(self.stream_url)
+            url = f"{parts.scheme}://{parts.hostname}/"
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.close()
+            if not response.ok:
+                self.last_error = f"HTTP {response.status_code}"
+            return response.ok
+        except requests.RequestException as e:
+            self.last_error = str(e)
+            return False
+
+    def iter_frames(self):
+        """
+        Yield MJPEGFrame objects, reconnecting as needed, until stop()
+
+        Each frame's data is a memoryview that is only valid until the
+        next frame is requested.
+        """
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                for frame in self._iter_connection():
+                    attempt = 0  # A healthy stream resets the backoff
+                    yield frame
+                if self._stop.is_set():
+                    break
+                raise requests.ConnectionError("stream closed by camera")
+            except Exception as e:
+                # Any failure (timeouts, resets, aborted reads) means reconnect
+                self.failures += 1
+                self.last_error = str(e)
+            finally:
+                self._close_response()
+
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            attempt += 1
+            if self._stop.wait(delay):
+                break
+            self.reconnects += 1
+
+    def stop(self):
+        """Stop iter_frames() and abort the open connection, if any"""
+        self._stop.set()
+        self._close_response()
+
+    def stats(self):
+        """Return connection-level stats as a dict"""
+        return {
+            'url': self.stream_url,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'failures': self.failures,
+            'frames': self.frames,
+            'bytes_received': self.bytes_received,
+            'bytes_per_sec': round(self.bytes_per_sec, 1),
+            'time_to_first_frame': self.time_to_first_frame,
+            'last_error': self.last_error,
+        }
+
+    # ---------------------------------------------------
+    # Internals
+    # ---------------------------------------------------
+    def _iter_connection(self):
+        started = time.monotonic()
+        response = self.session.get(self.stream_url, stream=True, timeout=self.timeout)
+        with self._lock:
+            self._response = response
+        if self._stop.is_set():
+            return
+        response.raise_for_status()
+        self.connects += 1
+        self.time_to_first_frame = None
+        if self._window_start is None:
+            self._window_start = time.monotonic()
+
+        demuxer = MJPEGDemuxer(boundary_from_content_type(response.headers.get('Content-Type')))
+        arrived = None  # When the first chunk of the frame being received was read
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if arrived is None:
+                arrived = time.perf_counter()
+            self._count_bytes(len(chunk))
+            frames = demuxer.feed(chunk)
+            if frames:
+                if self.metrics is not None:
+                    received = time.perf_counter() - arrived
+                    for _ in frames:
+                        self.metrics.observe('network', received)
+                arrived = None
+            for frame in frames:
+                if self.time_to_first_frame is None:
+                    self.time_to_first_frame = time.monotonic() - started
+                self.frames += 1
+                yield frame
+            if self._stop.is_set():
+                return
+
+    def _count_bytes(self, count):
+        self.bytes_received += count
+        self._window_bytes += count
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= RATE_WINDOW:
+            self.bytes_per_sec = self._window_bytes / elapsed
+            self._window_start = now
+            self._window_bytes = 0
+
+    def _close_response(self):
+        with self._lock:
+            response, self._response = self._response, None
+        if response is not None:
+            response.close()
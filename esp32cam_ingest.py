@@ -0,0 +1,557 @@
+"""
+Multi-Camera ESP32-CAM Ingest Service
+Reads every reading-corner camera in one asyncio event loop and runs
+decode + QR scanning on a bounded worker pool
+
+Usage:
+    python esp32cam_ingest.py [--config cameras.json] [--workers 4] [--adaptive]
+
+cameras.json:
+    [{"name": "corner-1", "url": "http://192.168.1.101"},
+     {"name": "corner-2", "stream_url": "http://192.168.1.102:81/stream"}]
+
+--adaptive lets a capture_control.CaptureController per camera drop idle
+cameras to small, compressed frames and burst to full resolution when a
+QR code candidate appears.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import cv2
+
+from capture_control import CaptureController, control_url_for, scan_gray
+from esp32_stream_client import (BACKOFF_BASE, BACKOFF_MAX, CONNECT_TIMEOUT,
+                                 READ_TIMEOUT, backoff_delay)
+from frame_pipeline import FrameExchange
+from mjpeg_parser import MJPEGDemuxer, boundary_from_content_type
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+CAMERA_ENDPOINTS = [
+    {"name": "main", "url": "http://192.168.1.100"},  # ⚠️ CHANGE THIS to your cameras
+]
+STREAM_PORT = 81  # Default ESP32-CAM stream port
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+WORKERS = 4  # Decode/scan threads shared by all cameras
+QUEUE_SIZE = 2  # JPEGs buffered per camera; older ones are dropped
+IN_FLIGHT_PER_CAMERA = 1  # Worker slots one camera may hold at a time
+CHUNK_SIZE = 16 * 1024
+
+CameraEndpoint = namedtuple('CameraEndpoint', ['name', 'stream_url', 'control_url'], defaults=(None,))
+
+
+def load_camera_config(path=None):
+    """
+    Load camera endpoints from a JSON file or CAMERA_ENDPOINTS
+
+    Each entry needs a "name" and either a "stream_url" or the camera
+    "url" (the stream is then assumed on port 81 at /stream). "control_url"
+    defaults to /control on the camera's port 80.
+
+    Returns:
+        list[CameraEndpoint]
+    """
+    entries = CAMERA_ENDPOINTS
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+
+    endpoints = []
+    for index, entry in enumerate(entries):
+        name = entry.get('name') or f"camera-{index + 1}"
+        stream_url = entry.get('stream_url')
+        if not stream_url:
+            stream_url = f"{entry['url'].rstrip('/')}:{STREAM_PORT}/stream"
+        control_url = entry.get('control_url')
+        if not control_url:
+            control_url = (f"{entry['url'].rstrip('/')}/control" if entry.get('url')
+                           else control_url_for(stream_url))
+        endpoints.append(CameraEndpoint(name, stream_url, control_url))
+    return endpoints
+
+
+# =======================================================
+# ASYNC HTTP STREAM
+# =======================================================
+async def _open_stream(url, connect_timeout):
+    """Send GET and return (reader, writer, headers) for a streaming response"""
+    parts = urlsplit(url)
+    port = parts.port or 80
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, port), connect_timeout
+    )
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {parts.hostname}\r\n"
+            f"Connection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), connect_timeout)
+        lines = head.decode('latin-1').split('\r\n')
+        status = lines[0].split(' ', 2)
+        if len(status) < 2 or status[1] != '200':
+            raise ConnectionError(f"unexpected response: {lines[0]}")
+    except BaseException:
+        # Timeouts and cancellation too; the caller never sees this writer
+        writer.close()
+        raise
+
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return reader, writer, headers
+
+
+async def _iter_body(reader, headers, read_timeout):
+    """Yield body chunks, decoding chunked transfer encoding if used"""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        # The ESP32 httpd sends every boundary, header and JPEG as a chunk
+        while True:
+            size_line = await asyncio.wait_for(reader.readline(), read_timeout)
+            size = int(size_line.split(b';', 1)[0], 16)
+            if size == 0:
+                return
+            chunk = await asyncio.wait_for(reader.readexactly(size + 2), read_timeout)
+            yield memoryview(chunk)[:size]
+    else:
+        while True:
+            chunk = await asyncio.wait_for(reader.read(CHUNK_SIZE), read_timeout)
+            if not chunk:
+                return
+            yield chunk
+
+
+# =======================================================
+# CAMERA STATE
+# =======================================================
+class _Camera:
+    """Per-camera queue, frame exchange and counters"""
+
+    def __init__(self, endpoint, queue_size, controller=None):
+        self.endpoint = endpoint
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.frames = FrameExchange(CAMERA_WIDTH, CAMERA_HEIGHT)
+        self.controller = controller
+        self.connects = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.bytes_received = 0
+        self.bytes_per_sec = 0.0
+        self.time_to_first_frame = None
+        self.queue_dropped = 0
+        self.scanned = 0
+        self.scan_seconds = 0.0
+        self.last_codes = []
+        self.last_error = None
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    def count_bytes(self, count):
+        self.bytes_received += count
+        self._window_bytes += count
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.bytes_per_sec = self._window_bytes / elapsed
+            self._window_start = now
+            self._window_bytes = 0
+
+    def offer(self, jpg, seq):
+        """Queue a JPEG (and its FrameExchange seq) for scanning, dropping the oldest one when full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue_dropped += 1
+        self.queue.put_nowait((jpg, seq))
+
+    def stats(self):
+        stats = {
+            'name': self.endpoint.name,
+            'url': self.endpoint.stream_url,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'failures': self.failures,
+            'bytes_received': self.bytes_received,
+            'bytes_per_sec': round(self.bytes_per_sec, 1),
+            'time_to_first_frame': self.time_to_first_frame,
+            'queue_dropped': self.queue_dropped,
+            'scanned': self.scanned,
+            'avg_scan_ms': round(self.scan_seconds / self.scanned * 1000, 2) if self.scanned else None,
+            'last_codes': self.last_codes,
+            'last_error': self.last_error,
+        }
+        stats.update(self.frames.stats())
+        if self.controller is not None:
+            stats['capture'] = self.controller.stats()
+        return stats
+
+
+# =======================================================
+# DEFAULT SCAN FUNCTION
+# =======================================================
+_detectors = threading.local()
+
+
+def scan_image(image):
+    """
+    Return the QR payloads found in a decoded BGR frame
+
+    cv2.QRCodeDetector is not thread-safe, so each worker keeps its own.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    detector = getattr(_detectors, 'detector', None)
+    if detector is None:
+        detector = _detectors.detector = cv2.QRCodeDetector()
+    data, _, _ = detector.detectAndDecode(gray)
+    return [data] if data else []
+
+
+# =======================================================
+# INGEST SERVICE CLASS
+# =======================================================
+class IngestService:
+    """
+    Multiplexes many ESP32-CAM streams in a single event loop
+
+    Every camera gets one network task and one processing task. Network
+    tasks only parse bytes; decoding and QR scanning run on a shared
+    ThreadPoolExecutor. A scanned JPEG is decoded once, at the readers'
+    CAMERA_WIDTH x CAMERA_HEIGHT, and the image is handed to the camera's
+    FrameExchange so readers do not decode it again. A camera never holds
+    more than IN_FLIGHT_PER_CAMERA workers, so a slow or chatty camera
+    cannot starve the others.
+
+    Args:
+        endpoints (list[CameraEndpoint]): Cameras to read
+        workers (int): Size of the decode/scan pool
+        scan_fn (callable): BGR image -> list of QR payloads; None disables scanning
+        on_scan (callable): Called as on_scan(camera_name, codes) on the loop
+        adaptive (bool): Give every camera a CaptureController; frames are
+            scanned with capture_control.scan_gray instead of scan_fn, and
+            only when CaptureController.should_scan allows it
+        controller_options (dict): Keyword arguments for each CaptureController
+    """
+
+    def __init__(self, endpoints, workers=WORKERS, queue_size=QUEUE_SIZE,
+                 scan_fn=scan_image, on_scan=None, in_flight=IN_FLIGHT_PER_CAMERA,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 adaptive=False, controller_options=None):
+        self.endpoints = list(endpoints)
+        self.adaptive = adaptive and scan_fn is not None
+        self.controller_options = controller_options or {}
+        self.workers = workers
+        self.queue_size = queue_size
+        self.scan_fn = scan_fn
+        self.on_scan = on_scan
+        self.in_flight = in_flight
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.cameras = {}
+        self._tasks = {}  # Camera name -> its network and processing tasks
+        self._pool = None
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    # ---------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------
+    async def run(self):
+        """Run until stop() is called (use directly from async code)"""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+        self.cameras = {}
+        self._tasks = {}
+        try:
+            for endpoint in self.endpoints:
+                self._start_camera(endpoint)
+            self._ready.set()
+            await self._stop_event.wait()
+        finally:
+            for name in list(self._tasks):
+                await self._stop_camera(name)
+            self._pool.shutdown(wait=True)
+
+    def _controller(self, endpoint):
+        if not self.adaptive:
+            return None
+        control_url = endpoint.control_url or control_url_for(endpoint.stream_url)
+        return CaptureController(control_url, **self.controller_options).start()
+
+    def _start_camera(self, endpoint):
+        """Create the camera's state and tasks (on the loop)"""
+        camera = self.cameras[endpoint.name] = _Camera(endpoint, self.queue_size, self._controller(endpoint))
+        tasks = self._tasks[endpoint.name] = [asyncio.create_task(self._stream_camera(camera))]
+        if self.scan_fn is not None:
+            for _ in range(self.in_flight):
+                tasks.append(asyncio.create_task(self._process_camera(camera, self._pool)))
+
+    async def _stop_camera(self, name):
+        """Cancel one camera's tasks; returns the number of cameras still running"""
+        tasks = self._tasks.pop(name, [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        camera = self.cameras.get(name)
+        if tasks and camera.controller is not None:
+            camera.controller.stop()
+        return len(self._tasks)
+
+    def _run_thread(self):
+        try:
+            asyncio.run(self.run())
+        except BaseException as e:
+            self._error = e
+        finally:
+            # Never leave start() waiting, even if run() failed during setup
+            self._ready.set()
+
+    def start(self):
+        """
+        Run the event loop in a background thread
+
+        Raises:
+            Exception: Whatever run() raised while setting up the cameras
+        """
+        self._ready.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._run_thread, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._error
+        return self
+
+    def stop(self):
+        """Stop all cameras and wait for the loop to finish"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start_camera(self, name):
+        """
+        Start one camera again after stop_camera()
+
+        Starts the whole service instead if it is not running.
+        """
+        if not self.running:
+            return self.start()
+        if name not in self._tasks:
+            endpoint = next(e for e in self.endpoints if e.name == name)
+            asyncio.run_coroutine_threadsafe(self._async_start_camera(endpoint), self._loop).result()
+        return self
+
+    async def _async_start_camera(self, endpoint):
+        self._start_camera(endpoint)
+
+    def stop_camera(self, name):
+        """
+        Stop one camera and leave the others running
+
+        Call from outside the loop, like stop(). Stopping the last running
+        camera stops the service.
+        """
+        if not self.running:
+            return
+        remaining = asyncio.run_coroutine_threadsafe(self._stop_camera(name), self._loop).result()
+        if not remaining:
+            self.stop()
+
+    def reader(self, name):
+        """Return an ESP32CamReader-compatible view of one camera"""
+        return IngestCameraReader(self, name)
+
+    def stats(self):
+        """Per-camera stats keyed by camera name"""
+        # Snapshot: cameras are added on the loop thread while this runs on another
+        return {name: camera.stats() for name, camera in list(self.cameras.items())}
+
+    # ---------------------------------------------------
+    # Per-camera tasks
+    # ---------------------------------------------------
+    async def _stream_camera(self, camera):
+        attempt = 0
+        while True:
+            writer = None
+            try:
+                started = time.monotonic()
+                reader, writer, headers = await _open_stream(
+                    camera.endpoint.stream_url, self.connect_timeout
+                )
+                camera.connects += 1
+                camera.time_to_first_frame = None
+                demuxer = MJPEGDemuxer(boundary_from_content_type(headers.get('content-type')))
+
+                async for chunk in _iter_body(reader, headers, self.read_timeout):
+                    camera.count_bytes(len(chunk))
+                    for frame in demuxer.feed(chunk):
+                        if camera.time_to_first_frame is None:
+                            camera.time_to_first_frame = time.monotonic() - started
+                        attempt = 0
+                        jpg = bytes(frame.data)
+                        seq = camera.frames.put(jpg, frame.timestamp)
+                        if self.scan_fn is not None:
+                            camera.offer(jpg, seq)
+                raise ConnectionError("stream closed by camera")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                camera.failures += 1
+                camera.last_error = str(e) or type(e).__name__
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            await asyncio.sleep(backoff_delay(attempt, BACKOFF_BASE, BACKOFF_MAX))
+            attempt += 1
+            camera.reconnects += 1
+
+    async def _process_camera(self, camera, pool):
+        controller = camera.controller
+        while True:
+            jpg, seq = await camera.queue.get()
+            started = time.perf_counter()
+            try:
+                result = await self._loop.run_in_executor(pool, self._scan, camera, jpg, seq)
+            except Exception as e:
+                camera.last_error = f"scan failed: {e}"
+                continue
+            if result is None:
+                continue
+            codes, candidate = result
+            elapsed = time.perf_counter() - started
+            camera.scanned += 1
+            camera.scan_seconds += elapsed
+            if controller is not None:
+                controller.observe(elapsed, candidate, bool(codes), camera.bytes_per_sec)
+            if codes:
+                camera.last_codes = codes
+                if self.on_scan is not None:
+                    self.on_scan(camera.endpoint.name, codes)
+
+    def _scan(self, camera, jpg, seq):
+        """
+        Decode and scan one JPEG (runs on the pool)
+
+        Returns:
+            tuple: (codes, candidate), or None for an idle frame the capture
+                controller skipped
+        """
+        controller = camera.controller
+        if controller is not None and not controller.should_scan(jpg):
+            return None
+        image = camera.frames.decode(jpg)
+        if image is None:
+            return [], False
+        camera.frames.adopt(seq, image)
+        if controller is not None:
+            return scan_gray(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+        codes = self.scan_fn(image)
+        return codes, bool(codes)
+
+
+# =======================================================
+# READER ADAPTER
+# =======================================================
+class IngestCameraReader:
+    """
+    Same interface as ESP32CamReader, backed by an IngestService camera
+
+    start() starts the service if it is not running yet, so code written
+    for a single ESP32CamReader keeps working unchanged. stop() only stops
+    this camera; other readers of the same service keep their streams.
+    """
+
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+        self.stream_url = next(e.stream_url for e in service.endpoints if e.name == name)
+
+    @property
+    def frames(self):
+        return self.service.cameras[self.name].frames
+
+    def start(self):
+        self.service.start_camera(self.name)
+        return self
+
+    def read(self):
+        frame = self.frames.read()
+        return frame.image if frame is not None else None
+
+    def read_next(self, timeout=None):
+        return self.frames.read_next(timeout)
+
+    def stats(self):
+        return self.service.cameras[self.name].stats()
+
+    def stop(self):
+        self.service.stop_camera(self.name)
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-camera ESP32-CAM ingest")
+    parser.add_argument('--config', help='JSON list of camera endpoints')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Lower resolution while idle, burst when a QR code appears')
+    args = parser.parse_args()
+
+    endpoints = load_camera_config(args.config)
+
+    def print_scan(name, codes):
+        for code in codes:
+            print(f"📖 [{name}] Detected QR Code: {code}")
+
+    print("📡 ESP32-CAM Ingest Service")
+    print("=" * 60)
+    for endpoint in endpoints:
+        print(f"   • {endpoint.name}: {endpoint.stream_url}")
+    print("\n⌨️  Press Ctrl+C to stop")
+    print("=" * 60 + "\n")
+
+    service = IngestService(endpoints, workers=args.workers, on_scan=print_scan,
+                            adaptive=args.adaptive).start()
+    try:
+        while True:
+            time.sleep(5)
+            for name, stats in service.stats().items():
+                capture = stats.get('capture')
+                mode = (f" | Mode: {capture['mode']} (framesize {capture['framesize']}, "
+                        f"quality {capture['quality']})" if capture else "")
+                print(f"📊 [{name}] {stats['bytes_per_sec'] / 1024:.0f} KiB/s | "
+                      f"Frames: {stats['received']} | Scanned: {stats['scanned']} | "
+                      f"Dropped: {stats['queue_dropped']} | Reconnects: {stats['reconnects']}{mode}")
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping ingest service...")
+        service.stop()
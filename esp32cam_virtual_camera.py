@@ -3,82 +3,76 @@ ESP32-CAM Virtual Camera for Chrome
 Creates a virtual webcam that streams from ESP32-CAM
 """
 
-import cv2
-import numpy as np
 import pyvirtualcam
-import requests
 from threading import Thread
 import time
 
+from camera_replay import ReplaySource
+from esp32_stream_client import ESP32StreamClient
+from frame_metrics import MetricsServer, StageMetrics
+from frame_pipeline import FrameExchange, OutputStage
+
 # =======================================================
 # ESP32-CAM CONFIGURATION
 # =======================================================
 ESP32_CAM_URL = "http://192.168.1.100"  # ⚠️ CHANGE THIS to your ESP32-CAM IP
 STREAM_URL = f"{ESP32_CAM_URL}:81/stream"  # Default ESP32-CAM stream port
+REPLAY_PATH = None  # Recording to loop instead of the camera (see camera_replay.py)
 
 # Virtual camera settings
 CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 CAMERA_FPS = 30
 
+# Stream reader settings
+FRAME_STALL_TIMEOUT = 1.0  # Seconds without a new frame before showing the placeholder
+
+# Latency metrics
+METRICS_PORT = None  # e.g. 9108 to serve /metrics (Prometheus) and /stats (JSON)
+METRICS_HOST = "127.0.0.1"
+STATS_EVERY = 30  # Print a stats line every N frames
+
 # =======================================================
 # STREAM READER CLASS
 # =======================================================
 class ESP32CamReader:
-    def __init__(self, stream_url):
+    def __init__(self, stream_url, metrics=None, client=None):
         self.stream_url = stream_url
-        self.frame = None
-        self.running = False
+        self.client = client or ESP32StreamClient(stream_url, metrics=metrics)
+        self.frames = FrameExchange(CAMERA_WIDTH, CAMERA_HEIGHT, metrics)
         self.thread = None
         
     def start(self):
         """Start reading stream in background thread"""
-        self.running = True
         self.thread = Thread(target=self._read_stream, daemon=True)
         self.thread.start()
         return self
     
     def _read_stream(self):
-        """Read MJPEG stream from ESP32-CAM"""
-        while self.running:
-            try:
-                # Open stream
-                response = requests.get(self.stream_url, stream=True, timeout=5)
-                bytes_data = bytes()
-                
-                # Read MJPEG stream
-                for chunk in response.iter_content(chunk_size=1024):
-                    bytes_data += chunk
-                    
-                    # Find JPEG boundaries
-                    a = bytes_data.find(b'\xff\xd8')  # JPEG start
-                    b = bytes_data.find(b'\xff\xd9')  # JPEG end
-                    
-                    if a != -1 and b != -1:
-                        jpg = bytes_data[a:b+2]
-                        bytes_data = bytes_data[b+2:]
-                        
-                        # Decode JPEG to frame
-                        frame = cv2.imdecode(
-                            np.frombuffer(jpg, dtype=np.uint8),
-                            cv2.IMREAD_COLOR
-                        )
-                        
-                        if frame is not None:
-                            # Resize to virtual camera resolution
-                            self.frame = cv2.resize(frame, (CAMERA_WIDTH, CAMERA_HEIGHT))
-                            
-            except Exception as e:
-                print(f"❌ Stream error: {e}")
-                time.sleep(2)  # Wait before reconnecting
-                
+        """Read MJPEG stream from ESP32-CAM (reconnects with backoff)"""
+        for jpg in self.client.iter_frames():
+            # Keep the raw JPEG; decoding happens in read(). The copy is needed,
+            # the demuxer reuses the buffer jpg.data points into
+            self.frames.put(bytes(jpg.data), jpg.timestamp)
+        
     def read(self):
-        """Get latest frame"""
-        return self.frame
+        """Get latest frame (decoded on demand)"""
+        frame = self.frames.read()
+        return frame.image if frame is not None else None
+    
+    def read_next(self, timeout=None):
+        """Wait for a frame newer than the last one read (returns a Frame or None)"""
+        return self.frames.read_next(timeout)
+    
+    def stats(self):
+        """Connection and frame counters"""
+        stats = self.client.stats()
+        stats.update(self.frames.stats())
+        return stats
     
     def stop(self):
         """Stop reading stream"""
-        self.running = False
+        self.client.stop()
         if self.thread:
             self.thread.join()
 
@@ -92,24 +86,27 @@ def create_virtual_camera():
     print("📹 ESP32-CAM VIRTUAL CAMERA")
     print("=" * 60)
     print(f"ESP32-CAM URL: {ESP32_CAM_URL}")
-    print(f"Stream URL: {STREAM_URL}")
+    print(f"Stream URL: {REPLAY_PATH or STREAM_URL}")
     print(f"Resolution: {CAMERA_WIDTH}x{CAMERA_HEIGHT}")
     print(f"FPS: {CAMERA_FPS}")
     print("=" * 60 + "\n")
     
     # Test connection
     print("🔍 Testing ESP32-CAM connection...")
-    try:
-        response = requests.get(ESP32_CAM_URL, timeout=5)
+    metrics = StageMetrics(budget=1.0 / CAMERA_FPS)
+    if REPLAY_PATH:
+        reader = ESP32CamReader(REPLAY_PATH, metrics, ReplaySource(REPLAY_PATH, loop=True))
+    else:
+        reader = ESP32CamReader(STREAM_URL, metrics)
+    if reader.client.probe(ESP32_CAM_URL):
         print("✅ ESP32-CAM connected successfully!\n")
-    except Exception as e:
-        print(f"❌ Cannot connect to ESP32-CAM: {e}")
+    else:
+        print(f"❌ Cannot connect to ESP32-CAM: {reader.client.last_error}")
         print("⚠️ Make sure ESP32-CAM is powered on and URL is correct")
         return
     
     # Start stream reader
     print("📡 Starting ESP32-CAM stream reader...")
-    reader = ESP32CamReader(STREAM_URL)
     reader.start()
     
     # Wait for first frame
@@ -118,6 +115,12 @@ def create_virtual_camera():
         time.sleep(0.1)
     print("✅ Receiving frames!\n")
     
+    # Optional metrics endpoint
+    metrics_server = None
+    if METRICS_PORT:
+        metrics_server = MetricsServer(metrics, METRICS_HOST, METRICS_PORT, reader.stats).start()
+        print(f"📈 Metrics at {metrics_server.url}/metrics and {metrics_server.url}/stats\n")
+    
     # Create virtual camera
     print("🎥 Creating virtual camera...")
     with pyvirtualcam.Camera(width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=CAMERA_FPS) as cam:
@@ -135,44 +138,47 @@ def create_virtual_camera():
         print("\n⌨️  Press Ctrl+C to stop")
         print("=" * 60 + "\n")
         
-        frame_count = 0
-        start_time = time.time()
+        output = OutputStage(cam, CAMERA_WIDTH, CAMERA_HEIGHT, metrics)
         
         try:
             while True:
-                # Get frame from ESP32-CAM
-                frame = reader.read()
+                # Wait for a fresh frame from ESP32-CAM (never resend the same one)
+                frame = reader.read_next(timeout=FRAME_STALL_TIMEOUT)
                 
                 if frame is not None:
-                    # Convert BGR to RGB (required for virtual camera)
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    
-                    # Send to virtual camera
-                    cam.send(frame_rgb)
+                    # Convert BGR to RGB in place and send to virtual camera
+                    output.send(frame.image)
+                    latency_ms = reader.frames.age(frame) * 1000
                     
-                    # FPS counter
-                    frame_count += 1
-                    if frame_count % 30 == 0:
-                        elapsed = time.time() - start_time
-                        fps = frame_count / elapsed
-                        print(f"📊 FPS: {fps:.1f} | Frames: {frame_count}")
-                    
-                    # Sleep to maintain FPS
-                    cam.sleep_until_next_frame()
+                    # Rolling stats
+                    if metrics.frames % STATS_EVERY == 0:
+                        print_stats(metrics.stats(), reader.stats(), latency_ms)
                 else:
-                    # Show placeholder if no frame
-                    placeholder = np.zeros((CAMERA_HEIGHT, CAMERA_WIDTH, 3), dtype=np.uint8)
-                    cv2.putText(placeholder, "Waiting for ESP32-CAM...", 
-                              (50, CAMERA_HEIGHT//2), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                    cam.send(placeholder)
-                    cam.sleep_until_next_frame()
+                    # Show the cached placeholder if no frame
+                    output.send_placeholder()
+                
+                # Sleep to maintain FPS
+                cam.sleep_until_next_frame()
                     
         except KeyboardInterrupt:
             print("\n\n⏹️  Stopping virtual camera...")
             reader.stop()
+            if metrics_server:
+                metrics_server.stop()
             print("✅ Virtual camera stopped")
 
+
+def print_stats(metrics, reader, latency_ms):
+    """Print one line of rolling output stats"""
+    work = metrics['work']
+    stages = " ".join(f"{name} {stage['p95']:.1f}" for name, stage in metrics['stages'].items()
+                      if stage['p95'] is not None)
+    print(f"📊 FPS: {metrics['fps']:.1f} | Frames: {metrics['frames']} | "
+          f"Dropped: {reader['dropped']} | Latency: {latency_ms:.0f} ms | "
+          f"Work p50/p95/p99: {work['p50']:.1f}/{work['p95']:.1f}/{work['p99']:.1f} ms | "
+          f"Missed: {metrics['missed_deadlines']} | p95 ms: {stages} | "
+          f"{reader['bytes_per_sec'] / 1024:.0f} KiB/s | Reconnects: {reader['reconnects']}")
+
 # =======================================================
 # MAIN EXECUTION
 # =======================================================
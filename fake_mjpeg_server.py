@@ -0,0 +1,225 @@
+"""
+Fake ESP32-CAM MJPEG Server
+Serves the same multipart stream as arduino/CameraWebServer so the
+virtual camera, stream client and benchmarks can run without hardware
+
+Usage:
+    python fake_mjpeg_server.py [--port 8081] [--fps 30] [--capture file.mjpeg]
+                                [--drop-after 0]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mjpeg_parser import MJPEGDemuxer
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+PART_BOUNDARY = "123456789000000000000987654321"  # Same as app_httpd.cpp
+STREAM_CONTENT_TYPE = f"multipart/x-mixed-replace;boundary={PART_BOUNDARY}"
+STREAM_BOUNDARY = f"\r\n--{PART_BOUNDARY}\r\n".encode()
+STREAM_PART = "Content-Type: image/jpeg\r\nContent-Length: {}\r\nX-Timestamp: {}.{:06d}\r\n\r\n"
+
+
+def load_capture(path):
+    """Split a recorded stream body into a list of JPEG bytes"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [bytes(frame.data) for frame in MJPEGDemuxer().feed(data)]
+
+
+def synthetic_frames(count=30, width=640, height=480):
+    """Generate numbered test frames (needs OpenCV)"""
+    import cv2
+    import numpy as np
+
+    frames = []
+    for index in range(count):
+        image = np.full((height, width, 3), 40, dtype=np.uint8)
+        cv2.putText(image, f"FAKE ESP32-CAM #{index:03d}", (40, height // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        frames.append(cv2.imencode('.jpg', image)[1].tobytes())
+    return frames
+
+
+# =======================================================
+# FAKE SERVER CLASS
+# =======================================================
+class FakeMJPEGServer:
+    """
+    Threaded HTTP server imitating the ESP32-CAM endpoints
+
+    Endpoints: "/" (probe), "/stream", "/status" and "/control".
+    Use as a context manager; port 0 picks a free port.
+
+    Args:
+        frames (list[bytes]): JPEGs to loop over
+        fps (float): Frame rate, or 0 to send as fast as possible
+        drop_after (int): Close each stream after this many frames (0 = never)
+            to imitate flaky Wi-Fi
+        with_length (bool): Send Content-Length part headers
+        chunked (bool): Use chunked transfer encoding like the ESP32 httpd
+        settings (dict): framesize/quality the given frames were captured at
+
+    Frames are sent as given until /control changes framesize or quality;
+    from then on they are resized and re-encoded like the camera would.
+    """
+
+    def __init__(self, frames=None, host='127.0.0.1', port=0, fps=30,
+                 drop_after=0, with_length=True, chunked=True, settings=None):
+        self.frames = frames or synthetic_frames()
+        self.fps = fps
+        self.drop_after = drop_after
+        self.with_length = with_length
+        self.chunked = chunked
+        self.settings = dict(settings or {'framesize': 8, 'quality': 12})  # VGA, ESP32 default quality
+        self.connections = 0
+        self.stream_started = None  # monotonic time the latest stream began
+        self._initial_settings = dict(self.settings)
+        self._encoded = {}  # (framesize, quality) -> {index: jpg}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stream_url(self):
+        return f"{self.url}/stream"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def frame(self, index):
+        """JPEG `index` at the current /control framesize and quality"""
+        if self.settings == self._initial_settings:
+            return self.frames[index % len(self.frames)]
+        from capture_control import reencode
+
+        key = (self.settings['framesize'], self.settings['quality'])
+        cache = self._encoded.setdefault(key, {})
+        index %= len(self.frames)
+        if index not in cache:
+            cache[index] = reencode(self.frames[index], *key)
+        return cache[index]
+
+    def prepare(self, framesize, quality):
+        """Re-encode every frame for a setting before streaming, so switching to it keeps the pacing"""
+        settings, self.settings = self.settings, {'framesize': framesize, 'quality': quality}
+        try:
+            for index in range(len(self.frames)):
+                self.frame(index)
+        finally:
+            self.settings = settings
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                if path == '/stream':
+                    self._stream()
+                elif path == '/status':
+                    self._send(200, 'application/json', json.dumps(server.settings).encode())
+                elif path == '/control':
+                    params = dict(p.split('=', 1) for p in query.split('&') if '=' in p)
+                    try:
+                        server.settings[params['var']] = int(params['val'])
+                    except (KeyError, ValueError):
+                        self._send(404, 'text/plain', b'')
+                        return
+                    self._send(200, 'text/plain', b'')
+                else:
+                    self._send(200, 'text/html', b'<html>Fake ESP32-CAM</html>')
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                server.connections += 1
+                self.send_response(200)
+                self.send_header('Content-Type', STREAM_CONTENT_TYPE)
+                if server.chunked:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                interval = 1.0 / server.fps if server.fps else 0
+                sent = 0
+                next_time = server.stream_started = time.monotonic()
+                try:
+                    while not server.drop_after or sent < server.drop_after:
+                        jpg = server.frame(sent)
+                        now = time.time()
+                        header = STREAM_PART.format(len(jpg), int(now), int(now % 1 * 1e6))
+                        if not server.with_length:
+                            header = header.replace(f"Content-Length: {len(jpg)}\r\n", "")
+                        for piece in (STREAM_BOUNDARY, header.encode(), jpg):
+                            if server.chunked:
+                                self.wfile.write(b"%X\r\n" % len(piece) + piece + b"\r\n")
+                            else:
+                                self.wfile.write(piece)
+                        sent += 1
+                        if interval:
+                            next_time += interval
+                            time.sleep(max(0, next_time - time.monotonic()))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake ESP32-CAM MJPEG server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--capture', help='Recorded stream body to replay')
+    parser.add_argument('--drop-after', type=int, default=0)
+    args = parser.parse_args()
+
+    frames = load_capture(args.capture) if args.capture else None
+    server = FakeMJPEGServer(frames, args.host, args.port, args.fps, args.drop_after)
+    print(f"📡 Fake ESP32-CAM streaming at {server.stream_url}")
+    print("⌨️  Press Ctrl+C to stop")
+    try:
+        server.start()
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
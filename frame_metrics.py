@@ -0,0 +1,289 @@
+"""
+Frame Latency Metrics
+Rolling per-stage latency histograms for the ESP32-CAM virtual camera,
+exposed as a stats dict and as Prometheus text
+"""
+
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+STAGES = ('network', 'wait', 'decode', 'resize', 'convert', 'send')
+# Not work of the output loop: socket reads happen on the reader thread,
+# and waiting for the next frame is idle time
+UNBUDGETED_STAGES = ('network', 'wait')
+WINDOW = 300  # Samples per rolling window (10 s at 30 fps)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Histogram bucket upper bounds in seconds (Prometheus convention)
+BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5)
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# =======================================================
+# ROLLING HISTOGRAM CLASS
+# =======================================================
+class RollingHistogram:
+    """
+    Latency samples for one stage
+
+    The last `window` samples are kept in a ring buffer for exact rolling
+    quantiles. Lifetime bucket counts, sum and count are kept as well,
+    because Prometheus histograms must only ever grow.
+    Not thread-safe; StageMetrics holds the lock.
+    """
+
+    def __init__(self, window=WINDOW, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._samples = np.zeros(window)
+        self._pos = 0
+        self._size = 0
+
+        # Lifetime totals; the last bucket is +Inf
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self._samples[self._pos] = seconds
+        self._pos = (self._pos + 1) % len(self._samples)
+        self._size = min(self._size + 1, len(self._samples))
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def window(self):
+        """The samples currently in the rolling window, in no particular order"""
+        return self._samples[:self._size]
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Rolling-window quantiles in seconds, or None before the first sample"""
+        if not self._size:
+            return [None] * len(quantiles)
+        return [float(q) for q in np.quantile(self.window(), quantiles)]
+
+
+# =======================================================
+# STAGE METRICS CLASS
+# =======================================================
+class StageMetrics:
+    """
+    Per-stage timings and a frame budget for the virtual camera output loop
+
+    Stages are observed as they happen (time() or observe()). frame_done()
+    closes a frame: the work stages observed since the previous frame_done()
+    are summed, and the frame counts as a missed deadline when that sum is
+    over `budget` seconds. "network" (reading and demuxing a frame off the
+    socket, on the reader thread) and "wait" (the output loop idling until
+    the next frame) do not count towards the budget.
+    """
+
+    def __init__(self, stages=STAGES, budget=None, window=WINDOW, buckets=BUCKETS):
+        self.budget = budget
+        self.histograms = {stage: RollingHistogram(window, buckets) for stage in stages}
+        self.work = RollingHistogram(window, buckets)
+        self.frames = 0
+        self.placeholders = 0
+        self.missed_deadlines = 0
+        self._frame_times = deque(maxlen=window)
+        self._pending_work = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.histograms[stage].observe(seconds)
+            if stage not in UNBUDGETED_STAGES:
+                self._pending_work += seconds
+
+    @contextmanager
+    def time(self, stage):
+        """Context manager that observes the time spent in its block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def frame_done(self, placeholder=False):
+        """
+        Close the current frame
+
+        Returns:
+            bool: True if the frame's work went over the budget
+        """
+        now = time.monotonic()
+        with self._lock:
+            work, self._pending_work = self._pending_work, 0.0
+            self.work.observe(work)
+            self._frame_times.append(now)
+            self.frames += 1
+            self.placeholders += placeholder
+            missed = self.budget is not None and work > self.budget
+            self.missed_deadlines += missed
+        return missed
+
+    def fps(self):
+        """Output frame rate over the rolling window"""
+        times = self._frame_times
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stats(self):
+        """
+        Return rolling quantiles and counters as a dict
+
+        Latencies are in milliseconds: {'stages': {stage: {'count', 'p50',
+        'p95', 'p99', 'max'}}, 'work': {...}, 'frames', 'fps', ...}
+        """
+        def summary(histogram):
+            window = histogram.window()
+            values = histogram.quantiles() + [float(window.max()) if len(window) else None]
+            summary = {'count': histogram.count}
+            for name, value in zip(('p50', 'p95', 'p99', 'max'), values):
+                summary[name] = round(value * 1000, 3) if value is not None else None
+            return summary
+
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'placeholders': self.placeholders,
+                'fps': round(self.fps(), 1),
+                'budget_ms': round(self.budget * 1000, 3) if self.budget else None,
+                'missed_deadlines': self.missed_deadlines,
+                'work': summary(self.work),
+                'stages': {stage: summary(h) for stage, h in self.histograms.items()},
+            }
+
+    def prometheus(self, prefix='esp32cam'):
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def histogram_lines(name, labels, histogram):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.bucket_counts):
+                cumulative += count
+                lines.append(f'{prefix}_{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            labels = f'{{{labels.rstrip(",")}}}' if labels else ''
+            lines.append(f'{prefix}_{name}_sum{labels} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_{name}_count{labels} {histogram.count}')
+
+        with self._lock:
+            header('stage_seconds', 'histogram', 'Time spent per frame in each output stage')
+            for stage, histogram in self.histograms.items():
+                histogram_lines('stage_seconds', f'stage="{stage}",', histogram)
+
+            header('stage_window_seconds', 'summary', 'Stage latency over the rolling window')
+            for stage, histogram in self.histograms.items():
+                for quantile, value in zip(QUANTILES, histogram.quantiles()):
+                    if value is not None:
+                        lines.append(f'{prefix}_stage_window_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                                     f'{value:.6f}')
+                window = histogram.window()
+                lines.append(f'{prefix}_stage_window_seconds_sum{{stage="{stage}"}} {window.sum():.6f}')
+                lines.append(f'{prefix}_stage_window_seconds_count{{stage="{stage}"}} {len(window)}')
+
+            header('frame_work_seconds', 'histogram', 'Decode-to-send work per output frame')
+            histogram_lines('frame_work_seconds', '', self.work)
+
+            header('frames_total', 'counter', 'Frames sent to the virtual camera')
+            lines.append(f'{prefix}_frames_total {self.frames}')
+            header('placeholder_frames_total', 'counter', 'Placeholder frames sent while the camera stalled')
+            lines.append(f'{prefix}_placeholder_frames_total {self.placeholders}')
+            header('missed_deadlines_total', 'counter', 'Frames whose work exceeded the frame budget')
+            lines.append(f'{prefix}_missed_deadlines_total {self.missed_deadlines}')
+            header('output_fps', 'gauge', 'Output frame rate over the rolling window')
+            lines.append(f'{prefix}_output_fps {self.fps():.3f}')
+            if self.budget:
+                header('frame_budget_seconds', 'gauge', 'Time available per output frame')
+                lines.append(f'{prefix}_frame_budget_seconds {self.budget:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+# =======================================================
+# METRICS SERVER CLASS
+# =======================================================
+class MetricsServer:
+    """
+    Threaded HTTP server for StageMetrics
+
+    Endpoints: "/metrics" (Prometheus text) and "/stats" (JSON).
+    Use as a context manager; port 0 picks a free port.
+
+    Args:
+        metrics (StageMetrics): Metrics to serve
+        extra_stats (callable): Optional function returning a dict that is
+            added to /stats under "source" (e.g. reader connection stats)
+    """
+
+    def __init__(self, metrics, host='127.0.0.1', port=0, extra_stats=None):
+        self.metrics = metrics
+        self.extra_stats = extra_stats
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.partition('?')[0]
+                if path == '/metrics':
+                    self._send(METRICS_CONTENT_TYPE, server.metrics.prometheus().encode())
+                elif path == '/stats':
+                    stats = server.metrics.stats()
+                    if server.extra_stats:
+                        stats['source'] = server.extra_stats()
+                    self._send('application/json', json.dumps(stats, default=str).encode())
+                else:
+                    self.send_error(404)
+
+            def _send(self, content_type, body):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,353 @@
+"""
+Frame Pipeline Stages for the ESP32-CAM Virtual Camera
+Sits between the MJPEG demuxer and the virtual camera output
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# =======================================================
+# JPEG HELPERS
+# =======================================================
+# Start-of-frame markers carry the image size (C4, C8 and CC are not SOF)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """
+    Read (width, height) from a JPEG header without decoding it
+
+    Args:
+        data (bytes-like): Complete or partial JPEG file
+
+    Returns:
+        tuple: (width, height), or None if no SOF segment was found
+    """
+    data = memoryview(data)
+    pos = 2  # Skip SOI
+    end = len(data)
+    while pos + 9 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return width, height
+        if marker == 0xDA:  # Start of scan; no SOF before entropy data
+            return None
+        pos += 2 + ((data[pos + 2] << 8) | data[pos + 3])
+    return None
+
+
+def reduced_decode_flag(source_size, target_size):
+    """
+    Pick the cheapest cv2.IMREAD_REDUCED_* flag that still covers the target
+
+    libjpeg can decode at 1/2 or 1/4 scale for much less work than a full
+    decode followed by cv2.resize.
+
+    Args:
+        source_size (tuple): (width, height) of the JPEG
+        target_size (tuple): (width, height) wanted by the consumer
+    """
+    if source_size is None:
+        return cv2.IMREAD_COLOR
+    src_w, src_h = source_size
+    dst_w, dst_h = target_size
+    for factor, flag in ((4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if src_w // factor >= dst_w and src_h // factor >= dst_h:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+# =======================================================
+# FRAME EXCHANGE CLASS
+# =======================================================
+# One frame handed to the consumer. `image` stays valid until the second read
+# after this one (it may be one of the exchange's resize buffers).
+Frame = namedtuple('Frame', ['seq', 'image', 'timestamp', 'received_at'])
+
+
+class FrameExchange:
+    """
+    Hands the newest JPEG from the reader thread to a single consumer
+
+    The producer calls put() for every frame off the wire. Only the latest
+    JPEG is kept; JPEGs replaced before the consumer read them are counted
+    as dropped and never decoded. Each put() gets a monotonically increasing
+    sequence number, so consumers can tell fresh frames from repeats and
+    block in read_next() until one arrives.
+
+    Decoding happens lazily on the consumer side, at most once per JPEG,
+    unless a worker that decodes every frame anyway hands its image over
+    with adopt().
+    cv2.imdecode has no destination argument in Python, so every decode
+    allocates a new image; a JPEG already at the target size is handed out
+    as decoded, without a copy. Larger JPEGs are resized into two
+    preallocated buffers used alternately, so the frame returned by the
+    previous read is never overwritten by the current one.
+
+    With a frame_metrics.StageMetrics, the consumer's wait in read_next()
+    is observed as "wait" and decode() as "decode" and "resize".
+    """
+
+    def __init__(self, width, height, metrics=None):
+        self.size = (width, height)
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        self._next_buffer = 0
+
+        # Latest JPEG from the producer
+        self._jpg = None
+        self._jpg_seq = 0
+        self._jpg_timestamp = None
+        self._jpg_received_at = None
+
+        # Latest decoded frame, and the seq of the last one the consumer got
+        self._frame = None
+        self._read_seq = 0
+
+        # Counters
+        self.received = 0
+        self.decoded = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # ---------------------------------------------------
+    # Producer side
+    # ---------------------------------------------------
+    def put(self, jpg, timestamp=None):
+        """
+        Store the latest JPEG and wake waiting consumers
+
+        Args:
+            jpg (bytes): Encoded frame; must not be a view into a reused buffer
+            timestamp (float): Capture timestamp from the camera, if known
+
+        Returns:
+            int: The JPEG's sequence number
+        """
+        received_at = time.monotonic()
+        with self._cond:
+            if self._jpg is not None:
+                self.dropped += 1
+            self._jpg = jpg
+            self._jpg_seq += 1
+            self._jpg_timestamp = timestamp
+            self._jpg_received_at = received_at
+            self.received += 1
+            self._cond.notify_all()
+            return self._jpg_seq
+
+    def adopt(self, seq, image):
+        """
+        Use a decode of JPEG `seq` made by another thread
+
+        The consumer's next read returns `image` instead of decoding the
+        same JPEG again. Ignored when a newer JPEG has arrived since or the
+        consumer already took this one.
+
+        Args:
+            seq (int): Sequence number returned by put()
+            image (numpy.ndarray): The JPEG as returned by decode() without
+                `out` (so never one of the consumer's buffers)
+
+        Returns:
+            bool: True if `image` became the current frame
+        """
+        with self._cond:
+            if self._jpg is None or self._jpg_seq != seq:
+                return False
+            _, _, timestamp, received_at = self._take_pending()
+            self._frame = Frame(seq, image, timestamp, received_at)
+            self.decoded += 1
+        return True
+
+    # ---------------------------------------------------
+    # Consumer side
+    # ---------------------------------------------------
+    @property
+    def seq(self):
+        """Sequence number of the newest JPEG put so far (0 before any)"""
+        return self._jpg_seq
+
+    def read(self):
+        """
+        Return the newest Frame without blocking
+
+        Returns:
+            Frame: Latest decoded frame, or None before the first one
+        """
+        with self._cond:
+            pending = self._take_pending()
+        if pending is not None:
+            self._decode_pending(*pending)
+        return self._hand_out(self._frame)
+
+    def read_next(self, timeout=None):
+        """
+        Block until a frame newer than the last one returned is available
+
+        Args:
+            timeout (float): Seconds to wait, or None to wait forever
+
+        Returns:
+            Frame: The new frame, or None on timeout
+        """
+        last_seq = self._read_seq
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            waited = time.perf_counter()
+            with self._cond:
+                fresh = self._cond.wait_for(lambda: self._jpg_seq > last_seq, timeout)
+                pending = self._take_pending() if fresh else None
+            if self.metrics is not None:
+                self.metrics.observe('wait', time.perf_counter() - waited)
+            if not fresh:
+                return None
+            if pending is not None and self._decode_pending(*pending):
+                return self._hand_out(self._frame)
+            frame = self._frame
+            if frame is not None and frame.seq > last_seq:
+                return self._hand_out(frame)  # Decoded by another thread (see adopt)
+            # The new JPEG failed to decode; wait for the one after it
+            last_seq = pending[1] if pending is not None else self._jpg_seq
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    return None
+
+    def _hand_out(self, frame):
+        if frame is not None:
+            self._read_seq = frame.seq
+        return frame
+
+    def _take_pending(self):
+        """Claim the pending JPEG; must be called with the lock held"""
+        if self._jpg is None:
+            return None
+        pending = (self._jpg, self._jpg_seq, self._jpg_timestamp, self._jpg_received_at)
+        self._jpg = None
+        return pending
+
+    def _decode_pending(self, jpg, seq, timestamp, received_at):
+        image = self.decode(jpg, out=self._buffers[self._next_buffer])
+        if image is None:
+            self.failed += 1
+            return False
+        self._next_buffer ^= 1
+        with self._cond:
+            # An adopted newer frame may have replaced the one decoded here
+            if self._frame is None or seq > self._frame.seq:
+                self._frame = Frame(seq, image, timestamp, received_at)
+            self.decoded += 1
+        return True
+
+    def decode(self, jpg, out=None):
+        """
+        Decode a JPEG at the smallest scale that covers self.size
+
+        Args:
+            jpg (bytes-like): Encoded frame
+            out (numpy.ndarray): Optional destination for the resized image;
+                a JPEG already at self.size is returned as decoded
+        """
+        started = time.perf_counter()
+        flag = reduced_decode_flag(jpeg_size(jpg), self.size)
+        frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), flag)
+        decoded = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.observe('decode', decoded - started)
+        if frame is None:
+            return None
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, dst=out)
+        if self.metrics is not None:
+            self.metrics.observe('resize', time.perf_counter() - decoded)
+        return frame
+
+    def age(self, frame):
+        """Seconds since `frame` arrived from the network"""
+        return time.monotonic() - frame.received_at
+
+    def stats(self):
+        """Return frame counters as a dict"""
+        return {
+            'seq': self._jpg_seq,
+            'received': self.received,
+            'decoded': self.decoded,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+# =======================================================
+# OUTPUT STAGE CLASS
+# =======================================================
+PLACEHOLDER_TEXT = "Waiting for ESP32-CAM..."
+
+
+def render_placeholder(width, height, text=PLACEHOLDER_TEXT):
+    """Black frame with a status message (identical in BGR and RGB)"""
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.putText(image, text, (50, height // 2),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return image
+
+
+class OutputStage:
+    """
+    Sends frames to a pyvirtualcam.Camera without per-frame allocations
+
+    BGR frames are converted into one preallocated RGB buffer, and the
+    placeholder shown while the camera stalls is rendered once and reused.
+    The "convert" and "send" stages are observed on `metrics`, and every
+    sent frame closes a frame there (see StageMetrics.frame_done).
+
+    Args:
+        cam: Object with send(rgb_array), e.g. pyvirtualcam.Camera
+        metrics (StageMetrics): Optional timings; use the same object as
+            the FrameExchange so decode/resize count towards the budget
+    """
+
+    def __init__(self, cam, width, height, metrics=None):
+        self.cam = cam
+        self.metrics = metrics
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.placeholder = render_placeholder(width, height)
+
+    def send(self, image):
+        """
+        Convert a BGR frame into the RGB buffer and send it
+
+        Returns:
+            bool: True if the frame missed its deadline
+        """
+        started = time.perf_counter()
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        converted = time.perf_counter()
+        self.cam.send(self.rgb)
+        if self.metrics is None:
+            return False
+        self.metrics.observe('convert', converted - started)
+        self.metrics.observe('send', time.perf_counter() - converted)
+        return self.metrics.frame_done()
+
+    def send_placeholder(self):
+        """Send the cached placeholder frame"""
+        started = time.perf_counter()
+        self.cam.send(self.placeholder)
+        if self.metrics is None:
+            return False
+        self.metrics.observe('send', time.perf_counter() - started)
+        return self.metrics.frame_done(placeholder=True)
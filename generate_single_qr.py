@@ -2,41 +2,308 @@
 Single QR Code Generator
 Generates a single QR code image from command line
 Used by PHP to generate QR codes for books
+
+Usage:
+    python generate_single_qr.py <qr_code> <output_path> [--force]
+        (an output path ending in .svg writes SVG instead of PNG)
+    python generate_single_qr.py --serve [--port 8765] [--root qr_codes]
+    python generate_single_qr.py --client <qr_code> <output_path> [<qr_code> <output_path> ...]
+
+--serve keeps qrcode/PIL imported and answers batched generation
+requests on http://127.0.0.1:<port>/generate, so PHP does not pay
+interpreter startup for every book it adds.
 """
 
 import sys
-import qrcode
 import os
+import json
+import threading
+
+from qr_cache import QRCache, atomic_output, make_key
+from qr_render import EXTENSIONS, format_for_path, render_bytes
+
+# QR settings (must match qr_code_generator.py so cached files are shared)
+QR_ERROR_CORRECTION = "H"
+QR_BOX_SIZE = 10
+QR_BORDER = 4
+
+# Daemon settings (must match QR_DAEMON_URL in php/qr-code-helper.php)
+QR_DAEMON_HOST = "127.0.0.1"  # Loopback only; the daemon writes files for any caller
+QR_DAEMON_PORT = 8765
+QR_DAEMON_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qr_codes")
+QR_DAEMON_MAX_BATCH = 500
+QR_DAEMON_MAX_BODY = 1024 * 1024
+
+
+def _render(qr_code_text, output_path, cache):
+    """Render one code unless `cache` says the file is up to date"""
+    output_format = format_for_path(output_path)
+    key = make_key(qr_code_text, QR_ERROR_CORRECTION, QR_BOX_SIZE, QR_BORDER, output_format)
+    if cache is not None and cache.is_fresh(output_path, key):
+        return False
+
+    # qr_render imports qrcode/PIL on first use, so cache hits skip that cost
+    data = render_bytes(qr_code_text, output_format, QR_ERROR_CORRECTION, QR_BOX_SIZE, QR_BORDER)
+
+    # Save image (creates the directory; temp file + rename)
+    with atomic_output(output_path) as f:
+        f.write(data)
+
+    if cache is not None:
+        cache.record(output_path, key)
+    return True
+
+
+def generate(qr_code_text, output_path, use_cache=True):
+    """
+    Generate one QR code PNG, skipping the work if it is already up to date
+
+    Returns:
+        bool: True if the image was rendered, False on a cache hit
+    """
+    cache = QRCache(os.path.dirname(output_path) or ".") if use_cache else None
+    generated = _render(qr_code_text, output_path, cache)
+    if cache is not None:
+        cache.save()
+    return generated
+
+
+def generate_batch(items, use_cache=True):
+    """
+    Generate several QR codes, loading and saving each folder's manifest once
+
+    Args:
+        items (list): (qr_code, output_path) pairs
+
+    Returns:
+        list: One result dict per item with qr_code, output_path and
+              status ("generated", "unchanged" or "error")
+    """
+    caches = {}
+    results = []
+    for qr_code_text, output_path in items:
+        result = {"qr_code": qr_code_text, "output_path": output_path}
+        try:
+            cache = None
+            if use_cache:
+                folder = os.path.dirname(output_path) or "."
+                cache = caches.get(folder)
+                if cache is None:
+                    cache = caches[folder] = QRCache(folder)
+            generated = _render(qr_code_text, output_path, cache)
+            result["status"] = "generated" if generated else "unchanged"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        results.append(result)
+
+    for cache in caches.values():
+        cache.save()
+    return results
+
+
+# =======================================================
+# DAEMON MODE
+# =======================================================
+def _inside(path, root):
+    path = os.path.realpath(path)
+    return os.path.commonpath([path, root]) == root and path != root
+
+
+def parse_request(body, root):
+    """
+    Validate a /generate request body
+
+    Accepts {"qr_code": ..., "output_path": ...} or
+    {"codes": [{"qr_code": ..., "output_path": ...}, ...]}.
+    Relative output paths are resolved against `root`; absolute ones
+    must point inside it. Only .png/.svg names are written, and never
+    dotfiles such as the cache manifest.
+
+    Returns:
+        list: (qr_code, output_path) pairs
+
+    Raises:
+        ValueError: If the body is malformed, a path escapes `root` or
+            does not name a QR image
+    """
+    request = json.loads(body.decode("utf-8"))
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    codes = request.get("codes", [request])
+    if not isinstance(codes, list) or not codes:
+        raise ValueError("codes must be a non-empty list")
+    if len(codes) > QR_DAEMON_MAX_BATCH:
+        raise ValueError(f"at most {QR_DAEMON_MAX_BATCH} codes per request")
+
+    root = os.path.realpath(root)
+    items = []
+    for code in codes:
+        if not isinstance(code, dict):
+            raise ValueError("each code must be a JSON object")
+        qr_code_text = code.get("qr_code")
+        output_path = code.get("output_path") or f"{qr_code_text}.png"
+        if not isinstance(qr_code_text, str) or not qr_code_text:
+            raise ValueError("qr_code must be a non-empty string")
+        if not isinstance(output_path, str):
+            raise ValueError("output_path must be a string")
+        output_path = os.path.join(root, output_path)
+        if not _inside(output_path, root):
+            raise ValueError(f"output_path must be inside {root}: {code.get('output_path')}")
+        output_path = os.path.realpath(output_path)
+        name = os.path.basename(output_path)
+        if name.startswith(".") or not name.lower().endswith(tuple(EXTENSIONS.values())):
+            raise ValueError(f"output_path must be a .png or .svg file: {code.get('output_path')}")
+        items.append((qr_code_text, output_path))
+    return items
+
+
+def make_server(host=QR_DAEMON_HOST, port=QR_DAEMON_PORT, root=QR_DAEMON_ROOT):
+    """
+    Build (but do not start) the generation daemon
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() / shutdown() on it
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    # Warm the encoder once instead of on every request
+    import qrcode.constants  # noqa: F401
+    import PIL.PngImagePlugin  # noqa: F401
+
+    # Manifests are read-modify-write, so batches run one at a time
+    lock = threading.Lock()
+    stats = {"requests": 0, "generated": 0, "unchanged": 0, "errors": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "root": root, **stats})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._reply(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > QR_DAEMON_MAX_BODY:
+                self._reply(413, {"error": "request too large"})
+                return
+            try:
+                items = parse_request(self.rfile.read(length), root)
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+                return
+
+            with lock:
+                results = generate_batch(items)
+                stats["requests"] += 1
+                for result in results:
+                    key = "errors" if result["status"] == "error" else result["status"]
+                    stats[key] += 1
+            self._reply(200, {"results": results})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(host=QR_DAEMON_HOST, port=QR_DAEMON_PORT, root=QR_DAEMON_ROOT):
+    """Run the generation daemon until interrupted"""
+    server = make_server(host, port, root)
+    print(f"QR daemon listening on http://{host}:{server.server_address[1]}/generate (root: {root})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def request_generation(items, url=None, timeout=5):
+    """
+    Ask a running daemon to generate codes
+
+    Args:
+        items (list): (qr_code, output_path) pairs
+        url (str): Daemon base URL (defaults to the local daemon)
+        timeout (float): Seconds to wait for the whole batch
+
+    Returns:
+        list: Result dicts as returned by generate_batch()
+
+    Raises:
+        OSError: If the daemon is not reachable or rejects the request
+    """
+    from urllib.request import Request, urlopen
+
+    url = url or f"http://{QR_DAEMON_HOST}:{QR_DAEMON_PORT}"
+    body = json.dumps({"codes": [{"qr_code": q, "output_path": p} for q, p in items]})
+    request = Request(url.rstrip("/") + "/generate", data=body.encode("utf-8"),
+                      headers={"Content-Type": "application/json"})
+    with urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))["results"]
+
+
+def _option(args, name, default):
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1]
+        del args[index:index + 2]
+        return value
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    if "--serve" in args:
+        args.remove("--serve")
+        serve(port=int(_option(args, "--port", QR_DAEMON_PORT)),
+              root=os.path.abspath(_option(args, "--root", QR_DAEMON_ROOT)))
+        sys.exit(0)
+
+    if "--client" in args:
+        args.remove("--client")
+        url = _option(args, "--url", None)
+        if len(args) < 2 or len(args) % 2:
+            print("ERROR: Usage: python generate_single_qr.py --client <qr_code> <output_path> [...]")
+            sys.exit(1)
+        try:
+            results = request_generation(list(zip(args[::2], args[1::2])), url)
+        except Exception as e:
+            print(f"ERROR: QR daemon unavailable: {e}")
+            sys.exit(1)
+        for result in results:
+            if result["status"] == "error":
+                print(f"ERROR: {result['output_path']}: {result['error']}")
+            else:
+                suffix = " (unchanged)" if result["status"] == "unchanged" else ""
+                print(f"SUCCESS: {result['output_path']}{suffix}")
+        sys.exit(1 if any(r["status"] == "error" for r in results) else 0)
+
+    args = [arg for arg in args if arg != "--force"]
+    if len(args) < 2:
+        print("ERROR: Usage: python generate_single_qr.py <qr_code> <output_path> [--force]")
+        sys.exit(1)
+
+    qr_code_text = args[0]
+    output_path = args[1]
 
-if len(sys.argv) < 3:
-    print("ERROR: Usage: python generate_single_qr.py <qr_code> <output_path>")
-    sys.exit(1)
-
-qr_code_text = sys.argv[1]
-output_path = sys.argv[2]
-
-try:
-    # Create QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
-    )
-
-    qr.add_data(qr_code_text)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    # Save image
-    img.save(output_path)
-
-    print(f"SUCCESS: {output_path}")
-    sys.exit(0)
-except Exception as e:
-    print(f"ERROR: {str(e)}")
-    sys.exit(1)
+    try:
+        generated = generate(qr_code_text, output_path, use_cache="--force" not in sys.argv)
+        print(f"SUCCESS: {output_path}" + ("" if generated else " (unchanged)"))
+        sys.exit(0)
+    except Exception as e:
+        print(f"ERROR: {str(e)}")
+        sys.exit(1)
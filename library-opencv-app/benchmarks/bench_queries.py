@@ -0,0 +1,147 @@
+"""Benchmark the dashboard/quiz queries before and after the index migrations.
+
+Usage (from library-opencv-app/):
+    python -m benchmarks.bench_queries [--uri mysql+pymysql://.../bench_db] [--attempts 120000]
+
+Without --uri a throwaway SQLite file is used. The tables are created
+without the hot-path indexes, seeded with synthetic data, timed with
+EXPLAIN output, migrated (src.database.migrate) and timed again.
+Point --uri at an empty scratch database: its tables are dropped.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.database import database
+from src.database.database import Base, bulk_insert
+from src.database.migrate import migrate
+from src.database.models import Book, QuizAttempt, Reward, User, UserReward
+
+# The PHP queries, with CONCAT/DATE() rewritten to portable, sargable forms
+QUERIES = {
+    're-attempt check': ('per_user', 'SELECT COUNT(*) FROM quiz_attempts WHERE user_id = :uid AND book_id = :bid'),
+    'student summary': ('per_user', 'SELECT COUNT(DISTINCT book_id), AVG(score_percentage) '
+                                    'FROM quiz_attempts WHERE user_id = :uid'),
+    'rewards per student': ('per_user', 'SELECT COUNT(DISTINCT reward_id) FROM user_rewards WHERE user_id = :uid'),
+    'books completed (>=70)': ('global', 'SELECT COUNT(*) FROM (SELECT DISTINCT user_id, book_id '
+                                         'FROM quiz_attempts WHERE score_percentage >= 70) t'),
+    'book inventory': ('global', 'SELECT b.book_id, COUNT(DISTINCT qa.user_id), AVG(qa.score_percentage) '
+                                 'FROM books b LEFT JOIN quiz_attempts qa ON b.book_id = qa.book_id '
+                                 'GROUP BY b.book_id'),
+    'recent activity': ('global', 'SELECT u.full_name, b.title, qa.score_percentage, qa.attempt_date '
+                                  'FROM quiz_attempts qa JOIN users u ON qa.user_id = u.user_id '
+                                  'JOIN books b ON qa.book_id = b.book_id '
+                                  'ORDER BY qa.attempt_date DESC LIMIT 10'),
+    'attempts today': ('global', 'SELECT COUNT(*) FROM quiz_attempts '
+                                 'WHERE attempt_date >= :day AND attempt_date < :next_day'),
+}
+
+
+def create_tables_without_indexes(engine):
+    Base.metadata.drop_all(engine)
+    saved = {table: set(table.indexes) for table in Base.metadata.tables.values()}
+    for table in saved:
+        table.indexes.clear()
+    try:
+        Base.metadata.create_all(engine)
+    finally:
+        for table, indexes in saved.items():
+            table.indexes.update(indexes)
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE IF EXISTS schema_migrations'))
+
+
+def seed(attempts, users, books, rng):
+    now = datetime(2025, 3, 1)
+    bulk_insert(User, ({'full_name': f'Student {i}', 'email': f's{i}@example.com', 'password_hash': 'x',
+                        'user_type': 'student', 'grade_level': 3 + i % 4} for i in range(users)))
+    bulk_insert(Book, ({'title': f'Book {i}', 'author': f'Author {i % 97}', 'qr_code': f'QR{i:05d}'}
+                       for i in range(books)))
+    bulk_insert(Reward, ({'reward_name': f'Reward {n}', 'books_required': n} for n in (10, 25, 50, 100)))
+    bulk_insert(QuizAttempt, (
+        {'user_id': rng.randint(1, users), 'book_id': rng.randint(1, books), 'total_questions': 5,
+         'correct_answers': (c := rng.randint(0, 5)), 'score_percentage': c * 20.0,
+         'time_taken': rng.randint(30, 600),
+         'attempt_date': now - timedelta(minutes=rng.randint(0, 60 * 24 * 300))}
+        for _ in range(attempts)))
+    bulk_insert(UserReward, ({'user_id': rng.randint(1, users), 'reward_id': rng.randint(1, 4)}
+                             for _ in range(users * 2)))
+
+
+def explain(connection, sql, params):
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = connection.execute(text(prefix + sql), params).fetchall()
+    if connection.dialect.name == 'sqlite':
+        return [row[-1] for row in rows]
+    return [f'{row.table}: type={row.type} key={row.key} rows={row.rows} {row.Extra or ""}' for row in rows]
+
+
+def run_queries(engine, users, books, repeat, rng):
+    timings = {}
+    params_day = {'day': datetime(2025, 2, 28), 'next_day': datetime(2025, 3, 1)}
+    with engine.connect() as connection:
+        for name, (kind, sql) in QUERIES.items():
+            count = repeat if kind == 'per_user' else max(repeat // 40, 3)
+            params = [dict(params_day, uid=rng.randint(1, users), bid=rng.randint(1, books))
+                      for _ in range(count)]
+            plan = explain(connection, sql, params[0])
+            start = time.perf_counter()
+            for p in params:
+                connection.execute(text(sql), p).fetchall()
+            timings[name] = (time.perf_counter() - start) / count * 1000
+            print(f'  {name:24s} {timings[name]:9.3f} ms')
+            for line in plan:
+                print(f'      {line}')
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uri', help='Scratch database URI (default: temporary SQLite file)')
+    parser.add_argument('--attempts', type=int, default=120000)
+    parser.add_argument('--users', type=int, default=3000)
+    parser.add_argument('--books', type=int, default=800)
+    parser.add_argument('--repeat', type=int, default=200, help='Runs per per-student query')
+    args = parser.parse_args()
+
+    tmpdir = None
+    uri = args.uri
+    if not uri:
+        tmpdir = tempfile.TemporaryDirectory()
+        uri = 'sqlite:///' + os.path.join(tmpdir.name, 'bench.db')
+    engine = database.configure(uri)
+    rng = random.Random(0)
+
+    print(f'Seeding {args.attempts} attempts, {args.users} students, {args.books} books ({engine.dialect.name})')
+    create_tables_without_indexes(engine)
+    start = time.perf_counter()
+    seed(args.attempts, args.users, args.books, rng)
+    print(f'Seeded in {time.perf_counter() - start:.1f}s\n')
+
+    print('Before (foreign keys only):')
+    before = run_queries(engine, args.users, args.books, args.repeat, random.Random(1))
+    print('\nMigrating:')
+    migrate(engine, log=lambda message: print('  ' + message))
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+    print('\nAfter:')
+    after = run_queries(engine, args.users, args.books, args.repeat, random.Random(1))
+
+    print('\nSpeedup:')
+    for name in QUERIES:
+        print(f'  {name:24s} {before[name] / after[name]:7.1f}x')
+
+    database.db_session.remove()
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Load test: a whole class submitting quiz results at the same moment.
+
+Usage (from library-opencv-app/):
+    python -m benchmarks.bench_quiz_submissions [--uri mysql+pymysql://.../bench_db] [--students 40]
+
+Each of --students threads submits one 10-question quiz at the same time,
+first through a port of php/save-quiz-result.php (about ten sequential
+queries and one INSERT per response, one connection per request), then
+through src.services.quiz (one validating SELECT, multi-row INSERTs,
+group commits by the background writer). Reports wall time, latency
+percentiles, statements per submission and peak connections checked out.
+Without --uri a throwaway SQLite file is used. Point --uri at an empty
+scratch database: its tables are dropped.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, text
+
+from src.database import database
+from src.database.database import Base, bulk_insert, init_db
+from src.database.models import Book, QuizQuestion, Reward, User
+from src.services import quiz, stats
+
+QUESTIONS = 10
+
+
+class Probe:
+    """Counts statements and concurrently checked-out connections."""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.checked_out = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._statement)
+        event.listen(engine, 'checkout', self._checkout)
+        event.listen(engine, 'checkin', self._checkin)
+
+    def _statement(self, *args):
+        with self._lock:
+            self.statements += 1
+
+    def _checkout(self, *args):
+        with self._lock:
+            self.checked_out += 1
+            self.peak = max(self.peak, self.checked_out)
+
+    def _checkin(self, *args):
+        with self._lock:
+            self.checked_out -= 1
+
+    def reset(self):
+        with self._lock:
+            self.statements = 0
+            self.peak = self.checked_out
+
+
+def php_style_submit(data):
+    """The query sequence of php/save-quiz-result.php, statement for statement."""
+    user_id, book_id = data['user_id'], data['book_id']
+    engine = database.get_engine()
+    for attempt in range(5):
+        try:
+            with engine.begin() as connection:
+                def one(sql, **params):
+                    return connection.execute(text(sql), params).first()
+
+                user = one("SELECT user_id, full_name FROM users WHERE user_id = :u AND status = 'active'", u=user_id)
+                book = one('SELECT book_id, title FROM books WHERE book_id = :b', b=book_id)
+                if user is None or book is None:
+                    raise ValueError('invalid submission')
+                correct = 0
+                for response in data['responses']:
+                    key = one('SELECT correct_answer FROM quiz_questions WHERE question_id = :q',
+                              q=response['question_id'])
+                    correct += key[0] == response['user_answer']
+                score = correct / len(data['responses']) * 100
+                attempt_id = connection.execute(text(
+                    'INSERT INTO quiz_attempts (user_id, book_id, total_questions, correct_answers, '
+                    'score_percentage, time_taken) VALUES (:u, :b, :t, :c, :s, 60)'),
+                    {'u': user_id, 'b': book_id, 't': len(data['responses']), 'c': correct, 's': score}).lastrowid
+                for response in data['responses']:
+                    connection.execute(text(
+                        'INSERT INTO quiz_responses (attempt_id, question_id, user_answer, is_correct) '
+                        'VALUES (:a, :q, :ans, :ok)'),
+                        {'a': attempt_id, 'q': response['question_id'], 'ans': response['user_answer'], 'ok': True})
+                one('SELECT COUNT(*) FROM quiz_attempts WHERE user_id = :u AND book_id = :b', u=user_id, b=book_id)
+                books_count = one('SELECT COUNT(DISTINCT book_id) FROM quiz_attempts WHERE user_id = :u',
+                                  u=user_id)[0]
+                one('SELECT AVG(score_percentage) FROM quiz_attempts WHERE user_id = :u', u=user_id)
+                rewards = connection.execute(text(
+                    'SELECT reward_id, books_required FROM rewards WHERE is_active = 1 '
+                    'ORDER BY books_required')).all()
+                for reward_id, required in rewards:
+                    if books_count >= required and one(
+                            'SELECT user_reward_id FROM user_rewards WHERE user_id = :u AND reward_id = :r',
+                            u=user_id, r=reward_id) is None:
+                        connection.execute(text('INSERT INTO user_rewards (user_id, reward_id) VALUES (:u, :r)'),
+                                           {'u': user_id, 'r': reward_id})
+                one('SELECT COUNT(DISTINCT reward_id) FROM user_rewards WHERE user_id = :u', u=user_id)
+            return
+        except Exception as exc:
+            if 'locked' not in str(exc) or attempt == 4:
+                raise
+            time.sleep(0.01 * (attempt + 1))
+
+
+def run_class(submit_one, students):
+    barrier = threading.Barrier(students)
+    latencies = [0.0] * students
+    errors = []
+
+    def student(index):
+        payload = {'user_id': index + 1, 'book_id': 1,
+                   'responses': [{'question_id': q + 1, 'user_answer': 'ABCD'[(q + index) % 4]}
+                                 for q in range(QUESTIONS)]}
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            submit_one(payload)
+        except Exception as exc:
+            errors.append(exc)
+        latencies[index] = (time.perf_counter() - start) * 1000
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(students)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) * 1000, sorted(latencies), errors
+
+
+def reset_tables(engine, students):
+    Base.metadata.drop_all(engine)
+    init_db()
+    bulk_insert(User, ({'full_name': f'Student {i}', 'email': f's{i}@example.com', 'password_hash': 'x',
+                        'user_type': 'student', 'status': 'active'} for i in range(students)))
+    bulk_insert(Book, ({'title': 'Class reader', 'author': 'Author', 'qr_code': 'QR-CLASS'},))
+    bulk_insert(QuizQuestion, ({'book_id': 1, 'question_text': f'Question {q}', 'option_a': 'a', 'option_b': 'b',
+                                'option_c': 'c', 'option_d': 'd', 'correct_answer': 'ABCD'[q % 4], 'created_by': 1}
+                               for q in range(QUESTIONS)))
+    bulk_insert(Reward, ({'reward_name': name, 'books_required': n} for n, name in ((1, 'Bookmark'), (10, 'Pen'))))
+    with engine.begin() as connection:
+        stats.rebuild(connection)
+    quiz.clear_rewards_cache()
+    database.db_session.remove()
+
+
+def report(name, probe, students, wall_ms, latencies, errors):
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'{name:22s} wall {wall_ms:8.1f} ms  median {statistics.median(latencies):7.1f} ms  '
+          f'p95 {p95:7.1f} ms  {probe.statements / students:5.1f} statements/submission  '
+          f'peak connections {probe.peak}  errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uri', help='Scratch database URI (default: temporary SQLite file)')
+    parser.add_argument('--students', type=int, default=40)
+    args = parser.parse_args()
+
+    tmpdir = None
+    uri = args.uri
+    if not uri:
+        tmpdir = tempfile.TemporaryDirectory()
+        uri = 'sqlite:///' + os.path.join(tmpdir.name, 'bench.db')
+    engine = database.configure(uri)
+    probe = Probe(engine)
+    print(f'{args.students} concurrent submissions of a {QUESTIONS}-question quiz ({engine.dialect.name})\n')
+
+    reset_tables(engine, args.students)
+    probe.reset()
+    report('save-quiz-result.php', probe, args.students, *run_class(php_style_submit, args.students))
+
+    reset_tables(engine, args.students)
+    probe.reset()
+    report('quiz.submit', probe, args.students, *run_class(quiz.submit, args.students))
+
+    reset_tables(engine, args.students)
+    writer = quiz.QuizResultWriter()
+    probe.reset()
+    report('QuizResultWriter', probe, args.students,
+           *run_class(lambda payload: writer.submit(payload).result(60), args.students))
+    writer.close()
+    print(f'  {writer.stats["transactions"]} transactions for {writer.stats["submissions"]} submissions')
+
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Scan recording: one database write per scan vs. the scan journal.
+
+Usage (from library-opencv-app/):
+    python -m benchmarks.bench_scan_journal [--scans 5000] [--db-latency 2]
+
+--db-latency adds that many milliseconds to every statement, standing in
+for the round trip to a MySQL server on the school network. Three runs:
+
+- direct: each scan is written to system_logs/reading_progress in its own
+  transaction, the way a kiosk posting every scan to the server works;
+- journal: each scan is appended to the local journal while a
+  JournalFlusher writes to the database in the background;
+- outage: the database is unreachable while the scans are recorded, then
+  comes back and the backlog is drained.
+
+Reports the time a kiosk waits per scan and how fast scans reach the
+database. Uses throwaway SQLite files.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from src.database import database
+from src.database.database import bulk_insert, init_db
+from src.database.models import Book, SystemLog, User
+from src.services.scan_journal import JournalFlusher, ScanJournal, ScanRecord, write_batch
+
+STUDENTS = 40
+BOOKS = 200
+
+
+def scans(count):
+    return [(f'QR{i % BOOKS}', f'kiosk-{i % 3}', 1 + i % STUDENTS, None) for i in range(count)]
+
+
+def slow_statements(engine, milliseconds):
+    def delay(*args):
+        time.sleep(milliseconds / 1000)
+    event.listen(engine, 'before_cursor_execute', delay)
+
+
+def setup_database(uri, latency):
+    engine = database.configure(uri)
+    init_db()
+    bulk_insert(User, ({'full_name': f'Student {i}', 'email': f's{i}@example.com', 'password_hash': 'x',
+                        'user_type': 'student'} for i in range(STUDENTS)))
+    bulk_insert(Book, ({'title': f'Book {i}', 'author': 'Author', 'qr_code': f'QR{i}'} for i in range(BOOKS)))
+    database.db_session.remove()
+    slow_statements(engine, latency)
+    return engine
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def run_direct(batch):
+    latencies = []
+    for seq, (qr_code, camera, user_id, _) in enumerate(batch, 1):
+        start = time.perf_counter()
+        session = database.SessionLocal()
+        try:
+            write_batch(session, [ScanRecord(seq, time.time(), camera, qr_code, user_id)])
+            session.commit()
+        finally:
+            session.close()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_journal(batch, journal):
+    latencies = []
+    for scan in batch:
+        start = time.perf_counter()
+        journal.append_many([scan])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def wait_for_drain(journal):
+    start = time.perf_counter()
+    while journal.backlog():
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def report(name, latencies, wall, extra=''):
+    median, p99 = percentiles(latencies)
+    print(f'{name:8s} per scan: median {median:7.3f} ms  p99 {p99:7.3f} ms  | '
+          f'{len(latencies) / wall:8.0f} scans/s into the database{extra}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scans', type=int, default=5000)
+    parser.add_argument('--db-latency', type=float, default=2.0, help='Milliseconds added per statement')
+    args = parser.parse_args()
+    batch = scans(args.scans)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f'{args.scans} scans, {args.db_latency:g} ms per database statement\n')
+
+        uri = 'sqlite:///' + os.path.join(tmpdir, 'direct.db')
+        setup_database(uri, args.db_latency)
+        start = time.perf_counter()
+        latencies = run_direct(batch)
+        report('direct', latencies, time.perf_counter() - start)
+
+        uri = 'sqlite:///' + os.path.join(tmpdir, 'journal.db')
+        setup_database(uri, args.db_latency)
+        journal = ScanJournal(os.path.join(tmpdir, 'scan_journal.db'))
+        flusher = JournalFlusher(journal, interval=0.05).start()
+        start = time.perf_counter()
+        latencies = run_journal(batch, journal)
+        wait_for_drain(journal)
+        wall = time.perf_counter() - start
+        flusher.stop()
+        report('journal', latencies, wall, f'  ({flusher.stats["batches"]} transactions)')
+
+        database.configure('sqlite:///' + os.path.join(tmpdir, 'offline', 'library.db'))
+        flusher = JournalFlusher(journal, interval=0.05, max_backoff=0.2).start()
+        latencies = run_journal(batch, journal)
+        time.sleep(0.5)
+        backlog = journal.backlog()
+        engine = database.configure(uri)
+        slow_statements(engine, args.db_latency)
+        drain = wait_for_drain(journal)
+        flusher.stop()
+        median, p99 = percentiles(latencies)
+        print(f'outage   per scan: median {median:7.3f} ms  p99 {p99:7.3f} ms  | backlog of {backlog} drained in '
+              f'{drain:.2f} s after {flusher.stats["failures"]} failed flushes')
+        with database.session_scope() as session:
+            print(f'\nsystem_logs rows in the journal database: {session.query(SystemLog).count()}')
+        journal.close()
+        database.get_engine().dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark full-frame QR decoding against ScannerEngine.
+
+Usage (from library-opencv-app/):
+    python -m benchmarks.bench_scanner [video.mp4] [--limit 600] [--cart]
+
+Without a video, a synthetic clip is generated: a book QR code slides
+across the frame, pauses, then leaves an otherwise static scene.
+
+--cart instead compares decode_gray with MultiDecoder on synthetic 720p
+returns-cart frames, each with eight rotated and tilted book codes.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+import qrcode
+
+from src.qr.engine import MultiDecoder, ScannerEngine, decode_gray, to_gray
+
+
+def synthetic_frames(count=300, size=(640, 480), payload='QR001'):
+    width, height = size
+    # Integer downsampling keeps every module the same size (5 px)
+    code = np.array(qrcode.make(payload).convert('L'))[::2, ::2]
+    side = code.shape[0]
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 120, (height, width), dtype=np.uint8)
+    frames = []
+    for index in range(count):
+        frame = background.copy()
+        if index < count * 2 // 3:
+            x = 40 + min(index, count // 3) * 2
+            frame[120:120 + side, x:x + side] = code
+        noise = rng.integers(0, 2, (height, width), dtype=np.uint8)
+        frames.append(cv2.cvtColor(cv2.add(frame, noise), cv2.COLOR_GRAY2BGR))
+    return frames
+
+
+def cart_frames(count=10, books=8, size=(1280, 720)):
+    """Frames of a cart of `books` books, each code rotated and tilted at random."""
+    width, height = size
+    rng = np.random.default_rng(0)
+    frames, payloads = [], set()
+    for index in range(count):
+        frame = rng.normal(120, 8, (height, width)).clip(0, 255).astype(np.uint8)
+        for book in range(books):
+            payload = f'BOOK-{index * books + book:04d}'
+            payloads.add(payload)
+            code = np.array(qrcode.make(payload, box_size=1, border=2).convert('L'))
+            n = code.shape[0]
+            half = rng.uniform(3, 6) * n / 2
+            tilt = rng.uniform(0, 0.3)
+            corners = np.array([[-half * (1 - tilt), -half], [half * (1 - tilt), -half], [half, half], [-half, half]])
+            angle = np.deg2rad(rng.uniform(-45, 45))
+            rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+            center = (170 + (book % 4) * 310, 190 + (book // 4) * 340)
+            matrix = cv2.getPerspectiveTransform(np.float32([[0, 0], [n, 0], [n, n], [0, n]]),
+                                                 np.float32(corners @ rotation.T + center))
+            warped = cv2.warpPerspective(code, matrix, size)
+            mask = cv2.warpPerspective(np.full_like(code, 255), matrix, size, flags=cv2.INTER_NEAREST)
+            frame[mask > 0] = warped[mask > 0]
+        frames.append(frame)
+    return frames, payloads
+
+
+def bench_cart(frames, decoder):
+    found = set()
+    start = time.perf_counter()
+    for frame in frames:
+        found.update(d.data for d in decoder(frame))
+    return time.perf_counter() - start, found
+
+
+def video_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_full_frame(frames):
+    hits = 0
+    start = time.perf_counter()
+    for frame in frames:
+        if decode_gray(to_gray(frame)):
+            hits += 1
+    return time.perf_counter() - start, hits
+
+
+def bench_engine(frames):
+    engine = ScannerEngine()
+    hits = 0
+    start = time.perf_counter()
+    for frame in frames:
+        if engine.process(frame):
+            hits += 1
+    return time.perf_counter() - start, hits, engine.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('video', nargs='?', help='Recorded video file')
+    parser.add_argument('--limit', type=int, default=600, help='Maximum frames to read')
+    parser.add_argument('--cart', action='store_true', help='Benchmark multi-code decoding instead')
+    args = parser.parse_args()
+
+    if args.cart:
+        frames, payloads = cart_frames()
+        print(f'Cart frames: {len(frames)}, {len(payloads)} book codes')
+        for name, decoder, workers in (('decode_gray', decode_gray, None),
+                                       ('MultiDecoder', MultiDecoder(workers=1), 1),
+                                       ('MultiDecoder', MultiDecoder(workers=4), 4)):
+            elapsed, found = bench_cart(frames, decoder)
+            label = f'{name} ({workers} workers)' if workers else name
+            print(f'{label:28s} {len(frames) / elapsed:6.1f} frames/s, '
+                  f'{len(found & payloads):3d}/{len(payloads)} codes read')
+            if workers:
+                decoder.close()
+        return
+
+    frames = video_frames(args.video, args.limit) if args.video else synthetic_frames()
+    if not frames:
+        raise SystemExit('No frames to benchmark')
+
+    full_time, full_hits = bench_full_frame(frames)
+    engine_time, engine_hits, stats = bench_engine(frames)
+
+    print(f'Frames: {len(frames)} ({args.video or "synthetic"})')
+    print(f'Full-frame decode: {len(frames) / full_time:8.1f} frames/s, {full_hits} frames with hits')
+    print(f'ScannerEngine:     {len(frames) / engine_time:8.1f} frames/s, {engine_hits} frames with hits')
+    print(f'Speedup: {full_time / engine_time:.1f}x  engine stats: {stats}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+-- =====================================================
+-- 0001: Composite indexes for the hot quiz/progress query paths
+-- Mirrored by __table_args__ in src/database/models.py
+-- Apply with: python -m src.database.migrate
+-- =====================================================
+
+-- quiz_attempts
+-- save-quiz-result.php / quiz.php: WHERE user_id = ? [AND book_id = ?],
+-- COUNT(DISTINCT book_id), AVG(score_percentage) -> index-only range scan
+CREATE INDEX idx_qa_user_book_score ON quiz_attempts (user_id, book_id, score_percentage);
+-- librarian.php inventory: LEFT JOIN ... GROUP BY book_id, COUNT(DISTINCT user_id), AVG(score)
+CREATE INDEX idx_qa_book_user_score ON quiz_attempts (book_id, user_id, score_percentage);
+-- admin.php / teacher.php: distinct (user_id, book_id) WHERE score_percentage >= 70
+CREATE INDEX idx_qa_score_user_book ON quiz_attempts (score_percentage, user_id, book_id);
+-- Recent activity: ORDER BY attempt_date DESC LIMIT n; attempts today
+CREATE INDEX idx_qa_attempt_date ON quiz_attempts (attempt_date);
+
+-- quiz_responses: per-attempt review and per-question difficulty
+CREATE INDEX idx_qr_attempt_question ON quiz_responses (attempt_id, question_id, is_correct);
+CREATE INDEX idx_qr_question_correct ON quiz_responses (question_id, is_correct);
+
+-- reading_progress: one row per (user, book); dashboards filter by status
+CREATE INDEX idx_rp_user_book_status ON reading_progress (user_id, book_id, reading_status);
+CREATE INDEX idx_rp_book_status ON reading_progress (book_id, reading_status);
+
+-- user_rewards: "already earned?" check, COUNT(DISTINCT reward_id) per user,
+-- COUNT(*) per reward on the dashboards
+CREATE INDEX idx_ur_user_reward ON user_rewards (user_id, reward_id);
+CREATE INDEX idx_ur_reward_user ON user_rewards (reward_id, user_id);
+
+-- book_borrowings: current loans per user/book, overdue sweep
+CREATE INDEX idx_bb_user_status ON book_borrowings (user_id, status);
+CREATE INDEX idx_bb_book_status ON book_borrowings (book_id, status);
+CREATE INDEX idx_bb_status_due ON book_borrowings (status, expected_return_date);
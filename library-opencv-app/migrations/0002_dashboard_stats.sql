@@ -0,0 +1,89 @@
+-- =====================================================
+-- 0002: Running aggregates for the dashboards
+-- Mirrored by DashboardStats & co. in src/database/models.py and kept
+-- current by src/services/stats.py (ORM) or the 0003 triggers (MySQL).
+-- Rebuild/verify at any time with: python -m src.services.stats --rebuild | --check
+-- =====================================================
+
+-- Single row (stats_id = 1) read by admin.php / teacher.php / the Flask dashboard
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+    stats_id INT PRIMARY KEY,
+    active_students INT NOT NULL DEFAULT 0,
+    total_books INT NOT NULL DEFAULT 0,
+    total_attempts INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    passed_pairs INT NOT NULL DEFAULT 0,
+    active_readers INT NOT NULL DEFAULT 0,
+    rewards_earned INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS student_stats (
+    user_id INT PRIMARY KEY,
+    attempts INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    books_attempted INT NOT NULL DEFAULT 0,
+    books_passed INT NOT NULL DEFAULT 0,
+    rewards_earned INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS book_stats (
+    book_id INT PRIMARY KEY,
+    attempts INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    readers INT NOT NULL DEFAULT 0,
+    passed_readers INT NOT NULL DEFAULT 0
+);
+
+-- Distinct (student, book) set: replaces COUNT(DISTINCT user_id, book_id) scans
+CREATE TABLE IF NOT EXISTS completion_pairs (
+    user_id INT NOT NULL,
+    book_id INT NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    best_score DECIMAL(5,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, book_id)
+);
+
+CREATE TABLE IF NOT EXISTS reward_stats (
+    reward_id INT PRIMARY KEY,
+    earned INT NOT NULL DEFAULT 0
+);
+
+-- Backfill from the existing rows (same result as --rebuild)
+DELETE FROM completion_pairs;
+INSERT INTO completion_pairs (user_id, book_id, attempts, best_score)
+SELECT user_id, book_id, COUNT(*), MAX(score_percentage)
+FROM quiz_attempts GROUP BY user_id, book_id;
+
+DELETE FROM student_stats;
+INSERT INTO student_stats (user_id, attempts, score_sum, books_attempted, books_passed)
+SELECT user_id, SUM(attempts), 0, COUNT(*), SUM(CASE WHEN best_score >= 70 THEN 1 ELSE 0 END)
+FROM completion_pairs GROUP BY user_id;
+UPDATE student_stats SET score_sum =
+    (SELECT SUM(score_percentage) FROM quiz_attempts qa WHERE qa.user_id = student_stats.user_id);
+INSERT INTO student_stats (user_id)
+SELECT DISTINCT user_id FROM user_rewards WHERE user_id NOT IN (SELECT user_id FROM completion_pairs);
+UPDATE student_stats SET rewards_earned =
+    (SELECT COUNT(*) FROM user_rewards ur WHERE ur.user_id = student_stats.user_id);
+
+DELETE FROM book_stats;
+INSERT INTO book_stats (book_id, attempts, score_sum, readers, passed_readers)
+SELECT book_id, SUM(attempts), 0, COUNT(*), SUM(CASE WHEN best_score >= 70 THEN 1 ELSE 0 END)
+FROM completion_pairs GROUP BY book_id;
+UPDATE book_stats SET score_sum =
+    (SELECT SUM(score_percentage) FROM quiz_attempts qa WHERE qa.book_id = book_stats.book_id);
+
+DELETE FROM reward_stats;
+INSERT INTO reward_stats (reward_id, earned)
+SELECT reward_id, COUNT(*) FROM user_rewards GROUP BY reward_id;
+
+DELETE FROM dashboard_stats;
+INSERT INTO dashboard_stats (stats_id, active_students, total_books, total_attempts, score_sum,
+                             passed_pairs, active_readers, rewards_earned)
+SELECT 1,
+    (SELECT COUNT(*) FROM users WHERE user_type = 'student' AND COALESCE(status, 'active') = 'active'),
+    (SELECT COUNT(*) FROM books),
+    (SELECT COUNT(*) FROM quiz_attempts),
+    (SELECT COALESCE(SUM(score_percentage), 0) FROM quiz_attempts),
+    (SELECT COUNT(*) FROM completion_pairs WHERE best_score >= 70),
+    (SELECT COUNT(DISTINCT user_id) FROM completion_pairs),
+    (SELECT COUNT(*) FROM user_rewards);
@@ -0,0 +1,125 @@
+-- =====================================================
+-- 0003: Keep the 0002 aggregates current inside MySQL
+-- Every write from the PHP site (save-quiz-result.php, user/book admin,
+-- reward grants) updates the stats in the same transaction. When
+-- trg_quiz_attempts_stats exists, src/services/stats.py leaves the
+-- bookkeeping to these triggers.
+-- Not tracked: deleting quiz attempts (also via ON DELETE CASCADE, which
+-- does not fire triggers). Run python -m src.services.stats --rebuild after
+-- bulk deletes; --check reports any drift.
+-- =====================================================
+
+DROP TRIGGER IF EXISTS trg_quiz_attempts_stats;
+DROP TRIGGER IF EXISTS trg_users_stats_insert;
+DROP TRIGGER IF EXISTS trg_users_stats_update;
+DROP TRIGGER IF EXISTS trg_users_stats_delete;
+DROP TRIGGER IF EXISTS trg_books_stats_insert;
+DROP TRIGGER IF EXISTS trg_books_stats_delete;
+DROP TRIGGER IF EXISTS trg_user_rewards_stats_insert;
+DROP TRIGGER IF EXISTS trg_user_rewards_stats_delete;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_quiz_attempts_stats AFTER INSERT ON quiz_attempts
+FOR EACH ROW
+BEGIN
+    DECLARE prev_best DECIMAL(5,2) DEFAULT NULL;
+    DECLARE prev_attempts INT DEFAULT 0;
+    DECLARE new_pair INT DEFAULT 0;
+    DECLARE new_pass INT DEFAULT 0;
+
+    SET prev_best = (SELECT best_score FROM completion_pairs
+                     WHERE user_id = NEW.user_id AND book_id = NEW.book_id);
+    SET prev_attempts = COALESCE((SELECT attempts FROM student_stats WHERE user_id = NEW.user_id), 0);
+    SET new_pair = IF(prev_best IS NULL, 1, 0);
+    SET new_pass = IF(NEW.score_percentage >= 70 AND (prev_best IS NULL OR prev_best < 70), 1, 0);
+
+    INSERT INTO completion_pairs (user_id, book_id, attempts, best_score)
+    VALUES (NEW.user_id, NEW.book_id, 1, NEW.score_percentage)
+    ON DUPLICATE KEY UPDATE attempts = attempts + 1,
+                            best_score = GREATEST(best_score, NEW.score_percentage);
+
+    INSERT INTO student_stats (user_id, attempts, score_sum, books_attempted, books_passed)
+    VALUES (NEW.user_id, 1, NEW.score_percentage, new_pair, new_pass)
+    ON DUPLICATE KEY UPDATE attempts = attempts + 1,
+                            score_sum = score_sum + NEW.score_percentage,
+                            books_attempted = books_attempted + new_pair,
+                            books_passed = books_passed + new_pass;
+
+    INSERT INTO book_stats (book_id, attempts, score_sum, readers, passed_readers)
+    VALUES (NEW.book_id, 1, NEW.score_percentage, new_pair, new_pass)
+    ON DUPLICATE KEY UPDATE attempts = attempts + 1,
+                            score_sum = score_sum + NEW.score_percentage,
+                            readers = readers + new_pair,
+                            passed_readers = passed_readers + new_pass;
+
+    INSERT INTO dashboard_stats (stats_id, total_attempts, score_sum, passed_pairs, active_readers)
+    VALUES (1, 1, NEW.score_percentage, new_pass, IF(prev_attempts = 0, 1, 0))
+    ON DUPLICATE KEY UPDATE total_attempts = total_attempts + 1,
+                            score_sum = score_sum + NEW.score_percentage,
+                            passed_pairs = passed_pairs + new_pass,
+                            active_readers = active_readers + IF(prev_attempts = 0, 1, 0);
+END$$
+
+CREATE TRIGGER trg_users_stats_insert AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO dashboard_stats (stats_id, active_students)
+    VALUES (1, IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0))
+    ON DUPLICATE KEY UPDATE active_students = active_students
+        + IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0);
+END$$
+
+CREATE TRIGGER trg_users_stats_update AFTER UPDATE ON users
+FOR EACH ROW
+BEGIN
+    DECLARE delta INT DEFAULT 0;
+    SET delta = IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0)
+              - IF(OLD.user_type = 'student' AND COALESCE(OLD.status, 'active') = 'active', 1, 0);
+    IF delta <> 0 THEN
+        INSERT INTO dashboard_stats (stats_id, active_students) VALUES (1, delta)
+        ON DUPLICATE KEY UPDATE active_students = active_students + delta;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_users_stats_delete AFTER DELETE ON users
+FOR EACH ROW
+BEGIN
+    IF OLD.user_type = 'student' AND COALESCE(OLD.status, 'active') = 'active' THEN
+        UPDATE dashboard_stats SET active_students = active_students - 1 WHERE stats_id = 1;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_books_stats_insert AFTER INSERT ON books
+FOR EACH ROW
+BEGIN
+    INSERT INTO dashboard_stats (stats_id, total_books) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE total_books = total_books + 1;
+END$$
+
+CREATE TRIGGER trg_books_stats_delete AFTER DELETE ON books
+FOR EACH ROW
+BEGIN
+    UPDATE dashboard_stats SET total_books = total_books - 1 WHERE stats_id = 1;
+END$$
+
+CREATE TRIGGER trg_user_rewards_stats_insert AFTER INSERT ON user_rewards
+FOR EACH ROW
+BEGIN
+    INSERT INTO reward_stats (reward_id, earned) VALUES (NEW.reward_id, 1)
+    ON DUPLICATE KEY UPDATE earned = earned + 1;
+    INSERT INTO student_stats (user_id, rewards_earned) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE rewards_earned = rewards_earned + 1;
+    INSERT INTO dashboard_stats (stats_id, rewards_earned) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE rewards_earned = rewards_earned + 1;
+END$$
+
+CREATE TRIGGER trg_user_rewards_stats_delete AFTER DELETE ON user_rewards
+FOR EACH ROW
+BEGIN
+    UPDATE reward_stats SET earned = earned - 1 WHERE reward_id = OLD.reward_id;
+    UPDATE student_stats SET rewards_earned = rewards_earned - 1 WHERE user_id = OLD.user_id;
+    UPDATE dashboard_stats SET rewards_earned = rewards_earned - 1 WHERE stats_id = 1;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,9 @@
+-- =====================================================
+-- 0004: Count of every user account on the dashboard row
+-- Mirrored by DashboardStats.total_users in src/database/models.py; the
+-- Flask dashboard shows it next to active_students.
+-- =====================================================
+
+ALTER TABLE dashboard_stats ADD COLUMN total_users INT NOT NULL DEFAULT 0;
+
+UPDATE dashboard_stats SET total_users = (SELECT COUNT(*) FROM users);
@@ -0,0 +1,32 @@
+-- =====================================================
+-- 0005: Keep dashboard_stats.total_users current inside MySQL
+-- Replaces the 0003 user insert/delete triggers with versions that also
+-- count every account; the update trigger is unchanged.
+-- =====================================================
+
+DROP TRIGGER IF EXISTS trg_users_stats_insert;
+DROP TRIGGER IF EXISTS trg_users_stats_delete;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_users_stats_insert AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO dashboard_stats (stats_id, total_users, active_students)
+    VALUES (1, 1, IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0))
+    ON DUPLICATE KEY UPDATE total_users = total_users + 1,
+        active_students = active_students
+        + IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0);
+END$$
+
+CREATE TRIGGER trg_users_stats_delete AFTER DELETE ON users
+FOR EACH ROW
+BEGIN
+    UPDATE dashboard_stats
+    SET total_users = total_users - 1,
+        active_students = active_students
+        - IF(OLD.user_type = 'student' AND COALESCE(OLD.status, 'active') = 'active', 1, 0)
+    WHERE stats_id = 1;
+END$$
+
+DELIMITER ;
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
+from src.database.database import db_session
 from src.database.models import User
 from src.utils.responses import json_response
-from werkzeug.security import generate_password_hash
 
 signup_bp = Blueprint('signup', __name__)
 
@@ -20,11 +20,17 @@ def signup():
     if existing_user:
         return json_response(False, 'User already exists.')
 
-    # Create new user
-    new_user = User(email=email, password=generate_password_hash(password))
+    # Create new user (the password setter stores a hash)
+    new_user = User(
+        email=email,
+        full_name=data.get('full_name') or email,
+        user_type='student',
+        password=password,
+    )
     
     try:
-        new_user.save()  # Assuming save method exists in User model
+        new_user.save()
         return json_response(True, 'User registered successfully.')
     except Exception as e:
+        db_session.rollback()
         return json_response(False, str(e))
\ No newline at end of file
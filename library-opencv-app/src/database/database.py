@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.config import settings
+
+BULK_BATCH_SIZE = 1000
+
+
+def make_engine(uri=None):
+    """Create an engine for `uri` (default: settings.DATABASE_URI).
+
+    Server databases get a sized connection pool with pre-ping and recycling
+    so connections dropped by MySQL's wait_timeout are replaced transparently.
+    SQLite connections may be shared across Flask's worker threads and run
+    with foreign keys on and WAL journaling for file databases.
+    """
+    uri = uri or settings.DATABASE_URI
+    if uri.startswith('sqlite'):
+        options = {'connect_args': {'check_same_thread': False}}
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            # One shared connection, otherwise every checkout sees an empty database
+            options['poolclass'] = StaticPool
+        engine = create_engine(uri, **options)
+        event.listen(engine, 'connect', _sqlite_pragmas)
+        return engine
+
+    return create_engine(
+        uri,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+engine = make_engine()
+SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+# One session per thread (i.e. per Flask request); removed on app teardown
+db_session = scoped_session(SessionLocal)
+
+
+class _ModelMixin:
+    """Flask-SQLAlchemy style helpers used by the auth and UI blueprints."""
+
+    query = db_session.query_property()
+
+    def save(self, commit=True):
+        db_session.add(self)
+        if commit:
+            db_session.commit()
+        return self
+
+    def delete(self, commit=True):
+        db_session.delete(self)
+        if commit:
+            db_session.commit()
+
+
+Base = declarative_base(cls=_ModelMixin)
+
+
+def configure(uri):
+    """Point the module at another database (e.g. an in-memory one in tests)."""
+    global engine
+    db_session.remove()
+    engine.dispose()
+    engine = make_engine(uri)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_engine():
+    return engine
+
+
+def init_db():
+    """Create any missing tables for the models in src.database.models."""
+    import src.database.models  # noqa: F401  (registers the tables on Base)
+    Base.metadata.create_all(engine)
+
+
+def init_app(app):
+    """Return each request's session to the pool when the request ends."""
+    @app.teardown_appcontext
+    def remove_session(exception=None):
+        db_session.remove()
+
+
+@contextmanager
+def session_scope():
+    """Commit on success, roll back on error; for scripts and background jobs."""
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def bulk_insert(model, rows, batch_size=BULK_BATCH_SIZE, session=None):
+    """Insert an iterable of dicts as multi-row INSERTs, `batch_size` at a time.
+
+    Skips the ORM unit of work entirely, so objects are not returned.
+    Returns the number of rows inserted.
+    """
+    session = session or db_session
+    table = model.__table__
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            session.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(table), batch)
+        count += len(batch)
+    session.commit()
+    return count
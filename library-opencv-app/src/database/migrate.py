@@ -0,0 +1,143 @@
+"""Versioned SQL migrations for the library database.
+
+Migrations are plain SQL files in ``migrations/`` named ``NNNN_name.sql``
+and are applied in order; applied versions are recorded in the
+``schema_migrations`` table. ``NNNN_name.mysql.sql`` only runs on that
+dialect (other databases just record the version), and ``DELIMITER``
+lines work as in the mysql client so triggers can be defined.
+
+Usage (from library-opencv-app/):
+    python -m src.database.migrate [--uri mysql+pymysql://...] [--list]
+"""
+import argparse
+import os
+import re
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, text
+
+from src.database import database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'migrations')
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, server_default=func.now()),
+)
+
+_CREATE_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)', re.IGNORECASE)
+_ADD_COLUMN = re.compile(r'ALTER\s+TABLE\s+(\w+)\s+ADD\s+(?:COLUMN\s+)?(\w+)', re.IGNORECASE)
+
+
+def discover(path=MIGRATIONS_DIR):
+    """Return (version, name, file path, dialect or None) for every migration, in order."""
+    migrations = []
+    for filename in sorted(os.listdir(path)):
+        match = re.match(r'(\d+)_(\w+?)(?:\.(\w+))?\.sql$', filename)
+        if match:
+            version, name, dialect = match.groups()
+            migrations.append((int(version), name, os.path.join(path, filename), dialect))
+    return migrations
+
+
+def split_statements(sql):
+    """Split a SQL script into statements, dropping ``--`` comment lines.
+
+    A ``DELIMITER $$`` line switches the statement terminator, as in the
+    mysql client, so trigger bodies can contain ``;``.
+    """
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('--'):
+            continue
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        buffer.append(line)
+        text_so_far = '\n'.join(buffer)
+        while delimiter in text_so_far:
+            statement, text_so_far = text_so_far.split(delimiter, 1)
+            if statement.strip():
+                statements.append(statement.strip())
+            buffer = [text_so_far] if text_so_far.strip() else []
+    if buffer and '\n'.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+
+def _should_skip(connection, statement):
+    """Skip CREATE INDEX / ALTER TABLE ... ADD COLUMN when the index or column
+    exists (e.g. made by create_all) or the table does not exist in this database."""
+    index = _CREATE_INDEX.match(statement)
+    column = _ADD_COLUMN.match(statement)
+    if not index and not column:
+        return None
+    table_name = index.group(2) if index else column.group(1)
+    inspector = inspect(connection)
+    if not inspector.has_table(table_name):
+        return f'table {table_name} does not exist'
+    if index and index.group(1) in {idx['name'] for idx in inspector.get_indexes(table_name)}:
+        return f'index {index.group(1)} already exists'
+    if column and column.group(2) in {col['name'] for col in inspector.get_columns(table_name)}:
+        return f'column {table_name}.{column.group(2)} already exists'
+    return None
+
+
+def applied_versions(engine):
+    _metadata.create_all(engine)
+    with engine.connect() as connection:
+        return {row.version for row in connection.execute(schema_migrations.select())}
+
+
+def migrate(engine=None, path=MIGRATIONS_DIR, log=print):
+    """Apply pending migrations and return the versions applied."""
+    engine = engine or database.get_engine()
+    done = applied_versions(engine)
+    applied = []
+    for version, name, filename, dialect in discover(path):
+        if version in done:
+            continue
+        statements = []
+        if dialect and dialect != engine.dialect.name:
+            log(f'  skip: {version:04d}_{name} is {dialect} only')
+        else:
+            with open(filename, encoding='utf-8') as f:
+                statements = split_statements(f.read())
+        # MySQL commits DDL implicitly, so each statement is its own step;
+        # a failed run can simply be re-run and skips what already exists.
+        with engine.begin() as connection:
+            for statement in statements:
+                reason = _should_skip(connection, statement)
+                if reason:
+                    log(f'  skip: {reason}')
+                    continue
+                connection.execute(text(statement))
+            connection.execute(schema_migrations.insert().values(version=version, name=name))
+        log(f'Applied {version:04d}_{name}')
+        applied.append(version)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uri', help='Database URI (default: settings.DATABASE_URI)')
+    parser.add_argument('--list', action='store_true', help='Show migration status and exit')
+    args = parser.parse_args()
+
+    engine = database.configure(args.uri) if args.uri else database.get_engine()
+    if args.list:
+        done = applied_versions(engine)
+        for version, name, _, _ in discover():
+            print(f'{"applied" if version in done else "pending":8s} {version:04d}_{name}')
+        return
+    if not migrate(engine):
+        print('Database is up to date')
+
+
+if __name__ == '__main__':
+    main()
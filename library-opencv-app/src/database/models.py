@@ -1,16 +1,46 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Date, DateTime, Index, Integer, Numeric, String, Text, ForeignKey, func
+from sqlalchemy.orm import relationship, synonym
+from werkzeug.security import check_password_hash, generate_password_hash
 from .database import Base
 
+try:
+    import bcrypt
+except ImportError:  # Only needed for hashes created by the PHP site
+    bcrypt = None
+
 class User(Base):
     __tablename__ = 'users'
 
     user_id = Column(Integer, primary_key=True, autoincrement=True)
-    full_name = Column(String, nullable=False)
-    email = Column(String, unique=True, nullable=False)
-    password_hash = Column(String, nullable=False)
-    user_type = Column(String, nullable=False)  # e.g., 'student', 'teacher', 'librarian', 'admin'
-    status = Column(String, default='active')  # e.g., 'active', 'inactive'
+    student_id = Column(String(20), unique=True)
+    full_name = Column(String(100), nullable=False)
+    email = Column(String(100), unique=True, nullable=False)
+    password_hash = Column(String(255), nullable=False)
+    user_type = Column(String(20), nullable=False)  # e.g., 'student', 'teacher', 'librarian', 'admin'
+    grade_level = Column(Integer)
+    class_section = Column(String(10))
+    status = Column(String(20), default='active')  # e.g., 'active', 'inactive'
+    created_at = Column(DateTime, server_default=func.now())
+
+    id = synonym('user_id')
+    quiz_attempts = relationship("QuizAttempt", back_populates="user")
+
+    @property
+    def password(self):
+        raise AttributeError('password is write-only')
+
+    @password.setter
+    def password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def verify_password(self, password):
+        # The PHP site stores bcrypt hashes ($2y$...), Flask signups werkzeug ones
+        if self.password_hash.startswith(('$2y$', '$2b$', '$2a$')):
+            if bcrypt is None:
+                return False
+            stored = '$2b$' + self.password_hash[4:]
+            return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+        return check_password_hash(self.password_hash, password)
 
     def __repr__(self):
         return f"<User(id={self.user_id}, name={self.full_name}, email={self.email})>"
@@ -19,13 +49,19 @@ class Book(Base):
     __tablename__ = 'books'
 
     book_id = Column(Integer, primary_key=True, autoincrement=True)
-    title = Column(String, nullable=False)
-    author = Column(String, nullable=False)
-    isbn = Column(String, unique=True, nullable=False)
-    genre = Column(String)
+    title = Column(String(200), nullable=False)
+    author = Column(String(100), nullable=False)
+    isbn = Column(String(20), unique=True)
+    qr_code = Column(String(100), unique=True, nullable=False)
+    qr_code_path = Column(String(255))
+    genre = Column(String(50))
+    recommended_grade_level = Column(String(10))
     total_pages = Column(Integer)
-    difficulty = Column(String, default='beginner')
-    qr_code = Column(String)
+    difficulty = Column('difficulty_level', String(20), default='beginner')
+    description = Column(Text)
+    is_available = Column(Boolean, default=True)
+
+    quiz_attempts = relationship("QuizAttempt", back_populates="book")
 
     def __repr__(self):
         return f"<Book(id={self.book_id}, title={self.title}, author={self.author})>"
@@ -34,14 +70,199 @@ class QuizAttempt(Base):
     __tablename__ = 'quiz_attempts'
 
     attempt_id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.user_id'), nullable=False)
-    book_id = Column(Integer, ForeignKey('books.book_id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    book_id = Column(Integer, ForeignKey('books.book_id', ondelete='CASCADE'), nullable=False)
     total_questions = Column(Integer, nullable=False)
     correct_answers = Column(Integer, nullable=False)
-    score_percentage = Column(Float, nullable=False)
+    score_percentage = Column(Numeric(5, 2, asdecimal=False), nullable=False)
+    time_taken = Column(Integer)
+    attempt_date = Column(DateTime, server_default=func.now())
 
     user = relationship("User", back_populates="quiz_attempts")
     book = relationship("Book", back_populates="quiz_attempts")
+    responses = relationship("QuizResponse", back_populates="attempt")
+
+    # Covering indexes for the dashboard and save-quiz-result.php queries
+    # (migrations/0001_hot_path_indexes.sql)
+    __table_args__ = (
+        Index('idx_qa_user_book_score', 'user_id', 'book_id', 'score_percentage'),
+        Index('idx_qa_book_user_score', 'book_id', 'user_id', 'score_percentage'),
+        Index('idx_qa_score_user_book', 'score_percentage', 'user_id', 'book_id'),
+        Index('idx_qa_attempt_date', 'attempt_date'),
+    )
+
+    def __repr__(self):
+        return f"<QuizAttempt(id={self.attempt_id}, user_id={self.user_id}, book_id={self.book_id}, score={self.score_percentage})>"
+
+class QuizQuestion(Base):
+    __tablename__ = 'quiz_questions'
+
+    question_id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(Integer, ForeignKey('books.book_id', ondelete='CASCADE'), nullable=False)
+    question_text = Column(Text, nullable=False)
+    option_a = Column(String(255), nullable=False)
+    option_b = Column(String(255), nullable=False)
+    option_c = Column(String(255), nullable=False)
+    option_d = Column(String(255), nullable=False)
+    correct_answer = Column(String(1), nullable=False)  # 'A', 'B', 'C' or 'D'
+    difficulty = Column('difficulty_level', String(20), default='medium')
+    points = Column(Integer, default=1)
+    created_by = Column(Integer, ForeignKey('users.user_id'), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<QuizQuestion(id={self.question_id}, book_id={self.book_id})>"
+
+class QuizResponse(Base):
+    __tablename__ = 'quiz_responses'
+
+    response_id = Column(Integer, primary_key=True, autoincrement=True)
+    attempt_id = Column(Integer, ForeignKey('quiz_attempts.attempt_id', ondelete='CASCADE'), nullable=False)
+    question_id = Column(Integer, ForeignKey('quiz_questions.question_id', ondelete='CASCADE'), nullable=False)
+    user_answer = Column(String(1), nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+    response_time = Column(Integer)
+
+    attempt = relationship("QuizAttempt", back_populates="responses")
+
+    # migrations/0001_hot_path_indexes.sql
+    __table_args__ = (
+        Index('idx_qr_attempt_question', 'attempt_id', 'question_id', 'is_correct'),
+        Index('idx_qr_question_correct', 'question_id', 'is_correct'),
+    )
+
+    def __repr__(self):
+        return f"<QuizResponse(attempt_id={self.attempt_id}, question_id={self.question_id}, correct={self.is_correct})>"
+
+class Reward(Base):
+    __tablename__ = 'rewards'
+
+    reward_id = Column(Integer, primary_key=True, autoincrement=True)
+    reward_name = Column(String(100), nullable=False)
+    reward_description = Column(Text)
+    books_required = Column(Integer, nullable=False)
+    reward_type = Column(String(20), default='physical')
+    is_active = Column(Boolean, default=True)
+
+    def __repr__(self):
+        return f"<Reward(id={self.reward_id}, name={self.reward_name}, books_required={self.books_required})>"
+
+class UserReward(Base):
+    __tablename__ = 'user_rewards'
+
+    user_reward_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    reward_id = Column(Integer, ForeignKey('rewards.reward_id', ondelete='CASCADE'), nullable=False)
+    earned_date = Column(DateTime, server_default=func.now())
+    is_claimed = Column(Boolean, default=False)
+    claimed_date = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_ur_user_reward', 'user_id', 'reward_id'),
+        Index('idx_ur_reward_user', 'reward_id', 'user_id'),
+    )
 
     def __repr__(self):
-        return f"<QuizAttempt(id={self.attempt_id}, user_id={self.user_id}, book_id={self.book_id}, score={self.score_percentage})>"
\ No newline at end of file
+        return f"<UserReward(user_id={self.user_id}, reward_id={self.reward_id})>"
+
+class ReadingProgress(Base):
+    __tablename__ = 'reading_progress'
+
+    progress_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    book_id = Column(Integer, ForeignKey('books.book_id', ondelete='CASCADE'), nullable=False)
+    pages_read = Column(Integer, default=0)
+    reading_status = Column(String(20), default='not_started')  # 'not_started', 'in_progress', 'completed'
+    start_date = Column(DateTime, server_default=func.now())
+    completion_date = Column(DateTime)
+    reading_time_minutes = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_rp_user_book_status', 'user_id', 'book_id', 'reading_status'),
+        Index('idx_rp_book_status', 'book_id', 'reading_status'),
+    )
+
+    def __repr__(self):
+        return f"<ReadingProgress(user_id={self.user_id}, book_id={self.book_id}, status={self.reading_status})>"
+
+class BookBorrowing(Base):
+    __tablename__ = 'book_borrowings'
+
+    borrowing_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    book_id = Column(Integer, ForeignKey('books.book_id', ondelete='CASCADE'), nullable=False)
+    borrowed_date = Column(DateTime, server_default=func.now())
+    expected_return_date = Column(Date)
+    actual_return_date = Column(Date)
+    status = Column(String(20), default='borrowed')  # 'borrowed', 'returned', 'overdue'
+
+    __table_args__ = (
+        Index('idx_bb_user_status', 'user_id', 'status'),
+        Index('idx_bb_book_status', 'book_id', 'status'),
+        Index('idx_bb_status_due', 'status', 'expected_return_date'),
+    )
+
+    def __repr__(self):
+        return f"<BookBorrowing(user_id={self.user_id}, book_id={self.book_id}, status={self.status})>"
+
+class SystemLog(Base):
+    __tablename__ = 'system_logs'
+
+    log_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='SET NULL'))
+    action = Column(String(100), nullable=False)  # e.g. 'book_scanned', 'quiz_updated'
+    description = Column(Text)
+    ip_address = Column(String(45))
+    user_agent = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<SystemLog(user_id={self.user_id}, action={self.action})>"
+
+# Running aggregates for the dashboards (src/services/stats.py, migrations 0002/0003)
+class DashboardStats(Base):
+    __tablename__ = 'dashboard_stats'
+
+    stats_id = Column(Integer, primary_key=True)  # Always 1
+    active_students = Column(Integer, nullable=False, server_default='0')
+    total_users = Column(Integer, nullable=False, server_default='0')  # Every account, any type or status
+    total_books = Column(Integer, nullable=False, server_default='0')
+    total_attempts = Column(Integer, nullable=False, server_default='0')
+    score_sum = Column(Numeric(14, 2, asdecimal=False), nullable=False, server_default='0')
+    passed_pairs = Column(Integer, nullable=False, server_default='0')  # Distinct (student, book) with a pass
+    active_readers = Column(Integer, nullable=False, server_default='0')  # Students with at least one attempt
+    rewards_earned = Column(Integer, nullable=False, server_default='0')
+
+class StudentStats(Base):
+    __tablename__ = 'student_stats'
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    attempts = Column(Integer, nullable=False, server_default='0')
+    score_sum = Column(Numeric(12, 2, asdecimal=False), nullable=False, server_default='0')
+    books_attempted = Column(Integer, nullable=False, server_default='0')
+    books_passed = Column(Integer, nullable=False, server_default='0')
+    rewards_earned = Column(Integer, nullable=False, server_default='0')
+
+class BookStats(Base):
+    __tablename__ = 'book_stats'
+
+    book_id = Column(Integer, primary_key=True, autoincrement=False)
+    attempts = Column(Integer, nullable=False, server_default='0')
+    score_sum = Column(Numeric(12, 2, asdecimal=False), nullable=False, server_default='0')
+    readers = Column(Integer, nullable=False, server_default='0')
+    passed_readers = Column(Integer, nullable=False, server_default='0')
+
+class CompletionPair(Base):
+    """Distinct (student, book) set behind the COUNT(DISTINCT ...) statistics."""
+    __tablename__ = 'completion_pairs'
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    book_id = Column(Integer, primary_key=True, autoincrement=False)
+    attempts = Column(Integer, nullable=False, server_default='0')
+    best_score = Column(Numeric(5, 2, asdecimal=False), nullable=False, server_default='0')
+
+class RewardStats(Base):
+    __tablename__ = 'reward_stats'
+
+    reward_id = Column(Integer, primary_key=True, autoincrement=False)
+    earned = Column(Integer, nullable=False, server_default='0')
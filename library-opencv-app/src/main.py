@@ -1,31 +1,39 @@
 import cv2
-from flask import Flask, render_template, request, redirect, url_for
-from src.auth.login import login_user
-from src.auth.signup import register_user
-from src.ui.dashboard import render_dashboard
+from flask import Flask, render_template, redirect, url_for
+from src.auth.login import login_bp
+from src.auth.signup import signup_bp
+from src.database.database import init_app, init_db
+from src.services import books, stats
+from src.ui.books import books_bp
+from src.ui.dashboard import dashboard_bp
+from src.ui.exports import exports_bp
+from src.ui.quiz import quiz_bp
+from src.ui.scans import scans_bp
 
 app = Flask(__name__)
+app.register_blueprint(login_bp)
+app.register_blueprint(signup_bp)
+app.register_blueprint(dashboard_bp)
+app.register_blueprint(books_bp)
+app.register_blueprint(quiz_bp)
+app.register_blueprint(exports_bp)
+app.register_blueprint(scans_bp)
+init_app(app)
+stats.install()
+books.install()
 
 @app.route('/')
 def home():
     return render_template('base.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@app.route('/login', methods=['GET'])
 def login():
-    if request.method == 'POST':
-        return login_user(request.form)
     return render_template('login.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@app.route('/signup', methods=['GET'])
 def signup():
-    if request.method == 'POST':
-        return register_user(request.form)
     return render_template('signup.html')
 
-@app.route('/dashboard')
-def dashboard():
-    return render_dashboard()
-
 @app.route('/qr/scanner')
 def qr_scanner():
     # Initialize the QR code scanner
@@ -34,7 +42,7 @@ def qr_scanner():
         ret, frame = cap.read()
         if not ret:
             break
-        
+
         # QR code detection logic goes here
 
         cv2.imshow('QR Scanner', frame)
@@ -43,7 +51,9 @@ def qr_scanner():
 
     cap.release()
     cv2.destroyAllWindows()
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('dashboard.dashboard'))
 
 if __name__ == '__main__':
+    init_db()
+    books.book_lookup.warm()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,238 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+try:
+    from pyzbar.pyzbar import decode as zbar_decode, ZBarSymbol
+except ImportError:  # pyzbar or the zbar shared library is missing
+    zbar_decode = None
+
+Detection = namedtuple('Detection', ['data', 'polygon'])
+
+_cv_detector = None
+
+
+def to_gray(frame):
+    """Convert a BGR/BGRA frame to grayscale; gray frames are returned as-is."""
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def decode_gray(gray, offset=(0, 0)):
+    """Decode QR codes in a grayscale image.
+
+    Uses pyzbar when available and falls back to cv2.QRCodeDetector.
+    Polygons are returned in the coordinates of the full frame, shifted by
+    `offset` when `gray` is a crop.
+    """
+    ox, oy = offset
+    detections = []
+
+    if zbar_decode is not None:
+        for obj in zbar_decode(gray, symbols=[ZBarSymbol.QRCODE]):
+            polygon = [(p.x + ox, p.y + oy) for p in obj.polygon]
+            detections.append(Detection(obj.data.decode('utf-8'), polygon))
+        return detections
+
+    global _cv_detector
+    if _cv_detector is None:
+        _cv_detector = cv2.QRCodeDetector()
+    ok, texts, points, _ = _cv_detector.detectAndDecodeMulti(gray)
+    if ok and points is not None:
+        for text, quad in zip(texts, points):
+            if text:
+                polygon = [(int(x) + ox, int(y) + oy) for x, y in quad]
+                detections.append(Detection(text, polygon))
+    if not detections:
+        # The multi detector misses some clean single codes
+        text, points, _ = _cv_detector.detectAndDecode(gray)
+        if text and points is not None:
+            polygon = [(int(x) + ox, int(y) + oy) for x, y in points.reshape(-1, 2)]
+            detections.append(Detection(text, polygon))
+    return detections
+
+
+_local = threading.local()
+
+
+def _thread_detector():
+    # cv2 detectors keep state between calls, so each thread gets its own
+    detector = getattr(_local, 'detector', None)
+    if detector is None:
+        detector = _local.detector = cv2.QRCodeDetector()
+    return detector
+
+
+def warp_to_square(gray, quad, size=200, quiet_zone=20):
+    """Perspective-correct the QR code at `quad` into a square image.
+
+    The code fills `size` x `size` pixels inside a `quiet_zone` border, so
+    tilted, rotated and small codes all reach the decoder upright and at
+    the same scale.
+    """
+    end = quiet_zone + size
+    target = np.float32([[quiet_zone, quiet_zone], [end, quiet_zone], [end, end], [quiet_zone, end]])
+    matrix = cv2.getPerspectiveTransform(np.float32(quad), target)
+    return cv2.warpPerspective(gray, matrix, (end + quiet_zone, end + quiet_zone),
+                               flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+class MultiDecoder:
+    """Decode every QR code in a frame, e.g. all the books on a returns cart.
+
+    Candidates are located with the ArUco-based QR detector (the plain
+    detector on OpenCV builds without it). Each one is warped to a
+    canonical square (see warp_to_square) and decoded on its own, on a
+    thread pool of `workers` threads. OpenCV releases the GIL, so decodes
+    run in parallel.
+
+    Callable like decode_gray, so it plugs into ScannerEngine(decoder=...).
+    """
+
+    def __init__(self, workers=4, size=200, quiet_zone=20):
+        self.workers = workers
+        self.size = size
+        self.quiet_zone = quiet_zone
+        self._pool = None
+        if hasattr(cv2, 'QRCodeDetectorAruco'):
+            self._locator = cv2.QRCodeDetectorAruco()
+        else:
+            self._locator = cv2.QRCodeDetector()
+        self._lock = threading.Lock()
+
+    def candidates(self, gray):
+        """Return the corner quads (4x2 float arrays) of QR codes in `gray`."""
+        with self._lock:
+            ok, points = self._locator.detectMulti(gray)
+        if not ok or points is None:
+            return []
+        quads = []
+        for quad in points.reshape(-1, 4, 2):
+            center = quad.mean(axis=0)
+            # Drop duplicates of a code already found
+            if all(np.abs(center - q.mean(axis=0)).max() > 10 for q in quads):
+                quads.append(quad)
+        return quads
+
+    def __call__(self, gray, offset=(0, 0)):
+        ox, oy = offset
+        quads = self.candidates(gray)
+        if len(quads) > 1 and self.workers > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='qr-decode')
+            texts = list(self._pool.map(lambda quad: self._decode(gray, quad), quads))
+        else:
+            texts = [self._decode(gray, quad) for quad in quads]
+
+        detections, seen = [], set()
+        for text, quad in zip(texts, quads):
+            if text and text not in seen:
+                seen.add(text)
+                detections.append(Detection(text, [(int(x) + ox, int(y) + oy) for x, y in quad]))
+        return detections
+
+    def _decode(self, gray, quad):
+        detector = _thread_detector()
+        # The decoder's sampling grid misses some codes at one scale and not
+        # at another, so a failed decode is retried smaller and larger
+        for size in (self.size, self.size * 3 // 4, self.size * 3 // 2):
+            text, _, _ = detector.detectAndDecode(warp_to_square(gray, quad, size, self.quiet_zone))
+            if text:
+                return text
+        return ''
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def _thumbnail(gray, size):
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+
+class ScannerEngine:
+    """Frame-to-frame QR scanner that avoids full-frame decodes.
+
+    - Each frame is converted to grayscale once.
+    - After a hit, following frames are decoded only inside the last QR
+      polygon's bounding box, dilated by `roi_margin`.
+    - A full-frame rescan happens every `full_scan_interval` frames or as
+      soon as the ROI decode misses.
+    - After a full-frame miss, frames whose downsampled image barely differs
+      from the missed one are skipped without decoding.
+    """
+
+    def __init__(self, full_scan_interval=10, roi_margin=0.5, motion_threshold=3.0,
+                 diff_size=(32, 24), decoder=decode_gray):
+        self.full_scan_interval = full_scan_interval
+        self.roi_margin = roi_margin
+        self.motion_threshold = motion_threshold
+        self.diff_size = diff_size
+        self.decoder = decoder
+        self.reset()
+
+    def reset(self):
+        """Forget the tracked ROI and counters."""
+        self.roi = None
+        self._miss_thumb = None
+        self._since_full = 0
+        self._skips = 0
+        self.stats = {'frames': 0, 'full_scans': 0, 'roi_scans': 0, 'skipped': 0, 'hits': 0}
+
+    def process(self, frame):
+        """Scan one frame and return a list of Detection tuples."""
+        self.stats['frames'] += 1
+        gray = to_gray(frame)
+
+        if self.roi is not None and self._since_full < self.full_scan_interval:
+            self._since_full += 1
+            detections = self._scan_roi(gray)
+            if detections:
+                return self._hit(detections, gray)
+            # ROI miss: the code moved or left; fall through to a full scan
+
+        elif self._miss_thumb is not None and self._skips < self.full_scan_interval:
+            thumb = _thumbnail(gray, self.diff_size)
+            if cv2.absdiff(thumb, self._miss_thumb).mean() < self.motion_threshold:
+                self._skips += 1
+                self.stats['skipped'] += 1
+                return []
+
+        return self._scan_full(gray)
+
+    def _scan_roi(self, gray):
+        self.stats['roi_scans'] += 1
+        x0, y0, x1, y1 = self.roi
+        return self.decoder(gray[y0:y1, x0:x1], offset=(x0, y0))
+
+    def _scan_full(self, gray):
+        self.stats['full_scans'] += 1
+        self._since_full = 0
+        self._skips = 0
+        detections = self.decoder(gray)
+        if detections:
+            self._miss_thumb = None
+            return self._hit(detections, gray)
+        self.roi = None
+        self._miss_thumb = _thumbnail(gray, self.diff_size)
+        return []
+
+    def _hit(self, detections, gray):
+        self.stats['hits'] += 1
+        height, width = gray.shape
+        self.roi = self._dilated_box(detections, width, height)
+        return detections
+
+    def _dilated_box(self, detections, width, height):
+        points = np.array([p for d in detections for p in d.polygon], dtype=np.int32)
+        x, y, w, h = cv2.boundingRect(points)
+        pad = int(max(w, h) * self.roi_margin)
+        return (max(x - pad, 0), max(y - pad, 0),
+                min(x + w + pad, width), min(y + h + pad, height))
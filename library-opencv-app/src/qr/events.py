@@ -0,0 +1,157 @@
+"""Scan events: debounced detections between the scanner and side effects.
+
+A code held in front of the camera is detected on every frame. The
+``Debouncer`` turns that stream into one ``ScanEvent`` per presentation:
+
+- A code is emitted only once it was seen in ``min_votes`` of the last
+  ``window`` frames, so a single blurred misread never fires.
+- After emitting, the code stays silent while it remains in view and for
+  ``cooldown`` seconds after it was last seen.
+
+``EventBatcher`` then hands emitted events to a sink (e.g. a database
+writer) in batches instead of one write per event.
+"""
+import time
+from collections import Counter, deque, namedtuple
+
+from src.qr.engine import ScannerEngine
+from src.qr.scanner import iter_frames
+
+ScanEvent = namedtuple('ScanEvent', ['data', 'polygon', 'frame_index', 'timestamp', 'votes'])
+
+
+class Debouncer:
+    """N-of-M frame agreement plus per-code suppression."""
+
+    def __init__(self, window=5, min_votes=3, cooldown=2.0, clock=time.time):
+        if not 1 <= min_votes <= window:
+            raise ValueError('min_votes must be between 1 and window')
+        self.window = window
+        self.min_votes = min_votes
+        self.cooldown = cooldown
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self._frames = deque(maxlen=self.window)  # set of codes per frame
+        self._votes = Counter()
+        self._last_seen = {}  # emitted code -> timestamp of its latest detection
+        self._emitted = set()  # codes suppressed until they leave for `cooldown`
+        self.stats = {'frames': 0, 'detections': 0, 'events': 0, 'suppressed': 0}
+
+    def update(self, detections, frame_index=None, now=None):
+        """Feed one frame's detections; return the ScanEvents it completes."""
+        now = self.clock() if now is None else now
+        frame_index = self.stats['frames'] if frame_index is None else frame_index
+        self.stats['frames'] += 1
+        self.stats['detections'] += len(detections)
+
+        by_code = {}
+        for detection in detections:
+            by_code.setdefault(detection.data, detection)
+
+        if len(self._frames) == self.window:
+            # Drop codes that left the window, so one-off misreads are not kept forever
+            for code in self._frames[0]:
+                self._votes[code] -= 1
+                if not self._votes[code]:
+                    del self._votes[code]
+        self._frames.append(set(by_code))
+        self._votes.update(by_code.keys())
+
+        # Codes gone for longer than the cooldown may fire again
+        for code in [c for c in self._emitted if c not in by_code and now - self._last_seen[c] > self.cooldown]:
+            self._emitted.discard(code)
+            del self._last_seen[code]
+
+        events = []
+        for code, detection in by_code.items():
+            if code in self._emitted:
+                self._last_seen[code] = now
+                self.stats['suppressed'] += 1
+                continue
+            votes = self._votes[code]
+            if votes >= self.min_votes:
+                self._emitted.add(code)
+                self._last_seen[code] = now
+                events.append(ScanEvent(code, detection.polygon, frame_index, now, votes))
+        self.stats['events'] += len(events)
+        return events
+
+
+class EventBatcher:
+    """Collect events and pass them to `sink(list_of_events)` in batches.
+
+    A batch is flushed when it reaches `max_batch` events or its oldest
+    event is `max_delay` seconds old (checked on every add/poll), and on
+    close().
+    """
+
+    def __init__(self, sink, max_batch=50, max_delay=1.0, clock=time.monotonic):
+        self.sink = sink
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.clock = clock
+        self._pending = []
+        self._oldest = None
+        self.batches = 0
+
+    def add(self, events):
+        if events:
+            if not self._pending:
+                self._oldest = self.clock()
+            self._pending.extend(events)
+        self.poll()
+
+    def poll(self):
+        """Flush if the pending batch is full or old enough."""
+        if self._pending and (len(self._pending) >= self.max_batch
+                              or self.clock() - self._oldest >= self.max_delay):
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._oldest = None
+        self.batches += 1
+        self.sink(batch)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_scan_events(source, engine=None, debouncer=None):
+    """Scan `source` and yield debounced ScanEvents.
+
+    Frames without detections are fed to the debouncer too, so they age
+    the vote window.
+    """
+    engine = engine or ScannerEngine()
+    debouncer = debouncer or Debouncer()
+    for index, frame in enumerate(iter_frames(source)):
+        for event in debouncer.update(engine.process(frame), index):
+            yield event
+
+
+def run_pipeline(source, sink, engine=None, debouncer=None, batcher=None):
+    """Scan `source`, debounce, and deliver events to `sink` in batches.
+
+    Returns the number of events delivered.
+    """
+    batcher = batcher or EventBatcher(sink)
+    count = 0
+    with batcher:
+        engine = engine or ScannerEngine()
+        debouncer = debouncer or Debouncer()
+        for index, frame in enumerate(iter_frames(source)):
+            events = debouncer.update(engine.process(frame), index)
+            count += len(events)
+            batcher.add(events)
+    return count
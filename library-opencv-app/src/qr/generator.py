@@ -1,19 +1,78 @@
+"""QR code rendering for the app.
+
+qr_matrix/to_png_bytes/to_svg_bytes produce the same bytes as qr_render.py
+at the repository root (checked by tests/test_qr_render.py there). The app
+is installed and run on its own from library-opencv-app/, so it cannot
+import that module; change both together.
+"""
+import io
+import os
+
 import cv2
+import numpy as np
 import qrcode
+from PIL import Image
+
+OUTPUT_FORMATS = ('png', 'svg')
 
-def generate_qr_code(data, filename):
-    """Generate a QR code and save it as an image file."""
+
+def qr_matrix(data, border=4):
+    """Encode `data` and return the modules as a boolean array (True = dark)."""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+        border=border,
     )
     qr.add_data(data)
     qr.make(fit=True)
+    return np.array(qr.get_matrix(), dtype=bool)
+
+
+def to_png_bytes(matrix, box_size=10):
+    """Encode a module matrix as a 1-bit PNG at maximum compression."""
+    pixels = np.repeat(np.repeat(~matrix, box_size, axis=0), box_size, axis=1)
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, format='PNG', optimize=True, compress_level=9)
+    return out.getvalue()
+
+
+def to_svg_bytes(matrix, box_size=10):
+    """Encode a module matrix as an SVG with one path of horizontal runs."""
+    size = matrix.shape[0]
+    commands = []
+    for y, row in enumerate(matrix):
+        # Run starts/ends are where the padded row flips between light and dark
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], row, [False])).astype(np.int8)))
+        for start, end in zip(edges[::2], edges[1::2]):
+            commands.append(f'M{start} {y}h{end - start}v1h-{end - start}z')
+    pixels = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(commands)}"/></svg>\n'
+    ).encode('ascii')
+
+
+def generate_qr_code_bytes(data, output_format='png', box_size=10, border=4):
+    """Render a QR code in memory and return the PNG or SVG file contents."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f'Unknown output format {output_format!r}, expected one of {OUTPUT_FORMATS}')
+    matrix = qr_matrix(data, border)
+    if output_format == 'svg':
+        return to_svg_bytes(matrix, box_size)
+    return to_png_bytes(matrix, box_size)
+
+
+def generate_qr_code(data, filename, output_format=None):
+    """Generate a QR code and save it as an image file.
 
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(filename)
+    The format follows the file extension (.svg or PNG) unless given.
+    """
+    if output_format is None:
+        output_format = 'svg' if os.fspath(filename).lower().endswith('.svg') else 'png'
+    with open(filename, 'wb') as f:
+        f.write(generate_qr_code_bytes(data, output_format))
 
 def display_qr_code(filename):
     """Display the generated QR code image using OpenCV."""
@@ -1,10 +1,145 @@
+import os
+import time
+from collections import namedtuple
+
 import cv2
 import numpy as np
-from pyzbar.pyzbar import decode
+from src.qr.engine import MultiDecoder, ScannerEngine
+
+ScanResult = namedtuple('ScanResult', ['data', 'polygon', 'frame_index', 'latency_ms'])
+
+VIDEO_EXTENSIONS = ('.avi', '.mp4', '.mov', '.mkv', '.webm', '.mjpeg', '.mjpg')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def iter_frames(source):
+    """Yield BGR frames from an image path, video path, directory of
+    images (e.g. a frame sequence recorded with camera_replay.py, in name
+    order), camera index, numpy array or any iterable of frames."""
+    if isinstance(source, np.ndarray):
+        yield source
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    image = cv2.imread(os.path.join(path, name))
+                    if image is not None:
+                        yield image
+            return
+        if not os.path.isfile(path):
+            return
+        if not path.lower().endswith(VIDEO_EXTENSIONS):
+            image = cv2.imread(path)
+            if image is not None:
+                yield image
+                return
+        source = cv2.VideoCapture(path)
+
+    elif isinstance(source, int):
+        source = cv2.VideoCapture(source)
+
+    if isinstance(source, cv2.VideoCapture):
+        try:
+            while True:
+                ret, frame = source.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            source.release()
+        return
+
+    for frame in source:
+        yield frame
+
+
+def iter_scan(source, engine=None):
+    """Scan every frame of `source` and yield a ScanResult per detection.
+
+    Works as a stage in a generator pipeline, e.g.
+    ``for result in iter_scan(camera_frames()): ...``.
+    """
+    engine = engine or ScannerEngine()
+    for index, frame in enumerate(iter_frames(source)):
+        start = time.perf_counter()
+        detections = engine.process(frame)
+        latency_ms = (time.perf_counter() - start) * 1000
+        for detection in detections:
+            yield ScanResult(detection.data, detection.polygon, index, latency_ms)
+
+
+def iter_book_scans(source, lookup=None, engine=None):
+    """Like iter_scan, but yield (ScanResult, book card or None) pairs.
+
+    Books come from the cached lookup service (src/services/books.py), so a
+    code held in front of the camera costs one database query at most.
+    """
+    if lookup is None:
+        from src.services.books import book_lookup as lookup
+    for result in iter_scan(source, engine):
+        yield result, lookup.lookup(result.data)
 
-def scan_qr_code():
+
+def scan(source, engine=None, first_only=False):
+    """Scan `source` without a display and return a list of ScanResults."""
+    results = []
+    for result in iter_scan(source, engine):
+        results.append(result)
+        if first_only:
+            break
+    return results
+
+
+def multi_engine(workers=4):
+    """ScannerEngine that reads every code in each frame (see MultiDecoder).
+
+    Every frame is a full scan: with several books in view, tracking one
+    ROI would hide books that enter elsewhere.
+    """
+    return ScannerEngine(full_scan_interval=0, decoder=MultiDecoder(workers))
+
+
+def scan_all_qr_codes(source, engine=None):
+    """Return the data of every distinct QR code in `source`, in order of
+    first sighting, e.g. all the books on a cart in one camera pass."""
+    own_engine = engine is None
+    engine = engine or multi_engine()
+    try:
+        codes = {}
+        for result in iter_scan(source, engine):
+            codes.setdefault(result.data, None)
+        return list(codes)
+    finally:
+        if own_engine:
+            engine.decoder.close()
+
+
+def scan_qr_code(source=None):
+    """Return the data of the first QR code in `source`, or None.
+
+    Without a source, opens the default camera in an interactive window.
+    """
+    if source is None:
+        return scan_qr_code_interactive()
+    if isinstance(source, str) and not source:
+        return None
+    results = scan(source, first_only=True)
+    return results[0].data if results else None
+
+
+def scan_qr_code_interactive(camera_index=0, multi=False):
     # Initialize the video capture
-    cap = cv2.VideoCapture(0)
+    from src.qr.events import Debouncer
+
+    cap = cv2.VideoCapture(camera_index)
+    # multi=True reads every book in view, not just the first
+    engine = multi_engine() if multi else ScannerEngine()
+    # Report each presented code once, not once per frame
+    debouncer = Debouncer()
+    last_data = None
 
     while True:
         # Capture frame-by-frame
@@ -12,8 +147,8 @@ def scan_qr_code():
         if not ret:
             break
 
-        # Decode the QR codes in the frame
-        decoded_objects = decode(frame)
+        # Decode the QR codes in the frame (ROI-tracked, see ScannerEngine)
+        decoded_objects = engine.process(frame)
 
         for obj in decoded_objects:
             # Draw a rectangle around the detected QR code
@@ -21,12 +156,9 @@ def scan_qr_code():
             if len(points) == 4:  # Ensure it's a quadrilateral
                 cv2.polylines(frame, [np.array(points)], isClosed=True, color=(0, 255, 0), thickness=2)
 
-            # Get the QR code data
-            qr_data = obj.data.decode('utf-8')
-            print(f'Detected QR Code: {qr_data}')
-
-            # Optionally, you can break the loop after detecting a QR code
-            break
+        for event in debouncer.update(decoded_objects):
+            print(f'Detected QR Code: {event.data}')
+            last_data = event.data
 
         # Display the resulting frame
         cv2.imshow('QR Code Scanner', frame)
@@ -37,4 +169,7 @@ def scan_qr_code():
 
     # Release the capture and close windows
     cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    cv2.destroyAllWindows()
+    if multi:
+        engine.decoder.close()
+    return last_data
@@ -0,0 +1,365 @@
+"""Columnar reading analytics over quiz_attempts, quiz_responses and reading_progress.
+
+``ReadingAnalytics.refresh()`` copies the rows into NumPy column arrays.
+Quiz attempts and responses are read incrementally, only past the
+``(attempt_date, attempt_id)`` watermark of the previous refresh, in
+streamed chunks. ``save()``/``load()`` keep the columns in an ``.npz``
+file, so a term-end report only reads what changed since the last run
+and never scans the production tables. Each report is a vectorized
+group-by over the arrays.
+
+Attempts inserted later with an older ``attempt_date`` (back-filled data)
+are only picked up by ``refresh(full=True)``. Students, books and
+reading_progress rows are small and change in place, so they are reloaded
+on every refresh.
+
+Usage (from library-opencv-app/):
+    python -m src.services.analytics [--store analytics.npz] [--full] [--by grade|class|book]
+"""
+import argparse
+import os
+
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+
+from src.database import database
+from src.database.models import Book, QuizAttempt, QuizResponse, ReadingProgress, User
+
+PASS_MARK = 70
+SCORE_BINS = (0, 20, 40, 60, 80, 100.01)
+CHUNK_SIZE = 10000
+NO_TIME = -1  # time_taken was not recorded
+
+ATTEMPT_COLUMNS = (
+    ('attempt_id', QuizAttempt.attempt_id, np.int64),
+    ('user_id', QuizAttempt.user_id, np.int32),
+    ('book_id', QuizAttempt.book_id, np.int32),
+    ('score', QuizAttempt.score_percentage, np.float32),
+    ('time_taken', func.coalesce(QuizAttempt.time_taken, NO_TIME), np.int32),
+    ('attempt_date', QuizAttempt.attempt_date, 'datetime64[s]'),
+)
+RESPONSE_COLUMNS = (
+    ('attempt_id', QuizResponse.attempt_id, np.int64),
+    ('question_id', QuizResponse.question_id, np.int32),
+    ('is_correct', QuizResponse.is_correct, np.bool_),
+)
+PROGRESS_COLUMNS = (
+    ('user_id', ReadingProgress.user_id, np.int32),
+    ('book_id', ReadingProgress.book_id, np.int32),
+    ('completed', ReadingProgress.reading_status == 'completed', np.bool_),
+    ('start_date', ReadingProgress.start_date, 'datetime64[s]'),
+    ('completion_date', ReadingProgress.completion_date, 'datetime64[s]'),
+)
+STUDENT_COLUMNS = (
+    ('user_id', User.user_id, np.int32),
+    ('grade_level', func.coalesce(User.grade_level, 0), np.int16),
+    ('class_section', func.coalesce(User.class_section, ''), 'U10'),
+)
+BOOK_COLUMNS = (
+    ('book_id', Book.book_id, np.int32),
+    ('title', Book.title, 'U200'),
+)
+
+
+def _empty(columns):
+    return {name: np.empty(0, dtype=dtype) for name, _, dtype in columns}
+
+
+def fetch_columns(connection, columns, where=None, order_by=None, join=None, chunk_size=CHUNK_SIZE):
+    """Stream a SELECT of `columns` into {name: ndarray}, `chunk_size` rows at a time."""
+    statement = select(*(expression for _, expression, _ in columns))
+    if join is not None:
+        statement = statement.select_from(join)
+    if where is not None:
+        statement = statement.where(where)
+    if order_by is not None:
+        statement = statement.order_by(*order_by)
+
+    chunks = {name: [] for name, _, _ in columns}
+    result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(statement)
+    while True:
+        rows = result.fetchmany(chunk_size)
+        if not rows:
+            break
+        for index, (name, _, dtype) in enumerate(columns):
+            values = [row[index] for row in rows]
+            if str(dtype).startswith('datetime64'):
+                values = [value if value is not None else 'NaT' for value in values]
+            chunks[name].append(np.array(values, dtype=dtype))
+    return {name: np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+            for (name, _, dtype), parts in zip(columns, chunks.values())}
+
+
+def _up_to(watermark):
+    """Attempts at or before an (attempt_date, attempt_id) watermark."""
+    date, attempt_id = watermark
+    return or_(QuizAttempt.attempt_date < date,
+               and_(QuizAttempt.attempt_date == date, QuizAttempt.attempt_id <= attempt_id))
+
+
+def group_index(keys):
+    """Return (sorted unique keys, inverse index) for a key array."""
+    return np.unique(keys, return_inverse=True)
+
+
+def group_quantiles(inverse, values, groups, q):
+    """Linear-interpolated quantiles `q` (0..1) of `values` within each group, vectorized."""
+    order = np.lexsort((values, inverse))
+    ordered = values[order].astype(np.float64)
+    counts = np.bincount(inverse, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((groups, len(q)), np.nan)
+    present = counts > 0
+    for column, quantile in enumerate(q):
+        position = starts + quantile * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts + counts - 1)
+        fraction = position - low
+        low, high = low[present], high[present]
+        result[present, column] = ordered[low] * (1 - fraction[present]) + ordered[high] * fraction[present]
+    return result
+
+
+class ReadingAnalytics:
+    """In-memory column store with vectorized reports."""
+
+    def __init__(self):
+        self.attempts = _empty(ATTEMPT_COLUMNS)
+        self.responses = _empty(RESPONSE_COLUMNS)
+        self.progress = _empty(PROGRESS_COLUMNS)
+        self.students = _empty(STUDENT_COLUMNS)
+        self.books = _empty(BOOK_COLUMNS)
+        self.watermark = None  # (attempt_date, attempt_id) of the newest attempt loaded
+
+    # -- loading -------------------------------------------------------------
+
+    def refresh(self, engine=None, full=False, chunk_size=CHUNK_SIZE):
+        """Load attempts/responses past the watermark and reload the small tables.
+
+        Returns the number of new attempts.
+        """
+        engine = engine or database.get_engine()
+        if full:
+            self.attempts, self.responses, self.watermark = _empty(ATTEMPT_COLUMNS), _empty(RESPONSE_COLUMNS), None
+
+        newer = None if self.watermark is None else ~_up_to(self.watermark)
+
+        with engine.connect() as connection:
+            attempts = fetch_columns(connection, ATTEMPT_COLUMNS, newer,
+                                     (QuizAttempt.attempt_date, QuizAttempt.attempt_id), chunk_size=chunk_size)
+            responses = _empty(RESPONSE_COLUMNS)
+            if len(attempts['attempt_id']):
+                # Only responses of the attempts just read, not of ones committed since
+                loaded = _up_to((attempts['attempt_date'][-1].item(), int(attempts['attempt_id'][-1])))
+                responses = fetch_columns(connection, RESPONSE_COLUMNS,
+                                          loaded if newer is None else and_(newer, loaded),
+                                          (QuizResponse.attempt_id,),
+                                          join=QuizResponse.__table__.join(QuizAttempt.__table__),
+                                          chunk_size=chunk_size)
+            self.progress = fetch_columns(connection, PROGRESS_COLUMNS, chunk_size=chunk_size)
+            self.students = fetch_columns(connection, STUDENT_COLUMNS, User.user_type == 'student',
+                                          chunk_size=chunk_size)
+            self.books = fetch_columns(connection, BOOK_COLUMNS, chunk_size=chunk_size)
+
+        added = len(attempts['attempt_id'])
+        if added:
+            self.attempts = {name: np.concatenate((self.attempts[name], attempts[name])) for name in attempts}
+            self.responses = {name: np.concatenate((self.responses[name], responses[name])) for name in responses}
+            self.watermark = (attempts['attempt_date'][-1].item(), int(attempts['attempt_id'][-1]))
+        return added
+
+    def save(self, path):
+        arrays = {}
+        for prefix, table in (('attempts', self.attempts), ('responses', self.responses),
+                              ('progress', self.progress), ('students', self.students), ('books', self.books)):
+            arrays.update({f'{prefix}.{name}': values for name, values in table.items()})
+        if self.watermark is not None:
+            arrays['watermark.date'] = np.array(self.watermark[0], dtype='datetime64[s]')
+            arrays['watermark.attempt_id'] = np.array(self.watermark[1], dtype=np.int64)
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with np.load(path) as data:
+            for key in data.files:
+                prefix, name = key.split('.', 1)
+                if prefix != 'watermark':
+                    getattr(store, prefix)[name] = data[key]
+            if 'watermark.date' in data.files:
+                store.watermark = (data['watermark.date'].item(), int(data['watermark.attempt_id']))
+        return store
+
+    # -- grouping ------------------------------------------------------------
+
+    def _student_lookup(self, column, fill):
+        """Dense user_id -> student attribute array for fancy indexing."""
+        user_ids = self.students['user_id']
+        size = max(int(user_ids.max()) if len(user_ids) else 0,
+                   int(self.attempts['user_id'].max()) if len(self.attempts['user_id']) else 0) + 1
+        lookup = np.full(size, fill, dtype=self.students[column].dtype)
+        lookup[user_ids] = self.students[column]
+        return lookup
+
+    def attempt_keys(self, by):
+        """Group key per attempt: None, 'grade', 'class', 'book' or 'user'."""
+        user_ids = self.attempts['user_id']
+        if by is None:
+            return np.zeros(len(user_ids), dtype=np.int8)
+        if by == 'grade':
+            return self._student_lookup('grade_level', 0)[user_ids]
+        if by == 'class':
+            return self._student_lookup('class_section', '')[user_ids]
+        if by == 'book':
+            return self.attempts['book_id']
+        if by == 'user':
+            return user_ids
+        raise ValueError(f'unknown grouping {by!r}')
+
+    def _labels(self, by, keys):
+        """Readable labels for the group keys of attempt_keys(by)."""
+        if by is None:
+            return ['all']
+        if by == 'book':
+            titles = dict(zip(self.books['book_id'].tolist(), self.books['title'].tolist()))
+            return [titles.get(key, f'Book {key}') for key in keys.tolist()]
+        return keys.tolist()
+
+    # -- reports -------------------------------------------------------------
+
+    def score_summary(self, by=None):
+        """{group: {'attempts', 'students', 'mean_score', 'pass_rate'}}."""
+        keys, inverse = group_index(self.attempt_keys(by))
+        scores = self.attempts['score'].astype(np.float64)
+        counts = np.bincount(inverse, minlength=len(keys))
+        sums = np.bincount(inverse, weights=scores, minlength=len(keys))
+        passed = np.bincount(inverse, weights=scores >= PASS_MARK, minlength=len(keys))
+        user_ids = self.attempts['user_id'].astype(np.int64)
+        pairs = np.unique(inverse * (int(user_ids.max(initial=0)) + 1) + user_ids)
+        students = np.bincount(pairs // (int(user_ids.max(initial=0)) + 1), minlength=len(keys))
+        return {label: {'attempts': int(counts[i]), 'students': int(students[i]),
+                        'mean_score': round(float(sums[i] / counts[i]), 1),
+                        'pass_rate': round(float(passed[i] / counts[i]), 3)}
+                for i, label in enumerate(self._labels(by, keys))}
+
+    def score_distribution(self, by=None, bins=SCORE_BINS):
+        """{group: [attempt count per score bin]} for `bins` edges."""
+        keys, inverse = group_index(self.attempt_keys(by))
+        edges = np.asarray(bins, dtype=np.float64)
+        bucket = np.clip(np.searchsorted(edges, self.attempts['score'], side='right') - 1, 0, len(edges) - 2)
+        counts = np.bincount(inverse * (len(edges) - 1) + bucket, minlength=len(keys) * (len(edges) - 1))
+        counts = counts.reshape(len(keys), len(edges) - 1)
+        return {label: counts[i].tolist() for i, label in enumerate(self._labels(by, keys))}
+
+    def time_taken_percentiles(self, by='book', percentiles=(25, 50, 90)):
+        """{group: {percentile: seconds}} over attempts that recorded time_taken."""
+        timed = self.attempts['time_taken'] != NO_TIME
+        keys, inverse = group_index(self.attempt_keys(by)[timed])
+        values = self.attempts['time_taken'][timed]
+        quantiles = group_quantiles(inverse, values, len(keys), [p / 100 for p in percentiles])
+        return {label: {p: round(float(v), 1) for p, v in zip(percentiles, quantiles[i])}
+                for i, label in enumerate(self._labels(by, keys))}
+
+    def question_difficulty(self, min_responses=1):
+        """Classical item difficulty: {question_id: {'responses', 'p_value'}}, hardest first.
+
+        p_value is the share of correct responses (low = hard).
+        """
+        keys, inverse = group_index(self.responses['question_id'])
+        counts = np.bincount(inverse, minlength=len(keys))
+        correct = np.bincount(inverse, weights=self.responses['is_correct'], minlength=len(keys))
+        keep = counts >= min_responses
+        p_values = np.divide(correct, counts, out=np.zeros(len(keys)), where=counts > 0)
+        order = np.argsort(p_values[keep], kind='stable')
+        return {int(keys[keep][i]): {'responses': int(counts[keep][i]), 'p_value': round(float(p_values[keep][i]), 3)}
+                for i in order}
+
+    def trend(self, by='grade', period='M'):
+        """Mean score per group per period ('D', 'W' or 'M'): {group: [(period, mean, attempts)]}."""
+        keys, inverse = group_index(self.attempt_keys(by))
+        dates = self.attempts['attempt_date']
+        if period == 'W':
+            # numpy weeks start on Thursday (the epoch); shift so they start on Monday
+            periods = (dates.astype('datetime64[D]') + 3).astype('datetime64[W]').astype('datetime64[D]') - 3
+        else:
+            periods = dates.astype(f'datetime64[{period}]')
+        period_keys, period_inverse = group_index(periods)
+        cell = inverse * len(period_keys) + period_inverse
+        size = len(keys) * len(period_keys)
+        counts = np.bincount(cell, minlength=size).reshape(len(keys), -1)
+        sums = np.bincount(cell, weights=self.attempts['score'].astype(np.float64), minlength=size)
+        sums = sums.reshape(len(keys), -1)
+        period_labels = [str(period) for period in period_keys]
+        return {label: [(period_labels[j], round(float(sums[i, j] / counts[i, j]), 1), int(counts[i, j]))
+                        for j in np.flatnonzero(counts[i])]
+                for i, label in enumerate(self._labels(by, keys))}
+
+    def reading_streaks(self, today=None):
+        """Consecutive days with reading activity (quiz attempts, started or
+        completed books) per student: {user_id: {'longest', 'current'}}."""
+        users = np.concatenate((self.attempts['user_id'], self.progress['user_id'], self.progress['user_id']))
+        dates = np.concatenate((self.attempts['attempt_date'], self.progress['start_date'],
+                                self.progress['completion_date'])).astype('datetime64[D]')
+        known = ~np.isnat(dates)
+        if not known.any():
+            return {}
+        days = dates[known].astype(np.int64)
+        activity = np.unique((users[known].astype(np.int64) << 32) | (days - days.min()))
+        user = activity >> 32
+        day = (activity & 0xFFFFFFFF) + days.min()
+
+        new_run = np.ones(len(activity), dtype=bool)
+        new_run[1:] = (user[1:] != user[:-1]) | (day[1:] - day[:-1] != 1)
+        run_starts = np.flatnonzero(new_run)
+        run_lengths = np.diff(np.append(run_starts, len(activity)))
+        run_users = user[run_starts]
+        run_last_day = day[np.append(run_starts[1:], len(activity)) - 1]
+
+        user_starts = np.flatnonzero(np.r_[True, run_users[1:] != run_users[:-1]])
+        longest = np.maximum.reduceat(run_lengths, user_starts)
+        last_run = np.append(user_starts[1:], len(run_users)) - 1
+        today = np.datetime64(today or 'today', 'D').astype(np.int64)
+        last_day = run_last_day[last_run]
+        current = np.where((last_day >= today - 1) & (last_day <= today), run_lengths[last_run], 0)
+        return {int(u): {'longest': int(l), 'current': int(c)}
+                for u, l, c in zip(run_users[user_starts], longest, current)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reading analytics report')
+    parser.add_argument('--uri', help='Database URI (default: settings.DATABASE_URI)')
+    parser.add_argument('--store', default='analytics.npz', help='Column store file, refreshed incrementally')
+    parser.add_argument('--full', action='store_true', help='Reload everything instead of past the watermark')
+    parser.add_argument('--by', default='grade', choices=('grade', 'class', 'book', 'user'))
+    args = parser.parse_args()
+
+    engine = database.configure(args.uri) if args.uri else database.get_engine()
+    analytics = ReadingAnalytics.load(args.store) if os.path.exists(args.store) else ReadingAnalytics()
+    added = analytics.refresh(engine, full=args.full)
+    analytics.save(args.store)
+    print(f'{added} new attempts, {len(analytics.attempts["attempt_id"])} in {args.store}\n')
+
+    print(f'Scores by {args.by}:')
+    distributions = analytics.score_distribution(args.by)
+    for group, summary in analytics.score_summary(args.by).items():
+        print(f'  {str(group):30s} {summary["attempts"]:7d} attempts  mean {summary["mean_score"]:5.1f}  '
+              f'pass {summary["pass_rate"]:.0%}  bins {distributions[group]}')
+
+    print('\nTime taken (s), p25/p50/p90:')
+    for group, values in analytics.time_taken_percentiles(args.by).items():
+        print(f'  {str(group):30s} ' + ' / '.join(f'{v:.0f}' for v in values.values()))
+
+    print('\nHardest questions (p-value):')
+    for question_id, item in list(analytics.question_difficulty(min_responses=5).items())[:10]:
+        print(f'  question {question_id:6d}  p={item["p_value"]:.2f}  n={item["responses"]}')
+
+    streaks = analytics.reading_streaks()
+    if streaks:
+        best = max(streaks.items(), key=lambda item: item[1]['longest'])
+        print(f'\nLongest reading streak: {best[1]["longest"]} days (student {best[0]})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""QR code -> book lookups for the scan path, cached in-process.
+
+``lookup(qr_code)`` answers from a bounded LRU cache whose entries expire
+after ``BOOK_CACHE_TTL`` seconds. Unknown codes are cached too, for the
+shorter ``BOOK_CACHE_NEGATIVE_TTL``, so a kiosk holding up a foreign QR
+code does not hit the database on every frame. ``warm()`` fills the cache
+with one bulk query at startup.
+
+ORM writes to ``books`` invalidate the affected codes when the transaction
+commits. Writes from the PHP site are not seen here; the TTL bounds how
+long such a change can stay stale.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from src.config.settings import BOOK_CACHE_NEGATIVE_TTL, BOOK_CACHE_SIZE, BOOK_CACHE_TTL
+from src.database import database
+from src.database.models import Book
+
+_MISSING = object()
+
+# Columns returned by php/get-book-by-qr.php
+CARD_COLUMNS = (Book.book_id, Book.qr_code, Book.title, Book.author, Book.genre,
+                Book.recommended_grade_level, Book.description)
+
+
+def book_card(row):
+    """Shape a book row like the JSON of php/get-book-by-qr.php."""
+    return {
+        'bookId': row.book_id,
+        'qrCode': row.qr_code,
+        'title': row.title,
+        'author': row.author,
+        'genre': row.genre or 'General',
+        'gradeLevel': row.recommended_grade_level or 'All Grades',
+        'description': row.description or 'No description available',
+    }
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class BookLookup:
+    """Cached ``qr_code`` -> book card lookups for available books."""
+
+    def __init__(self, maxsize=BOOK_CACHE_SIZE, ttl=BOOK_CACHE_TTL, negative_ttl=BOOK_CACHE_NEGATIVE_TTL,
+                 clock=time.monotonic):
+        self.cache = TTLCache(maxsize, ttl, clock)
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+        self.queries = 0
+
+    def _query(self):
+        return select(*CARD_COLUMNS).where(Book.is_available.is_(True))
+
+    def lookup(self, qr_code, session=None):
+        """Return the book card for `qr_code`, or None if no available book has it."""
+        card = self.cache.get(qr_code, _MISSING)
+        if card is not _MISSING:
+            if card is None:
+                self.negative_hits += 1
+            return card
+
+        session = session or database.db_session
+        self.queries += 1
+        row = session.execute(self._query().where(Book.qr_code == qr_code).limit(1)).first()
+        if row is None:
+            self.cache.set(qr_code, None, ttl=self.negative_ttl)
+            return None
+        card = book_card(row)
+        self.cache.set(qr_code, card)
+        return card
+
+    def warm(self, session=None):
+        """Load up to `maxsize` available books with one query; returns the count."""
+        session = session or database.db_session
+        self.queries += 1
+        rows = session.execute(self._query().order_by(Book.book_id.desc()).limit(self.cache.maxsize))
+        count = 0
+        for row in rows:
+            self.cache.set(row.qr_code, book_card(row))
+            count += 1
+        return count
+
+    def invalidate(self, *qr_codes):
+        """Forget the given codes, or everything when called without arguments."""
+        if not qr_codes:
+            self.cache.clear()
+        for qr_code in qr_codes:
+            self.cache.discard(qr_code)
+
+    def stats(self):
+        return dict(self.cache.stats(), negative_hits=self.negative_hits, queries=self.queries)
+
+
+book_lookup = BookLookup()
+
+_PENDING_KEY = 'book_lookup_invalidate'
+
+
+def _collect_changed_codes(session, flush_context):
+    codes = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Book):
+            codes.add(obj.qr_code)
+            # A changed qr_code must also drop the entry under the old code
+            codes.update(code for code in inspect(obj).attrs.qr_code.history.deleted if code)
+
+
+def _invalidate_after_commit(session):
+    codes = session.info.pop(_PENDING_KEY, None)
+    if codes:
+        book_lookup.invalidate(*codes)
+
+
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def install():
+    """Invalidate cached books when ORM transactions change them (idempotent)."""
+    for name, listener in (('after_flush', _collect_changed_codes),
+                           ('after_commit', _invalidate_after_commit),
+                           ('after_rollback', _discard_pending)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
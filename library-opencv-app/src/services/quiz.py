@@ -0,0 +1,334 @@
+"""Quiz submissions: validate in one query, write in one transaction.
+
+The Python counterpart of php/save-quiz-result.php. A submission is
+checked with a single SELECT that also returns the student's running
+counters (``student_stats``/``completion_pairs`` from the stats service)
+and earned rewards. The attempt, its ``quiz_responses`` (one multi-row
+INSERT) and any new rewards are then written in one transaction; the
+counters are updated by the stats hook in the same flush.
+
+``QuizResultWriter`` funnels submissions from many request threads into a
+single background writer that commits them in groups, so a whole class
+submitting at once needs one connection instead of forty.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.database import database
+from src.database.models import (Book, CompletionPair, QuizAttempt, QuizQuestion, QuizResponse, Reward,
+                                 StudentStats, User, UserReward)
+from src.services import stats
+
+PASS_MARK = stats.PASS_MARK
+ANSWERS = ('A', 'B', 'C', 'D')
+REQUIRED_FIELDS = ('user_id', 'book_id', 'total_questions', 'correct_answers', 'score_percentage')
+REWARDS_TTL = 60  # Seconds the active rewards list is reused between submissions
+
+# The running counters read by validate() are kept by the stats hook
+stats.install()
+
+
+class QuizSubmissionError(ValueError):
+    """A submission that is invalid and must not be retried."""
+
+
+_rewards_cache = {'expires_at': 0.0, 'rewards': ()}
+_rewards_lock = threading.Lock()
+
+
+def active_rewards(session):
+    """(reward_id, reward_name, books_required) of active rewards, cached for REWARDS_TTL."""
+    with _rewards_lock:
+        if _rewards_cache['expires_at'] > time.monotonic():
+            return _rewards_cache['rewards']
+    rows = session.execute(select(Reward.reward_id, Reward.reward_name, Reward.books_required)
+                           .where(Reward.is_active.is_(True)).order_by(Reward.books_required)).all()
+    with _rewards_lock:
+        _rewards_cache['rewards'] = tuple(tuple(row) for row in rows)
+        _rewards_cache['expires_at'] = time.monotonic() + REWARDS_TTL
+    return _rewards_cache['rewards']
+
+
+def clear_rewards_cache():
+    with _rewards_lock:
+        _rewards_cache['expires_at'] = 0.0
+
+
+def parse_submission(data):
+    """Normalise a save-quiz-result.php style payload; raises QuizSubmissionError.
+
+    With a ``responses`` list ([{question_id, user_answer, response_time}])
+    the score is recomputed from the answers after validation.
+    """
+    if not isinstance(data, dict):
+        raise QuizSubmissionError('Invalid quiz data')
+    responses = data.get('responses') or []
+    if not responses:
+        for field in REQUIRED_FIELDS:
+            if data.get(field) is None:
+                raise QuizSubmissionError(f'Missing required field: {field}')
+    try:
+        submission = {
+            'user_id': int(data['user_id']),
+            'book_id': int(data['book_id']),
+            'total_questions': int(data.get('total_questions') or len(responses)),
+            'correct_answers': int(data.get('correct_answers') or 0),
+            'score_percentage': float(data.get('score_percentage') or 0),
+            'time_taken': int(data.get('time_taken') or 0),
+            'responses': [{'question_id': int(r['question_id']),
+                           'user_answer': str(r['user_answer']).upper(),
+                           'response_time': int(r['response_time']) if r.get('response_time') is not None
+                           else None}
+                          for r in responses],
+        }
+    except (KeyError, TypeError, ValueError):
+        raise QuizSubmissionError('Invalid quiz data values')
+
+    if submission['responses']:
+        question_ids = [r['question_id'] for r in submission['responses']]
+        if len(set(question_ids)) != len(question_ids):
+            raise QuizSubmissionError('Duplicate question in responses')
+        if any(r['user_answer'] not in ANSWERS for r in submission['responses']):
+            raise QuizSubmissionError('Invalid answer')
+        submission['total_questions'] = len(question_ids)
+    elif (submission['total_questions'] <= 0 or submission['correct_answers'] < 0
+          or submission['correct_answers'] > submission['total_questions']):
+        raise QuizSubmissionError('Invalid quiz data values')
+    return submission
+
+
+def _context_query(submission):
+    """One SELECT: user, book, running counters, earned rewards and answer key."""
+    user_rewards = (select(func.group_concat(UserReward.reward_id))
+                    .where(UserReward.user_id == User.user_id).scalar_subquery())
+    question_ids = [r['question_id'] for r in submission['responses']]
+    return (
+        select(User.full_name, Book.title,
+               StudentStats.attempts, StudentStats.score_sum, StudentStats.books_attempted,
+               CompletionPair.attempts.label('previous_attempts'),
+               user_rewards.label('reward_ids'),
+               QuizQuestion.question_id, QuizQuestion.correct_answer)
+        .select_from(User)
+        .join(Book, Book.book_id == submission['book_id'])
+        .outerjoin(StudentStats, StudentStats.user_id == User.user_id)
+        .outerjoin(CompletionPair, and_(CompletionPair.user_id == User.user_id,
+                                        CompletionPair.book_id == Book.book_id))
+        .outerjoin(QuizQuestion, and_(QuizQuestion.book_id == Book.book_id,
+                                      QuizQuestion.question_id.in_(question_ids)))
+        .where(User.user_id == submission['user_id'], User.status == 'active')
+    )
+
+
+def validate(session, submission):
+    """Check the submission against the database in one round-trip.
+
+    Returns the context used by write(); grades ``responses`` in place.
+    """
+    rows = session.execute(_context_query(submission)).all()
+    if not rows:
+        exists = session.execute(select(User.user_id).where(User.user_id == submission['user_id'],
+                                                            User.status == 'active')).first()
+        raise QuizSubmissionError('Invalid book ID' if exists else 'Invalid user account. Please login again.')
+
+    first = rows[0]
+    if submission['responses']:
+        answer_key = {row.question_id: row.correct_answer for row in rows if row.question_id is not None}
+        correct = 0
+        for response in submission['responses']:
+            if response['question_id'] not in answer_key:
+                raise QuizSubmissionError('Question does not belong to this book')
+            response['is_correct'] = response['user_answer'] == answer_key[response['question_id']]
+            correct += response['is_correct']
+        submission['correct_answers'] = correct
+        submission['score_percentage'] = round(correct / len(submission['responses']) * 100, 2)
+
+    return {
+        'user_name': first.full_name,
+        'book_title': first.title,
+        'attempts': first.attempts or 0,
+        'score_sum': first.score_sum or 0.0,
+        'books_attempted': first.books_attempted or 0,
+        'is_reattempt': bool(first.previous_attempts),
+        'reward_ids': {int(r) for r in str(first.reward_ids).split(',')} if first.reward_ids else set(),
+    }
+
+
+def write(session, submission, context):
+    """Insert the attempt, its responses and new rewards; returns the result dict."""
+    attempt = QuizAttempt(user_id=submission['user_id'], book_id=submission['book_id'],
+                          total_questions=submission['total_questions'],
+                          correct_answers=submission['correct_answers'],
+                          score_percentage=submission['score_percentage'],
+                          time_taken=submission['time_taken'])
+    session.add(attempt)
+
+    # PHP semantics: any attempted book counts towards rewards
+    books_completed = context['books_attempted'] + (0 if context['is_reattempt'] else 1)
+    earned = [(reward_id, name) for reward_id, name, required in active_rewards(session)
+              if books_completed >= required]
+    new_rewards = []
+    for reward_id, name in earned:
+        if reward_id not in context['reward_ids']:
+            session.add(UserReward(user_id=submission['user_id'], reward_id=reward_id))
+            new_rewards.append(name)
+    session.flush()
+
+    if submission['responses']:
+        session.execute(insert(QuizResponse), [
+            dict(response, attempt_id=attempt.attempt_id) for response in submission['responses']])
+
+    attempts = context['attempts'] + 1
+    score_sum = context['score_sum'] + submission['score_percentage']
+    return {
+        'attempt_id': attempt.attempt_id,
+        'books_completed': books_completed,
+        'average_score': round(score_sum / attempts, 1),
+        'rewards_earned': len(context['reward_ids']) + len(new_rewards),
+        'new_rewards': new_rewards,
+        'all_rewards': [name for _, name in earned],
+        'user_name': context['user_name'],
+        'book_title': context['book_title'],
+        'score_percentage': submission['score_percentage'],
+        'passed': submission['score_percentage'] >= PASS_MARK,
+        'is_reattempt': context['is_reattempt'],
+    }
+
+
+def submit(data, session=None, retries=3):
+    """Validate and save one submission in its own transaction."""
+    submission = parse_submission(data)
+    for attempt in range(retries):
+        own_session = session is None
+        current = database.SessionLocal() if own_session else session
+        try:
+            result = write(current, submission, validate(current, submission))
+            current.commit()
+            return result
+        except (IntegrityError, OperationalError):
+            # Concurrent first attempts on the same counters, or a locked SQLite file
+            current.rollback()
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.01 * (attempt + 1))
+        except Exception:
+            current.rollback()
+            raise
+        finally:
+            if own_session:
+                current.close()
+
+
+class QuizResultWriter:
+    """Background writer that commits queued submissions in groups.
+
+    submit() returns a Future with the result dict, or the
+    QuizSubmissionError for an invalid submission. Up to `max_batch`
+    submissions that arrive within `max_wait` seconds share a transaction;
+    if that commit fails, they are retried one by one.
+
+    A submission whose Future is cancelled before the writer takes it is
+    never written; once taken, the Future is running and cancel() fails.
+    """
+
+    def __init__(self, max_batch=20, max_wait=0.005):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {'submissions': 0, 'transactions': 0, 'fallbacks': 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='quiz-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, data):
+        future = Future()
+        try:
+            submission = parse_submission(data)
+        except QuizSubmissionError as exc:
+            future.set_exception(exc)
+            return future
+        self.start()
+        self._queue.put((submission, future))
+        return future
+
+    def close(self, timeout=None):
+        """Finish the queued submissions and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Drop submissions the caller gave up on; the rest can no longer be cancelled
+            batch = [(submission, future) for submission, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._write_batch(batch)
+            except Exception:
+                self.stats['fallbacks'] += 1
+                for submission, future in batch:
+                    if future.done():
+                        continue
+                    try:
+                        future.set_result(submit(submission))
+                    except Exception as exc:
+                        future.set_exception(exc)
+
+    def _write_batch(self, batch):
+        session = database.SessionLocal()
+        try:
+            results = []
+            for submission, future in batch:
+                try:
+                    context = validate(session, submission)
+                except QuizSubmissionError as exc:
+                    future.set_exception(exc)
+                    continue
+                results.append((future, write(session, submission, context)))
+                session.flush()  # Later submissions in the batch see the updated counters
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        self.stats['transactions'] += 1
+        self.stats['submissions'] += len(results)
+        for future, result in results:
+            future.set_result(result)
+
+
+quiz_writer = QuizResultWriter()
@@ -0,0 +1,285 @@
+"""Scan journal: record scans locally first, write them to the database later.
+
+Kiosks and cameras append (timestamp, camera, qr_code, user_id) records to
+a local SQLite file in WAL mode. An append is one small local transaction
+and never waits for the library database, so scanning runs at full speed
+whatever state the database is in.
+
+``JournalFlusher`` moves the records into the database in bulk from a
+background thread:
+
+- one ``book_scanned`` row per scan in ``system_logs`` (one multi-row INSERT),
+- an ``in_progress`` row in ``reading_progress`` the first time a student
+  scans a book.
+
+If the database is slow or unreachable, the flusher backs off and the
+journal keeps growing on disk. Once the database is back, the backlog is
+drained in back-to-back batches of ``SCAN_JOURNAL_BATCH`` records.
+
+Records are delivered at least once: a crash between the database commit
+and the journal update replays that batch. reading_progress is not
+affected, but the batch's system_logs rows are written twice. A record
+that cannot be written at all (e.g. a timestamp out of range) is moved to
+the journal's ``quarantine`` table instead of blocking the ones after it.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import insert, select, tuple_
+
+from src.config import settings
+from src.database import database
+from src.database.models import Book, ReadingProgress, SystemLog, User
+
+SCAN_ACTION = 'book_scanned'
+
+ScanRecord = namedtuple('ScanRecord', ['seq', 'scanned_at', 'camera', 'qr_code', 'user_id'])
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS scans ('
+    'seq INTEGER PRIMARY KEY AUTOINCREMENT, scanned_at REAL NOT NULL, '
+    'camera TEXT, qr_code TEXT NOT NULL, user_id INTEGER)',
+    'CREATE TABLE IF NOT EXISTS quarantine ('
+    'seq INTEGER PRIMARY KEY, scanned_at REAL, camera TEXT, qr_code TEXT, user_id INTEGER, reason TEXT)',
+)
+
+EARLIEST_SCAN = 946684800.0  # 2000-01-01; earlier timestamps are bogus (or in milliseconds if larger)
+FUTURE_SLACK = 86400.0  # Seconds a kiosk clock may run ahead
+
+
+def valid_timestamp(value, now=None):
+    """True for a finite Unix timestamp in seconds between 2000 and tomorrow."""
+    now = time.time() if now is None else now
+    return isinstance(value, (int, float)) and math.isfinite(value) and EARLIEST_SCAN <= value <= now + FUTURE_SLACK
+
+
+class ScanJournal:
+    """Local append-only scan log (thread-safe).
+
+    Records stay in the file until the flusher has committed them to the
+    database (mark_flushed). The file is opened on first use.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.SCAN_JOURNAL_PATH
+        self._conn = None
+        self._lock = threading.Lock()
+        self.appended = 0
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Survives an app crash; a power cut may lose the last few scans
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def append(self, qr_code, camera=None, user_id=None, scanned_at=None):
+        return self.append_many([(qr_code, camera, user_id, scanned_at)])
+
+    def append_many(self, scans):
+        """Append (qr_code, camera, user_id, scanned_at) tuples in one transaction.
+
+        scanned_at is a Unix timestamp and defaults to now. Returns the
+        number of records appended.
+        """
+        now = time.time()
+        rows = [(now if scanned_at is None else scanned_at, camera, qr_code, user_id)
+                for qr_code, camera, user_id, scanned_at in scans]
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany('INSERT INTO scans (scanned_at, camera, qr_code, user_id) VALUES (?, ?, ?, ?)',
+                                 rows)
+            self.appended += len(rows)
+        return len(rows)
+
+    def sink(self, camera=None, user_id=None):
+        """An EventBatcher sink (src/qr/events.py) that journals ScanEvents."""
+        def journal_events(events):
+            self.append_many((event.data, camera, user_id, event.timestamp) for event in events)
+        return journal_events
+
+    def pending(self, limit):
+        """The oldest `limit` records not yet flushed, as ScanRecords."""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT seq, scanned_at, camera, qr_code, user_id FROM scans ORDER BY seq LIMIT ?',
+                (limit,)).fetchall()
+        return [ScanRecord(*row) for row in rows]
+
+    def mark_flushed(self, seq, rejected=()):
+        """Drop the records up to and including `seq`.
+
+        `rejected` holds (ScanRecord, reason) pairs among them that were not
+        written; they are kept in the quarantine table for inspection.
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO quarantine VALUES (?, ?, ?, ?, ?, ?)',
+                                 [tuple(record) + (reason,) for record, reason in rejected])
+                conn.execute('DELETE FROM scans WHERE seq <= ?', (seq,))
+
+    def quarantined(self):
+        """Number of records that could not be written to the database."""
+        with self._lock:
+            return self._connection().execute('SELECT COUNT(*) FROM quarantine').fetchone()[0]
+
+    def backlog(self):
+        """Number of records waiting to be flushed."""
+        with self._lock:
+            return self._connection().execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def write_batch(session, records):
+    """Write ScanRecords to system_logs and reading_progress; the caller commits.
+
+    Unknown users are logged without a user_id and unknown codes without a
+    book. Records with an unusable timestamp are skipped, so one bad
+    record cannot block the journal.
+    Returns (log rows, new reading_progress rows, [(skipped record, reason)]).
+    """
+    rejected = []
+    usable = []
+    for record in records:
+        if valid_timestamp(record.scanned_at):
+            usable.append(record)
+        else:
+            rejected.append((record, f'invalid timestamp {record.scanned_at!r}'))
+    records = usable
+    if not records:
+        return 0, 0, rejected
+
+    codes = {record.qr_code for record in records}
+    books = dict(session.execute(select(Book.qr_code, Book.book_id).where(Book.qr_code.in_(codes))).all())
+    user_ids = {record.user_id for record in records if record.user_id is not None}
+    users = set(session.scalars(select(User.user_id).where(User.user_id.in_(user_ids)))) if user_ids else set()
+
+    logs = []
+    first_scans = {}  # (user_id, book_id) -> first scan time in the batch
+    for record in records:
+        user_id = record.user_id if record.user_id in users else None
+        book_id = books.get(record.qr_code)
+        description = f'Scanned QR {record.qr_code}' + (f' on {record.camera}' if record.camera else '')
+        if book_id is None:
+            description += ' (unknown book)'
+        logs.append({'user_id': user_id, 'action': SCAN_ACTION, 'description': description,
+                     'created_at': datetime.fromtimestamp(record.scanned_at)})
+        if user_id is not None and book_id is not None:
+            first_scans.setdefault((user_id, book_id), record.scanned_at)
+    session.execute(insert(SystemLog), logs)
+
+    progress = []
+    if first_scans:
+        existing = set(session.execute(
+            select(ReadingProgress.user_id, ReadingProgress.book_id)
+            .where(tuple_(ReadingProgress.user_id, ReadingProgress.book_id).in_(list(first_scans)))).all())
+        progress = [{'user_id': user_id, 'book_id': book_id, 'reading_status': 'in_progress',
+                     'start_date': datetime.fromtimestamp(scanned_at)}
+                    for (user_id, book_id), scanned_at in first_scans.items() if (user_id, book_id) not in existing]
+        if progress:
+            session.execute(insert(ReadingProgress), progress)
+    return len(logs), len(progress), rejected
+
+
+class JournalFlusher:
+    """Background thread that moves journal records into the database.
+
+    Every `interval` seconds, pending records are written in transactions
+    of `batch_size`, back to back until the journal is empty. A database
+    error doubles the pause (up to `max_backoff`); the records stay in the
+    journal and are retried. Records write_batch rejects are quarantined.
+    """
+
+    def __init__(self, journal, batch_size=None, interval=None, max_backoff=None):
+        self.journal = journal
+        self.batch_size = batch_size or settings.SCAN_JOURNAL_BATCH
+        self.interval = interval or settings.SCAN_JOURNAL_INTERVAL
+        self.max_backoff = max_backoff or settings.SCAN_JOURNAL_MAX_BACKOFF
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {'flushed': 0, 'batches': 0, 'progress_rows': 0, 'quarantined': 0, 'failures': 0,
+                      'last_error': None}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='scan-journal', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the thread after one last attempt to drain the journal."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    def flush_once(self):
+        """Write one batch; returns the number of records flushed."""
+        records = self.journal.pending(self.batch_size)
+        if not records:
+            return 0
+        session = database.SessionLocal()
+        try:
+            logs, progress, rejected = write_batch(session, records)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        self.journal.mark_flushed(records[-1].seq, rejected)
+        self.stats['quarantined'] += len(rejected)
+        self.stats['batches'] += 1
+        self.stats['flushed'] += logs
+        self.stats['progress_rows'] += progress
+        return len(records)
+
+    def drain(self):
+        """Flush until the journal is empty; returns the number of records flushed."""
+        total = 0
+        while True:
+            count = self.flush_once()
+            total += count
+            if count < self.batch_size:
+                return total
+
+    def _run(self):
+        delay = self.interval
+        while True:
+            stopping = self._stop.wait(delay)
+            try:
+                self.drain()
+                delay = self.interval
+            except Exception as exc:
+                # Database errors are retried; anything else too, but the thread must not die
+                self.stats['failures'] += 1
+                self.stats['last_error'] = str(exc).splitlines()[0]
+                delay = min(delay * 2, self.max_backoff)
+            if stopping:
+                return
+
+
+scan_journal = ScanJournal()
+journal_flusher = JournalFlusher(scan_journal)
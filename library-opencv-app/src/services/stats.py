@@ -0,0 +1,311 @@
+"""Incrementally maintained dashboard statistics.
+
+Every quiz attempt, reward, user or book written through the ORM updates
+the running aggregates in ``dashboard_stats``, ``student_stats``,
+``book_stats``, ``reward_stats`` and the distinct ``completion_pairs``
+set in the same transaction (an ``after_flush`` hook). On MySQL, the
+triggers from ``migrations/0003_dashboard_stats_triggers.mysql.sql`` do
+the same for the PHP site's writes, and the hook stands down so nothing
+is counted twice.
+
+Deletes of quiz attempts and Core-level writes (``bulk_insert``, raw SQL
+without the triggers) are not tracked incrementally; ``rebuild``
+recomputes everything from the source tables and ``check`` reports drift.
+
+Usage (from library-opencv-app/):
+    python -m src.services.stats [--rebuild | --check]
+"""
+import argparse
+
+from sqlalchemy import event, func, insert, inspect, select, text, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.database import database
+from src.database.models import (Book, BookStats, CompletionPair, DashboardStats, QuizAttempt,
+                                 RewardStats, StudentStats, User, UserReward)
+
+PASS_MARK = 70
+DASHBOARD_ID = 1
+TRIGGER_NAME = 'trg_quiz_attempts_stats'
+
+_trigger_cache = {}
+
+
+def _db_maintains_stats(connection):
+    """True when MySQL triggers already keep the stats tables current."""
+    if connection.dialect.name != 'mysql':
+        return False
+    key = str(connection.engine.url)
+    if key not in _trigger_cache:
+        _trigger_cache[key] = bool(connection.execute(text(
+            'SELECT COUNT(*) FROM information_schema.TRIGGERS '
+            'WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = :name'), {'name': TRIGGER_NAME}).scalar())
+    return _trigger_cache[key]
+
+
+def _upsert(connection, table, row, updates):
+    """INSERT row, or SET updates on the row with the same primary key, in one statement.
+
+    ``updates`` maps column names to SQL expressions over the stored row, so
+    concurrent writers never overwrite each other's values.
+    """
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        upsert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = upsert(table).values(**row).on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key.columns], set_=updates)
+    elif dialect in ('mysql', 'mariadb'):
+        statement = mysql.insert(table).values(**row).on_duplicate_key_update(**updates)
+    else:
+        where = [column == row[column.name] for column in table.primary_key.columns]
+        if connection.execute(update(table).where(*where).values(**updates)).rowcount == 0:
+            connection.execute(insert(table).values(**row))
+        return
+    connection.execute(statement)
+
+
+def _bump(connection, model, key, **deltas):
+    """Add deltas to the row at key, inserting the row if missing."""
+    table = model.__table__
+    _upsert(connection, table, dict(key, **deltas),
+            {name: table.c[name] + delta for name, delta in deltas.items()})
+
+
+def _greatest(connection, *values):
+    # SQLite's two-argument MAX() is its GREATEST()
+    return (func.max if connection.dialect.name == 'sqlite' else func.greatest)(*values)
+
+
+def _bump_dashboard(connection, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        _bump(connection, DashboardStats, {'stats_id': DASHBOARD_ID}, **deltas)
+
+
+def record_attempt(connection, user_id, book_id, score):
+    """Fold one new quiz attempt into every aggregate."""
+    pairs = CompletionPair.__table__
+    where = (pairs.c.user_id == user_id, pairs.c.book_id == book_id)
+    # Counting the attempt first locks the pair's row until commit, so the best
+    # score read next cannot change under a concurrent attempt at the same book
+    _upsert(connection, pairs, {'user_id': user_id, 'book_id': book_id, 'attempts': 1, 'best_score': score},
+            {'attempts': pairs.c.attempts + 1})
+    attempts, previous_best = connection.execute(select(pairs.c.attempts, pairs.c.best_score).where(*where)).one()
+    new_pair = attempts == 1
+    new_pass = score >= PASS_MARK and (new_pair or previous_best < PASS_MARK)
+    if not new_pair and score > previous_best:
+        connection.execute(update(pairs).where(*where)
+                           .values(best_score=_greatest(connection, pairs.c.best_score, score)))
+
+    students = StudentStats.__table__
+    _bump(connection, StudentStats, {'user_id': user_id}, attempts=1, score_sum=score,
+          books_attempted=int(new_pair), books_passed=int(new_pass))
+    first_attempt = connection.execute(
+        select(students.c.attempts).where(students.c.user_id == user_id)).scalar() == 1
+    _bump(connection, BookStats, {'book_id': book_id}, attempts=1, score_sum=score,
+          readers=int(new_pair), passed_readers=int(new_pass))
+    _bump_dashboard(connection, total_attempts=1, score_sum=score, passed_pairs=int(new_pass),
+                    active_readers=int(first_attempt))
+
+
+def record_reward(connection, user_id, reward_id, delta=1):
+    _bump(connection, RewardStats, {'reward_id': reward_id}, earned=delta)
+    _bump(connection, StudentStats, {'user_id': user_id}, rewards_earned=delta)
+    _bump_dashboard(connection, rewards_earned=delta)
+
+
+def _is_active_student(user_type, status):
+    return user_type == 'student' and (status or 'active') == 'active'
+
+
+def _old_value(state, name):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.obj(), name)
+
+
+def _after_flush(session, flush_context):
+    connection = session.connection()
+    if _db_maintains_stats(connection):
+        return
+
+    for obj in session.new:
+        if isinstance(obj, QuizAttempt):
+            record_attempt(connection, obj.user_id, obj.book_id, float(obj.score_percentage))
+        elif isinstance(obj, UserReward):
+            record_reward(connection, obj.user_id, obj.reward_id)
+        elif isinstance(obj, User):
+            _bump_dashboard(connection, total_users=1,
+                            active_students=int(_is_active_student(obj.user_type, obj.status)))
+        elif isinstance(obj, Book):
+            _bump_dashboard(connection, total_books=1)
+
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj):
+            state = inspect(obj)
+            was = _is_active_student(_old_value(state, 'user_type'), _old_value(state, 'status'))
+            now = _is_active_student(obj.user_type, obj.status)
+            _bump_dashboard(connection, active_students=int(now) - int(was))
+
+    for obj in session.deleted:
+        if isinstance(obj, UserReward):
+            record_reward(connection, obj.user_id, obj.reward_id, delta=-1)
+        elif isinstance(obj, User):
+            _bump_dashboard(connection, total_users=-1,
+                            active_students=-int(_is_active_student(obj.user_type, obj.status)))
+        elif isinstance(obj, Book):
+            _bump_dashboard(connection, total_books=-1)
+
+
+def install():
+    """Maintain the aggregates on every ORM flush (idempotent)."""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+def _empty_student(user_id):
+    return {'user_id': user_id, 'attempts': 0, 'score_sum': 0.0, 'books_attempted': 0,
+            'books_passed': 0, 'rewards_earned': 0}
+
+
+def snapshot(connection):
+    """Compute every aggregate from scratch from the source tables.
+
+    Returns {model: {primary key: row dict}}.
+    """
+    qa = QuizAttempt.__table__
+    pairs = {}
+    students = {}
+    books = {}
+    for user_id, book_id, count, total, best in connection.execute(
+            select(qa.c.user_id, qa.c.book_id, func.count(), func.sum(qa.c.score_percentage),
+                   func.max(qa.c.score_percentage)).group_by(qa.c.user_id, qa.c.book_id)):
+        total, best = float(total), float(best)
+        pair_passed = best >= PASS_MARK
+        pairs[(user_id, book_id)] = {'user_id': user_id, 'book_id': book_id, 'attempts': count,
+                                     'best_score': best}
+        student = students.setdefault(user_id, _empty_student(user_id))
+        student['attempts'] += count
+        student['score_sum'] += total
+        student['books_attempted'] += 1
+        student['books_passed'] += int(pair_passed)
+        book = books.setdefault(book_id, {'book_id': book_id, 'attempts': 0, 'score_sum': 0.0,
+                                          'readers': 0, 'passed_readers': 0})
+        book['attempts'] += count
+        book['score_sum'] += total
+        book['readers'] += 1
+        book['passed_readers'] += int(pair_passed)
+
+    ur = UserReward.__table__
+    rewards = {}
+    for reward_id, count in connection.execute(select(ur.c.reward_id, func.count()).group_by(ur.c.reward_id)):
+        rewards[reward_id] = {'reward_id': reward_id, 'earned': count}
+    for user_id, count in connection.execute(select(ur.c.user_id, func.count()).group_by(ur.c.user_id)):
+        students.setdefault(user_id, _empty_student(user_id))['rewards_earned'] = count
+
+    users = User.__table__
+    dashboard = {
+        'stats_id': DASHBOARD_ID,
+        'active_students': connection.execute(
+            select(func.count()).select_from(users).where(
+                users.c.user_type == 'student', func.coalesce(users.c.status, 'active') == 'active')).scalar(),
+        'total_users': connection.execute(select(func.count()).select_from(users)).scalar(),
+        'total_books': connection.execute(select(func.count()).select_from(Book.__table__)).scalar(),
+        'total_attempts': sum(s['attempts'] for s in students.values()),
+        'score_sum': sum(s['score_sum'] for s in students.values()),
+        'passed_pairs': sum(1 for pair in pairs.values() if pair['best_score'] >= PASS_MARK),
+        'active_readers': sum(1 for s in students.values() if s['attempts']),
+        'rewards_earned': sum(r['earned'] for r in rewards.values()),
+    }
+    return {
+        DashboardStats: {DASHBOARD_ID: dashboard},
+        StudentStats: students,
+        BookStats: books,
+        CompletionPair: pairs,
+        RewardStats: rewards,
+    }
+
+
+def rebuild(connection):
+    """Replace every aggregate with a fresh snapshot; returns row counts."""
+    counts = {}
+    for model, rows in snapshot(connection).items():
+        connection.execute(model.__table__.delete())
+        if rows:
+            connection.execute(insert(model.__table__), list(rows.values()))
+        counts[model.__tablename__] = len(rows)
+    return counts
+
+
+def check(connection):
+    """Compare the stored aggregates with a fresh snapshot.
+
+    Returns a list of (table, key, stored row, expected row) mismatches.
+    """
+    mismatches = []
+    for model, expected in snapshot(connection).items():
+        table = model.__table__
+        key_columns = [column.name for column in table.primary_key.columns]
+        stored = {}
+        for row in connection.execute(select(table)).mappings():
+            key = tuple(row[name] for name in key_columns)
+            stored[key[0] if len(key) == 1 else key] = dict(row)
+        for key in set(stored) | set(expected):
+            have, want = stored.get(key), expected.get(key)
+            if have is None or want is None or any(
+                    abs(float(have[name] or 0) - float(value or 0)) > 0.005 for name, value in want.items()):
+                mismatches.append((table.name, key, have, want))
+    return mismatches
+
+
+def dashboard_stats(session=None):
+    """Read the precomputed dashboard row (rebuilding it once if missing)."""
+    session = session or database.db_session
+    row = session.get(DashboardStats, DASHBOARD_ID)
+    if row is None:
+        rebuild(session.connection())
+        session.commit()
+        row = session.get(DashboardStats, DASHBOARD_ID)
+    return {
+        'active_students': row.active_students,
+        'total_users': row.total_users,
+        'total_books': row.total_books,
+        'total_quizzes': row.total_attempts,
+        'average_score': round(row.score_sum / row.total_attempts, 1) if row.total_attempts else 0,
+        'books_read': row.passed_pairs,
+        'active_readers': row.active_readers,
+        'rewards_earned': row.rewards_earned,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dashboard statistics maintenance')
+    parser.add_argument('--uri', help='Database URI (default: settings.DATABASE_URI)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--rebuild', action='store_true', help='Recompute all aggregates from scratch')
+    group.add_argument('--check', action='store_true', help='Report aggregates that drifted')
+    args = parser.parse_args()
+
+    engine = database.configure(args.uri) if args.uri else database.get_engine()
+    database.init_db()
+    if args.rebuild:
+        with engine.begin() as connection:
+            for table, count in rebuild(connection).items():
+                print(f'{table:18s} {count} rows')
+    elif args.check:
+        with engine.connect() as connection:
+            mismatches = check(connection)
+        for table, key, have, want in mismatches[:50]:
+            print(f'{table} {key}: stored {have} expected {want}')
+        print(f'{len(mismatches)} mismatched rows')
+        raise SystemExit(1 if mismatches else 0)
+    else:
+        with database.session_scope() as session:
+            for name, value in dashboard_stats(session).items():
+                print(f'{name:16s} {value}')
+
+
+if __name__ == '__main__':
+    main()
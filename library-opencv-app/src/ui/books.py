@@ -0,0 +1,17 @@
+from flask import Blueprint
+from src.services.books import book_lookup
+from src.utils.responses import json_response
+
+books_bp = Blueprint('books', __name__)
+
+@books_bp.route('/books/qr/<path:qr_code>', methods=['GET'])
+def book_by_qr(qr_code):
+    # Same book card as php/get-book-by-qr.php, answered from the lookup cache
+    book = book_lookup.lookup(qr_code)
+    if book is None:
+        return json_response(False, 'Book not found in database', code=404)
+    return json_response(True, 'Book found', book)
+
+@books_bp.route('/books/cache', methods=['GET'])
+def book_cache_stats():
+    return json_response(True, 'Book lookup cache statistics', book_lookup.stats())
\ No newline at end of file
@@ -1,13 +1,12 @@
 from flask import Blueprint, render_template
-from src.database.models import User, Book
+from src.services.stats import dashboard_stats
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 @dashboard_bp.route('/dashboard')
 def dashboard():
-    # Fetch statistics for the dashboard
-    total_users = User.query.count()
-    total_books = Book.query.count()
-    # Add more statistics as needed
+    # Precomputed running aggregates (src/services/stats.py), not table scans
+    stats = dashboard_stats()
 
-    return render_template('dashboard.html', total_users=total_users, total_books=total_books)
\ No newline at end of file
+    return render_template('dashboard.html', total_users=stats['total_users'], total_books=stats['total_books'],
+                           stats=stats)
\ No newline at end of file
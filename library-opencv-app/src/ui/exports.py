@@ -0,0 +1,195 @@
+"""Streaming CSV/JSON exports of quiz attempts, responses, reading progress and rewards.
+
+GET /exports/<dataset>.<csv|json>?start=YYYY-MM-DD&end=YYYY-MM-DD&grade=N&class_section=X&gzip=1
+
+Rows are read through a server-side cursor (``yield_per``) and written to
+a chunked HTTP response one partition at a time, optionally gzip
+compressed on the fly, so memory stays flat however many rows a school
+year produces. ``end`` is inclusive. JSON is a single array, with one row
+object per line. gzip=1 downloads a .gz file; otherwise the response is
+gzip-encoded in transit when the client sends Accept-Encoding: gzip.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, Response, request, stream_with_context
+from sqlalchemy import select
+
+from src.database import database
+from src.database.models import (Book, QuizAttempt, QuizResponse, ReadingProgress, Reward, User,
+                                 UserReward)
+from src.utils.responses import json_response
+
+exports_bp = Blueprint('exports', __name__)
+
+YIELD_PER = 1000  # Rows fetched from the cursor and written per chunk
+
+
+def _attempts():
+    statement = (select(QuizAttempt.attempt_id, QuizAttempt.user_id, User.full_name, User.grade_level,
+                        User.class_section, QuizAttempt.book_id, Book.title, QuizAttempt.total_questions,
+                        QuizAttempt.correct_answers, QuizAttempt.score_percentage, QuizAttempt.time_taken,
+                        QuizAttempt.attempt_date)
+                 .join(User, User.user_id == QuizAttempt.user_id)
+                 .join(Book, Book.book_id == QuizAttempt.book_id)
+                 .order_by(QuizAttempt.attempt_id))
+    return statement, QuizAttempt.attempt_date
+
+
+def _responses():
+    statement = (select(QuizResponse.response_id, QuizResponse.attempt_id, QuizAttempt.user_id, User.grade_level,
+                        User.class_section, QuizAttempt.book_id, QuizResponse.question_id, QuizResponse.user_answer,
+                        QuizResponse.is_correct, QuizResponse.response_time, QuizAttempt.attempt_date)
+                 .join(QuizAttempt, QuizAttempt.attempt_id == QuizResponse.attempt_id)
+                 .join(User, User.user_id == QuizAttempt.user_id)
+                 .order_by(QuizResponse.response_id))
+    return statement, QuizAttempt.attempt_date
+
+
+def _progress():
+    statement = (select(ReadingProgress.progress_id, ReadingProgress.user_id, User.full_name, User.grade_level,
+                        User.class_section, ReadingProgress.book_id, Book.title, ReadingProgress.pages_read,
+                        ReadingProgress.reading_status, ReadingProgress.start_date, ReadingProgress.completion_date,
+                        ReadingProgress.reading_time_minutes)
+                 .join(User, User.user_id == ReadingProgress.user_id)
+                 .join(Book, Book.book_id == ReadingProgress.book_id)
+                 .order_by(ReadingProgress.progress_id))
+    return statement, ReadingProgress.start_date
+
+
+def _rewards():
+    statement = (select(UserReward.user_reward_id, UserReward.user_id, User.full_name, User.grade_level,
+                        User.class_section, UserReward.reward_id, Reward.reward_name, UserReward.earned_date,
+                        UserReward.is_claimed, UserReward.claimed_date)
+                 .join(User, User.user_id == UserReward.user_id)
+                 .join(Reward, Reward.reward_id == UserReward.reward_id)
+                 .order_by(UserReward.user_reward_id))
+    return statement, UserReward.earned_date
+
+
+DATASETS = {
+    'attempts': _attempts,
+    'responses': _responses,
+    'progress': _progress,
+    'rewards': _rewards,
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ExportError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def build_query(dataset, args):
+    """The SELECT for `dataset` with the date range / grade / class filters applied."""
+    statement, date_column = DATASETS[dataset]()
+    start, end = _parse_date(args, 'start'), _parse_date(args, 'end')
+    if start:
+        statement = statement.where(date_column >= start)
+    if end:
+        # Range instead of DATE(column) so the date index can be used
+        statement = statement.where(date_column < end + timedelta(days=1))
+    if args.get('grade'):
+        try:
+            statement = statement.where(User.grade_level == int(args['grade']))
+        except ValueError:
+            raise ExportError('grade must be a number')
+    if args.get('class_section'):
+        statement = statement.where(User.class_section == args['class_section'])
+    return statement
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_json(columns, partitions):
+    separator = '[\n'
+    for rows in partitions:
+        parts = []
+        for row in rows:
+            parts.append(separator + json.dumps({name: _json_value(value) for name, value in zip(columns, row)}))
+            separator = ',\n'
+        yield ''.join(parts)
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of text chunks into gzip members on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(statement, output_format, compress=False, engine=None, yield_per=YIELD_PER):
+    """Yield the encoded export of `statement` chunk by chunk.
+
+    Uses its own connection, held only while the response streams.
+    """
+    engine = engine or database.get_engine()
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=yield_per).execute(statement)
+        columns = list(result.keys())
+        serialize = iter_csv if output_format == 'csv' else iter_json
+        chunks = serialize(columns, result.partitions())
+        if compress:
+            yield from gzip_chunks(chunks)
+        else:
+            for chunk in chunks:
+                if chunk:
+                    yield chunk.encode('utf-8')
+
+
+@exports_bp.route('/exports/<dataset>.<output_format>', methods=['GET'])
+def export(dataset, output_format):
+    if dataset not in DATASETS or output_format not in FORMATS:
+        return json_response(False, f'Unknown export {dataset}.{output_format}', code=404)
+    try:
+        statement = build_query(dataset, request.args)
+    except ExportError as exc:
+        return json_response(False, str(exc))
+
+    # gzip=1 downloads a .gz file; otherwise compress in transit if the client accepts it
+    as_file = request.args.get('gzip') == '1'
+    in_transit = not as_file and 'gzip' in request.accept_encodings
+    filename = f'{dataset}.{output_format}' + ('.gz' if as_file else '')
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    if in_transit:
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    mimetype = 'application/gzip' if as_file else FORMATS[output_format]
+    return Response(stream_with_context(stream_export(statement, output_format, as_file or in_transit)),
+                    mimetype=mimetype, headers=headers)
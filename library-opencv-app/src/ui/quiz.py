@@ -0,0 +1,30 @@
+from concurrent.futures import TimeoutError
+
+from flask import Blueprint, request
+from src.services.quiz import QuizSubmissionError, quiz_writer
+from src.utils.responses import json_response
+
+quiz_bp = Blueprint('quiz', __name__)
+
+SUBMIT_TIMEOUT = 15  # Seconds to wait for the background writer
+
+@quiz_bp.route('/quiz/results', methods=['POST'])
+def save_quiz_result():
+    # Same payload and response data as php/save-quiz-result.php
+    future = quiz_writer.submit(request.get_json(silent=True))
+    try:
+        result = future.result(timeout=SUBMIT_TIMEOUT)
+    except QuizSubmissionError as exc:
+        return json_response(False, str(exc))
+    except TimeoutError:
+        if future.cancel():
+            # Still queued and now withdrawn, so submitting again cannot duplicate it
+            return json_response(False, 'The server is busy, please submit again.', code=503)
+        # Already being written: it will be saved, so the client must not resubmit
+        try:
+            result = future.result(timeout=SUBMIT_TIMEOUT)
+        except QuizSubmissionError as exc:
+            return json_response(False, str(exc))
+        except TimeoutError:
+            return json_response(True, 'Quiz result accepted and will be saved shortly', code=202)
+    return json_response(True, 'Quiz result saved successfully', result)
\ No newline at end of file
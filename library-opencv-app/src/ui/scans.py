@@ -0,0 +1,52 @@
+from flask import Blueprint, request
+from src.services.scan_journal import journal_flusher, scan_journal, valid_timestamp
+from src.utils.responses import json_response
+
+scans_bp = Blueprint('scans', __name__)
+
+MAX_SCANS_PER_REQUEST = 1000
+MAX_USER_ID = 2 ** 31 - 1  # users.user_id is a signed INT
+
+def _parse_scan(scan):
+    # Accepts the field names of php/save-scanned-book.php as well
+    qr_code = scan.get('qr_code') or scan.get('qrCode')
+    if not isinstance(qr_code, str) or not qr_code:
+        raise ValueError('Missing qr_code')
+    camera = scan.get('camera')
+    if camera is not None and not isinstance(camera, str):
+        raise ValueError('Invalid camera')
+    user_id = scan.get('user_id', scan.get('userId'))
+    if user_id is not None:
+        user_id = int(user_id)
+        if not 0 < user_id <= MAX_USER_ID:
+            raise ValueError('Invalid user_id')
+    timestamp = scan.get('timestamp')
+    if timestamp is not None:
+        # Unix seconds; rejects NaN/inf and millisecond values such as Date.now()
+        timestamp = float(timestamp)
+        if not valid_timestamp(timestamp):
+            raise ValueError('Invalid timestamp')
+    return qr_code, camera, user_id, timestamp
+
+@scans_bp.route('/scans', methods=['POST'])
+def record_scans():
+    # One scan, or {"scans": [...]} from a kiosk catching up after being offline
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return json_response(False, 'Invalid scan data')
+    scans = data['scans'] if 'scans' in data else [data]
+    if not isinstance(scans, list) or not scans or len(scans) > MAX_SCANS_PER_REQUEST:
+        return json_response(False, 'Invalid scan data')
+    try:
+        rows = [_parse_scan(scan) for scan in scans]
+    except (AttributeError, OverflowError, TypeError, ValueError):
+        return json_response(False, 'Invalid scan data')
+    count = scan_journal.append_many(rows)
+    journal_flusher.start()
+    return json_response(True, 'Scans recorded', {'recorded': count}, code=202)
+
+@scans_bp.route('/scans/journal', methods=['GET'])
+def journal_stats():
+    return json_response(True, 'Scan journal statistics',
+                         dict(journal_flusher.stats, backlog=scan_journal.backlog(), appended=scan_journal.appended,
+                              quarantined=scan_journal.quarantined()))
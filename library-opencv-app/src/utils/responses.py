@@ -1,3 +1,5 @@
+from flask import jsonify
+
 def success_response(data, message="Success"):
     return {
         "status": "success",
@@ -16,4 +18,12 @@ def not_found_response(message="Resource not found"):
     return error_response(message, code=404)
 
 def unauthorized_response(message="Unauthorized access"):
-    return error_response(message, code=401)
\ No newline at end of file
+    return error_response(message, code=401)
+
+def json_response(success, message, data=None, code=None):
+    """Flask JSON response used by the auth blueprints."""
+    if success:
+        body = success_response(data, message)
+    else:
+        body = error_response(message, code or 400)
+    return jsonify(body), code or (200 if success else 400)
\ No newline at end of file
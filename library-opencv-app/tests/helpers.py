@@ -0,0 +1,51 @@
+"""Fixtures shared by the database-backed tests."""
+import os
+import tempfile
+import unittest
+
+from src.database import database
+from src.database.database import Base, bulk_insert, db_session, init_db
+from src.database.models import Book, User
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def seed_students(count, **columns):
+    """Insert ``count`` students; a callable column value is called with the row index."""
+    return bulk_insert(User, ({'full_name': f'Student {i}', 'email': f's{i}@example.com', 'password_hash': 'x',
+                               'user_type': 'student',
+                               **{name: value(i) if callable(value) else value for name, value in columns.items()}}
+                              for i in range(count)))
+
+
+def seed_books(count, title='Book {}', qr_code='QR{}'):
+    return bulk_insert(Book, ({'title': title.format(i), 'author': 'Author', 'qr_code': qr_code.format(i)}
+                              for i in range(count)))
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """A fresh schema per test: in memory, or in a temporary sqlite file when ``db_file`` is set."""
+    db_file = None
+
+    def setUp(self):
+        if self.db_file:
+            self.tmpdir = tempfile.TemporaryDirectory()
+            self.db_uri = 'sqlite:///' + os.path.join(self.tmpdir.name, self.db_file)
+        else:
+            self.db_uri = 'sqlite://'
+        database.configure(self.db_uri)
+        init_db()
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(database.get_engine())
+        database.get_engine().dispose()
+        if self.db_file:
+            self.tmpdir.cleanup()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.database import database
+from src.database.database import Base, bulk_insert, db_session, init_db
+from src.database.models import Book, QuizAttempt, QuizQuestion, QuizResponse, ReadingProgress, User
+from src.services.analytics import ReadingAnalytics, group_quantiles
+
+START = datetime(2025, 1, 6, 9, 0)  # A Monday
+
+
+def attempt(attempt_id, user_id, book_id, score, day, time_taken=None):
+    return {'attempt_id': attempt_id, 'user_id': user_id, 'book_id': book_id, 'total_questions': 5,
+            'correct_answers': int(score // 20), 'score_percentage': score, 'time_taken': time_taken,
+            'attempt_date': START + timedelta(days=day)}
+
+
+class TestReadingAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        database.configure('sqlite://')
+        init_db()
+        bulk_insert(User, [
+            {'full_name': 'Ana', 'email': 'a@x', 'password_hash': 'x', 'user_type': 'student',
+             'grade_level': 3, 'class_section': 'A'},
+            {'full_name': 'Ben', 'email': 'b@x', 'password_hash': 'x', 'user_type': 'student',
+             'grade_level': 3, 'class_section': 'B'},
+            {'full_name': 'Cy', 'email': 'c@x', 'password_hash': 'x', 'user_type': 'student',
+             'grade_level': 4, 'class_section': 'A'},
+        ])
+        bulk_insert(Book, [{'title': 'Alpha', 'author': 'A', 'qr_code': 'Q1'},
+                           {'title': 'Beta', 'author': 'B', 'qr_code': 'Q2'}])
+        bulk_insert(QuizQuestion, ({'book_id': 1, 'question_text': 'q', 'option_a': 'a', 'option_b': 'b',
+                                    'option_c': 'c', 'option_d': 'd', 'correct_answer': 'A', 'created_by': 1}
+                                   for _ in range(2)))
+        bulk_insert(QuizAttempt, [
+            attempt(1, 1, 1, 100.0, 0, 120),
+            attempt(2, 1, 2, 60.0, 1, 300),
+            attempt(3, 2, 1, 40.0, 1),
+            attempt(4, 3, 1, 80.0, 35, 200),
+        ])
+        bulk_insert(QuizResponse, [
+            {'attempt_id': 1, 'question_id': 1, 'user_answer': 'A', 'is_correct': True},
+            {'attempt_id': 1, 'question_id': 2, 'user_answer': 'A', 'is_correct': True},
+            {'attempt_id': 3, 'question_id': 1, 'user_answer': 'A', 'is_correct': True},
+            {'attempt_id': 3, 'question_id': 2, 'user_answer': 'B', 'is_correct': False},
+        ])
+        bulk_insert(ReadingProgress, [
+            {'user_id': 1, 'book_id': 2, 'reading_status': 'completed', 'start_date': START + timedelta(days=2),
+             'completion_date': START + timedelta(days=3)},
+        ])
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(database.get_engine())
+
+    def test_reports(self):
+        analytics = ReadingAnalytics()
+        self.assertEqual(analytics.refresh(), 4)
+
+        by_grade = analytics.score_summary('grade')
+        self.assertEqual(by_grade[3], {'attempts': 3, 'students': 2, 'mean_score': 66.7, 'pass_rate': 0.333})
+        self.assertEqual(analytics.score_summary('class')['A']['attempts'], 3)
+        self.assertEqual(analytics.score_distribution('book'), {'Alpha': [0, 0, 1, 0, 2], 'Beta': [0, 0, 0, 1, 0]})
+        self.assertEqual(analytics.time_taken_percentiles('book', (50,)), {'Alpha': {50: 160.0}, 'Beta': {50: 300.0}})
+        self.assertEqual(analytics.question_difficulty(), {2: {'responses': 2, 'p_value': 0.5},
+                                                           1: {'responses': 2, 'p_value': 1.0}})
+        self.assertEqual(analytics.trend('grade', 'M')[3], [('2025-01', 66.7, 3)])
+        self.assertEqual(analytics.trend(None, 'W')['all'][0], ('2025-01-06', 66.7, 3))
+        # Ana: quiz on days 0 and 1, started day 2, completed day 3
+        streaks = analytics.reading_streaks(today=(START + timedelta(days=4)).date())
+        self.assertEqual(streaks[1], {'longest': 4, 'current': 4})
+        streaks = analytics.reading_streaks(today=(START + timedelta(days=36)).date())
+        self.assertEqual(streaks[1], {'longest': 4, 'current': 0})
+        self.assertEqual(streaks[3], {'longest': 1, 'current': 1})
+
+    def test_incremental_refresh_and_store(self):
+        analytics = ReadingAnalytics()
+        analytics.refresh()
+        self.assertEqual(analytics.refresh(), 0)
+        bulk_insert(QuizAttempt, [attempt(5, 2, 2, 90.0, 36, 100), attempt(6, 2, 1, 70.0, 36)])
+        bulk_insert(QuizResponse, [{'attempt_id': 6, 'question_id': 2, 'user_answer': 'A', 'is_correct': True}])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'analytics.npz')
+            analytics.save(path)
+            reloaded = ReadingAnalytics.load(path)
+        self.assertEqual(reloaded.watermark, analytics.watermark)
+        self.assertEqual(reloaded.refresh(), 2)
+
+        full = ReadingAnalytics()
+        full.refresh()
+        for name, values in full.attempts.items():
+            np.testing.assert_array_equal(reloaded.attempts[name], values)
+        self.assertEqual(reloaded.question_difficulty(), full.question_difficulty())
+        self.assertEqual(reloaded.score_summary('user'), full.score_summary('user'))
+
+    def test_group_quantiles_match_numpy(self):
+        rng = np.random.default_rng(0)
+        groups = rng.integers(0, 7, 500)
+        values = rng.integers(30, 900, 500)
+        result = group_quantiles(groups, values, 7, [0.1, 0.5, 0.9])
+        for group in range(7):
+            np.testing.assert_allclose(result[group], np.percentile(values[groups == group], [10, 50, 90]))
+
+
+if __name__ == '__main__':
+    unittest.main()
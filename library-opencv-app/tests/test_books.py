@@ -0,0 +1,113 @@
+import unittest
+
+from flask import Flask
+
+from src.database.database import db_session, init_app
+from src.database.models import Book
+from src.qr.scanner import iter_book_scans
+from src.services import books
+from src.services.books import BookLookup, TTLCache
+from src.ui.books import books_bp
+
+from .helpers import DatabaseTestCase, FakeClock, seed_books
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_lru_eviction_and_expiry(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now least recently used
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 11
+        self.assertIsNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['expirations']),
+                         (2, 2, 1, 1))
+
+
+class TestBookLookup(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        books.install()
+        seed_books(50, qr_code='QR{:03d}')
+        self.clock = FakeClock()
+        self.lookup = BookLookup(maxsize=100, ttl=300, negative_ttl=30, clock=self.clock)
+
+    def tearDown(self):
+        books.book_lookup.invalidate()
+        super().tearDown()
+
+    def test_warm_then_hits_without_queries(self):
+        self.assertEqual(self.lookup.warm(), 50)
+        for _ in range(3):
+            card = self.lookup.lookup('QR007')
+        self.assertEqual(card['title'], 'Book 7')
+        self.assertEqual(card['genre'], 'General')
+        stats = self.lookup.stats()
+        self.assertEqual((stats['queries'], stats['hits'], stats['misses']), (1, 3, 0))
+
+    def test_negative_caching(self):
+        self.assertIsNone(self.lookup.lookup('UNKNOWN'))
+        self.assertIsNone(self.lookup.lookup('UNKNOWN'))
+        self.assertEqual((self.lookup.queries, self.lookup.negative_hits), (1, 1))
+        self.clock.now = 31
+        self.assertIsNone(self.lookup.lookup('UNKNOWN'))
+        self.assertEqual(self.lookup.queries, 2)
+
+    def test_orm_changes_invalidate(self):
+        lookup = books.book_lookup
+        self.assertIsNone(lookup.lookup('NEW001'))
+        Book(title='New', author='Author', qr_code='NEW001').save()
+        self.assertEqual(lookup.lookup('NEW001')['title'], 'New')
+
+        book = Book.query.filter_by(qr_code='QR001').one()
+        self.assertEqual(lookup.lookup('QR001')['title'], 'Book 1')
+        book.qr_code = 'QR001-B'
+        book.title = 'Renamed'
+        db_session.commit()
+        self.assertIsNone(lookup.lookup('QR001'))
+        self.assertEqual(lookup.lookup('QR001-B')['title'], 'Renamed')
+
+        book.is_available = False
+        db_session.commit()
+        self.assertIsNone(lookup.lookup('QR001-B'))
+
+    def test_rollback_keeps_cache(self):
+        lookup = books.book_lookup
+        lookup.lookup('QR002')
+        book = Book.query.filter_by(qr_code='QR002').one()
+        book.title = 'Changed'
+        db_session.flush()
+        db_session.rollback()
+        self.assertEqual(lookup.stats()['size'], 1)
+
+    def test_iter_book_scans(self):
+        frames = [object(), object()]
+
+        class Engine:
+            def process(self, frame):
+                from src.qr.engine import Detection
+                return [Detection('QR003', [(0, 0)] * 4)]
+
+        pairs = list(iter_book_scans(frames, self.lookup, Engine()))
+        self.assertEqual([book['title'] for _, book in pairs], ['Book 3', 'Book 3'])
+        self.assertEqual(self.lookup.queries, 1)
+
+    def test_blueprint(self):
+        app = Flask(__name__)
+        app.register_blueprint(books_bp)
+        init_app(app)
+        client = app.test_client()
+        self.assertEqual(client.get('/books/qr/QR004').get_json()['data']['title'], 'Book 4')
+        self.assertEqual(client.get('/books/qr/NOPE').status_code, 404)
+        self.assertEqual(client.get('/books/cache').get_json()['data']['misses'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
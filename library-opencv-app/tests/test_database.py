@@ -0,0 +1,86 @@
+import unittest
+
+from flask import Flask
+
+from src.auth.login import login_bp
+from src.auth.signup import signup_bp
+from src.database import database
+from src.database.database import Base, bulk_insert, db_session, init_app, init_db
+from src.database.migrate import applied_versions, migrate, split_statements
+from src.database.models import Book, QuizAttempt, User
+
+
+class DatabaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        database.configure('sqlite://')
+        init_db()
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(database.get_engine())
+
+
+class TestDatabase(DatabaseTestCase):
+
+    def test_save_and_query_property(self):
+        user = User(full_name='Juan Dela Cruz', email='juan@example.com', user_type='student',
+                    password='password123').save()
+        self.assertIsNotNone(user.id)
+        found = User.query.filter_by(email='juan@example.com').first()
+        self.assertEqual(found.user_id, user.user_id)
+        self.assertTrue(found.verify_password('password123'))
+        self.assertFalse(found.verify_password('wrong'))
+
+    def test_bulk_insert_and_relationships(self):
+        rows = ({'title': f'Book {i}', 'author': 'Author', 'qr_code': f'QR{i:04d}'} for i in range(2500))
+        self.assertEqual(bulk_insert(Book, rows, batch_size=1000), 2500)
+        self.assertEqual(Book.query.count(), 2500)
+
+        user = User(full_name='Maria', email='maria@example.com', user_type='student',
+                    password_hash='x').save()
+        book = Book.query.filter_by(qr_code='QR0001').one()
+        QuizAttempt(user=user, book=book, total_questions=5, correct_answers=4,
+                    score_percentage=80.0).save()
+        self.assertEqual(book.quiz_attempts[0].user.full_name, 'Maria')
+        self.assertEqual(user.quiz_attempts[0].score_percentage, 80.0)
+
+
+class TestMigrations(DatabaseTestCase):
+
+    def test_split_statements_drops_comments(self):
+        sql = '-- header; with a semicolon\nCREATE INDEX a ON t (x);\n\n-- note\nCREATE INDEX b ON t (y);\n'
+        self.assertEqual(split_statements(sql), ['CREATE INDEX a ON t (x)', 'CREATE INDEX b ON t (y)'])
+
+    def test_migrate_is_idempotent_with_create_all(self):
+        logged = []
+        self.assertEqual(migrate(log=logged.append), [1, 2, 3, 4, 5])
+        self.assertTrue(any('already exists' in line for line in logged))
+        self.assertIn(1, applied_versions(database.get_engine()))
+        self.assertEqual(migrate(log=logged.append), [])
+
+
+class TestAuthBlueprints(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        app = Flask(__name__)
+        app.register_blueprint(login_bp)
+        app.register_blueprint(signup_bp)
+        init_app(app)
+        self.client = app.test_client()
+
+    def test_signup_then_login(self):
+        credentials = {'email': 'ana@example.com', 'password': 'secret'}
+        response = self.client.post('/signup', json=credentials)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post('/signup', json=credentials).status_code, 400)
+
+        response = self.client.post('/login', json=credentials)
+        self.assertEqual(response.get_json()['data']['full_name'], 'ana@example.com')
+        bad = dict(credentials, password='nope')
+        self.assertEqual(self.client.post('/login', json=bad).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
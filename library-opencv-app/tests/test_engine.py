@@ -0,0 +1,88 @@
+import unittest
+
+import cv2
+import numpy as np
+import qrcode
+
+from src.qr.engine import MultiDecoder, ScannerEngine
+from src.qr.scanner import scan_all_qr_codes
+
+
+def make_frame(payload=None, x=50):
+    frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+    if payload:
+        code = np.array(qrcode.make(payload).convert('L'))[::2, ::2]
+        side = code.shape[0]
+        frame[100:100 + side, x:x + side] = code[:, :, None]
+    return frame
+
+
+def make_cart(payloads, module_px=4):
+    """A 1280x720 frame with one rotated, perspective-tilted code per payload."""
+    frame = np.full((720, 1280), 120, dtype=np.uint8)
+    for index, payload in enumerate(payloads):
+        code = np.array(qrcode.make(payload, box_size=1, border=2).convert('L'))
+        n = code.shape[0]
+        half = module_px * n / 2
+        corners = np.array([[-half * 0.8, -half], [half * 0.8, -half], [half, half], [-half, half]])
+        angle = np.deg2rad(-30 + 20 * index)
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        center = (200 + (index % 4) * 300, 200 + (index // 4) * 330)
+        target = np.float32(corners @ rotation.T + center)
+        matrix = cv2.getPerspectiveTransform(np.float32([[0, 0], [n, 0], [n, n], [0, n]]), target)
+        warped = cv2.warpPerspective(code, matrix, (1280, 720))
+        mask = cv2.warpPerspective(np.full_like(code, 255), matrix, (1280, 720), flags=cv2.INTER_NEAREST)
+        frame[mask > 0] = warped[mask > 0]
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+class TestScannerEngine(unittest.TestCase):
+
+    def test_tracks_roi_after_hit(self):
+        engine = ScannerEngine(full_scan_interval=5)
+        self.assertEqual(engine.process(make_frame('QR001'))[0].data, 'QR001')
+        self.assertIsNotNone(engine.roi)
+
+        detections = engine.process(make_frame('QR001', x=60))
+        self.assertEqual(detections[0].data, 'QR001')
+        self.assertEqual(engine.stats['roi_scans'], 1)
+        self.assertEqual(engine.stats['full_scans'], 1)
+
+    def test_skips_unchanged_frames_after_miss(self):
+        engine = ScannerEngine(full_scan_interval=3)
+        empty = make_frame()
+        for _ in range(4):
+            self.assertEqual(engine.process(empty), [])
+        self.assertEqual(engine.stats['skipped'], 3)
+        self.assertEqual(engine.stats['full_scans'], 1)
+
+        # A code appearing is a big change, so it is scanned right away
+        self.assertEqual(engine.process(make_frame('QR002'))[0].data, 'QR002')
+
+    def test_rescans_full_frame_when_code_moves_out_of_roi(self):
+        engine = ScannerEngine()
+        engine.process(make_frame('QR001', x=20))
+        detections = engine.process(make_frame('QR001', x=450))
+        self.assertEqual(detections[0].data, 'QR001')
+        self.assertEqual(engine.stats['full_scans'], 2)
+
+
+class TestMultiDecoder(unittest.TestCase):
+
+    def test_decodes_every_tilted_code(self):
+        payloads = [f'BOOK-{i:04d}' for i in range(1, 7)]
+        decoder = MultiDecoder(workers=3)
+        try:
+            detections = decoder(cv2.cvtColor(make_cart(payloads), cv2.COLOR_BGR2GRAY))
+        finally:
+            decoder.close()
+        self.assertEqual(sorted(d.data for d in detections), payloads)
+        self.assertTrue(all(len(d.polygon) == 4 for d in detections))
+
+    def test_scan_all_qr_codes_across_frames(self):
+        frames = [make_cart(['BOOK-0001', 'BOOK-0002']), make_cart(['BOOK-0002', 'BOOK-0003'])]
+        self.assertEqual(scan_all_qr_codes(iter(frames)), ['BOOK-0001', 'BOOK-0002', 'BOOK-0003'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from src.qr.engine import Detection
+from src.qr.events import Debouncer, EventBatcher, run_pipeline
+
+from .helpers import FakeClock
+
+SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10)]
+
+
+def frames(*codes):
+    """One detection list per frame; None is an empty frame."""
+    return [[Detection(code, SQUARE)] if code else [] for code in codes]
+
+
+class TestDebouncer(unittest.TestCase):
+
+    def feed(self, debouncer, codes, fps=30):
+        events = []
+        for index, detections in enumerate(frames(*codes)):
+            events.extend(debouncer.update(detections, index, now=index / fps))
+        return events
+
+    def test_held_code_emits_once(self):
+        debouncer = Debouncer(window=5, min_votes=3, cooldown=1.0)
+        events = self.feed(debouncer, ['A'] * 90)
+        self.assertEqual([(e.data, e.frame_index, e.votes) for e in events], [('A', 2, 3)])
+        self.assertEqual(debouncer.stats['suppressed'], 87)
+
+    def test_single_misread_is_ignored(self):
+        debouncer = Debouncer(window=5, min_votes=3)
+        self.assertEqual(self.feed(debouncer, [None, 'B', None, None, 'B', None, None, None, 'B']), [])
+
+    def test_code_fires_again_after_cooldown(self):
+        debouncer = Debouncer(window=3, min_votes=2, cooldown=1.0)
+        codes = ['A'] * 10 + [None] * 15 + ['A'] * 5 + [None] * 40 + ['A'] * 5
+        events = self.feed(debouncer, codes)
+        # The 15-frame (0.5 s) gap is within the cooldown; the 40-frame one is not
+        self.assertEqual([e.frame_index for e in events], [1, 71])
+
+    def test_state_stays_bounded_with_many_misreads(self):
+        debouncer = Debouncer(window=5, min_votes=3, cooldown=1.0)
+        for index in range(10000):
+            debouncer.update([Detection(f'garbled-{index}', SQUARE)], index, now=index / 30)
+        self.assertLessEqual(len(debouncer._votes), debouncer.window)
+        self.assertEqual((debouncer._last_seen, debouncer._emitted), ({}, set()))
+
+        # Emitted codes are forgotten once their cooldown has passed
+        events = self.feed(debouncer, ['A'] * 5 + [None] * 60)
+        self.assertEqual([e.data for e in events], ['A'])
+        self.assertEqual((len(debouncer._votes), debouncer._last_seen, debouncer._emitted), (0, {}, set()))
+
+    def test_two_codes_in_view(self):
+        debouncer = Debouncer(window=3, min_votes=2)
+        both = [Detection('A', SQUARE), Detection('B', SQUARE)]
+        events = debouncer.update(both, now=0) + debouncer.update(both, now=0.03)
+        self.assertEqual(sorted(e.data for e in events), ['A', 'B'])
+
+
+class TestEventBatcher(unittest.TestCase):
+
+    def test_batches_by_size_and_age(self):
+        clock = FakeClock()
+        batches = []
+        batcher = EventBatcher(batches.append, max_batch=3, max_delay=1.0, clock=clock)
+        batcher.add(['e1', 'e2'])
+        batcher.add(['e3'])
+        self.assertEqual(batches, [['e1', 'e2', 'e3']])
+        batcher.add(['e4'])
+        clock.now = 0.5
+        batcher.poll()
+        self.assertEqual(len(batches), 1)
+        clock.now = 1.5
+        batcher.poll()
+        self.assertEqual(batches[-1], ['e4'])
+        batcher.add(['e5'])
+        batcher.close()
+        self.assertEqual(batches[-1], ['e5'])
+
+    def test_run_pipeline(self):
+        class Engine:
+            def process(self, frame):
+                return frame
+
+        batches = []
+        stream = frames(*(['A'] * 30 + [None] * 100 + ['B'] * 30))
+        count = run_pipeline(stream, batches.append, engine=Engine(),
+                             debouncer=Debouncer(cooldown=0),
+                             batcher=EventBatcher(batches.append, max_delay=60))
+        self.assertEqual(count, 2)
+        self.assertEqual([[e.data for e in batch] for batch in batches], [['A', 'B']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from src.database.database import bulk_insert, init_app
+from src.database.models import QuizAttempt, Reward, UserReward
+from src.ui.exports import build_query, exports_bp, stream_export
+
+from .helpers import DatabaseTestCase, seed_books, seed_students
+
+
+class TestExports(DatabaseTestCase):
+    db_file = 'export.db'
+
+    def setUp(self):
+        super().setUp()
+        seed_students(10, grade_level=lambda i: 3 + i % 2, class_section=lambda i: 'AB'[i % 2])
+        seed_books(5, title='Book, "{}"')
+        bulk_insert(Reward, [{'reward_name': 'Pen', 'books_required': 10}])
+        bulk_insert(UserReward, [{'user_id': 1, 'reward_id': 1, 'earned_date': datetime(2025, 3, 1)}])
+        start = datetime(2025, 1, 1, 8, 0)
+        bulk_insert(QuizAttempt, ({'user_id': 1 + i % 10, 'book_id': 1 + i % 5, 'total_questions': 5,
+                                   'correct_answers': i % 6, 'score_percentage': (i % 6) * 20.0,
+                                   'time_taken': 60, 'attempt_date': start + timedelta(hours=i)}
+                                  for i in range(5000)))
+        app = Flask(__name__)
+        app.register_blueprint(exports_bp)
+        init_app(app)
+        self.client = app.test_client()
+
+    def test_csv_with_filters(self):
+        response = self.client.get('/exports/attempts.csv?start=2025-01-01&end=2025-01-02&grade=3')
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment; filename="attempts.csv"', response.headers['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        # Hourly attempts from Jan 1 08:00: 40 in range, every other one by a grade 3 student
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows[0]['title'], 'Book, "0"')
+        self.assertTrue(all(row['grade_level'] == '3' for row in rows))
+
+    def test_json_and_gzip(self):
+        response = self.client.get('/exports/rewards.json')
+        self.assertEqual(json.loads(response.get_data()), [{
+            'user_reward_id': 1, 'user_id': 1, 'full_name': 'Student 0', 'grade_level': 3, 'class_section': 'A',
+            'reward_id': 1, 'reward_name': 'Pen', 'earned_date': '2025-03-01T00:00:00', 'is_claimed': False,
+            'claimed_date': None}])
+        self.assertEqual(json.loads(self.client.get('/exports/progress.json').get_data()), [])
+
+        response = self.client.get('/exports/attempts.json?gzip=1&class_section=B')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.get_data()))), 2500)
+
+        response = self.client.get('/exports/attempts.csv', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.get_data()).count(b'\n'), 5001)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/exports/users.csv').status_code, 404)
+        self.assertEqual(self.client.get('/exports/attempts.xml').status_code, 404)
+        self.assertEqual(self.client.get('/exports/attempts.csv?start=01/02/2025').status_code, 400)
+        self.assertEqual(self.client.get('/exports/attempts.csv?grade=three').status_code, 400)
+
+    def test_memory_stays_flat(self):
+        def peak_while_streaming(args):
+            statement = build_query('attempts', args)
+            tracemalloc.start()
+            size = sum(len(chunk) for chunk in stream_export(statement, 'json', yield_per=100))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return size, peak
+
+        peak_while_streaming({})  # Warm SQLAlchemy's statement caches
+        small_size, small_peak = peak_while_streaming({'end': '2025-01-20'})
+        full_size, full_peak = peak_while_streaming({})
+        self.assertGreater(full_size, 10 * small_size)
+        self.assertLess(full_peak, 1.5 * small_peak)
+
+if __name__ == '__main__':
+    unittest.main()
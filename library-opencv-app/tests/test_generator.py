@@ -0,0 +1,40 @@
+import os
+import re
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from src.qr.generator import generate_qr_code, generate_qr_code_bytes, qr_matrix
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_png_bytes_decode(self):
+        data = generate_qr_code_bytes('QR001')
+        self.assertTrue(data.startswith(b'\x89PNG'))
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        self.assertEqual(cv2.QRCodeDetector().detectAndDecode(image)[0], 'QR001')
+
+    def test_svg_covers_every_dark_module(self):
+        matrix = qr_matrix('QR001')
+        svg = generate_qr_code_bytes('QR001', 'svg').decode('ascii')
+        self.assertIn(f'viewBox="0 0 {matrix.shape[0]} {matrix.shape[0]}"', svg)
+        runs = [int(width) for width in re.findall(r'h(\d+)v1', svg)]
+        self.assertEqual(sum(runs), matrix.sum())
+
+    def test_format_follows_extension(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'QR001.svg')
+            generate_qr_code('QR001', path)
+            with open(path, 'rb') as f:
+                self.assertTrue(f.read().startswith(b'<svg'))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            generate_qr_code_bytes('QR001', 'gif')
+
+
+if __name__ == '__main__':
+    unittest.main()
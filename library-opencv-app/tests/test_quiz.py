@@ -0,0 +1,172 @@
+import threading
+import unittest
+
+from flask import Flask
+
+from src.database import database
+from src.database.database import bulk_insert, db_session, init_app
+from src.database.models import QuizAttempt, QuizQuestion, QuizResponse, Reward, User, UserReward
+from src.services import quiz, stats
+from src.services.quiz import QuizResultWriter, QuizSubmissionError, submit
+from src.ui import quiz as quiz_ui
+
+from .helpers import DatabaseTestCase, seed_books, seed_students
+
+
+def seed(students=2, books=3, rewards=((1, 'Bookmark'), (2, 'Pen'))):
+    seed_students(students, status='active')
+    seed_books(books)
+    bulk_insert(QuizQuestion, ({'book_id': 1, 'question_text': f'Q{i}', 'option_a': 'a', 'option_b': 'b',
+                                'option_c': 'c', 'option_d': 'd', 'correct_answer': 'ABCD'[i % 4],
+                                'created_by': 1} for i in range(4)))
+    bulk_insert(Reward, ({'reward_name': name, 'books_required': required} for required, name in rewards))
+    quiz.clear_rewards_cache()
+
+
+class QuizTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        seed()
+        self.rebuild_stats()
+
+    def rebuild_stats(self):
+        # bulk_insert bypasses the stats hook
+        with database.get_engine().begin() as connection:
+            stats.rebuild(connection)
+
+
+class TestSubmit(QuizTestCase):
+
+    def test_graded_responses_written_in_one_transaction(self):
+        answers = [{'question_id': i + 1, 'user_answer': a, 'response_time': 5} for i, a in enumerate('ABCA')]
+        result = submit({'user_id': 1, 'book_id': 1, 'time_taken': 60, 'responses': answers})
+        self.assertEqual(result['score_percentage'], 75.0)
+        self.assertTrue(result['passed'])
+        self.assertFalse(result['is_reattempt'])
+        self.assertEqual((result['books_completed'], result['new_rewards']), (1, ['Bookmark']))
+
+        attempt = db_session.get(QuizAttempt, result['attempt_id'])
+        self.assertEqual((attempt.total_questions, attempt.correct_answers), (4, 3))
+        self.assertEqual([r.is_correct for r in attempt.responses], [True, True, True, False])
+
+    def test_counters_and_rewards(self):
+        payload = {'user_id': 2, 'total_questions': 5, 'correct_answers': 3, 'score_percentage': 60}
+        first = submit(dict(payload, book_id=1))
+        again = submit(dict(payload, book_id=1, score_percentage=80))
+        second = submit(dict(payload, book_id=2))
+        self.assertTrue(again['is_reattempt'])
+        self.assertEqual(again['new_rewards'], [])
+        self.assertEqual(again['average_score'], 70.0)
+        self.assertEqual((second['books_completed'], second['new_rewards']), (2, ['Pen']))
+        self.assertEqual(second['all_rewards'], ['Bookmark', 'Pen'])
+        self.assertEqual(second['rewards_earned'], 2)
+        self.assertEqual(UserReward.query.filter_by(user_id=2).count(), 2)
+        self.assertEqual(first['book_title'], 'Book 0')
+        with database.get_engine().connect() as connection:
+            self.assertEqual(stats.check(connection), [])
+
+    def test_invalid_submissions(self):
+        payload = {'user_id': 1, 'book_id': 1, 'total_questions': 5, 'correct_answers': 3, 'score_percentage': 60}
+        cases = [
+            (dict(payload, user_id=99), 'Invalid user account'),
+            (dict(payload, book_id=99), 'Invalid book ID'),
+            (dict(payload, correct_answers=6), 'Invalid quiz data values'),
+            ({'user_id': 1}, 'Missing required field'),
+            ({'user_id': 1, 'book_id': 2, 'responses': [{'question_id': 1, 'user_answer': 'A'}]},
+             'Question does not belong'),
+            ({'user_id': 1, 'book_id': 1, 'responses': [{'question_id': 1, 'user_answer': 'E'}]}, 'Invalid answer'),
+        ]
+        for data, message in cases:
+            with self.assertRaisesRegex(QuizSubmissionError, message):
+                submit(data)
+        self.assertEqual(QuizAttempt.query.count(), 0)
+
+
+class TestConcurrentSubmissions(QuizTestCase):
+    db_file = 'quiz.db'
+
+    def setUp(self):
+        super().setUp()
+        bulk_insert(User, ({'full_name': f'Class {i}', 'email': f'c{i}@example.com', 'password_hash': 'x',
+                            'user_type': 'student', 'status': 'active'} for i in range(40)))
+        self.rebuild_stats()
+
+    def test_forty_students_submit_at_once(self):
+        writer = QuizResultWriter(max_batch=20, max_wait=0.01)
+        barrier = threading.Barrier(40)
+        results = [None] * 40
+
+        def student(index):
+            answers = [{'question_id': q + 1, 'user_answer': 'ABCD'[(q + index) % 4]} for q in range(4)]
+            barrier.wait()
+            results[index] = writer.submit({'user_id': index + 3, 'book_id': 1, 'responses': answers}).result(30)
+
+        threads = [threading.Thread(target=student, args=(i,)) for i in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        self.assertTrue(all(result and result['books_completed'] == 1 for result in results))
+        self.assertEqual(QuizAttempt.query.count(), 40)
+        self.assertEqual(QuizResponse.query.count(), 160)
+        self.assertEqual(writer.stats['submissions'], 40)
+        self.assertLess(writer.stats['transactions'], 40)
+        with database.get_engine().connect() as connection:
+            self.assertEqual(stats.check(connection), [])
+
+
+class TestSubmitTimeout(QuizTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.writer = QuizResultWriter()
+        self.release = threading.Event()
+        self.writing = threading.Event()
+        write_batch = self.writer._write_batch
+
+        def held_write_batch(batch):
+            self.writing.set()
+            self.release.wait(10)
+            write_batch(batch)
+        self.writer._write_batch = held_write_batch
+        self.saved = (quiz_ui.quiz_writer, quiz_ui.SUBMIT_TIMEOUT)
+        quiz_ui.quiz_writer, quiz_ui.SUBMIT_TIMEOUT = self.writer, 0.05
+        app = Flask(__name__)
+        app.register_blueprint(quiz_ui.quiz_bp)
+        init_app(app)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.release.set()
+        self.writer.close()
+        quiz_ui.quiz_writer, quiz_ui.SUBMIT_TIMEOUT = self.saved
+        super().tearDown()
+
+    def payload(self, user_id):
+        return {'user_id': user_id, 'book_id': 1, 'total_questions': 5, 'correct_answers': 3,
+                'score_percentage': 60}
+
+    def test_queued_submission_is_withdrawn_on_503(self):
+        held = self.writer.submit(self.payload(1))  # Occupies the writer
+        self.writing.wait(10)
+        response = self.client.post('/quiz/results', json=self.payload(2))
+        self.assertEqual(response.status_code, 503)
+        self.release.set()
+        held.result(10)
+        self.writer.close()
+        # Only the held submission was written, so resubmitting cannot duplicate
+        self.assertEqual([a.user_id for a in QuizAttempt.query.all()], [1])
+
+    def test_submission_being_written_is_accepted(self):
+        response = self.client.post('/quiz/results', json=self.payload(2))
+        self.assertEqual(response.status_code, 202)
+        self.release.set()
+        self.writer.close()
+        self.assertEqual([a.user_id for a in QuizAttempt.query.all()], [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
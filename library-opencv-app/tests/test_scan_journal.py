@@ -0,0 +1,154 @@
+import os
+import time
+import unittest
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from src.database import database
+from src.database.database import init_app
+from src.database.models import ReadingProgress, SystemLog
+from src.qr.events import EventBatcher, ScanEvent
+from src.services import scan_journal as journal_service
+from src.services.scan_journal import JournalFlusher, ScanJournal
+from src.ui.scans import scans_bp
+
+from .helpers import DatabaseTestCase, seed_books, seed_students
+
+
+class ScanJournalTestCase(DatabaseTestCase):
+    db_file = 'library.db'
+
+    def setUp(self):
+        super().setUp()
+        seed_students(2)
+        seed_books(3)
+        self.journal = ScanJournal(os.path.join(self.tmpdir.name, 'journal.db'))
+
+    def tearDown(self):
+        self.journal.close()
+        super().tearDown()
+
+
+class TestScanJournal(ScanJournalTestCase):
+
+    def test_flush_writes_logs_and_first_progress(self):
+        self.journal.append_many([('QR0', 'kiosk-1', 1, 1.7e9), ('QR0', 'kiosk-1', 1, 1.7e9 + 1),
+                                  ('QR1', 'kiosk-2', 99, 1.7e9 + 2), ('FOREIGN', None, 2, 1.7e9 + 3)])
+        flusher = JournalFlusher(self.journal, batch_size=10)
+        self.assertEqual(flusher.drain(), 4)
+        self.assertEqual(self.journal.backlog(), 0)
+
+        logs = SystemLog.query.order_by(SystemLog.log_id).all()
+        self.assertEqual([log.action for log in logs], ['book_scanned'] * 4)
+        self.assertEqual([log.user_id for log in logs], [1, 1, None, 2])
+        self.assertIn('unknown book', logs[3].description)
+        progress = ReadingProgress.query.all()
+        self.assertEqual([(p.user_id, p.book_id, p.reading_status) for p in progress], [(1, 1, 'in_progress')])
+
+        # A later scan of the same book does not add a second progress row
+        self.journal.append('QR0', user_id=1)
+        flusher.drain()
+        self.assertEqual(ReadingProgress.query.count(), 1)
+        self.assertEqual(flusher.stats['flushed'], 5)
+
+    def test_scans_kept_while_database_is_down(self):
+        database.configure('sqlite:///' + os.path.join(self.tmpdir.name, 'missing', 'library.db'))
+        flusher = JournalFlusher(self.journal, batch_size=3)
+        for i in range(7):
+            self.journal.append(f'QR{i % 3}', 'kiosk-1', 1)
+        with self.assertRaises(OperationalError):
+            flusher.flush_once()
+        self.assertEqual(self.journal.backlog(), 7)
+
+        database.configure(self.db_uri)
+        self.assertEqual(flusher.drain(), 7)
+        self.assertEqual(flusher.stats['batches'], 3)
+        self.assertEqual(SystemLog.query.count(), 7)
+        self.assertEqual(ReadingProgress.query.count(), 3)
+
+    def test_bad_records_are_quarantined_and_flusher_survives(self):
+        now = time.time()
+        # A Date.now() value in milliseconds, and one datetime cannot represent at all
+        self.journal.append_many([('QR0', 'kiosk-1', 1, now * 1000), ('QR1', 'kiosk-1', 1, 1e300),
+                                  ('QR2', 'kiosk-1', 1, now)])
+        flusher = JournalFlusher(self.journal, interval=0.01).start()
+        try:
+            deadline = time.monotonic() + 5
+            while self.journal.backlog() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            flusher.stop()
+        self.assertEqual(self.journal.backlog(), 0)
+        self.assertEqual(self.journal.quarantined(), 2)
+        self.assertEqual((flusher.stats['quarantined'], flusher.stats['failures']), (2, 0))
+        self.assertEqual([log.description for log in SystemLog.query.all()], ['Scanned QR QR2 on kiosk-1'])
+
+    def test_flusher_thread_survives_unexpected_errors(self):
+        self.journal.append('QR0', user_id=1)
+        flusher = JournalFlusher(self.journal, interval=0.01, max_backoff=0.02)
+        calls = []
+
+        def broken_pending(limit):
+            calls.append(limit)
+            raise RuntimeError('journal unreadable')
+        flusher.journal = type('BrokenJournal', (), {'pending': staticmethod(broken_pending)})()
+        flusher.start()
+        try:
+            deadline = time.monotonic() + 5
+            while len(calls) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(flusher._thread.is_alive())
+        finally:
+            flusher.journal = self.journal
+            flusher.stop()
+        self.assertGreaterEqual(flusher.stats['failures'], 3)
+        self.assertEqual(flusher.stats['last_error'], 'journal unreadable')
+        self.assertEqual(self.journal.backlog(), 0)
+
+    def test_event_batcher_sink(self):
+        with EventBatcher(self.journal.sink('kiosk-1', user_id=2)) as batcher:
+            batcher.add([ScanEvent('QR2', [], 0, 100.0, 3), ScanEvent('QR1', [], 5, 101.0, 3)])
+        self.assertEqual([(r.qr_code, r.camera, r.user_id, r.scanned_at) for r in self.journal.pending(10)],
+                         [('QR2', 'kiosk-1', 2, 100.0), ('QR1', 'kiosk-1', 2, 101.0)])
+
+
+class TestScansEndpoint(ScanJournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        journal_service.scan_journal.close()
+        journal_service.scan_journal.path = self.journal.path
+        app = Flask(__name__)
+        app.register_blueprint(scans_bp)
+        init_app(app)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        journal_service.journal_flusher.stop()
+        journal_service.scan_journal.close()
+        super().tearDown()
+
+    def test_record_scans(self):
+        response = self.client.post('/scans', json={'scans': [{'qrCode': 'QR0', 'userId': 1, 'camera': 'kiosk-1'},
+                                                              {'qr_code': 'QR1', 'user_id': 1}]})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['data'], {'recorded': 2})
+        self.assertEqual(self.client.post('/scans', json={'camera': 'kiosk-1'}).status_code, 400)
+        for timestamp in (time.time() * 1000, 'nan', 'inf', -1):
+            response = self.client.post('/scans', json={'qr_code': 'QR0', 'timestamp': timestamp})
+            self.assertEqual(response.status_code, 400)
+        # Values the journal columns cannot hold are rejected up front, not by sqlite
+        for scan in ({'camera': ['a']}, {'camera': {'a': 1}}, {'user_id': 10 ** 30}, {'user_id': -1}):
+            response = self.client.post('/scans', json=dict(scan, qr_code='QR0'))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json()['message'], 'Invalid scan data')
+
+        journal_service.journal_flusher.stop()  # Drains the journal on the way out
+        self.assertEqual(SystemLog.query.count(), 2)
+        stats = self.client.get('/scans/journal').get_json()['data']
+        self.assertEqual((stats['backlog'], stats['flushed']), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
+import os
+import tempfile
 import unittest
-from src.qr.scanner import scan_qr_code
+
+import cv2
+import numpy as np
+
+from src.qr.scanner import scan, scan_qr_code
 
 class TestQRCodeScanner(unittest.TestCase):
 
@@ -19,5 +25,30 @@ class TestQRCodeScanner(unittest.TestCase):
         result = scan_qr_code('')
         self.assertIsNone(result)
 
+    def test_scan_numpy_array(self):
+        frame = cv2.imread('tests/test_images/valid_qr_code.png')
+        results = scan(frame)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].data, 'Expected QR Code Data')
+        self.assertEqual(results[0].frame_index, 0)
+        self.assertEqual(len(results[0].polygon), 4)
+        self.assertGreaterEqual(results[0].latency_ms, 0)
+
+    def test_scan_frame_iterable(self):
+        code = cv2.imread('tests/test_images/valid_qr_code.png')
+        blank = np.full_like(code, 255)
+        results = scan(iter([blank, code, blank]))
+        self.assertEqual([r.frame_index for r in results], [1])
+
+    def test_scan_frame_directory(self):
+        code = cv2.imread('tests/test_images/valid_qr_code.png')
+        with tempfile.TemporaryDirectory() as directory:
+            cv2.imwrite(os.path.join(directory, 'frame_000000.png'), np.full_like(code, 255))
+            cv2.imwrite(os.path.join(directory, 'frame_000001.png'), code)
+            with open(os.path.join(directory, 'timestamps.txt'), 'w') as f:
+                f.write('frame_000000.png 0.0\nframe_000001.png 0.033\n')
+            results = scan(directory)
+        self.assertEqual([(r.data, r.frame_index) for r in results], [('Expected QR Code Data', 1)])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
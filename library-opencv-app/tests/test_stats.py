@@ -0,0 +1,176 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.dialects import mysql
+
+from src.database import database
+from src.database.database import Base, db_session, init_db
+from src.database.migrate import migrate
+from src.database.models import Book, CompletionPair, QuizAttempt, Reward, StudentStats, User, UserReward
+from src.services import stats
+
+
+class TestDashboardStats(unittest.TestCase):
+
+    def setUp(self):
+        database.configure('sqlite://')
+        init_db()
+        stats.install()
+        self.alice = User(full_name='Alice', email='alice@example.com', user_type='student', password_hash='x')
+        self.bob = User(full_name='Bob', email='bob@example.com', user_type='student', password_hash='x')
+        self.teacher = User(full_name='Teacher', email='t@example.com', user_type='teacher', password_hash='x')
+        self.books = [Book(title=f'Book {i}', author='Author', qr_code=f'QR{i}') for i in range(3)]
+        self.reward = Reward(reward_name='Pen', books_required=10)
+        db_session.add_all([self.alice, self.bob, self.teacher, self.reward] + self.books)
+        db_session.commit()
+
+    def tearDown(self):
+        db_session.remove()
+        Base.metadata.drop_all(database.get_engine())
+
+    def attempt(self, user, book, score):
+        QuizAttempt(user=user, book=book, total_questions=5, correct_answers=int(score // 20),
+                    score_percentage=score).save()
+
+    def test_incremental_updates_match_rebuild(self):
+        self.attempt(self.alice, self.books[0], 60.0)
+        self.attempt(self.alice, self.books[0], 80.0)
+        self.attempt(self.alice, self.books[0], 100.0)
+        self.attempt(self.alice, self.books[1], 40.0)
+        self.attempt(self.bob, self.books[0], 70.0)
+        UserReward(user_id=self.bob.user_id, reward_id=self.reward.reward_id).save()
+
+        summary = stats.dashboard_stats()
+        self.assertEqual(summary['active_students'], 2)
+        self.assertEqual(summary['total_users'], 3)
+        self.assertEqual(summary['total_books'], 3)
+        self.assertEqual(summary['total_quizzes'], 5)
+        self.assertEqual(summary['average_score'], 70.0)
+        self.assertEqual(summary['books_read'], 2)
+        self.assertEqual(summary['active_readers'], 2)
+        self.assertEqual(summary['rewards_earned'], 1)
+
+        alice = db_session.get(StudentStats, self.alice.user_id)
+        self.assertEqual((alice.attempts, alice.books_attempted, alice.books_passed), (4, 2, 1))
+        pair = db_session.get(CompletionPair, (self.alice.user_id, self.books[0].book_id))
+        self.assertEqual((pair.attempts, pair.best_score), (3, 100.0))
+
+        with database.get_engine().connect() as connection:
+            self.assertEqual(stats.check(connection), [])
+
+    def test_user_and_book_changes(self):
+        self.bob.status = 'inactive'
+        db_session.commit()
+        self.teacher.user_type = 'student'
+        db_session.commit()
+        db_session.delete(self.books[2])
+        db_session.commit()
+        summary = stats.dashboard_stats()
+        self.assertEqual((summary['active_students'], summary['total_books']), (2, 2))
+        # Inactive accounts and teachers still count as users
+        self.assertEqual(summary['total_users'], 3)
+        db_session.delete(self.alice)
+        db_session.commit()
+        summary = stats.dashboard_stats()
+        self.assertEqual((summary['active_students'], summary['total_users']), (1, 2))
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        self.attempt(self.alice, self.books[0], 90.0)
+        engine = database.get_engine()
+        with engine.begin() as connection:
+            # Raw SQL bypasses the ORM hook (as the PHP site does without triggers)
+            connection.execute(text('INSERT INTO quiz_attempts (user_id, book_id, total_questions, '
+                                    'correct_answers, score_percentage) VALUES (:u, :b, 5, 5, 100)'),
+                               {'u': self.bob.user_id, 'b': self.books[1].book_id})
+            self.assertTrue(stats.check(connection))
+            counts = stats.rebuild(connection)
+            self.assertEqual(counts['completion_pairs'], 2)
+            self.assertEqual(stats.check(connection), [])
+
+    def test_migration_backfill_matches_rebuild(self):
+        self.attempt(self.alice, self.books[0], 90.0)
+        self.attempt(self.bob, self.books[1], 50.0)
+        UserReward(user_id=self.alice.user_id, reward_id=self.reward.reward_id).save()
+        engine = database.get_engine()
+        with engine.begin() as connection:
+            for model in (CompletionPair, StudentStats):
+                connection.execute(model.__table__.delete())
+        self.assertEqual(migrate(log=lambda message: None), [1, 2, 3, 4, 5])
+        with engine.connect() as connection:
+            self.assertEqual(stats.check(connection), [])
+
+    def test_total_users_migration_backfills_existing_row(self):
+        engine = database.get_engine()
+        migrate(log=lambda message: None)
+        stats.dashboard_stats()
+        with engine.begin() as connection:
+            # A database migrated before 0004
+            connection.execute(text('ALTER TABLE dashboard_stats DROP COLUMN total_users'))
+            connection.execute(text('DELETE FROM schema_migrations WHERE version >= 4'))
+        db_session.remove()
+        self.assertEqual(migrate(log=lambda message: None), [4, 5])
+        self.assertEqual(stats.dashboard_stats()['total_users'], 3)
+
+
+class TestConcurrentAttempts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.configure('sqlite:///' + os.path.join(self.tmpdir.name, 'stats.db'))
+        init_db()
+
+    def tearDown(self):
+        Base.metadata.drop_all(database.get_engine())
+        database.get_engine().dispose()
+        self.tmpdir.cleanup()
+
+    def test_concurrent_attempts_are_all_counted(self):
+        scores = [50.0, 90.0, 60.0, 75.0, 100.0, 30.0, 80.0, 65.0]
+        errors = []
+        barrier = threading.Barrier(len(scores))
+
+        def submit(score):
+            try:
+                barrier.wait()
+                with database.get_engine().begin() as connection:
+                    stats.record_attempt(connection, 1, 1, score)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=submit, args=(score,)) for score in scores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        with database.get_engine().connect() as connection:
+            pair = connection.execute(text('SELECT attempts, best_score FROM completion_pairs')).one()
+            student = connection.execute(text(
+                'SELECT attempts, books_attempted, books_passed FROM student_stats')).one()
+            dashboard = connection.execute(text(
+                'SELECT total_attempts, passed_pairs, active_readers FROM dashboard_stats')).one()
+        self.assertEqual(tuple(pair), (8, 100.0))
+        self.assertEqual(tuple(student), (8, 1, 1))
+        self.assertEqual(tuple(dashboard), (8, 1, 1))
+
+    def test_mysql_statements_are_atomic(self):
+        statements = []
+
+        class Recorder:
+            dialect = mysql.dialect()
+
+            def execute(self, statement):
+                statements.append(str(statement.compile(dialect=self.dialect)))
+
+        stats._bump(Recorder(), StudentStats, {'user_id': 1}, attempts=1)
+        self.assertIn('ON DUPLICATE KEY UPDATE attempts = (student_stats.attempts + %s)', statements[0])
+        greatest = stats._greatest(Recorder(), CompletionPair.__table__.c.best_score, 90.0)
+        self.assertEqual(str(greatest.compile(dialect=mysql.dialect())), 'greatest(completion_pairs.best_score, %s)')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,292 @@
+"""
+MJPEG Stream Demuxer
+Splits the multipart/x-mixed-replace stream sent by the ESP32-CAM
+(arduino/CameraWebServer/app_httpd.cpp) into individual JPEG frames
+"""
+
+import re
+from collections import namedtuple
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+INITIAL_BUFFER_SIZE = 64 * 1024  # Grows on demand for large frames
+MAX_BUFFER_SIZE = 8 * 1024 * 1024  # Drop data past this without a frame
+MAX_HEADER_SIZE = 1024  # Part headers are ~100 bytes on the ESP32
+
+JPEG_SOI = b'\xff\xd8'  # JPEG start marker
+JPEG_EOI = b'\xff\xd9'  # JPEG end marker
+HEADER_END = b'\r\n\r\n'
+
+# A decoded frame. `data` is a memoryview into the demuxer buffer and is
+# only valid until the next call to feed(); copy it with bytes() to keep it.
+MJPEGFrame = namedtuple('MJPEGFrame', ['data', 'timestamp'])
+
+_BOUNDARY_RE = re.compile(rb'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+def boundary_from_content_type(content_type):
+    """
+    Extract the multipart boundary from a Content-Type header
+
+    Args:
+        content_type (str): e.g. "multipart/x-mixed-replace;boundary=123..."
+
+    Returns:
+        bytes: The boundary, or None if the header has none
+    """
+    if not content_type:
+        return None
+    if isinstance(content_type, str):
+        content_type = content_type.encode('latin-1')
+    match = _BOUNDARY_RE.search(content_type)
+    return match.group(1).strip() if match else None
+
+
+# =======================================================
+# DEMUXER CLASS
+# =======================================================
+class MJPEGDemuxer:
+    """
+    Incremental MJPEG demuxer backed by a single reusable bytearray
+
+    Parts carrying a Content-Length header are sliced out directly
+    without scanning the JPEG payload. Streams without lengths fall back
+    to a SOI/EOI marker search that resumes where the previous chunk
+    stopped, so no byte is scanned twice.
+    """
+
+    def __init__(self, boundary=None, max_buffer_size=MAX_BUFFER_SIZE):
+        if isinstance(boundary, str):
+            boundary = boundary.encode('latin-1')
+        self.boundary = boundary
+        self.max_buffer_size = max_buffer_size
+
+        self._buf = bytearray(INITIAL_BUFFER_SIZE)
+        self._start = 0  # First unconsumed byte
+        self._end = 0  # One past the last received byte
+        self._scan = 0  # Resume offset for header/marker searches
+
+        # Current part state
+        self._body_start = None
+        self._length = None
+        self._timestamp = None
+
+        # Counters
+        self.frames = 0
+        self.bytes_in = 0
+        self.resyncs = 0
+
+    # ---------------------------------------------------
+    # Buffer management
+    # ---------------------------------------------------
+    def _shift(self, offset):
+        """Move every stored position `offset` bytes to the left"""
+        self._start -= offset
+        self._end -= offset
+        self._scan = max(self._scan - offset, 0)
+        if self._body_start is not None:
+            self._body_start -= offset
+
+    def _reserve(self, size):
+        """Make room for `size` more bytes after self._end"""
+        pending = self._end - self._start
+        capacity = len(self._buf)
+
+        if self._end + size <= capacity:
+            return
+
+        if pending + size <= capacity:
+            # Compact in place; only the partial frame is moved
+            self._buf[:pending] = self._buf[self._start:self._end]
+        else:
+            # Allocate a new buffer instead of resizing, so memoryviews
+            # handed out earlier never block the grow
+            new_capacity = capacity
+            while pending + size > new_capacity:
+                new_capacity *= 2
+            new_buf = bytearray(new_capacity)
+            new_buf[:pending] = self._buf[self._start:self._end]
+            self._buf = new_buf
+        self._shift(self._start)
+
+    def _reset(self):
+        """Discard everything buffered and start looking for a new part"""
+        self._start = self._end = self._scan = 0
+        self._body_start = self._length = self._timestamp = None
+        self.resyncs += 1
+
+    # ---------------------------------------------------
+    # Feeding data
+    # ---------------------------------------------------
+    def feed(self, chunk):
+        """
+        Append a chunk of stream data and return completed frames
+
+        Args:
+            chunk (bytes-like): Raw bytes from the HTTP response body
+
+        Returns:
+            list[MJPEGFrame]: Frames completed by this chunk (may be empty)
+        """
+        size = len(chunk)
+        if size:
+            self._reserve(size)
+            self._buf[self._end:self._end + size] = chunk
+            self._end += size
+            self.bytes_in += size
+        return self._parse()
+
+    def readinto_from(self, raw, size=16 * 1024):
+        """
+        Read straight from a file-like object into the buffer
+
+        Args:
+            raw: Object with a readinto() method (socket file, urllib3 raw)
+            size (int): Maximum bytes to read
+
+        Returns:
+            tuple: (bytes_read, list[MJPEGFrame]); bytes_read is 0 at EOF
+        """
+        self._reserve(size)
+        view = memoryview(self._buf)[self._end:self._end + size]
+        try:
+            count = raw.readinto(view) or 0
+        finally:
+            view.release()
+        self._end += count
+        self.bytes_in += count
+        return count, self._parse()
+
+    def iter_frames(self, source, chunk_size=16 * 1024):
+        """
+        Yield frames from a readable object or an iterable of chunks
+
+        Args:
+            source: File-like object with readinto(), or iterable of bytes
+            chunk_size (int): Read size for file-like sources
+        """
+        if hasattr(source, 'readinto'):
+            while True:
+                count, frames = self.readinto_from(source, chunk_size)
+                for frame in frames:
+                    yield frame
+                if not count:
+                    return
+        else:
+            for chunk in source:
+                for frame in self.feed(chunk):
+                    yield frame
+
+    # ---------------------------------------------------
+    # Parsing
+    # ---------------------------------------------------
+    def _parse(self):
+        frames = []
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+
+        if self._end - self._start > self.max_buffer_size:
+            self._reset()
+        return frames
+
+    def _next_frame(self):
+        buf = self._buf
+
+        if self._body_start is None and not self._find_part_start():
+            return None
+
+        if self._length is not None:
+            # Content-Length known: slice the payload without scanning it
+            stop = self._body_start + self._length
+            if stop > self._end:
+                return None
+        else:
+            # No length: incremental search for the JPEG end marker
+            search_from = max(self._scan, self._body_start + 2)
+            eoi = buf.find(JPEG_EOI, search_from, self._end)
+            if eoi == -1:
+                self._scan = max(self._end - 1, search_from)
+                return None
+            stop = eoi + 2
+
+        frame = MJPEGFrame(memoryview(buf)[self._body_start:stop], self._timestamp)
+        self._start = self._scan = stop
+        self._body_start = self._length = self._timestamp = None
+        self.frames += 1
+        return frame
+
+    def _find_part_start(self):
+        """Locate the next JPEG payload; returns False if more data is needed"""
+        buf = self._buf
+        while True:
+            # Skip the CRLF that precedes each boundary
+            while self._start < self._end and buf[self._start] in (0x0d, 0x0a):
+                self._start += 1
+            self._scan = max(self._scan, self._start)
+            if self._end - self._start < 2:
+                return False
+
+            lead = buf[self._start:self._start + 2]
+            if lead == b'--':
+                header_end = buf.find(HEADER_END, self._scan, self._end)
+                if header_end == -1:
+                    if self._end - self._start > MAX_HEADER_SIZE:
+                        self._resync()
+                        continue
+                    self._scan = max(self._end - 3, self._start)
+                    return False
+                if not self._parse_headers(self._start, header_end):
+                    self._resync()
+                    continue
+                self._body_start = self._scan = header_end + 4
+                return True
+
+            if lead == JPEG_SOI:
+                # Bare JPEG without multipart headers
+                self._body_start = self._start
+                self._length = self._timestamp = None
+                return True
+
+            self._resync()
+
+    def _parse_headers(self, start, stop):
+        lines = bytes(self._buf[start:stop]).split(b'\r\n')
+        if self.boundary is not None and lines[0].rstrip(b'-') != b'--' + self.boundary:
+            return False
+
+        self._length = self._timestamp = None
+        for line in lines[1:]:
+            name, sep, value = line.partition(b':')
+            if not sep:
+                continue
+            name = name.strip().lower()
+            try:
+                if name == b'content-length':
+                    self._length = int(value)
+                elif name == b'x-timestamp':
+                    self._timestamp = float(value)
+            except ValueError:
+                return False
+        return True
+
+    def _resync(self):
+        """Drop bytes up to the next boundary or JPEG start marker"""
+        buf = self._buf
+        self.resyncs += 1
+        candidates = [
+            index for index in (
+                buf.find(b'\r\n--', self._start + 1, self._end),
+                buf.find(JPEG_SOI, self._start + 1, self._end),
+            )
+            if index != -1
+        ]
+        if candidates:
+            self._start = min(candidates)
+        else:
+            # Keep the last byte in case it is half of a marker
+            self._start = max(self._end - 1, self._start)
+        self._scan = self._start
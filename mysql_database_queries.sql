@@ -168,6 +168,210 @@ CREATE TABLE password_resets (
     INDEX idx_expires (expires_at)
 );
 
+-- =====================================================
+-- INDEXES FOR HOT QUERY PATHS
+-- Same as library-opencv-app/migrations/0001_hot_path_indexes.sql;
+-- existing databases get them with: python -m src.database.migrate
+-- =====================================================
+
+-- quiz_attempts
+-- save-quiz-result.php / quiz.php: WHERE user_id = ? [AND book_id = ?],
+-- COUNT(DISTINCT book_id), AVG(score_percentage) -> index-only range scan
+CREATE INDEX idx_qa_user_book_score ON quiz_attempts (user_id, book_id, score_percentage);
+-- librarian.php inventory: LEFT JOIN ... GROUP BY book_id, COUNT(DISTINCT user_id), AVG(score)
+CREATE INDEX idx_qa_book_user_score ON quiz_attempts (book_id, user_id, score_percentage);
+-- admin.php / teacher.php: distinct (user_id, book_id) WHERE score_percentage >= 70
+CREATE INDEX idx_qa_score_user_book ON quiz_attempts (score_percentage, user_id, book_id);
+-- Recent activity: ORDER BY attempt_date DESC LIMIT n; attempts today
+CREATE INDEX idx_qa_attempt_date ON quiz_attempts (attempt_date);
+
+-- quiz_responses: per-attempt review and per-question difficulty
+CREATE INDEX idx_qr_attempt_question ON quiz_responses (attempt_id, question_id, is_correct);
+CREATE INDEX idx_qr_question_correct ON quiz_responses (question_id, is_correct);
+
+-- reading_progress: one row per (user, book); dashboards filter by status
+CREATE INDEX idx_rp_user_book_status ON reading_progress (user_id, book_id, reading_status);
+CREATE INDEX idx_rp_book_status ON reading_progress (book_id, reading_status);
+
+-- user_rewards: "already earned?" check, COUNT(DISTINCT reward_id) per user,
+-- COUNT(*) per reward on the dashboards
+CREATE INDEX idx_ur_user_reward ON user_rewards (user_id, reward_id);
+CREATE INDEX idx_ur_reward_user ON user_rewards (reward_id, user_id);
+
+-- book_borrowings: current loans per user/book, overdue sweep
+CREATE INDEX idx_bb_user_status ON book_borrowings (user_id, status);
+CREATE INDEX idx_bb_book_status ON book_borrowings (book_id, status);
+CREATE INDEX idx_bb_status_due ON book_borrowings (status, expected_return_date);
+
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO schema_migrations (version, name) VALUES (1, 'hot_path_indexes');
+
+-- =====================================================
+-- DASHBOARD STATISTICS (library-opencv-app/migrations/0002 to 0005)
+-- Running aggregates kept current by triggers; admin.php and teacher.php
+-- read dashboard_stats instead of scanning quiz_attempts.
+-- =====================================================
+
+-- Single row (stats_id = 1) read by admin.php / teacher.php / the Flask dashboard
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+    stats_id INT PRIMARY KEY,
+    active_students INT NOT NULL DEFAULT 0,
+    total_books INT NOT NULL DEFAULT 0,
+    total_attempts INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    passed_pairs INT NOT NULL DEFAULT 0,
+    active_readers INT NOT NULL DEFAULT 0,
+    rewards_earned INT NOT NULL DEFAULT 0,
+    total_users INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS student_stats (
+    user_id INT PRIMARY KEY,
+    attempts INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    books_attempted INT NOT NULL DEFAULT 0,
+    books_passed INT NOT NULL DEFAULT 0,
+    rewards_earned INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS book_stats (
+    book_id INT PRIMARY KEY,
+    attempts INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    readers INT NOT NULL DEFAULT 0,
+    passed_readers INT NOT NULL DEFAULT 0
+);
+
+-- Distinct (student, book) set: replaces COUNT(DISTINCT user_id, book_id) scans
+CREATE TABLE IF NOT EXISTS completion_pairs (
+    user_id INT NOT NULL,
+    book_id INT NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    best_score DECIMAL(5,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, book_id)
+);
+
+CREATE TABLE IF NOT EXISTS reward_stats (
+    reward_id INT PRIMARY KEY,
+    earned INT NOT NULL DEFAULT 0
+);
+
+DELIMITER $$
+
+CREATE TRIGGER trg_quiz_attempts_stats AFTER INSERT ON quiz_attempts
+FOR EACH ROW
+BEGIN
+    DECLARE prev_best DECIMAL(5,2) DEFAULT NULL;
+    DECLARE prev_attempts INT DEFAULT 0;
+    DECLARE new_pair INT DEFAULT 0;
+    DECLARE new_pass INT DEFAULT 0;
+
+    SET prev_best = (SELECT best_score FROM completion_pairs
+                     WHERE user_id = NEW.user_id AND book_id = NEW.book_id);
+    SET prev_attempts = COALESCE((SELECT attempts FROM student_stats WHERE user_id = NEW.user_id), 0);
+    SET new_pair = IF(prev_best IS NULL, 1, 0);
+    SET new_pass = IF(NEW.score_percentage >= 70 AND (prev_best IS NULL OR prev_best < 70), 1, 0);
+
+    INSERT INTO completion_pairs (user_id, book_id, attempts, best_score)
+    VALUES (NEW.user_id, NEW.book_id, 1, NEW.score_percentage)
+    ON DUPLICATE KEY UPDATE attempts = attempts + 1,
+                            best_score = GREATEST(best_score, NEW.score_percentage);
+
+    INSERT INTO student_stats (user_id, attempts, score_sum, books_attempted, books_passed)
+    VALUES (NEW.user_id, 1, NEW.score_percentage, new_pair, new_pass)
+    ON DUPLICATE KEY UPDATE attempts = attempts + 1,
+                            score_sum = score_sum + NEW.score_percentage,
+                            books_attempted = books_attempted + new_pair,
+                            books_passed = books_passed + new_pass;
+
+    INSERT INTO book_stats (book_id, attempts, score_sum, readers, passed_readers)
+    VALUES (NEW.book_id, 1, NEW.score_percentage, new_pair, new_pass)
+    ON DUPLICATE KEY UPDATE attempts = attempts + 1,
+                            score_sum = score_sum + NEW.score_percentage,
+                            readers = readers + new_pair,
+                            passed_readers = passed_readers + new_pass;
+
+    INSERT INTO dashboard_stats (stats_id, total_attempts, score_sum, passed_pairs, active_readers)
+    VALUES (1, 1, NEW.score_percentage, new_pass, IF(prev_attempts = 0, 1, 0))
+    ON DUPLICATE KEY UPDATE total_attempts = total_attempts + 1,
+                            score_sum = score_sum + NEW.score_percentage,
+                            passed_pairs = passed_pairs + new_pass,
+                            active_readers = active_readers + IF(prev_attempts = 0, 1, 0);
+END$$
+
+CREATE TRIGGER trg_users_stats_insert AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO dashboard_stats (stats_id, total_users, active_students)
+    VALUES (1, 1, IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0))
+    ON DUPLICATE KEY UPDATE total_users = total_users + 1,
+        active_students = active_students
+        + IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0);
+END$$
+
+CREATE TRIGGER trg_users_stats_update AFTER UPDATE ON users
+FOR EACH ROW
+BEGIN
+    DECLARE delta INT DEFAULT 0;
+    SET delta = IF(NEW.user_type = 'student' AND COALESCE(NEW.status, 'active') = 'active', 1, 0)
+              - IF(OLD.user_type = 'student' AND COALESCE(OLD.status, 'active') = 'active', 1, 0);
+    IF delta <> 0 THEN
+        INSERT INTO dashboard_stats (stats_id, active_students) VALUES (1, delta)
+        ON DUPLICATE KEY UPDATE active_students = active_students + delta;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_users_stats_delete AFTER DELETE ON users
+FOR EACH ROW
+BEGIN
+    UPDATE dashboard_stats
+    SET total_users = total_users - 1,
+        active_students = active_students
+        - IF(OLD.user_type = 'student' AND COALESCE(OLD.status, 'active') = 'active', 1, 0)
+    WHERE stats_id = 1;
+END$$
+
+CREATE TRIGGER trg_books_stats_insert AFTER INSERT ON books
+FOR EACH ROW
+BEGIN
+    INSERT INTO dashboard_stats (stats_id, total_books) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE total_books = total_books + 1;
+END$$
+
+CREATE TRIGGER trg_books_stats_delete AFTER DELETE ON books
+FOR EACH ROW
+BEGIN
+    UPDATE dashboard_stats SET total_books = total_books - 1 WHERE stats_id = 1;
+END$$
+
+CREATE TRIGGER trg_user_rewards_stats_insert AFTER INSERT ON user_rewards
+FOR EACH ROW
+BEGIN
+    INSERT INTO reward_stats (reward_id, earned) VALUES (NEW.reward_id, 1)
+    ON DUPLICATE KEY UPDATE earned = earned + 1;
+    INSERT INTO student_stats (user_id, rewards_earned) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE rewards_earned = rewards_earned + 1;
+    INSERT INTO dashboard_stats (stats_id, rewards_earned) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE rewards_earned = rewards_earned + 1;
+END$$
+
+CREATE TRIGGER trg_user_rewards_stats_delete AFTER DELETE ON user_rewards
+FOR EACH ROW
+BEGIN
+    UPDATE reward_stats SET earned = earned - 1 WHERE reward_id = OLD.reward_id;
+    UPDATE student_stats SET rewards_earned = rewards_earned - 1 WHERE user_id = OLD.user_id;
+    UPDATE dashboard_stats SET rewards_earned = rewards_earned - 1 WHERE stats_id = 1;
+END$$
+
+DELIMITER ;
+
+INSERT INTO schema_migrations (version, name) VALUES (2, 'dashboard_stats'), (3, 'dashboard_stats_triggers'),
+    (4, 'dashboard_total_users'), (5, 'dashboard_total_users_triggers');
+
 -- =====================================================
 -- INSERT SAMPLE DATA
 -- =====================================================
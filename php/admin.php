@@ -1,51 +1,12 @@
 <?php
 require_once 'config.php';
+require_once 'dashboard-stats-helper.php';
 
 // Check if user is logged in as admin
 check_user_type(['admin']);
 
-// Fetch system statistics
-$stats = [];
-
-// Total students
-$sql = "SELECT COUNT(*) as total FROM users WHERE user_type = 'student' AND status = 'active'";
-$result = $conn->query($sql);
-$stats['total_students'] = $result->fetch_assoc()['total'];
-
-// Total books read (unique book-student combinations)
-$sql = "SELECT COUNT(DISTINCT CONCAT(user_id, '-', book_id)) as total FROM quiz_attempts WHERE score_percentage >= 70";
-$result = $conn->query($sql);
-$stats['books_read'] = $result->fetch_assoc()['total'];
-
-// Active readers (students who completed at least one quiz)
-$sql = "SELECT COUNT(DISTINCT user_id) as total FROM quiz_attempts";
-$result = $conn->query($sql);
-$stats['active_readers'] = $result->fetch_assoc()['total'];
-
-// Total books available
-$sql = "SELECT COUNT(*) as total FROM books";
-$result = $conn->query($sql);
-$stats['books_available'] = $result->fetch_assoc()['total'];
-
-// Average quiz score
-$sql = "SELECT AVG(score_percentage) as avg_score FROM quiz_attempts";
-$result = $conn->query($sql);
-$stats['average_score'] = round($result->fetch_assoc()['avg_score'], 1);
-
-// Total quizzes taken
-$sql = "SELECT COUNT(*) as total FROM quiz_attempts";
-$result = $conn->query($sql);
-$stats['total_quizzes'] = $result->fetch_assoc()['total'];
-
-// Pen rewards (10 books)
-$sql = "SELECT COUNT(*) as total FROM user_rewards WHERE reward_id = 1";
-$result = $conn->query($sql);
-$stats['pens_given'] = $result->fetch_assoc()['total'];
-
-// Notebook rewards (25 books)
-$sql = "SELECT COUNT(*) as total FROM user_rewards WHERE reward_id = 2";
-$result = $conn->query($sql);
-$stats['notebooks_given'] = $result->fetch_assoc()['total'];
+// Fetch system statistics (precomputed, see dashboard-stats-helper.php)
+$stats = get_dashboard_stats($conn);
 
 // Recent activity
 $sql = "SELECT 
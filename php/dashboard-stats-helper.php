@@ -0,0 +1,80 @@
+<?php
+/**
+ * Dashboard Statistics Helper
+ * Reads the running aggregates kept by the 0002/0003 migrations
+ * (library-opencv-app/migrations) instead of scanning quiz_attempts
+ * and user_rewards on every page load.
+ */
+
+function fetch_single_value($conn, $sql, $column = 'total') {
+    $result = $conn->query($sql);
+    return $result ? $result->fetch_assoc()[$column] : 0;
+}
+
+function get_precomputed_dashboard_stats($conn) {
+    try {
+        $result = $conn->query("SELECT * FROM dashboard_stats WHERE stats_id = 1");
+        $row = $result ? $result->fetch_assoc() : null;
+        if (!$row) {
+            return null;
+        }
+
+        $rewards = [];
+        $result = $conn->query("SELECT reward_id, earned FROM reward_stats WHERE reward_id IN (1, 2)");
+        while ($result && $reward = $result->fetch_assoc()) {
+            $rewards[$reward['reward_id']] = (int)$reward['earned'];
+        }
+    } catch (Exception $e) {
+        // Stats tables not migrated yet
+        return null;
+    }
+
+    $attempts = (int)$row['total_attempts'];
+    return [
+        'total_students' => (int)$row['active_students'],
+        'books_read' => (int)$row['passed_pairs'],
+        'active_readers' => (int)$row['active_readers'],
+        'books_available' => (int)$row['total_books'],
+        'average_score' => $attempts > 0 ? round($row['score_sum'] / $attempts, 1) : 0,
+        'total_quizzes' => $attempts,
+        'pens_given' => $rewards[1] ?? 0,
+        'notebooks_given' => $rewards[2] ?? 0,
+    ];
+}
+
+function get_live_dashboard_stats($conn) {
+    $stats = [];
+
+    // Total students
+    $stats['total_students'] = fetch_single_value($conn,
+        "SELECT COUNT(*) as total FROM users WHERE user_type = 'student' AND status = 'active'");
+
+    // Total books read (unique book-student combinations)
+    $stats['books_read'] = fetch_single_value($conn,
+        "SELECT COUNT(DISTINCT user_id, book_id) as total FROM quiz_attempts WHERE score_percentage >= 70");
+
+    // Active readers (students who completed at least one quiz)
+    $stats['active_readers'] = fetch_single_value($conn, "SELECT COUNT(DISTINCT user_id) as total FROM quiz_attempts");
+
+    // Total books available
+    $stats['books_available'] = fetch_single_value($conn, "SELECT COUNT(*) as total FROM books");
+
+    // Average quiz score
+    $stats['average_score'] = round(fetch_single_value($conn,
+        "SELECT AVG(score_percentage) as avg_score FROM quiz_attempts", 'avg_score'), 1);
+
+    // Total quizzes taken
+    $stats['total_quizzes'] = fetch_single_value($conn, "SELECT COUNT(*) as total FROM quiz_attempts");
+
+    // Pen rewards (10 books) and notebook rewards (25 books)
+    $stats['pens_given'] = fetch_single_value($conn, "SELECT COUNT(*) as total FROM user_rewards WHERE reward_id = 1");
+    $stats['notebooks_given'] = fetch_single_value($conn,
+        "SELECT COUNT(*) as total FROM user_rewards WHERE reward_id = 2");
+
+    return $stats;
+}
+
+function get_dashboard_stats($conn) {
+    return get_precomputed_dashboard_stats($conn) ?? get_live_dashboard_stats($conn);
+}
+?>
@@ -1,5 +1,6 @@
 <?php
 require_once 'config.php';
+require_once 'qr-code-helper.php';
 
 // Check if user is logged in as librarian
 check_user_type(['librarian']);
@@ -45,29 +46,19 @@ if ($_SERVER['REQUEST_METHOD'] == 'POST' && isset($_POST['add_book'])) {
                 $qr_code_path = "qr_codes/{$qr_code}.png";
                 $qr_file_path = __DIR__ . '/../' . $qr_code_path;
                 
-                // Find Python executable
-                $python_paths = [
-                    'python',      // Try 'python' command first
-                    'python3',     // Try 'python3' for Unix systems
-                    'C:\\Python312\\python.exe',
-                    'C:\\Python311\\python.exe',
-                    'C:\\Python310\\python.exe',
-                    'C:\\Python39\\python.exe',
-                    'C:\\Users\\' . get_current_user() . '\\AppData\\Local\\Programs\\Python\\Python312\\python.exe',
-                    'C:\\Users\\' . get_current_user() . '\\AppData\\Local\\Programs\\Python\\Python311\\python.exe',
-                ];
+                $qr_generated = false;
                 
-                $python_cmd = null;
-                foreach ($python_paths as $path) {
-                    $test_output = shell_exec("\"$path\" --version 2>&1");
-                    if ($test_output && stripos($test_output, 'python') !== false) {
-                        $python_cmd = $path;
-                        break;
-                    }
+                // Try the long-running QR daemon first (no interpreter startup)
+                $daemon_results = generateQRCodesViaDaemon([$qr_code]);
+                if ($daemon_results && $daemon_results[0]['status'] !== 'error'
+                        && file_exists($qr_file_path) && filesize($qr_file_path) > 0) {
+                    $qr_generated = true;
+                    $qr_method = "Python (QR daemon)";
                 }
                 
+                // Otherwise run the script once (Python path is cached between requests)
+                $python_cmd = $qr_generated ? null : findPythonExecutable();
                 $python_script = __DIR__ . '/../generate_single_qr.py';
-                $qr_generated = false;
                 
                 if ($python_cmd) {
                     // Try Python script
@@ -485,7 +476,7 @@ $stats['currently_borrowed'] = 0;
 $stats['borrowed_today'] = 0;
 
 // Quizzes completed
-$sql = "SELECT COUNT(*) as total FROM quiz_attempts WHERE DATE(attempt_date) = CURDATE()";
+$sql = "SELECT COUNT(*) as total FROM quiz_attempts WHERE attempt_date >= CURDATE() AND attempt_date < CURDATE() + INTERVAL 1 DAY";
 $result = $conn->query($sql);
 $stats['quizzes_today'] = $result->fetch_assoc()['total'];
 
@@ -4,6 +4,11 @@
  * Generates QR code images for books
  */
 
+// Local QR generation daemon (must match QR_DAEMON_PORT in generate_single_qr.py)
+if (!defined('QR_DAEMON_URL')) {
+    define('QR_DAEMON_URL', 'http://127.0.0.1:8765');
+}
+
 function generateQRCode($qr_code_text, $size = 300) {
     try {
         // Create qr_codes directory if it doesn't exist
@@ -63,6 +68,82 @@ function generateQRCode($qr_code_text, $size = 300) {
     }
 }
 
+/**
+ * Generate QR codes through the long-running Python daemon
+ * (python generate_single_qr.py --serve), which keeps the encoder loaded
+ * and writes into qr_codes/. Returns one result per code, or null when
+ * the daemon is not running so callers can fall back to a subprocess.
+ */
+function generateQRCodesViaDaemon(array $qr_code_texts, $timeout = 5) {
+    $codes = [];
+    foreach ($qr_code_texts as $qr_code_text) {
+        $codes[] = ['qr_code' => $qr_code_text, 'output_path' => $qr_code_text . '.png'];
+    }
+    
+    $context = stream_context_create([
+        'http' => [
+            'method' => 'POST',
+            'header' => "Content-Type: application/json\r\n",
+            'content' => json_encode(['codes' => $codes]),
+            'timeout' => $timeout,
+        ]
+    ]);
+    
+    $response = @file_get_contents(QR_DAEMON_URL . '/generate', false, $context);
+    if ($response === false) {
+        return null;
+    }
+    
+    $data = json_decode($response, true);
+    return $data['results'] ?? null;
+}
+
+/**
+ * Find a working Python executable
+ * The answer is kept for the rest of the request, and in APCu when it is
+ * available, so the candidates are not probed with --version every time.
+ * Only entries of the allow-list below are ever returned.
+ */
+function findPythonExecutable() {
+    static $found = null;
+    if ($found !== null) {
+        return $found ?: null;
+    }
+    
+    $python_paths = [
+        'python',      // Try 'python' command first
+        'python3',     // Try 'python3' for Unix systems
+        'C:\\Python312\\python.exe',
+        'C:\\Python311\\python.exe',
+        'C:\\Python310\\python.exe',
+        'C:\\Python39\\python.exe',
+        'C:\\Users\\' . get_current_user() . '\\AppData\\Local\\Programs\\Python\\Python312\\python.exe',
+        'C:\\Users\\' . get_current_user() . '\\AppData\\Local\\Programs\\Python\\Python311\\python.exe',
+    ];
+    
+    $use_apcu = function_exists('apcu_fetch') && ini_get('apc.enabled');
+    if ($use_apcu) {
+        $cached = apcu_fetch('library_qr_python_path', $hit);
+        if ($hit && in_array($cached, $python_paths, true)
+                && (strpos($cached, '\\') === false || file_exists($cached))) {
+            return $found = $cached;
+        }
+    }
+    
+    foreach ($python_paths as $path) {
+        $test_output = shell_exec("\"$path\" --version 2>&1");
+        if ($test_output && stripos($test_output, 'python') !== false) {
+            if ($use_apcu) {
+                apcu_store('library_qr_python_path', $path, 3600);
+            }
+            return $found = $path;
+        }
+    }
+    
+    $found = false;
+    return null;
+}
+
 /**
  * Check if QR code image exists
  */
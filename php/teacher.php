@@ -1,26 +1,13 @@
 <?php
 require_once 'config.php';
+require_once 'dashboard-stats-helper.php';
 
 // Check if user is logged in as teacher
 check_user_type(['teacher']);
 
-// Fetch statistics
-$stats = [];
-
-// Total students in system (teachers can see all)
-$sql = "SELECT COUNT(*) as total FROM users WHERE user_type = 'student' AND status = 'active'";
-$result = $conn->query($sql);
-$stats['total_students'] = $result->fetch_assoc()['total'];
-
-// Average quiz score
-$sql = "SELECT AVG(score_percentage) as avg_score FROM quiz_attempts";
-$result = $conn->query($sql);
-$stats['average_score'] = round($result->fetch_assoc()['avg_score'], 1);
-
-// Total books read
-$sql = "SELECT COUNT(DISTINCT CONCAT(user_id, '-', book_id)) as total FROM quiz_attempts WHERE score_percentage >= 70";
-$result = $conn->query($sql);
-$stats['total_books_read'] = $result->fetch_assoc()['total'];
+// Fetch statistics (precomputed, see dashboard-stats-helper.php)
+$stats = get_dashboard_stats($conn);
+$stats['total_books_read'] = $stats['books_read'];
 
 // Average books per student
 $stats['avg_books_per_student'] = $stats['total_students'] > 0 ? 
@@ -0,0 +1,167 @@
+"""
+QR Code Image Cache
+Manifest-backed, content-addressed cache so unchanged QR codes are not
+re-rendered by qr_code_generator.py or generate_single_qr.py
+
+Deliberately imports neither qrcode nor PIL, so a cache hit costs only
+a JSON read and an os.stat().
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+MANIFEST_NAME = ".qr_manifest.json"  # Stored inside the output folder
+MANIFEST_VERSION = 2  # 2: compact 1-bit PNG output (qr_render.py)
+
+
+@contextmanager
+def atomic_output(path, mode="wb"):
+    """
+    Open a temp file next to `path` and rename it over `path` on success
+
+    Readers (the web server, other processes) never see a partial file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp uses 0600; the web server must read it
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def make_key(payload, error_correction="H", box_size=10, border=4, output_format="png"):
+    """
+    Build the cache key for one rendered QR code
+
+    Every input that changes the output bytes is part of the key.
+
+    Returns:
+        str: sha256 hex digest
+    """
+    material = json.dumps(
+        [MANIFEST_VERSION, payload, error_correction, box_size, border, output_format],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path, block_size=64 * 1024):
+    """Hash a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# =======================================================
+# CACHE CLASS
+# =======================================================
+class QRCache:
+    """
+    Manifest of rendered QR images in one output folder
+
+    Each entry maps a file name to its cache key, the sha256 of the file
+    and the size/mtime it had when recorded. is_fresh() compares only the
+    key and os.stat() results (O(1) per code); verify() re-hashes files
+    to catch edits that preserved size and mtime.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get("version") == MANIFEST_VERSION:
+            self.entries = manifest.get("entries", {})
+
+    def _name(self, path):
+        return os.path.relpath(path, self.folder).replace(os.sep, "/")
+
+    def is_fresh(self, path, key):
+        """
+        True if `path` was produced from `key` and has not changed since
+
+        Args:
+            path (str): Output file path
+            key (str): Result of make_key()
+        """
+        entry = self.entries.get(self._name(path))
+        fresh = False
+        if entry is not None and entry.get("key") == key:
+            try:
+                stat = os.stat(path)
+                fresh = stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+            except OSError:
+                fresh = False
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def record(self, path, key):
+        """Remember that `path` now holds the output for `key`"""
+        stat = os.stat(path)
+        self.entries[self._name(path)] = {
+            "key": key,
+            "sha256": file_sha256(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        self.dirty = True
+
+    def forget(self, path):
+        if self.entries.pop(self._name(path), None) is not None:
+            self.dirty = True
+
+    def verify(self):
+        """
+        Re-hash every recorded file
+
+        Returns:
+            list: File names whose contents no longer match the manifest
+        """
+        stale = []
+        for name, entry in list(self.entries.items()):
+            path = os.path.join(self.folder, name)
+            if not os.path.exists(path) or file_sha256(path) != entry["sha256"]:
+                stale.append(name)
+                del self.entries[name]
+                self.dirty = True
+        return stale
+
+    def save(self):
+        """
+        Write the manifest atomically (no-op when nothing changed)
+
+        Concurrent writers (e.g. several PHP requests) may overwrite each
+        other's entries; a lost entry only costs one re-render later.
+        """
+        if not self.dirty:
+            return
+        with atomic_output(self.path, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f,
+                      indent=1, sort_keys=True)
+        self.dirty = False
@@ -6,8 +6,15 @@ Library Hub of Tambo, Lipa City
 This script generates QR codes for all books in the database
 """
 
-import qrcode
 import os
+import csv
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from qr_cache import QRCache, atomic_output, make_key
+from qr_render import EXTENSIONS, FORMATS, render_bytes
 
 # =======================================================
 # CONFIGURATION
@@ -15,6 +22,9 @@ import os
 OUTPUT_FOLDER = "qr_codes"
 QR_SIZE = 10  # Size of QR code boxes
 QR_BORDER = 4  # Border size
+QR_ERROR_CORRECTION = "H"  # High error correction (see qr_render.py)
+QR_OUTPUT_FORMAT = "png"  # "png" (1-bit, max compression) or "svg"
+BULK_CHUNK_SIZE = 50  # Codes per worker task in bulk mode
 
 # Create directory for QR codes if it doesn't exist
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
@@ -88,41 +98,74 @@ books_data = [
 # =======================================================
 # FUNCTION: Generate QR Code
 # =======================================================
-def generate_qr_code(data, filename):
+def render_qr_bytes(data, output_format=QR_OUTPUT_FORMAT):
     """
-    Generate a QR code image
+    Render the QR code for `data` in memory as PNG or SVG bytes
     
     Args:
         data (str): Data to encode in QR code
-        filename (str): Name of output file
+        output_format (str): "png" or "svg"
+    """
+    return render_bytes(data, output_format, QR_ERROR_CORRECTION, QR_SIZE, QR_BORDER)
+
+def qr_filename(folder, qr_code, output_format=QR_OUTPUT_FORMAT):
+    """
+    Output path for `qr_code` in `folder` (extension follows the format)
+    """
+    return os.path.join(folder, qr_code + EXTENSIONS[output_format])
+
+def save_bytes_atomic(data, filename):
     """
-    # Create QR code instance
-    qr = qrcode.QRCode(
-        version=1,  # Controls size (1 is smallest)
-        error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction
-        box_size=QR_SIZE,
-        border=QR_BORDER,
-    )
+    Write bytes via a temp file + rename so readers never see a partial file
+    """
+    with atomic_output(filename) as f:
+        f.write(data)
+    return filename
+
+def qr_cache_key(data, output_format=QR_OUTPUT_FORMAT):
+    """
+    Cache key for `data` rendered with the current settings
+    """
+    return make_key(data, QR_ERROR_CORRECTION, QR_SIZE, QR_BORDER, output_format)
+
+def generate_qr_code(data, filename, cache=None, output_format=QR_OUTPUT_FORMAT):
+    """
+    Generate a QR code image
     
-    # Add data to QR code
-    qr.add_data(data)
-    qr.make(fit=True)
+    Args:
+        data (str): Data to encode in QR code
+        filename (str): Name of output file
+        cache (QRCache): Skip rendering if the file is already up to date
+        output_format (str): "png" or "svg"
     
-    # Create image
-    img = qr.make_image(fill_color="black", back_color="white")
+    Returns:
+        str: The output file path
+    """
+    key = qr_cache_key(data, output_format)
+    if cache is not None and cache.is_fresh(filename, key):
+        print(f"⏭️  Unchanged: {filename}")
+        return filename
     
     # Save image
-    img.save(filename)
+    save_bytes_atomic(render_qr_bytes(data, output_format), filename)
+    if cache is not None:
+        cache.record(filename, key)
     
     print(f"✅ Generated: {filename}")
+    return filename
 
 # =======================================================
 # FUNCTION: Generate All QR Codes
 # =======================================================
-def generate_all_qr_codes():
+def generate_all_qr_codes(use_cache=True, output_format=QR_OUTPUT_FORMAT):
     """
     Generate QR codes for all books in the database
+    
+    Args:
+        use_cache (bool): Skip codes whose image is already up to date
+        output_format (str): "png" or "svg"
     """
+    cache = QRCache(OUTPUT_FOLDER) if use_cache else None
     print("📚 Library Hub QR Code Generator")
     print("=" * 50)
     print(f"Generating QR codes for {len(books_data)} books...\n")
@@ -134,15 +177,20 @@ def generate_all_qr_codes():
         author = book['author']
         
         # Generate QR code with just the QR code identifier
-        filename = f"{OUTPUT_FOLDER}/{qr_code}.png"
-        generate_qr_code(qr_code, filename)
+        filename = qr_filename(OUTPUT_FOLDER, qr_code, output_format)
+        generate_qr_code(qr_code, filename, cache, output_format)
         
         print(f"   Book: {title}")
         print(f"   Author: {author}")
         print(f"   QR Code: {qr_code}\n")
 
+    if cache is not None:
+        cache.save()
+    
     print("=" * 50)
     print(f"✅ Successfully generated {len(books_data)} QR codes!")
+    if cache is not None:
+        print(f"⏭️  {cache.hits} unchanged codes skipped")
     print(f"📁 QR codes saved in: {OUTPUT_FOLDER}/")
     print("\n📋 QR Code List:")
     for book in books_data:
@@ -151,7 +199,7 @@ def generate_all_qr_codes():
 # =======================================================
 # FUNCTION: Generate SQL Update Statements
 # =======================================================
-def generate_sql_updates():
+def generate_sql_updates(output_format=QR_OUTPUT_FORMAT):
     """
     Generate SQL UPDATE statements for database
     """
@@ -163,7 +211,7 @@ def generate_sql_updates():
     for book in books_data:
         qr_code = book["qr_code"]
         book_id = book["book_id"]
-        qr_path = f"qr_codes/{qr_code}.png"
+        qr_path = f"qr_codes/{qr_code}{EXTENSIONS[output_format]}"
         
         sql = f"UPDATE books SET qr_code_path = '{qr_path}' WHERE book_id = {book_id};"
         print(sql)
@@ -173,7 +221,7 @@ def generate_sql_updates():
 # =======================================================
 # FUNCTION: Generate HTML Display Code
 # =======================================================
-def generate_html_display():
+def generate_html_display(output_format=QR_OUTPUT_FORMAT):
     """
     Generate HTML code to display QR codes
     """
@@ -190,7 +238,7 @@ def generate_html_display():
         author = book["author"]
         
         html += f'''    <div class="qr-card">
-        <img src="qr_codes/{qr_code}.png" alt="{title} QR Code">
+        <img src="qr_codes/{qr_code}{EXTENSIONS[output_format]}" alt="{title} QR Code">
         <h3>{title}</h3>
         <p>by {author}</p>
         <p><strong>QR Code: {qr_code}</strong></p>
@@ -201,18 +249,171 @@ def generate_html_display():
     print(html)
     print("\n" + "=" * 60)
 
+# =======================================================
+# FUNCTION: Load Books from CSV / Database Export
+# =======================================================
+def load_books_file(path):
+    """
+    Load books from a CSV file or a tab-separated MySQL export
+    
+    The file needs a header row with at least a `qr_code` column;
+    `book_id`, `title` and `author` are used when present. A matching
+    export can be produced with:
+        mysql -B -e "SELECT book_id, qr_code, title, author FROM books" \
+              library_reading_system > books.tsv
+    
+    Args:
+        path (str): Path to the .csv or .tsv file
+    
+    Returns:
+        list: Book dicts in the same shape as books_data
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        first_line = f.readline()
+        f.seek(0)
+        delimiter = "\t" if "\t" in first_line else ","
+        reader = csv.DictReader(f, delimiter=delimiter)
+        books = []
+        for row in reader:
+            qr_code = (row.get("qr_code") or "").strip()
+            if not qr_code:
+                continue
+            books.append({
+                "qr_code": qr_code,
+                "book_id": (row.get("book_id") or "").strip(),
+                "title": (row.get("title") or "").strip(),
+                "author": (row.get("author") or "").strip(),
+            })
+    return books
+
+# =======================================================
+# FUNCTION: Bulk Generation (Process Pool)
+# =======================================================
+def _generate_chunk(qr_codes, output_folder, output_format=QR_OUTPUT_FORMAT):
+    """
+    Worker task: render and atomically save a chunk of QR codes
+    
+    Returns:
+        list: (qr_code, file_path, seconds, error) per item
+    """
+    results = []
+    for qr_code in qr_codes:
+        filename = qr_filename(output_folder, qr_code, output_format)
+        start = time.perf_counter()
+        try:
+            save_bytes_atomic(render_qr_bytes(qr_code, output_format), filename)
+            error = None
+        except Exception as e:
+            error = str(e)
+        results.append((qr_code, filename, time.perf_counter() - start, error))
+    return results
+
+def generate_bulk(books, output_folder=OUTPUT_FOLDER, workers=None, chunk_size=BULK_CHUNK_SIZE,
+                  use_cache=True, output_format=QR_OUTPUT_FORMAT):
+    """
+    Generate QR codes for many books across a process pool
+    
+    Args:
+        books (list): Book dicts with a `qr_code` key
+        output_folder (str): Directory for the image files
+        workers (int): Number of processes (default: CPU count)
+        chunk_size (int): Codes per worker task
+        use_cache (bool): Skip codes whose image is already up to date
+        output_format (str): "png" or "svg"
+    
+    Returns:
+        list: Result dicts with qr_code, path, seconds and error
+              (unchanged codes are not included)
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    qr_codes = [book["qr_code"] for book in books]
+    
+    # Drop up-to-date codes before paying for any worker processes
+    cache = QRCache(output_folder) if use_cache else None
+    if cache is not None:
+        qr_codes = [
+            code for code in qr_codes
+            if not cache.is_fresh(qr_filename(output_folder, code, output_format),
+                                  qr_cache_key(code, output_format))
+        ]
+        if cache.hits:
+            print(f"⏭️  {cache.hits} unchanged codes skipped")
+    
+    chunks = [qr_codes[i:i + chunk_size] for i in range(0, len(qr_codes), chunk_size)]
+    
+    print("📚 Library Hub QR Code Generator - Bulk Mode")
+    print("=" * 50)
+    print(f"Generating {len(qr_codes)} QR codes in {len(chunks)} chunks...\n")
+    
+    results = []
+    start = time.perf_counter()
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_generate_chunk, chunk, output_folder, output_format) for chunk in chunks]
+            for future in as_completed(futures):
+                for qr_code, path, seconds, error in future.result():
+                    results.append({"qr_code": qr_code, "path": path, "seconds": seconds, "error": error})
+                    if cache is not None and not error:
+                        cache.record(path, qr_cache_key(qr_code, output_format))
+                print(f"   ⏳ {len(results)}/{len(qr_codes)} done")
+    if cache is not None:
+        cache.save()
+    elapsed = time.perf_counter() - start
+    
+    failures = [r for r in results if r["error"]]
+    print("\n" + "=" * 50)
+    print(f"✅ Generated {len(results) - len(failures)} QR codes in {elapsed:.2f}s "
+          f"({len(results) / elapsed if elapsed else 0:.0f} codes/s)")
+    if results:
+        slowest = max(results, key=lambda r: r["seconds"])
+        average = sum(r["seconds"] for r in results) / len(results)
+        print(f"   Per code: avg {average * 1000:.1f} ms, slowest {slowest['qr_code']} "
+              f"{slowest['seconds'] * 1000:.1f} ms")
+    for failure in failures:
+        print(f"❌ {failure['qr_code']}: {failure['error']}")
+    print(f"📁 QR codes saved in: {output_folder}/")
+    return results
+
+def write_bulk_report(results, path):
+    """
+    Write per-item timings and errors from generate_bulk() to a CSV file
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["qr_code", "path", "seconds", "error"])
+        writer.writeheader()
+        writer.writerows(results)
+
 # =================================================
 # MAIN EXECUTION
 # =======================================================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Library Hub QR code generator")
+    parser.add_argument("--books", help="CSV or TSV export of the books table (bulk mode)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for bulk mode")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--report", help="Write per-item timings to this CSV file")
+    parser.add_argument("--force", action="store_true", help="Re-render even unchanged codes")
+    parser.add_argument("--format", choices=FORMATS, default=QR_OUTPUT_FORMAT,
+                        help="Output format: 1-bit PNG or SVG")
+    args = parser.parse_args()
+    
+    if args.books:
+        books_data = load_books_file(args.books)
+        results = generate_bulk(books_data, OUTPUT_FOLDER, args.workers, args.chunk_size,
+                                use_cache=not args.force, output_format=args.format)
+        if args.report:
+            write_bulk_report(results, args.report)
+            print(f"📋 Report written to: {args.report}")
+        sys.exit(1 if any(r["error"] for r in results) else 0)
+    
     # Generate all QR codes
-    generate_all_qr_codes()
+    generate_all_qr_codes(use_cache=not args.force, output_format=args.format)
     
     # Generate SQL update statements
-    generate_sql_updates()
+    generate_sql_updates(args.format)
     
     # Generate HTML display code
-    generate_html_display()
+    generate_html_display(args.format)
     
     print("\n✅ All tasks completed successfully!")
     print(f"📁 QR codes saved in: {os.path.abspath(OUTPUT_FOLDER)}")
@@ -231,7 +432,7 @@ def generate_single_qr(qr_code_text, title="Custom"):
         generate_single_qr("QR006", "New Book Title")
     """
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-    filename = f"{qr_code_text}.png"
+    filename = os.path.join(OUTPUT_FOLDER, f"{qr_code_text}.png")
     file_path = generate_qr_code(qr_code_text, filename)
     print(f"✅ Generated single QR code: {file_path}")
     return file_path
@@ -245,7 +446,7 @@ def generate_qr_batch(qr_codes_list):
     """
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
     for qr_code in qr_codes_list:
-        filename = f"{qr_code}.png"
+        filename = os.path.join(OUTPUT_FOLDER, f"{qr_code}.png")
         file_path = generate_qr_code(qr_code, filename)
         print(f"✅ Generated: {file_path}")
     print(f"\n✅ Batch complete - {len(qr_codes_list)} codes generated")
@@ -279,7 +480,23 @@ HOW TO USE THIS SCRIPT:
    - Use HTML code provided to display them
    - Or use: <img src="qr_codes/QR001.png" alt="Book QR">
 
-6. ADDING NEW BOOKS:
+6. BULK GENERATION FROM THE DATABASE:
+   - Export the books table:
+     mysql -B -e "SELECT book_id, qr_code, title, author FROM books" library_reading_system > books.tsv
+   - Generate in parallel:
+     python qr_code_generator.py --books books.tsv --report qr_report.csv
+
+   OUTPUT FORMATS:
+   - Default is a 1-bit PNG at maximum compression
+   - --format svg writes scalable SVG files for printed labels
+   - render_qr_bytes("QR001", "svg") returns the file contents without
+     touching disk
+
+7. PRINTING LABELS:
+   - One PDF of Avery-style label sheets with title/author captions:
+     python qr_label_sheet.py --books books.tsv --layout avery5160 --output labels.pdf
+
+8. ADDING NEW BOOKS:
    - Add new entry to books_data list
    - Run script again
    - Update database with new SQL statements
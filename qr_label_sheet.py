@@ -0,0 +1,369 @@
+"""
+=======================================================
+QR LABEL SHEET COMPOSITOR
+Library Hub of Tambo, Lipa City
+=======================================================
+Lays book QR codes out on printable label sheets (Avery-style grids)
+with title/author captions, in a single pass over the books
+
+Usage:
+    python qr_label_sheet.py [--books books.tsv] [--layout avery5160] [--output labels.pdf]
+    python qr_label_sheet.py --output labels.png        (one PNG per page)
+
+QR matrices are drawn straight into one preallocated page canvas that is
+reused for every page, and PDF pages are written to disk as soon as they
+are full, so memory stays at one page regardless of the number of books.
+No per-code image files are created.
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+from collections import namedtuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from qr_render import qr_matrix
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+DPI = 300
+LABEL_QR_BORDER = 2  # Quiet zone in modules; the label edge adds more white
+LABEL_PADDING = 0.06  # Inches between the label edge and its contents
+FONT_CANDIDATES = ["DejaVuSans.ttf", "arial.ttf", "Arial.ttf"]
+
+# All dimensions in inches; caption is "right" (wide labels) or "below"
+LabelLayout = namedtuple("LabelLayout", [
+    "page_width", "page_height", "columns", "rows",
+    "label_width", "label_height", "top", "left", "column_gap", "row_gap", "caption",
+])
+
+MM = 1 / 25.4
+LAYOUTS = {
+    # Letter, 30 address labels 1" x 2-5/8"
+    "avery5160": LabelLayout(8.5, 11, 3, 10, 2.625, 1.0, 0.5, 0.1875, 0.125, 0.0, "right"),
+    # Letter, 10 shipping labels 2" x 4"
+    "avery5163": LabelLayout(8.5, 11, 2, 5, 4.0, 2.0, 0.5, 0.156, 0.188, 0.0, "right"),
+    # A4, 21 labels 63.5 x 38.1 mm
+    "l7160": LabelLayout(210 * MM, 297 * MM, 3, 7, 63.5 * MM, 38.1 * MM,
+                         15.15 * MM, 7.2 * MM, 2.5 * MM, 0.0, "right"),
+    # Letter, 20 square 2" labels with the caption under the code
+    "square2": LabelLayout(8.5, 11, 4, 5, 2.0, 2.0, 0.5, 0.25, 0.0, 0.0, "below"),
+}
+
+
+def load_font(size):
+    """Load a scalable TrueType font, falling back to Pillow's bundled font"""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def label_matrix(qr_code):
+    """QR module matrix for one label (module level function so it pickles)"""
+    return qr_matrix(qr_code, border=LABEL_QR_BORDER)
+
+
+def iter_encoded(books, batch_size, workers=1):
+    """
+    Yield (book, matrix) pairs, encoding in a process pool when workers > 1
+
+    Books are consumed `batch_size` at a time so a generator of any length
+    is never materialized.
+    """
+    if workers <= 1:
+        for book in books:
+            yield book, label_matrix(book["qr_code"])
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import islice
+
+    books = iter(books)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(books, batch_size))
+            if not batch:
+                break
+            codes = [book["qr_code"] for book in batch]
+            chunk = max(len(batch) // (workers * 4), 1)
+            yield from zip(batch, executor.map(label_matrix, codes, chunksize=chunk))
+
+
+# =======================================================
+# CLASS: Streaming PDF writer
+# =======================================================
+class PDFStreamWriter:
+    """
+    Minimal PDF writer: one full-page 1-bit image per page
+
+    Each page is written (Flate-compressed) as soon as it is added; only
+    object offsets are kept in memory until close() writes the page tree
+    and cross-reference table.
+    """
+
+    def __init__(self, fileobj):
+        self.file = fileobj
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._next_id = 3  # 1 = catalog, 2 = page tree (written on close)
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def _object(self, object_id, body, stream=None):
+        self.offsets[object_id] = self.position
+        self._write(b"%d 0 obj\n" % object_id + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_page(self, image, width_pt, height_pt):
+        """
+        Append a page showing `image` (mode "1") scaled to the page size
+
+        Args:
+            image (PIL.Image): Page bitmap
+            width_pt (float): Page width in PostScript points
+            height_pt (float): Page height in PostScript points
+        """
+        page_id, content_id, image_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+
+        pixels = zlib.compress(image.tobytes(), 6)
+        self._object(image_id, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                     b"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode "
+                     b"/Length %d >>" % (image.width, image.height, len(pixels)), pixels)
+
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (width_pt, height_pt)
+        self._object(content_id, b"<< /Length %d >>" % len(content), content)
+
+        self._object(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                     b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                     % (width_pt, height_pt, image_id, content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        """Write the page tree, catalog, xref table and trailer"""
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_position = self.position
+        count = self._next_id
+        lines = [b"xref\n0 %d\n" % count, b"0000000000 65535 f \n"]
+        for object_id in range(1, count):
+            lines.append(b"%010d 00000 n \n" % self.offsets[object_id])
+        self._write(b"".join(lines))
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (count, xref_position))
+
+
+# =======================================================
+# CLASS: Label sheet compositor
+# =======================================================
+class LabelSheet:
+    """
+    Draws labels into one reusable page canvas
+
+    Call add(book) for each book; `on_page(image, page_number)` is called
+    with the canvas whenever a page is full and once more from finish()
+    for the last partial page.
+    """
+
+    def __init__(self, layout, on_page, dpi=DPI):
+        self.layout = layout
+        self.on_page = on_page
+        self.dpi = dpi
+        self.page = Image.new("L", (self._px(layout.page_width), self._px(layout.page_height)), 255)
+        self.draw = ImageDraw.Draw(self.page)
+        self.per_page = layout.columns * layout.rows
+        self.slot = 0
+        self.pages = 0
+        self.labels = 0
+
+        padding = self._px(LABEL_PADDING)
+        label_w, label_h = self._px(layout.label_width), self._px(layout.label_height)
+        if layout.caption == "right":
+            self.qr_size = min(label_h, label_w // 2) - 2 * padding
+            self.text_box = (self.qr_size + 2 * padding, padding, label_w - padding, label_h - padding)
+        else:
+            self.qr_size = min(label_w, int(label_h * 0.72)) - 2 * padding
+            self.text_box = (padding, self.qr_size + 2 * padding, label_w - padding, label_h - padding)
+        self.padding = padding
+
+        line_height = (self.text_box[3] - self.text_box[1]) // 3
+        self.title_font = load_font(max(int(line_height * 0.75), 8))
+        self.body_font = load_font(max(int(line_height * 0.6), 7))
+
+    def _px(self, inches):
+        return int(round(inches * self.dpi))
+
+    def _origin(self, slot):
+        layout = self.layout
+        column, row = slot % layout.columns, slot // layout.columns
+        x = layout.left + column * (layout.label_width + layout.column_gap)
+        y = layout.top + row * (layout.label_height + layout.row_gap)
+        return self._px(x), self._px(y)
+
+    def _fit(self, text, font, width):
+        """Truncate `text` with an ellipsis so it fits `width` pixels"""
+        if self.draw.textlength(text, font=font) <= width:
+            return text
+        # Binary search for the longest prefix that fits with the ellipsis
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.draw.textlength(text[:middle] + "…", font=font) <= width:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + "…"
+
+    def _draw_qr(self, matrix, x, y):
+        modules = len(matrix)
+        scale = max(self.qr_size // modules, 1)
+        pixels = bytes(0 if dark else 255 for row in matrix for dark in row)
+        code = Image.frombytes("L", (modules, modules), pixels)
+        code = code.resize((modules * scale, modules * scale), Image.NEAREST)
+        # Centre the code in its square when the module size rounds down
+        offset = (self.qr_size - modules * scale) // 2
+        self.page.paste(code, (x + self.padding + offset, y + self.padding + offset))
+
+    def add(self, book, matrix=None):
+        """
+        Draw one label
+
+        Args:
+            book (dict): Needs `qr_code`; `title` and `author` become captions
+            matrix (list): Pre-encoded QR matrix (see label_matrix)
+        """
+        x, y = self._origin(self.slot)
+        self._draw_qr(matrix or label_matrix(book["qr_code"]), x, y)
+
+        left, top, right, bottom = self.text_box
+        width = right - left
+        lines = [
+            (book.get("title") or "", self.title_font),
+            (f"by {book['author']}" if book.get("author") else "", self.body_font),
+            (book["qr_code"], self.body_font),
+        ]
+        line_y = y + top
+        step = (bottom - top) // len(lines)
+        for text, font in lines:
+            if text:
+                self.draw.text((x + left, line_y), self._fit(text, font, width), fill=0, font=font)
+            line_y += step
+
+        self.labels += 1
+        self.slot += 1
+        if self.slot == self.per_page:
+            self._flush()
+
+    def _flush(self):
+        self.pages += 1
+        self.on_page(self.page, self.pages)
+        self.page.paste(255, (0, 0, self.page.width, self.page.height))
+        self.slot = 0
+
+    def finish(self):
+        """Emit the last partial page"""
+        if self.slot:
+            self._flush()
+
+
+# =======================================================
+# FUNCTION: Render label sheets
+# =======================================================
+def render_labels(books, output, layout=LAYOUTS["avery5160"], dpi=DPI, workers=1):
+    """
+    Render labels for `books` into a PDF or numbered PNG pages
+
+    Args:
+        books (iterable): Book dicts (may be a generator)
+        output (str): "labels.pdf", or "labels.png" for labels-001.png, ...
+        layout (LabelLayout): Label grid
+        dpi (int): Raster resolution
+        workers (int): Processes for QR encoding (1 = encode in this process)
+
+    Returns:
+        LabelSheet: The finished compositor (for its page/label counts)
+    """
+    width_pt, height_pt = layout.page_width * 72, layout.page_height * 72
+
+    if output.lower().endswith(".pdf"):
+        with open(output, "wb") as f:
+            writer = PDFStreamWriter(f)
+            sheet = LabelSheet(
+                layout,
+                lambda page, number: writer.add_page(page.convert("1", dither=Image.Dither.NONE),
+                                                     width_pt, height_pt),
+                dpi,
+            )
+            for book, matrix in iter_encoded(books, sheet.per_page * 4, workers):
+                sheet.add(book, matrix)
+            sheet.finish()
+            writer.close()
+        return sheet
+
+    stem, extension = os.path.splitext(output)
+
+    def save_png(page, number):
+        page.convert("1", dither=Image.Dither.NONE).save(
+            f"{stem}-{number:03d}{extension}", dpi=(dpi, dpi), optimize=True)
+
+    sheet = LabelSheet(layout, save_png, dpi)
+    for book, matrix in iter_encoded(books, sheet.per_page * 4, workers):
+        sheet.add(book, matrix)
+    sheet.finish()
+    return sheet
+
+
+# =======================================================
+# MAIN EXECUTION
+# =======================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Library Hub QR label sheets")
+    parser.add_argument("--books", help="CSV or TSV export of the books table "
+                                        "(default: books_data in qr_code_generator.py)")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="avery5160")
+    parser.add_argument("--output", default="qr_labels.pdf", help=".pdf, or .png for one file per page")
+    parser.add_argument("--dpi", type=int, default=DPI)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for QR encoding")
+    for field in ["columns", "rows"]:
+        parser.add_argument(f"--{field}", type=int, help=f"Override the layout's {field}")
+    for field in ["label_width", "label_height", "top", "left", "column_gap", "row_gap"]:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, type=float,
+                            help=f"Override the layout's {field.replace('_', ' ')} (inches)")
+    args = parser.parse_args()
+
+    layout = LAYOUTS[args.layout]
+    overrides = {field: getattr(args, field) for field in layout._fields
+                 if getattr(args, field, None) is not None}
+    layout = layout._replace(**overrides)
+
+    from qr_code_generator import books_data, load_books_file
+    books = load_books_file(args.books) if args.books else books_data
+
+    print("🏷️  Library Hub QR Label Sheets")
+    print("=" * 50)
+    start = time.perf_counter()
+    try:
+        sheet = render_labels(books, args.output, layout, args.dpi, args.workers)
+    except OSError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {sheet.labels} labels on {sheet.pages} pages ({args.layout}, {args.dpi} dpi) "
+          f"in {elapsed:.2f}s")
+    print(f"📄 Saved: {args.output}")
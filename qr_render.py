@@ -0,0 +1,128 @@
+"""
+QR Code Output Backends
+Renders a QR code to bytes in memory; callers decide where the bytes go
+
+Formats:
+    png     1-bit PNG, optimized at maximum zlib compression
+    svg     One <path> of run-length encoded rows, scales without blurring
+
+Used by qr_code_generator.py and generate_single_qr.py. qrcode is only
+imported when a code is encoded, and PIL only for PNG output.
+
+library-opencv-app/src/qr/generator.py is a numpy port of the same
+backends for the app, which is deployed without these scripts; the two
+must keep producing identical bytes (tests/test_qr_render.py).
+"""
+
+import io
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+FORMATS = ("png", "svg")
+EXTENSIONS = {"png": ".png", "svg": ".svg"}
+ERROR_CORRECTION_LEVELS = {
+    "L": "ERROR_CORRECT_L",
+    "M": "ERROR_CORRECT_M",
+    "Q": "ERROR_CORRECT_Q",
+    "H": "ERROR_CORRECT_H",
+}
+
+
+def format_for_path(path, default="png"):
+    """
+    Pick the output format from a file extension (.svg -> svg, else default)
+    """
+    for output_format, extension in EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return output_format
+    return default
+
+
+def qr_matrix(data, error_correction="H", border=4):
+    """
+    Encode `data` and return the module matrix (border included)
+
+    Returns:
+        list: Rows of booleans, True for dark modules
+    """
+    import qrcode
+    import qrcode.constants
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, ERROR_CORRECTION_LEVELS[error_correction]),
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def matrix_to_png(matrix, box_size=10):
+    """
+    Render a module matrix as a 1-bit PNG
+
+    The image is built at one pixel per module and scaled with NEAREST,
+    which is much cheaper than drawing each box.
+    """
+    from PIL import Image
+
+    size = len(matrix)
+    # Mode "1": 0 is black, 255 is white
+    pixels = bytes(0 if dark else 255 for row in matrix for dark in row)
+    img = Image.frombytes("L", (size, size), pixels).convert("1")
+    if box_size != 1:
+        img = img.resize((size * box_size, size * box_size), Image.NEAREST)
+    out = io.BytesIO()
+    img.save(out, format="PNG", optimize=True, compress_level=9)
+    return out.getvalue()
+
+
+def matrix_to_svg(matrix, box_size=10):
+    """
+    Render a module matrix as SVG
+
+    Dark modules are merged into horizontal runs and emitted as a single
+    path in module units, so the file size tracks the number of runs
+    rather than the pixel size.
+    """
+    size = len(matrix)
+    commands = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            commands.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    pixels = size * box_size
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(commands)}"/></svg>\n'
+    )
+    return svg.encode("ascii")
+
+
+def render_bytes(data, output_format="png", error_correction="H", box_size=10, border=4):
+    """
+    Render a QR code in memory (nothing is written to disk)
+
+    Args:
+        data (str): Data to encode
+        output_format (str): One of FORMATS
+
+    Returns:
+        bytes: The encoded PNG or SVG file
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown QR output format: {output_format} (expected one of {FORMATS})")
+    matrix = qr_matrix(data, error_correction, border)
+    if output_format == "svg":
+        return matrix_to_svg(matrix, box_size)
+    return matrix_to_png(matrix, box_size)
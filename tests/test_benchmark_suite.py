@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import benchmark_suite
+from benchmark_suite import (CASES, capture_body, compare, load_baseline, run_case,
+                             synthetic_recording)
+from mjpeg_parser import MJPEGDemuxer
+
+RECORDING = synthetic_recording(frames=6)
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_capture_body_parses_back_to_the_recording(self):
+        frames = MJPEGDemuxer().feed(capture_body(RECORDING))
+        self.assertEqual([(bytes(f.data), round(f.timestamp, 6)) for f in frames],
+                         [(jpg, round(timestamp, 6)) for jpg, timestamp in RECORDING])
+
+    def test_every_case_processes_every_frame(self):
+        for name, case in CASES.items():
+            with self.subTest(case=name):
+                self.assertEqual(case(RECORDING)(), len(RECORDING))
+
+    def test_run_case(self):
+        calls = []
+
+        def run():
+            calls.append(1)
+            return 6
+        result = run_case(run, rounds=3)
+        # One warm-up round that is not timed
+        self.assertEqual(len(calls), 4)
+        self.assertEqual((result['rounds'], result['frames']), (3, 6))
+        self.assertLessEqual(result['min_ms'], result['median_ms'])
+
+    def test_compare_against_baseline(self):
+        results = {'parse': {'frames': 6, 'median_ms': 13.0}, 'decode': {'frames': 6, 'median_ms': 9.0},
+                   'scan': {'frames': 6, 'median_ms': 5.0}}
+        baseline = {'recording': 'synthetic',
+                    'results': {'parse': {'frames': 6, 'median_ms': 10.0}, 'decode': {'frames': 6, 'median_ms': 10.0},
+                                'scan': {'frames': 120, 'median_ms': 1.0}}}
+        ratios, regressions = compare(results, baseline, 'synthetic', tolerance=0.25)
+        # Cases run on a different number of frames are not compared
+        self.assertEqual(ratios, {'parse': 1.3, 'decode': 0.9})
+        self.assertEqual(regressions, ['parse'])
+        self.assertEqual(compare(results, baseline, 'capture.mjpeg', 0.25), ({}, []))
+        self.assertEqual(compare(results, None, 'synthetic', 0.25), ({}, []))
+
+    def test_save_then_compare(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'baseline.json')
+            self.assertIsNone(load_baseline(path))
+            capture = os.path.join(tmpdir, 'capture.mjpeg')
+            with open(capture, 'wb') as f:
+                f.write(capture_body(RECORDING))
+            argv = ['benchmark_suite.py', '--recording', capture, '--only', 'parse', '--rounds', '1',
+                    '--baseline', path]
+            with mock.patch('sys.argv', argv + ['--save']), mock.patch('builtins.print'):
+                self.assertEqual(benchmark_suite.main(), 0)
+            with open(path) as f:
+                saved = json.load(f)
+            self.assertEqual(saved['recording'], 'capture.mjpeg')
+            self.assertEqual(saved['results']['parse']['frames'], 6)
+            self.assertIn('opencv', saved['machine'])
+
+            # A baseline far faster than any machine makes the run fail
+            saved['results']['parse']['median_ms'] = 1e-6
+            with open(path, 'w') as f:
+                json.dump(saved, f)
+            with mock.patch('sys.argv', argv), mock.patch('builtins.print'):
+                self.assertEqual(benchmark_suite.main(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
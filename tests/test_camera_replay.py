@@ -0,0 +1,195 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import requests
+
+from benchmark_suite import synthetic_recording
+from camera_replay import (FrameSequenceWriter, MJPEGFileWriter, ReplaySource, load_recording,
+                           record_stream, stream_url_for)
+from fake_mjpeg_server import FakeMJPEGServer, synthetic_frames
+from frame_pipeline import FrameExchange
+
+# The scanner lives in the library app (src.qr.scanner)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'library-opencv-app')
+if APP_DIR not in sys.path:
+    sys.path.append(APP_DIR)
+from src.qr.scanner import iter_scan  # noqa: E402
+
+try:
+    from esp32cam_virtual_camera import ESP32CamReader
+except ImportError:  # pyvirtualcam is not installed
+    ESP32CamReader = None
+
+WIDTH, HEIGHT = 64, 48
+JPEGS = synthetic_frames(count=3, width=WIDTH, height=HEIGHT)
+
+
+def write_recording(writer, stamps):
+    for index, timestamp in enumerate(stamps):
+        writer.write(JPEGS[index % len(JPEGS)], timestamp)
+    writer.close()
+
+
+def replay_times(source):
+    """(seconds since the start, frame timestamp) for every replayed frame"""
+    started = time.monotonic()
+    return [(time.monotonic() - started, frame.timestamp) for frame in source.iter_frames()]
+
+
+class TestReplaySource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mjpeg = os.path.join(self.tmpdir.name, 'capture.mjpeg')
+        self.frame_dir = os.path.join(self.tmpdir.name, 'frames')
+        stamps = [1000.0, 1000.1, 1000.3]
+        write_recording(MJPEGFileWriter(self.mjpeg), stamps)
+        write_recording(FrameSequenceWriter(self.frame_dir), stamps)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_both_formats_load_with_timestamps(self):
+        for path in (self.mjpeg, self.frame_dir):
+            with self.subTest(path=os.path.basename(path)):
+                recording = load_recording(path)
+                self.assertEqual([jpg for jpg, _ in recording], JPEGS)
+                self.assertEqual([round(t, 6) for _, t in recording], [1000.0, 1000.1, 1000.3])
+
+    def test_realtime_follows_the_recorded_timestamps(self):
+        # X-Timestamp part headers and timestamps.txt pace the same way
+        for path in (self.mjpeg, self.frame_dir):
+            with self.subTest(path=os.path.basename(path)):
+                source = ReplaySource(path)
+                self.assertEqual([round(offset, 6) for offset in source.offsets], [0.0, 0.1, 0.3])
+                times = replay_times(source)
+                self.assertEqual([round(t, 6) for _, t in times], [1000.0, 1000.1, 1000.3])
+                for (elapsed, _), offset in zip(times, source.offsets):
+                    self.assertGreaterEqual(elapsed, offset - 0.01)
+                    self.assertLess(elapsed, offset + 0.08)
+
+    def test_speed_scales_the_pacing(self):
+        times = replay_times(ReplaySource(self.mjpeg, speed=2.0))
+        self.assertGreaterEqual(times[-1][0], 0.14)
+        self.assertLess(times[-1][0], 0.25)
+
+    def test_frames_without_timestamps_use_fps(self):
+        os.remove(os.path.join(self.frame_dir, 'timestamps.txt'))
+        source = ReplaySource(self.frame_dir, fps=20)
+        self.assertEqual(source.offsets, [0.0, 0.05, 0.1])
+        self.assertAlmostEqual(source.duration, 0.15)
+        self.assertGreaterEqual(replay_times(source)[-1][0], 0.09)
+
+    def test_fast_mode_does_not_wait(self):
+        source = ReplaySource(self.mjpeg, realtime=False)
+        times = replay_times(source)
+        self.assertEqual(len(times), 3)
+        self.assertLess(times[-1][0], 0.05)
+        stats = source.stats()
+        self.assertEqual((stats['frames'], stats['bytes_received'], stats['loops']), (3, sum(map(len, JPEGS)), 0))
+
+    def test_loop_continues_the_timeline(self):
+        source = ReplaySource(self.mjpeg, realtime=False, loop=True)
+        stamps = []
+        for frame in source.iter_frames():
+            stamps.append(round(frame.timestamp, 6))
+            if len(stamps) == 7:
+                source.stop()
+        # duration = last offset + one frame at the default 30 fps
+        loop = round(source.duration, 6)
+        self.assertAlmostEqual(loop, 0.3 + 1 / 30, places=6)
+        self.assertEqual(stamps[3:6], [round(t + loop, 6) for t in stamps[:3]])
+        self.assertEqual(source.loops, 2)
+
+    def test_stop_interrupts_a_realtime_wait(self):
+        source = ReplaySource(self.mjpeg, speed=0.01)
+        frames = source.iter_frames()
+        next(frames)
+        source.stop()
+        started = time.monotonic()
+        self.assertEqual(list(frames), [])
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_empty_recording(self):
+        empty = os.path.join(self.tmpdir.name, 'empty')
+        os.mkdir(empty)
+        source = ReplaySource(empty)
+        self.assertFalse(source.probe())
+        self.assertEqual(list(source.iter_frames()), [])
+        self.assertIn('no frames', source.stats()['last_error'])
+
+    def test_iterating_yields_decoded_frames(self):
+        images = list(ReplaySource(self.frame_dir, realtime=False))
+        self.assertEqual(len(images), 3)
+        self.assertEqual(images[0].shape, (HEIGHT, WIDTH, 3))
+
+
+class TestRecordAndReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.session = requests.Session()
+        self.recording = synthetic_recording(frames=6)
+
+    def tearDown(self):
+        self.session.close()
+        self.tmpdir.cleanup()
+
+    def record(self, name):
+        path = os.path.join(self.tmpdir.name, name)
+        frames = [jpg for jpg, _ in self.recording]
+        with FakeMJPEGServer(frames, fps=20) as server:
+            count = record_stream(server.url, path, max_frames=len(frames), session=self.session)
+        self.assertEqual(count, len(frames))
+        return path
+
+    def test_stream_url_for(self):
+        self.assertEqual(stream_url_for('http://192.168.1.100'), 'http://192.168.1.100:81/stream')
+        self.assertEqual(stream_url_for('http://127.0.0.1:8081/stream'), 'http://127.0.0.1:8081/stream')
+
+    def test_recording_keeps_frames_and_pacing(self):
+        for name in ('capture.mjpeg', 'frames'):
+            with self.subTest(recording=name):
+                replay = ReplaySource(self.record(name))
+                self.assertEqual([jpg for jpg, _ in replay.frames_data], [jpg for jpg, _ in self.recording])
+                # The server stamps frames 50 ms apart
+                gaps = np.diff(replay.offsets)
+                self.assertAlmostEqual(float(np.median(gaps)), 0.05, delta=0.02)
+
+    def test_replay_into_the_scanner(self):
+        for name in ('capture.mjpeg', 'frames'):
+            with self.subTest(recording=name):
+                results = list(iter_scan(ReplaySource(self.record(name), realtime=False)))
+                # The code is in view for the first two thirds of the clip
+                self.assertEqual([(r.data, r.frame_index) for r in results],
+                                 [('QR001', index) for index in range(4)])
+
+    def test_replay_into_the_frame_exchange(self):
+        # What ESP32CamReader._read_stream does with its client's frames
+        replay = ReplaySource(self.record('capture.mjpeg'), realtime=False)
+        exchange = FrameExchange(320, 240)
+        for jpg in replay.iter_frames():
+            exchange.put(bytes(jpg.data), jpg.timestamp)
+            frame = exchange.read()
+            self.assertEqual(frame.image.shape, (240, 320, 3))
+            self.assertEqual(frame.timestamp, jpg.timestamp)
+        self.assertEqual((exchange.received, exchange.decoded), (6, 6))
+
+    @unittest.skipIf(ESP32CamReader is None, 'pyvirtualcam is not installed')
+    def test_replay_into_the_reader(self):
+        replay = ReplaySource(self.record('capture.mjpeg'), realtime=False)
+        reader = ESP32CamReader(replay.path, client=replay).start()
+        reader.thread.join(5)
+        frame = reader.read()
+        reader.stop()
+        self.assertEqual(frame.shape, (480, 640, 3))
+        stats = reader.stats()
+        self.assertEqual((stats['frames'], stats['received'], stats['url']), (6, 6, replay.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from capture_control import (BURST_PROFILE, IDLE_PROFILE, MAX_BANDWIDTH, QUALITY_STEP, CaptureController,
+                             control_url_for)
+from fake_mjpeg_server import FakeMJPEGServer
+
+# An empty scene and the same scene with something held in front of the camera
+FRAMES = [cv2.imencode('.jpg', np.full((240, 320, 3), level, dtype=np.uint8))[1].tobytes() for level in (40, 200)]
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestCaptureController(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeMJPEGServer(FRAMES).__enter__()
+        self.clock = Clock()
+        self.controller = CaptureController(control_url_for(self.server.stream_url), clock=self.clock,
+                                            scan_budget=0.05).start()
+
+    def tearDown(self):
+        self.controller.stop()
+        self.server.__exit__(None, None, None)
+
+    def test_profiles_reach_the_camera(self):
+        self.assertTrue(wait_for(lambda: self.server.settings == {'framesize': IDLE_PROFILE.framesize,
+                                                                  'quality': IDLE_PROFILE.quality}))
+        self.controller.observe(0.01, candidate=False, hit=True)
+        self.assertEqual(self.controller.mode, 'burst')
+        self.assertTrue(wait_for(lambda: self.server.settings == {'framesize': BURST_PROFILE.framesize,
+                                                                  'quality': BURST_PROFILE.quality}))
+
+    def test_new_burst_restores_framesize(self):
+        controller = self.controller
+        controller.observe(0.01, candidate=False, hit=True)
+        for _ in range(2):
+            controller.observe(0.2, candidate=True, hit=False)
+        self.assertEqual(controller.profile().framesize, BURST_PROFILE.framesize - 2)
+
+        self.clock.now += controller.burst_seconds + 1
+        controller.observe(0.2, candidate=False, hit=False)
+        self.assertEqual(controller.mode, 'idle')
+        controller.observe(0.01, candidate=False, hit=True)
+        self.assertEqual(controller.mode, 'burst')
+        self.assertEqual(controller.profile().framesize, BURST_PROFILE.framesize)
+        self.assertEqual(controller.bursts, 1 + 1)
+
+    def test_burst_hold_follows_the_hit_rate(self):
+        controller = self.controller
+        low, high = controller.hold_scale
+        # Codes decoding in most scans keep the camera at full resolution longer
+        for _ in range(4):
+            controller.observe(0.01, candidate=False, hit=True)
+        self.assertEqual(controller.hold(), controller.burst_seconds * high)
+        self.clock.now += controller.burst_seconds * 1.5
+        controller.observe(0.01, candidate=False, hit=False)
+        self.assertEqual(controller.mode, 'burst')
+
+        # Candidates that never decode let it drop back early
+        hits = controller._hits
+        for _ in range(hits.maxlen):
+            controller.observe(0.01, candidate=True, hit=False)
+        self.assertEqual(controller.hold(), controller.burst_seconds * low)
+        self.clock.now += controller.burst_seconds * low + 0.01
+        controller.observe(0.01, candidate=False, hit=False)
+        self.assertEqual(controller.mode, 'idle')
+        self.assertEqual(controller.stats()['burst_hold'], round(controller.burst_seconds * low, 2))
+
+    def test_bandwidth_raises_the_quality_number(self):
+        controller = self.controller
+        self.assertEqual(controller.max_bandwidth, MAX_BANDWIDTH)
+        controller.observe(0.01, candidate=False, hit=True, bytes_per_sec=MAX_BANDWIDTH * 1.5)
+        self.assertEqual(controller.profile().quality, BURST_PROFILE.quality + QUALITY_STEP)
+        controller.observe(0.01, candidate=False, hit=True, bytes_per_sec=MAX_BANDWIDTH * 0.8)
+        self.assertEqual(controller.profile().quality, BURST_PROFILE.quality + QUALITY_STEP)
+        controller.observe(0.01, candidate=False, hit=True, bytes_per_sec=MAX_BANDWIDTH * 0.4)
+        self.assertEqual(controller.profile().quality, BURST_PROFILE.quality)
+        self.assertTrue(wait_for(lambda: self.server.settings.get('quality') == BURST_PROFILE.quality))
+
+    def test_idle_scans_only_changed_frames(self):
+        controller = self.controller
+        self.assertTrue(controller.should_scan(FRAMES[0]))
+        self.assertFalse(controller.should_scan(FRAMES[0]))
+        self.assertTrue(controller.should_scan(FRAMES[1]))
+        # A still scene is scanned scan_fps times per second
+        self.clock.now += 1.0 / IDLE_PROFILE.scan_fps
+        self.assertTrue(controller.should_scan(FRAMES[1]))
+        self.assertEqual(controller.skipped, 1)
+
+    def test_concurrent_workers_keep_counts(self):
+        controller = self.controller
+        calls, results = 200, []
+
+        def worker():
+            for i in range(calls):
+                results.append(controller.should_scan(FRAMES[i % 2]))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for _ in range(calls):
+            controller.observe(0.001, candidate=False, hit=False)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(controller.scans, calls)
+        self.assertEqual(controller.skipped, results.count(False))
+        self.assertEqual(len(results), 4 * calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+from benchmark_suite import synthetic_recording
+from capture_control import CaptureController
+from esp32cam_ingest import CameraEndpoint, IngestService, _Camera, _open_stream
+from fake_mjpeg_server import FakeMJPEGServer, synthetic_frames
+
+FRAMES = synthetic_frames(count=4, width=64, height=48)
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestOpenStream(unittest.TestCase):
+
+    def test_handshake_timeout_closes_the_connection(self):
+        # Accepts the request but never answers it
+        listener = socket.create_server(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        received = []
+
+        def serve():
+            conn, _ = listener.accept()
+            with conn:
+                conn.settimeout(5)
+                while True:
+                    data = conn.recv(4096)
+                    if not data:
+                        break
+                    received.append(data)
+            received.append(b'<closed>')
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        try:
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(_open_stream(f'http://127.0.0.1:{port}/stream', 0.1))
+            thread.join(5)
+        finally:
+            listener.close()
+        self.assertTrue(received[0].startswith(b'GET /stream HTTP/1.1'))
+        self.assertEqual(received[-1], b'<closed>')
+
+
+class TestIngestService(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [FakeMJPEGServer(FRAMES, fps=50).__enter__() for _ in range(2)]
+        self.endpoints = [CameraEndpoint(f'corner-{i}', server.stream_url)
+                          for i, server in enumerate(self.servers)]
+        self.scans = []
+        self.service = IngestService(self.endpoints, workers=1, scan_fn=lambda jpg: ['QR001'],
+                                     on_scan=lambda name, codes: self.scans.append(name))
+
+    def tearDown(self):
+        self.service.stop()
+        for server in self.servers:
+            server.__exit__(None, None, None)
+
+    def test_frames_are_received_and_scanned(self):
+        self.service.start()
+        stats = self.service.stats
+        self.assertTrue(wait_for(lambda: all(s['decoded'] or s['received'] >= 3 for s in stats().values())))
+        self.assertTrue(wait_for(lambda: {'corner-0', 'corner-1'} <= set(self.scans)))
+        frame = self.service.reader('corner-0').read_next(timeout=5)
+        self.assertEqual(frame.image.shape, (480, 640, 3))
+
+    def test_reader_stop_only_stops_its_camera(self):
+        first, second = self.service.reader('corner-0'), self.service.reader('corner-1')
+        first.start()
+        self.assertTrue(self.service.running)
+        first.stop()
+        self.assertTrue(self.service.running)
+        stopped = first.stats()['received']
+        self.assertIsNotNone(second.read_next(timeout=5))
+        self.assertIsNotNone(second.read_next(timeout=5))
+        self.assertEqual(first.stats()['received'], stopped)
+
+        # Starting the reader again resumes its camera
+        first.start()
+        self.assertIsNotNone(first.read_next(timeout=5))
+        # The service stops with the last camera
+        first.stop()
+        second.stop()
+        self.assertFalse(self.service.running)
+
+    def test_start_raises_setup_errors(self):
+        service = IngestService(self.endpoints, workers=0)
+        started = time.monotonic()
+        with self.assertRaises(ValueError):
+            service.start()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertFalse(service.running)
+
+
+class TestScanWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.jpg = synthetic_recording(frames=3)[0][0]  # 640x480 with a QR code
+        self.endpoint = CameraEndpoint('corner-0', 'http://127.0.0.1:81/stream')
+
+    def test_jpeg_is_decoded_once_for_scanner_and_readers(self):
+        images = []
+
+        def scan(image):
+            images.append(image)
+            return ['QR001']
+        camera = _Camera(self.endpoint, queue_size=2)
+        seq = camera.frames.put(self.jpg)
+        service = IngestService([self.endpoint], scan_fn=scan)
+        self.assertEqual(service._scan(camera, self.jpg, seq), (['QR001'], True))
+        frame = camera.frames.read()
+        self.assertIs(frame.image, images[0])
+        self.assertEqual(camera.frames.stats()['decoded'], 1)
+
+    def test_default_and_adaptive_scans_read_the_code(self):
+        for adaptive in (False, True):
+            with self.subTest(adaptive=adaptive):
+                controller = CaptureController('http://127.0.0.1/control') if adaptive else None
+                camera = _Camera(self.endpoint, queue_size=2, controller=controller)
+                seq = camera.frames.put(self.jpg)
+                codes, candidate = IngestService([self.endpoint])._scan(camera, self.jpg, seq)
+                self.assertEqual((codes, candidate), (['QR001'], True))
+                self.assertEqual(camera.frames.read().image.shape, (480, 640, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
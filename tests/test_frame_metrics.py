@@ -0,0 +1,158 @@
+import json
+import re
+import unittest
+
+import numpy as np
+import requests
+
+from frame_metrics import MetricsServer, RollingHistogram, StageMetrics
+from frame_pipeline import OutputStage, render_placeholder
+
+WIDTH, HEIGHT = 64, 48
+
+
+class FakeCam:
+    """Records what would be sent to a pyvirtualcam.Camera"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, frame):
+        self.sent.append((frame, frame.copy()))
+
+
+class TestRollingHistogram(unittest.TestCase):
+
+    def test_quantiles_cover_only_the_rolling_window(self):
+        histogram = RollingHistogram(window=100)
+        self.assertEqual(histogram.quantiles(), [None, None, None])
+        for ms in range(1, 101):
+            histogram.observe(ms / 1000)
+        p50, p95, p99 = histogram.quantiles()
+        self.assertAlmostEqual(p50, 0.0505)
+        self.assertAlmostEqual(p95, 0.09505)
+        self.assertAlmostEqual(p99, 0.09901)
+        # Older samples fall out of the window, lifetime totals keep them
+        for _ in range(100):
+            histogram.observe(1.0)
+        self.assertEqual(histogram.quantiles(), [1.0, 1.0, 1.0])
+        self.assertEqual(histogram.count, 200)
+        self.assertAlmostEqual(histogram.sum, 5.05 + 100)
+
+    def test_bucket_counts_include_inf(self):
+        histogram = RollingHistogram(buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.01, 0.05, 5.0):
+            histogram.observe(seconds)
+        # Upper bounds are inclusive, like Prometheus "le"
+        self.assertEqual(histogram.bucket_counts, [2, 1, 1])
+
+
+class TestStageMetrics(unittest.TestCase):
+
+    def test_missed_deadlines_count_work_over_budget(self):
+        metrics = StageMetrics(budget=0.010)
+        metrics.observe('decode', 0.004)
+        metrics.observe('convert', 0.004)
+        self.assertFalse(metrics.frame_done())
+        metrics.observe('decode', 0.008)
+        metrics.observe('send', 0.004)
+        self.assertTrue(metrics.frame_done())
+        # Waiting and network time are not work of the output loop
+        metrics.observe('wait', 0.5)
+        metrics.observe('network', 0.5)
+        self.assertFalse(metrics.frame_done(placeholder=True))
+        stats = metrics.stats()
+        self.assertEqual((stats['frames'], stats['placeholders'], stats['missed_deadlines']), (3, 1, 1))
+        self.assertEqual(stats['budget_ms'], 10.0)
+        self.assertEqual(stats['work']['max'], 12.0)
+
+    def test_no_budget_never_misses(self):
+        metrics = StageMetrics()
+        metrics.observe('decode', 10.0)
+        self.assertFalse(metrics.frame_done())
+        self.assertEqual(metrics.missed_deadlines, 0)
+
+    def test_prometheus_buckets_are_cumulative(self):
+        metrics = StageMetrics(stages=('decode',), budget=0.033, buckets=(0.001, 0.01, 0.1))
+        for seconds in (0.0005, 0.005, 0.005, 0.05, 1.0):
+            metrics.observe('decode', seconds)
+        metrics.frame_done()
+        text = metrics.prometheus()
+        buckets = re.findall(r'^esp32cam_stage_seconds_bucket\{stage="decode",le="([^"]+)"\} (\d+)$',
+                             text, re.MULTILINE)
+        self.assertEqual(buckets, [('0.001', '1'), ('0.01', '3'), ('0.1', '4'), ('+Inf', '5')])
+        self.assertIn('esp32cam_stage_seconds_count{stage="decode"} 5\n', text)
+        self.assertIn('esp32cam_stage_seconds_sum{stage="decode"} 1.060500\n', text)
+        self.assertIn('esp32cam_frame_work_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('esp32cam_frame_work_seconds_count 1\n', text)
+        self.assertIn('esp32cam_missed_deadlines_total 1\n', text)
+        self.assertIn('esp32cam_frame_budget_seconds 0.033000\n', text)
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def test_serves_metrics_and_stats(self):
+        metrics = StageMetrics(budget=0.033)
+        metrics.observe('decode', 0.002)
+        metrics.frame_done()
+        with MetricsServer(metrics, extra_stats=lambda: {'connected': True}) as server:
+            response = requests.get(server.url + '/metrics', timeout=5)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+            self.assertIn('esp32cam_frames_total 1\n', response.text)
+
+            stats = requests.get(server.url + '/stats?pretty=1', timeout=5).json()
+            self.assertEqual(stats['frames'], 1)
+            self.assertEqual(stats['stages']['decode']['count'], 1)
+            self.assertEqual(stats['source'], {'connected': True})
+            self.assertEqual(json.loads(json.dumps(stats)), stats)
+
+            self.assertEqual(requests.get(server.url + '/other', timeout=5).status_code, 404)
+
+
+class TestOutputStage(unittest.TestCase):
+
+    def setUp(self):
+        self.cam = FakeCam()
+        self.metrics = StageMetrics(budget=1.0)
+        self.output = OutputStage(self.cam, WIDTH, HEIGHT, self.metrics)
+
+    def test_frames_are_converted_into_the_preallocated_buffer(self):
+        bgr = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        bgr[..., 0] = 255  # Blue
+        buffer = self.output.rgb
+        self.assertFalse(self.output.send(bgr))
+        bgr[..., 0], bgr[..., 2] = 0, 255  # Red
+        self.output.send(bgr)
+
+        (first, first_pixels), (second, second_pixels) = self.cam.sent
+        # The same buffer is reused for every frame
+        self.assertIs(first, buffer)
+        self.assertIs(second, buffer)
+        self.assertIs(self.output.rgb, buffer)
+        self.assertEqual(first_pixels[0, 0].tolist(), [0, 0, 255])
+        self.assertEqual(second_pixels[0, 0].tolist(), [255, 0, 0])
+        # The caller's BGR frame is left untouched
+        self.assertEqual(bgr[0, 0].tolist(), [0, 0, 255])
+        self.assertEqual(self.metrics.histograms['convert'].count, 2)
+        self.assertEqual(self.metrics.histograms['send'].count, 2)
+        self.assertEqual(self.metrics.frames, 2)
+
+    def test_placeholder_is_rendered_once(self):
+        placeholder = self.output.placeholder
+        np.testing.assert_array_equal(placeholder, render_placeholder(WIDTH, HEIGHT))
+        self.output.send_placeholder()
+        self.output.send_placeholder()
+        self.assertIs(self.cam.sent[0][0], placeholder)
+        self.assertIs(self.cam.sent[1][0], placeholder)
+        self.assertEqual((self.metrics.frames, self.metrics.placeholders), (2, 2))
+        self.assertEqual(self.metrics.histograms['convert'].count, 0)
+
+    def test_without_metrics_nothing_is_missed(self):
+        output = OutputStage(self.cam, WIDTH, HEIGHT)
+        self.assertFalse(output.send(np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)))
+        self.assertFalse(output.send_placeholder())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from frame_metrics import StageMetrics
+from frame_pipeline import FrameExchange, jpeg_size, reduced_decode_flag
+from fake_mjpeg_server import synthetic_frames
+
+WIDTH, HEIGHT = 64, 48
+JPEGS = synthetic_frames(count=3, width=WIDTH, height=HEIGHT)
+
+
+class TestDecodeOnDemand(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = FrameExchange(WIDTH, HEIGHT)
+
+    def test_only_the_newest_jpeg_is_decoded(self):
+        self.assertIsNone(self.exchange.read())
+        for jpg in JPEGS:
+            self.exchange.put(jpg)
+        self.assertEqual(self.exchange.decoded, 0)
+        # The two JPEGs replaced before the read are dropped, never decoded
+        frame = self.exchange.read()
+        self.assertEqual((self.exchange.received, self.exchange.decoded, self.exchange.dropped), (3, 1, 2))
+        # Reading again without a new JPEG returns the same frame, decoded once
+        self.assertIs(self.exchange.read(), frame)
+        self.assertEqual(self.exchange.decoded, 1)
+        # A JPEG taken by the consumer does not count as dropped
+        self.exchange.put(JPEGS[0])
+        self.exchange.read()
+        self.assertEqual((self.exchange.decoded, self.exchange.dropped), (2, 2))
+
+    def test_undecodable_jpeg_is_counted(self):
+        self.exchange.put(b'\xff\xd8 not a jpeg \xff\xd9')
+        self.assertIsNone(self.exchange.read())
+        self.assertEqual((self.exchange.decoded, self.exchange.failed), (0, 1))
+
+    def test_jpeg_size_reads_the_header(self):
+        _, encoded = cv2.imencode('.jpg', np.zeros((HEIGHT, WIDTH, 3), np.uint8))
+        self.assertEqual(jpeg_size(encoded.tobytes()), (WIDTH, HEIGHT))
+        self.assertEqual(jpeg_size(encoded.tobytes()[:200]), (WIDTH, HEIGHT))
+        self.assertIsNone(jpeg_size(b'\xff\xd8 not a jpeg'))
+
+    def test_reduced_decode_for_larger_sources(self):
+        target = (640, 480)
+        self.assertEqual(reduced_decode_flag((2560, 1920), target), cv2.IMREAD_REDUCED_COLOR_4)
+        self.assertEqual(reduced_decode_flag((1600, 1200), target), cv2.IMREAD_REDUCED_COLOR_2)
+        self.assertEqual(reduced_decode_flag((800, 600), target), cv2.IMREAD_COLOR)
+        self.assertEqual(reduced_decode_flag(None, target), cv2.IMREAD_COLOR)
+
+    def test_larger_frames_are_scaled_to_size(self):
+        for scale in (4, 3):
+            with self.subTest(scale=scale):
+                self.exchange.put(synthetic_frames(count=1, width=WIDTH * scale, height=HEIGHT * scale)[0])
+                self.assertEqual(self.exchange.read().image.shape, (HEIGHT, WIDTH, 3))
+
+
+
+class TestFrameExchange(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = FrameExchange(WIDTH, HEIGHT)
+
+    def put_later(self, jpg, delay=0.05):
+        timer = threading.Timer(delay, self.exchange.put, (jpg,))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_sequence_numbers_and_timestamps(self):
+        self.assertEqual(self.exchange.seq, 0)
+        for i, jpg in enumerate(JPEGS):
+            self.exchange.put(jpg, timestamp=100.0 + i)
+        frame = self.exchange.read()
+        self.assertEqual((frame.seq, frame.timestamp), (3, 102.0))
+        self.assertGreaterEqual(self.exchange.age(frame), 0)
+        self.exchange.put(JPEGS[0])
+        self.assertEqual(self.exchange.read().seq, 4)
+        self.assertEqual(self.exchange.stats()['seq'], 4)
+
+    def test_read_next_waits_for_a_newer_frame(self):
+        self.exchange.put(JPEGS[0])
+        self.assertEqual(self.exchange.read_next(timeout=1).seq, 1)
+        started = time.monotonic()
+        self.assertIsNone(self.exchange.read_next(timeout=0.05))
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.put_later(JPEGS[1])
+        self.assertEqual(self.exchange.read_next(timeout=5).seq, 2)
+
+    def test_adopted_frames_are_not_decoded_again(self):
+        seq = self.exchange.put(JPEGS[0], timestamp=5.0)
+        image = self.exchange.decode(JPEGS[0])
+        self.assertTrue(self.exchange.adopt(seq, image))
+        frame = self.exchange.read()
+        self.assertIs(frame.image, image)
+        self.assertEqual((frame.seq, frame.timestamp, self.exchange.decoded), (seq, 5.0, 1))
+
+        # A decode of a JPEG that was already replaced is ignored
+        stale = self.exchange.put(JPEGS[1])
+        self.exchange.put(JPEGS[2])
+        self.assertFalse(self.exchange.adopt(stale, self.exchange.decode(JPEGS[1])))
+        self.assertEqual(self.exchange.read().seq, stale + 1)
+
+    def test_read_next_returns_an_adopted_frame(self):
+        self.exchange.read()
+        seq = self.exchange.put(JPEGS[0])
+        image = self.exchange.decode(JPEGS[0])
+        self.exchange.adopt(seq, image)
+        frame = self.exchange.read_next(timeout=1)
+        self.assertIs(frame.image, image)
+        self.assertEqual(self.exchange.decoded, 1)
+
+    def test_consumer_wait_is_not_timed_as_network(self):
+        metrics = StageMetrics()
+        exchange = FrameExchange(WIDTH, HEIGHT, metrics)
+        self.assertIsNone(exchange.read_next(timeout=0.05))
+        exchange.put(JPEGS[0])
+        exchange.read_next(timeout=1)
+        histograms = metrics.histograms
+        self.assertEqual((histograms['wait'].count, histograms['network'].count), (2, 0))
+        self.assertGreaterEqual(histograms['wait'].window().max(), 0.04)
+        self.assertEqual(histograms['decode'].count, 1)
+
+    def test_read_next_skips_undecodable_jpegs(self):
+        self.exchange.put(b'\xff\xd8 not a jpeg \xff\xd9')
+        self.put_later(JPEGS[2])
+        self.assertEqual(self.exchange.read_next(timeout=5).seq, 2)
+        self.assertEqual(self.exchange.failed, 1)
+
+    def test_previous_frame_is_not_overwritten(self):
+        # Same size (handed out as decoded) and resized into the alternating buffers
+        for jpegs in (JPEGS, synthetic_frames(count=2, width=100, height=75)):
+            with self.subTest(size=jpeg_size(jpegs[0])):
+                self.exchange.put(jpegs[0])
+                first = self.exchange.read()
+                snapshot = first.image.copy()
+                self.exchange.put(jpegs[1])
+                second = self.exchange.read()
+                self.assertIsNot(first.image, second.image)
+                np.testing.assert_array_equal(first.image, snapshot)
+                self.assertEqual(second.image.shape, (HEIGHT, WIDTH, 3))
+
+    def test_resized_frames_reuse_two_buffers(self):
+        jpg = synthetic_frames(count=1, width=100, height=75)[0]
+        images = []
+        for _ in range(4):
+            self.exchange.put(jpg)
+            images.append(self.exchange.read().image)
+        self.assertIs(images[0], images[2])
+        self.assertIs(images[1], images[3])
+        self.assertIsNot(images[0], images[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
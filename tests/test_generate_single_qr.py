@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+
+from generate_single_qr import parse_request
+from qr_cache import MANIFEST_NAME
+
+
+def body(*codes):
+    return json.dumps({'codes': [{'qr_code': 'QR001', 'output_path': path} for path in codes]}).encode()
+
+
+class TestParseRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_image_paths_resolve_inside_root(self):
+        items = parse_request(body('a.png', 'books/b.SVG', os.path.join(self.root, 'c.png')), self.root)
+        self.assertEqual([path for _, path in items],
+                         [os.path.join(self.root, 'a.png'), os.path.join(self.root, 'books', 'b.SVG'),
+                          os.path.join(self.root, 'c.png')])
+        # output_path defaults to <qr_code>.png
+        self.assertEqual(parse_request(b'{"qr_code": "QR002"}', self.root),
+                         [('QR002', os.path.join(self.root, 'QR002.png'))])
+
+    def test_rejects_paths_outside_root(self):
+        for path in ('../x.png', '/etc/x.png', '.'):
+            with self.subTest(path=path), self.assertRaises(ValueError):
+                parse_request(body(path), self.root)
+
+    def test_rejects_manifest_dotfiles_and_other_extensions(self):
+        for path in (MANIFEST_NAME, 'books/' + MANIFEST_NAME, '.hidden.png', 'x.json', 'x.png.php', 'x'):
+            with self.subTest(path=path), self.assertRaises(ValueError):
+                parse_request(body('ok.png', path), self.root)
+
+    def test_rejects_symlinks_to_the_manifest(self):
+        os.symlink(os.path.join(self.root, MANIFEST_NAME), os.path.join(self.root, 'link.png'))
+        with self.assertRaises(ValueError):
+            parse_request(body('link.png'), self.root)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from fake_mjpeg_server import PART_BOUNDARY, STREAM_BOUNDARY, STREAM_PART
+from mjpeg_parser import MJPEGDemuxer, boundary_from_content_type
+
+JPEGS = [b'\xff\xd8' + bytes([i]) * (100 + i) + b'\xff\xd9' for i in range(1, 4)]
+
+
+def stream_body(jpegs, with_length=True):
+    body = b''
+    for index, jpg in enumerate(jpegs):
+        header = STREAM_PART.format(len(jpg), 1700000000 + index, 500000)
+        if not with_length:
+            header = header.replace(f"Content-Length: {len(jpg)}\r\n", "")
+        body += STREAM_BOUNDARY + header.encode() + jpg
+    return body
+
+
+class TestMJPEGDemuxer(unittest.TestCase):
+
+    def test_boundary_from_content_type(self):
+        self.assertEqual(boundary_from_content_type(f"multipart/x-mixed-replace;boundary={PART_BOUNDARY}"),
+                         PART_BOUNDARY.encode())
+        self.assertEqual(boundary_from_content_type('multipart/x-mixed-replace; boundary="abc"'), b'abc')
+        self.assertIsNone(boundary_from_content_type('image/jpeg'))
+
+    def test_parts_with_and_without_content_length(self):
+        for with_length in (True, False):
+            with self.subTest(with_length=with_length):
+                demuxer = MJPEGDemuxer(PART_BOUNDARY)
+                # The last part only completes once the next boundary arrives without a length
+                frames = demuxer.feed(stream_body(JPEGS, with_length) + STREAM_BOUNDARY)
+                self.assertEqual([bytes(f.data) for f in frames], JPEGS)
+                self.assertEqual(frames[0].timestamp, 1700000000.5)
+
+    def test_split_across_chunks(self):
+        body = stream_body(JPEGS, with_length=False) + STREAM_BOUNDARY
+        for size in (1, 7, 64):
+            with self.subTest(chunk_size=size):
+                demuxer = MJPEGDemuxer(PART_BOUNDARY)
+                frames = []
+                for offset in range(0, len(body), size):
+                    frames += [bytes(f.data) for f in demuxer.feed(body[offset:offset + size])]
+                self.assertEqual(frames, JPEGS)
+
+    def test_resyncs_after_garbage(self):
+        demuxer = MJPEGDemuxer(PART_BOUNDARY)
+        frames = demuxer.feed(b'garbage\r\n' * 10 + stream_body(JPEGS))
+        self.assertEqual([bytes(f.data) for f in frames], JPEGS)
+
+
+if __name__ == '__main__':
+    unittest.main()
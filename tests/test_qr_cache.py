@@ -0,0 +1,137 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+
+from generate_single_qr import generate
+from qr_cache import MANIFEST_NAME, QRCache, atomic_output, make_key
+
+
+class TestQRCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = self.tmpdir.name
+        self.path = os.path.join(self.folder, 'QR001.png')
+        self.key = make_key('QR001')
+        with open(self.path, 'wb') as f:
+            f.write(b'image')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def saved_cache(self):
+        cache = QRCache(self.folder)
+        cache.record(self.path, self.key)
+        cache.save()
+        return QRCache(self.folder)
+
+    def test_recorded_file_is_fresh_after_reload(self):
+        cache = self.saved_cache()
+        self.assertTrue(cache.is_fresh(self.path, self.key))
+        self.assertFalse(cache.is_fresh(os.path.join(self.folder, 'QR002.png'), make_key('QR002')))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_covers_every_render_setting(self):
+        keys = {make_key('QR001'), make_key('QR002'), make_key('QR001', error_correction='M'),
+                make_key('QR001', box_size=8), make_key('QR001', border=2), make_key('QR001', output_format='svg')}
+        self.assertEqual(len(keys), 6)
+        cache = self.saved_cache()
+        self.assertFalse(cache.is_fresh(self.path, make_key('QR002')))
+        self.assertFalse(cache.is_fresh(self.path, make_key('QR001', output_format='svg')))
+
+    def test_changed_or_missing_file_is_stale(self):
+        cache = self.saved_cache()
+        with open(self.path, 'ab') as f:
+            f.write(b'!')
+        self.assertFalse(cache.is_fresh(self.path, self.key))
+        os.remove(self.path)
+        self.assertFalse(cache.is_fresh(self.path, self.key))
+
+    def test_verify_catches_edits_that_keep_size_and_mtime(self):
+        cache = self.saved_cache()
+        before = os.stat(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'IMAGE')
+        os.utime(self.path, ns=(before.st_atime_ns, before.st_mtime_ns))
+        self.assertTrue(cache.is_fresh(self.path, self.key))
+        self.assertEqual(cache.verify(), ['QR001.png'])
+        self.assertFalse(cache.is_fresh(self.path, self.key))
+
+    def test_old_or_corrupt_manifests_are_ignored(self):
+        manifest = os.path.join(self.folder, MANIFEST_NAME)
+        self.saved_cache()
+        with open(manifest) as f:
+            data = json.load(f)
+        data['version'] -= 1
+        with open(manifest, 'w') as f:
+            json.dump(data, f)
+        self.assertEqual(QRCache(self.folder).entries, {})
+        with open(manifest, 'w') as f:
+            f.write('{not json')
+        self.assertEqual(QRCache(self.folder).entries, {})
+
+    def test_save_only_writes_when_changed(self):
+        self.saved_cache()
+        manifest = os.path.join(self.folder, MANIFEST_NAME)
+        os.remove(manifest)
+        cache = QRCache(self.folder)
+        cache.is_fresh(self.path, self.key)
+        cache.save()
+        self.assertFalse(os.path.exists(manifest))
+
+
+class TestAtomicOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'codes', 'QR001.png')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_replaces_the_file_readable_by_others(self):
+        with atomic_output(self.path) as f:
+            f.write(b'first')
+            # Nothing is visible until the block completes
+            self.assertFalse(os.path.exists(self.path))
+        with atomic_output(self.path) as f:
+            f.write(b'second')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'second')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['QR001.png'])
+
+    def test_failed_write_keeps_the_old_file(self):
+        with atomic_output(self.path) as f:
+            f.write(b'good')
+        with self.assertRaises(RuntimeError):
+            with atomic_output(self.path) as f:
+                f.write(b'partial')
+                raise RuntimeError('render failed')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'good')
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['QR001.png'])
+
+
+class TestGenerateWithCache(unittest.TestCase):
+
+    def test_unchanged_codes_are_not_rendered_again(self):
+        with tempfile.TemporaryDirectory() as folder:
+            png = os.path.join(folder, 'QR001.png')
+            self.assertTrue(generate('QR001', png))
+            mtime = os.stat(png).st_mtime_ns
+            self.assertFalse(generate('QR001', png))
+            self.assertEqual(os.stat(png).st_mtime_ns, mtime)
+            # New content for the same file, or no cache, renders again
+            self.assertTrue(generate('QR001-B', png))
+            self.assertTrue(generate('QR001-B', png, use_cache=False))
+            svg = os.path.join(folder, 'QR001.svg')
+            self.assertTrue(generate('QR001', svg))
+            with open(svg, 'rb') as f:
+                self.assertTrue(f.read().lstrip().startswith(b'<'))
+
+
+if __name__ == '__main__':
+    unittest.main()
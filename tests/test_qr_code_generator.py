@@ -0,0 +1,81 @@
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+import cv2
+
+from qr_code_generator import generate_bulk, load_books_file, write_bulk_report
+
+CODES = [f"QR{i:03d}" for i in range(7)]
+
+
+def run_bulk(books, folder, **kwargs):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        results = generate_bulk(books, folder, workers=2, **kwargs)
+    return results, output.getvalue()
+
+
+class TestBulkGeneration(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmpdir.name, 'qr_codes')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_codes_are_split_into_chunks(self):
+        results, output = run_bulk([{'qr_code': code} for code in CODES], self.folder, chunk_size=3)
+        self.assertIn('Generating 7 QR codes in 3 chunks', output)
+        self.assertEqual(sorted(r['qr_code'] for r in results), CODES)
+        self.assertTrue(all(r['error'] is None and r['seconds'] > 0 for r in results))
+        data, _, _ = cv2.QRCodeDetector().detectAndDecode(cv2.imread(os.path.join(self.folder, 'QR004.png')))
+        self.assertEqual(data, 'QR004')
+        # No temp files are left behind by the atomic writes
+        self.assertEqual(sorted(os.listdir(self.folder)), sorted([c + '.png' for c in CODES] + ['.qr_manifest.json']))
+
+    def test_failures_are_reported_and_retried(self):
+        books = [{'qr_code': code} for code in CODES[:3] + ['BAD\0CODE']]
+        results, output = run_bulk(books, self.folder, chunk_size=2)
+        errors = {r['qr_code']: r['error'] for r in results}
+        self.assertIsNotNone(errors.pop('BAD\0CODE'))
+        self.assertEqual(set(errors.values()), {None})
+        self.assertIn('❌ BAD', output)
+
+        # Only the failed code is attempted again
+        results, output = run_bulk(books, self.folder, chunk_size=2)
+        self.assertIn('3 unchanged codes skipped', output)
+        self.assertEqual([r['qr_code'] for r in results], ['BAD\0CODE'])
+
+    def test_report_csv(self):
+        results, _ = run_bulk([{'qr_code': code} for code in CODES[:3]], self.folder, chunk_size=2,
+                              output_format='svg')
+        report = os.path.join(self.tmpdir.name, 'report.csv')
+        write_bulk_report(results, report)
+        with open(report, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(list(rows[0]), ['qr_code', 'path', 'seconds', 'error'])
+        self.assertEqual(sorted(row['qr_code'] for row in rows), CODES[:3])
+        for row in rows:
+            self.assertEqual(row['path'], os.path.join(self.folder, row['qr_code'] + '.svg'))
+            self.assertGreater(float(row['seconds']), 0)
+            self.assertEqual(row['error'], '')
+
+    def test_load_books_file_reads_csv_and_tsv(self):
+        for delimiter, name in ((',', 'books.csv'), ('\t', 'books.tsv')):
+            with self.subTest(name=name):
+                path = os.path.join(self.tmpdir.name, name)
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    f.write(delimiter.join(['book_id', 'qr_code', 'title']) + '\n')
+                    f.write(delimiter.join(['1', ' QR001 ', 'Matilda']) + '\n')
+                    f.write(delimiter.join(['2', '', 'No code']) + '\n')
+                self.assertEqual(load_books_file(path),
+                                 [{'qr_code': 'QR001', 'book_id': '1', 'title': 'Matilda', 'author': ''}])
+
+
+if __name__ == '__main__':
+    unittest.main()
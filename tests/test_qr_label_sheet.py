@@ -0,0 +1,105 @@
+import os
+import re
+import tempfile
+import unittest
+import zlib
+
+import cv2
+import numpy as np
+
+from qr_label_sheet import LAYOUTS, render_labels
+
+DPI = 100  # Enough for the QR codes to decode, small enough to be quick
+BOOKS = [{'qr_code': f'QR{i:03d}', 'title': f'Book {i}', 'author': 'Author'} for i in range(35)]
+
+
+def parse_pdf(data):
+    """
+    Follow the trailer and xref table like a PDF reader would
+
+    Returns:
+        tuple: (objects {id: body bytes}, page tree dict body)
+    """
+    startxref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', data).group(1))
+    table = re.match(rb'xref\n0 (\d+)\n0000000000 65535 f \n', data[startxref:])
+    count = int(table.group(1))
+    entries = data[startxref + table.end():].split(b'\n')[:count - 1]
+    objects = {}
+    for object_id, entry in enumerate(entries, start=1):
+        offset = int(entry.split()[0])
+        match = re.match(rb'%d 0 obj\n(.*?)\nendobj\n' % object_id, data[offset:], re.DOTALL)
+        objects[object_id] = match.group(1)
+    trailer = re.search(rb'trailer\n<< /Size (\d+) /Root (\d+) 0 R >>', data)
+    assert int(trailer.group(1)) == count
+    catalog = objects[int(trailer.group(2))]
+    pages_id = int(re.search(rb'/Pages (\d+) 0 R', catalog).group(1))
+    return objects, objects[pages_id]
+
+
+def page_images(objects, pages):
+    """Decode the 1-bit image on each page of the page tree"""
+    images = []
+    for page_id in re.findall(rb'(\d+) 0 R', re.search(rb'/Kids \[(.*?)\]', pages).group(1)):
+        page = objects[int(page_id)]
+        image_id = int(re.search(rb'/Im0 (\d+) 0 R', page).group(1))
+        header, stream = objects[image_id].split(b'\nstream\n')
+        width = int(re.search(rb'/Width (\d+)', header).group(1))
+        height = int(re.search(rb'/Height (\d+)', header).group(1))
+        length = int(re.search(rb'/Length (\d+)', header).group(1))
+        bits = np.frombuffer(zlib.decompress(stream[:length]), dtype=np.uint8).reshape(height, -1)
+        images.append((page, np.unpackbits(bits, axis=1)[:, :width] * 255))
+    return images
+
+
+class TestLabelSheetPDF(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.layout = LAYOUTS['avery5160']
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def label_code(self, image, slot):
+        layout = self.layout
+        column, row = slot % layout.columns, slot // layout.columns
+        x = int(round((layout.left + column * (layout.label_width + layout.column_gap)) * DPI))
+        y = int(round((layout.top + row * layout.label_height) * DPI))
+        label = image[y:y + int(layout.label_height * DPI), x:x + int(layout.label_width * DPI)]
+        return cv2.QRCodeDetector().detectAndDecode(cv2.copyMakeBorder(label, 20, 20, 20, 20,
+                                                                       cv2.BORDER_CONSTANT, value=255))[0]
+
+    def test_pdf_pages_and_labels(self):
+        output = os.path.join(self.tmpdir.name, 'labels.pdf')
+        sheet = render_labels(iter(BOOKS), output, self.layout, dpi=DPI)
+        self.assertEqual((sheet.pages, sheet.labels), (2, 35))
+
+        with open(output, 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b'%PDF-1.4\n'))
+        objects, pages = parse_pdf(data)
+        self.assertIn(b'/Count 2', pages)
+        images = page_images(objects, pages)
+        self.assertEqual(len(images), 2)
+        for page, image in images:
+            self.assertIn(b'/MediaBox [0 0 612.00 792.00]', page)
+            self.assertEqual(image.shape, (1100, 850))
+
+        # 30 labels on the first page, the remaining 5 on the second
+        first, second = images[0][1], images[1][1]
+        self.assertEqual([self.label_code(first, slot) for slot in (0, 14, 29)], ['QR000', 'QR014', 'QR029'])
+        self.assertEqual([self.label_code(second, slot) for slot in (0, 4)], ['QR030', 'QR034'])
+        self.assertEqual(self.label_code(second, 5), '')
+        self.assertTrue((second[600:] == 255).all())
+
+    def test_png_pages(self):
+        output = os.path.join(self.tmpdir.name, 'labels.png')
+        sheet = render_labels(BOOKS[:31], output, self.layout, dpi=DPI)
+        self.assertEqual((sheet.pages, sheet.labels), (2, 31))
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ['labels-001.png', 'labels-002.png'])
+        page = cv2.imread(os.path.join(self.tmpdir.name, 'labels-002.png'), cv2.IMREAD_GRAYSCALE)
+        self.assertEqual(self.label_code(page, 0), 'QR030')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import re
+import sys
+import unittest
+
+import cv2
+import numpy as np
+
+from qr_render import FORMATS, qr_matrix, render_bytes
+
+# The app keeps its own copy of the backends (src.qr.generator)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'library-opencv-app')
+if APP_DIR not in sys.path:
+    sys.path.append(APP_DIR)
+from src.qr import generator  # noqa: E402
+
+PAYLOADS = ['QR001', 'BOOK-2024-000123', 'https://example.com/books/42?lang=fil', 'x' * 120]
+
+
+class TestQRRender(unittest.TestCase):
+
+    def test_png_decodes(self):
+        for error_correction in ('L', 'H'):
+            data = render_bytes('QR001', 'png', error_correction)
+            self.assertTrue(data.startswith(b'\x89PNG'))
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+            self.assertEqual(image.shape[0], len(qr_matrix('QR001', error_correction)) * 10)
+            self.assertEqual(cv2.QRCodeDetector().detectAndDecode(image)[0], 'QR001')
+
+    def test_svg_covers_every_dark_module(self):
+        matrix = qr_matrix('QR001')
+        svg = render_bytes('QR001', 'svg').decode('ascii')
+        runs = [int(width) for width in re.findall(r'h(\d+)v1', svg)]
+        self.assertEqual(sum(runs), sum(map(sum, matrix)))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            render_bytes('QR001', 'gif')
+
+    def test_app_generator_produces_the_same_bytes(self):
+        # The app encodes with error correction L
+        for payload in PAYLOADS:
+            self.assertEqual(generator.qr_matrix(payload, border=2).tolist(), qr_matrix(payload, 'L', border=2))
+            for output_format in FORMATS:
+                for box_size in (1, 10):
+                    with self.subTest(payload=payload[:16], format=output_format, box_size=box_size):
+                        self.assertEqual(generator.generate_qr_code_bytes(payload, output_format, box_size),
+                                         render_bytes(payload, output_format, 'L', box_size))
+
+
+if __name__ == '__main__':
+    unittest.main()
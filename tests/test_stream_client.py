@@ -0,0 +1,76 @@
+import threading
+import unittest
+
+import requests
+
+from esp32_stream_client import ESP32StreamClient
+from fake_mjpeg_server import FakeMJPEGServer, synthetic_frames
+from frame_metrics import StageMetrics
+
+FRAMES = synthetic_frames(count=5, width=64, height=48)
+
+
+def collect(client, count, timeout=10):
+    """First `count` frame payloads from client.iter_frames(), read on a thread"""
+    frames = []
+
+    def read():
+        for frame in client.iter_frames():
+            frames.append(bytes(frame.data))
+            if len(frames) == count:
+                break
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    client.stop()
+    return frames
+
+
+class TestStreamClient(unittest.TestCase):
+
+    def setUp(self):
+        self.session = requests.Session()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_transfer_and_length_variants(self):
+        for chunked in (True, False):
+            for with_length in (True, False):
+                with self.subTest(chunked=chunked, with_length=with_length):
+                    with FakeMJPEGServer(FRAMES, fps=0, chunked=chunked, with_length=with_length) as server:
+                        client = ESP32StreamClient(server.stream_url, session=self.session)
+                        frames = collect(client, 8)
+                    self.assertEqual(frames, [FRAMES[i % len(FRAMES)] for i in range(8)])
+                    self.assertEqual(client.connects, 1)
+                    self.assertGreater(client.bytes_received, sum(len(f) for f in frames))
+
+    def test_reconnects_after_drop(self):
+        with FakeMJPEGServer(FRAMES, fps=0, drop_after=3) as server:
+            client = ESP32StreamClient(server.stream_url, session=self.session, backoff_base=0.01)
+            frames = collect(client, 7)
+            connections = server.connections
+        # Every connection starts again at frame 0
+        self.assertEqual(frames, FRAMES[:3] * 2 + FRAMES[:1])
+        self.assertEqual(connections, 3)
+        self.assertEqual((client.connects, client.reconnects), (3, 2))
+        self.assertIsNotNone(client.last_error)
+
+
+    def test_network_stage_is_timed_per_frame(self):
+        metrics = StageMetrics(budget=1.0)
+        with FakeMJPEGServer(FRAMES, fps=20) as server:
+            client = ESP32StreamClient(server.stream_url, session=self.session, metrics=metrics)
+            frames = collect(client, 6)
+        network = metrics.histograms['network']
+        self.assertEqual(network.count, len(frames))
+        # Transfer of a small frame on loopback, not the 50 ms between frames
+        self.assertLess(network.quantiles()[0], 0.04)
+        # Reading runs on the reader thread and is not output loop work
+        metrics.frame_done()
+        self.assertEqual(metrics.work.sum, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()